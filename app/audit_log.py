@@ -1,109 +1,414 @@
 """
 Модуль логирования важных действий пользователей
 Audit trail для безопасности и отслеживания действий
+
+- Обработчики запросов не пишут на диск: запись уходит в очередь
+  (QueueHandler), файл пишет фоновый поток QueueListener.
+- Формат - JSON lines: {"ts", "level", "event", "user_id", "email", "ip", ...}
+  в logs/audit.jsonl.
+- Файл ротируется по размеру (AUDIT_MAX_BYTES) или возрасту
+  (AUDIT_ROTATE_HOURS) и сжимается в logs/audit-<начало>.jsonl.gz; рядом
+  пишется индекс audit-<начало>.idx.json (интервал времени, события,
+  пользователи), чтобы поиск пропускал заведомо неподходящие файлы.
+- Запись и ротация идут под файловой блокировкой - gunicorn workers пишут
+  в один файл.
+
+Поиск: query_events() или scripts/audit_query.py. Старый текстовый
+logs/audit.log больше не пополняется и в поиск не входит.
 """
+import atexit
+import glob
+import gzip
+import json
 import logging
-from datetime import datetime
-from typing import Optional
 import os
+import queue
+import threading
+from datetime import datetime, timedelta
+from logging.handlers import QueueHandler, QueueListener
+from typing import Iterable, Iterator, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: один процесс, блокировка не нужна
+    fcntl = None
 
 # Настройка логгера
 log_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'logs')
 os.makedirs(log_dir, exist_ok=True)
 
+AUDIT_LOG_FILE = 'audit.jsonl'
+AUDIT_MAX_BYTES = 10 * 1024 * 1024
+AUDIT_ROTATE_HOURS = 24
+# Сколько сжатых файлов хранить (при суточной ротации - около года)
+AUDIT_KEEP_FILES = 365
+# Поля, по которым событие относится к пользователю
+USER_FIELDS = ('user_id', 'target_user_id', 'admin_id')
+
 audit_logger = logging.getLogger('audit')
 audit_logger.setLevel(logging.INFO)
 
-# Файловый handler
-handler = logging.FileHandler(os.path.join(log_dir, 'audit.log'), encoding='utf-8')
-handler.setLevel(logging.INFO)
-
-# Формат логов
-formatter = logging.Formatter(
-    '%(asctime)s | %(levelname)s | %(message)s',
-    datefmt='%Y-%m-%d %H:%M:%S'
-)
-handler.setFormatter(formatter)
-audit_logger.addHandler(handler)
-
+_listener: Optional[QueueListener] = None
+_listener_pid = None
+_listener_lock = threading.Lock()
+
+
+# ==================== ЗАПИСЬ ====================
+
+class AuditJsonFormatter(logging.Formatter):
+    """Одна JSON-строка на событие"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'ts': datetime.fromtimestamp(record.created).isoformat(timespec='seconds'),
+            'level': record.levelname,
+            'event': getattr(record, 'audit_event', record.getMessage()),
+        }
+        entry.update(getattr(record, 'audit_fields', {}))
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class AuditFileHandler(logging.Handler):
+    """
+    Запись JSON lines с ротацией по размеру/возрасту и сжатием
+
+    Несколько процессов пишут в один файл: каждая запись делается под
+    блокировкой <файл>.lock, перед записью проверяется, не ротировал ли
+    файл другой процесс (тогда файл открывается заново).
+    """
+
+    def __init__(self, path: str, max_bytes: int = AUDIT_MAX_BYTES,
+                 rotate_hours: float = AUDIT_ROTATE_HOURS, keep_files: int = AUDIT_KEEP_FILES):
+        super().__init__()
+        self.path = path
+        self.max_bytes = max_bytes
+        self.rotate_after = timedelta(hours=rotate_hours)
+        self.keep_files = keep_files
+        self.stream = None
+        self.inode = None
+        self.started_at: Optional[str] = None  # ts первой записи текущего файла
+        self._lock_file = open(f"{path}.lock", 'a')
+
+    def _open(self) -> None:
+        if self.stream is not None:
+            self.stream.close()
+        self.stream = open(self.path, 'a', encoding='utf-8')
+        self.inode = os.fstat(self.stream.fileno()).st_ino
+        self.started_at = None
+        with open(self.path, 'r', encoding='utf-8') as f:
+            first = f.readline()
+        if first.strip():
+            try:
+                self.started_at = json.loads(first)['ts']
+            except (ValueError, KeyError):
+                self.started_at = datetime.now().isoformat(timespec='seconds')
+
+    def _reopen_if_rotated(self) -> None:
+        try:
+            rotated = os.stat(self.path).st_ino != self.inode
+        except FileNotFoundError:
+            rotated = True
+        if self.stream is None or rotated:
+            self._open()
+
+    def _should_rollover(self) -> bool:
+        if self.started_at is None:
+            return False
+        if os.fstat(self.stream.fileno()).st_size >= self.max_bytes:
+            return True
+        return datetime.now() - datetime.fromisoformat(self.started_at) >= self.rotate_after
+
+    def _rotated_stem(self) -> str:
+        stamp = datetime.fromisoformat(self.started_at).strftime('%Y%m%d-%H%M%S')
+        base = os.path.join(os.path.dirname(self.path), f"audit-{stamp}")
+        stem, n = base, 1
+        while os.path.exists(f"{stem}.jsonl.gz"):
+            n += 1
+            stem = f"{base}-{n}"
+        return stem
+
+    def _rollover(self) -> None:
+        self.stream.close()
+        self.stream = None
+        stem = self._rotated_stem()
+        part = f"{stem}.jsonl.gz.part"
+        with open(self.path, 'r', encoding='utf-8') as src, gzip.open(part, 'wt', encoding='utf-8') as dst:
+            index = build_index(_copy_lines(src, dst))
+        write_index(f"{stem}.idx.json", index)
+        os.replace(part, f"{stem}.jsonl.gz")
+        os.remove(self.path)
+        self._prune()
+        self._open()
+
+    def _prune(self) -> None:
+        rotated = rotated_files(os.path.dirname(self.path))
+        for path in rotated[:max(0, len(rotated) - self.keep_files)]:
+            os.remove(path)
+            index_path = index_path_for(path)
+            if os.path.exists(index_path):
+                os.remove(index_path)
+
+    def emit(self, record: logging.LogRecord) -> None:
+        try:
+            line = self.format(record)
+            if fcntl is not None:
+                fcntl.flock(self._lock_file, fcntl.LOCK_EX)
+            try:
+                self._reopen_if_rotated()
+                if self._should_rollover():
+                    self._rollover()
+                if self.started_at is None:
+                    self.started_at = datetime.fromtimestamp(record.created).isoformat(timespec='seconds')
+                self.stream.write(line + '\n')
+                self.stream.flush()
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(self._lock_file, fcntl.LOCK_UN)
+        except Exception:
+            self.handleError(record)
+
+    def close(self) -> None:
+        with self.lock:
+            if self.stream is not None:
+                self.stream.close()
+                self.stream = None
+            self._lock_file.close()
+        super().close()
+
+
+def _copy_lines(src, dst) -> Iterator[str]:
+    for line in src:
+        dst.write(line)
+        yield line
+
+
+def _ensure_listener() -> None:
+    """Запустить фоновую запись (в каждом процессе - после fork - своя)"""
+    global _listener, _listener_pid
+    if _listener_pid == os.getpid():
+        return
+    with _listener_lock:
+        if _listener_pid == os.getpid():
+            return
+        file_handler = AuditFileHandler(os.path.join(log_dir, AUDIT_LOG_FILE))
+        file_handler.setFormatter(AuditJsonFormatter())
+        log_queue = queue.SimpleQueue()
+        for old in list(audit_logger.handlers):
+            audit_logger.removeHandler(old)
+        audit_logger.addHandler(QueueHandler(log_queue))
+        _listener = QueueListener(log_queue, file_handler)
+        _listener.start()
+        _listener_pid = os.getpid()
+
+
+def _stop_listener() -> None:
+    """Дописать очередь и остановить фоновую запись"""
+    global _listener, _listener_pid
+    # atexit наследуется при fork - останавливаем только свой поток
+    with _listener_lock:
+        if _listener is None or _listener_pid != os.getpid():
+            return
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener, _listener_pid = None, None
+
+
+atexit.register(_stop_listener)
+
+
+def _log(event: str, level: int = logging.INFO, **fields) -> None:
+    _ensure_listener()
+    fields = {k: v for k, v in fields.items() if v is not None}
+    audit_logger.log(level, event, extra={'audit_event': event, 'audit_fields': fields})
+
+
+# ==================== ИНДЕКС И ПОИСК ====================
+
+def _rotated_order(path: str) -> tuple:
+    # audit-20261019-120000.jsonl.gz, затем audit-20261019-120000-2.jsonl.gz, ...
+    parts = os.path.basename(path)[len('audit-'):-len('.jsonl.gz')].split('-')
+    return parts[0], parts[1], int(parts[2]) if len(parts) > 2 else 1
+
+
+def rotated_files(directory: str = log_dir) -> list:
+    """Сжатые файлы журнала от старых к новым"""
+    return sorted(glob.glob(os.path.join(directory, 'audit-*.jsonl.gz')), key=_rotated_order)
+
+
+def index_path_for(path: str) -> str:
+    return path[:-len('.jsonl.gz')] + '.idx.json'
+
+
+def build_index(lines: Iterable[str]) -> dict:
+    """Индекс файла: интервал времени, количество событий по типам, пользователи"""
+    start = end = None
+    events: dict = {}
+    users = set()
+    for line in lines:
+        if not line.strip():
+            continue
+        entry = json.loads(line)
+        start = entry['ts'] if start is None else min(start, entry['ts'])
+        end = entry['ts'] if end is None else max(end, entry['ts'])
+        events[entry['event']] = events.get(entry['event'], 0) + 1
+        users.update(entry[f] for f in USER_FIELDS if entry.get(f) is not None)
+    return {'start': start, 'end': end, 'events': events, 'users': sorted(users)}
+
+
+def write_index(path: str, index: dict) -> None:
+    tmp = f"{path}.tmp"
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(index, f, ensure_ascii=False)
+    os.replace(tmp, path)
+
+
+def load_index(path: str) -> dict:
+    """Индекс сжатого файла (если его нет - строится и сохраняется)"""
+    index_path = index_path_for(path)
+    try:
+        with open(index_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            index = build_index(f)
+        write_index(index_path, index)
+        return index
+
+
+def _index_matches(index: dict, user_id, events, since, until) -> bool:
+    if index['start'] is None:
+        return False
+    if since and index['end'] < since:
+        return False
+    if until and index['start'] > until:
+        return False
+    if user_id is not None and user_id not in index['users']:
+        return False
+    if events and not any(e in index['events'] for e in events):
+        return False
+    return True
+
+
+def _entry_matches(entry: dict, user_id, events, since, until) -> bool:
+    if since and entry['ts'] < since:
+        return False
+    if until and entry['ts'] > until:
+        return False
+    if user_id is not None and all(entry.get(f) != user_id for f in USER_FIELDS):
+        return False
+    if events and entry['event'] not in events:
+        return False
+    return True
+
+
+def query_events(user_id: int = None, events: Iterable[str] = None, since: str = None,
+                 until: str = None, directory: str = log_dir) -> Iterator[dict]:
+    """
+    События журнала по пользователю (user_id/target_user_id/admin_id),
+    типам событий и интервалу времени (ISO-строки, until включительно)
+    Сжатые файлы, не подходящие по индексу, не читаются.
+    """
+    events = set(events) if events else None
+    for path in rotated_files(directory):
+        if not _index_matches(load_index(path), user_id, events, since, until):
+            continue
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            for line in f:
+                entry = json.loads(line)
+                if _entry_matches(entry, user_id, events, since, until):
+                    yield entry
+
+    # Текущий файл не индексирован - читается целиком
+    current = os.path.join(directory, AUDIT_LOG_FILE)
+    if os.path.exists(current):
+        with open(current, 'r', encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    entry = json.loads(line)
+                    if _entry_matches(entry, user_id, events, since, until):
+                        yield entry
+
+
+# ==================== СОБЫТИЯ ====================
 
 def log_user_registered(user_id: int, email: str, ip_address: str = None):
     """Логирование регистрации нового пользователя"""
-    audit_logger.info(f"USER_REGISTERED | user_id={user_id} | email={email} | ip={ip_address or 'unknown'}")
+    _log('USER_REGISTERED', user_id=user_id, email=email, ip=ip_address)
 
 
 def log_user_login(user_id: int, email: str, ip_address: str = None, success: bool = True):
     """Логирование входа пользователя"""
     status = "SUCCESS" if success else "FAILED"
-    audit_logger.info(f"USER_LOGIN_{status} | user_id={user_id} | email={email} | ip={ip_address or 'unknown'}")
+    # Неудачный вход по неизвестному email приходит с user_id=0
+    _log(f'USER_LOGIN_{status}', user_id=user_id or None, email=email, ip=ip_address)
 
 
 def log_user_logout(user_id: int, email: str):
     """Логирование выхода пользователя"""
-    audit_logger.info(f"USER_LOGOUT | user_id={user_id} | email={email}")
+    _log('USER_LOGOUT', user_id=user_id, email=email)
 
 
 def log_password_changed(user_id: int, email: str, ip_address: str = None):
     """Логирование смены пароля"""
-    audit_logger.info(f"PASSWORD_CHANGED | user_id={user_id} | email={email} | ip={ip_address or 'unknown'}")
+    _log('PASSWORD_CHANGED', user_id=user_id, email=email, ip=ip_address)
 
 
 def log_password_reset_requested(email: str, ip_address: str = None):
     """Логирование запроса восстановления пароля"""
-    audit_logger.info(f"PASSWORD_RESET_REQUESTED | email={email} | ip={ip_address or 'unknown'}")
+    _log('PASSWORD_RESET_REQUESTED', email=email, ip=ip_address)
 
 
 def log_password_reset_completed(user_id: int, email: str, ip_address: str = None):
     """Логирование завершения восстановления пароля"""
-    audit_logger.info(f"PASSWORD_RESET_COMPLETED | user_id={user_id} | email={email} | ip={ip_address or 'unknown'}")
+    _log('PASSWORD_RESET_COMPLETED', user_id=user_id, email=email, ip=ip_address)
 
 
 def log_email_verified(user_id: int, email: str):
     """Логирование подтверждения email"""
-    audit_logger.info(f"EMAIL_VERIFIED | user_id={user_id} | email={email}")
+    _log('EMAIL_VERIFIED', user_id=user_id, email=email)
 
 
 def log_telegram_linked(user_id: int, email: str, telegram_username: str = None):
     """Логирование привязки Telegram"""
-    audit_logger.info(f"TELEGRAM_LINKED | user_id={user_id} | email={email} | telegram=@{telegram_username or 'unknown'}")
+    _log('TELEGRAM_LINKED', user_id=user_id, email=email, telegram=telegram_username)
 
 
 def log_telegram_unlinked(user_id: int, email: str):
     """Логирование отвязки Telegram"""
-    audit_logger.info(f"TELEGRAM_UNLINKED | user_id={user_id} | email={email}")
+    _log('TELEGRAM_UNLINKED', user_id=user_id, email=email)
 
 
 def log_user_activated(admin_id: int, target_user_id: int, target_email: str):
     """Логирование активации пользователя"""
-    audit_logger.info(f"USER_ACTIVATED | admin_id={admin_id} | target_user_id={target_user_id} | target_email={target_email}")
+    _log('USER_ACTIVATED', admin_id=admin_id, target_user_id=target_user_id, target_email=target_email)
 
 
 def log_user_deactivated(admin_id: int, target_user_id: int, target_email: str):
     """Логирование деактивации пользователя"""
-    audit_logger.info(f"USER_DEACTIVATED | admin_id={admin_id} | target_user_id={target_user_id} | target_email={target_email}")
+    _log('USER_DEACTIVATED', admin_id=admin_id, target_user_id=target_user_id, target_email=target_email)
 
 
 def log_admin_granted(admin_id: int, target_user_id: int, target_email: str):
     """Логирование назначения администратора"""
-    audit_logger.info(f"ADMIN_GRANTED | admin_id={admin_id} | target_user_id={target_user_id} | target_email={target_email}")
+    _log('ADMIN_GRANTED', admin_id=admin_id, target_user_id=target_user_id, target_email=target_email)
 
 
 def log_admin_revoked(admin_id: int, target_user_id: int, target_email: str):
     """Логирование снятия прав администратора"""
-    audit_logger.info(f"ADMIN_REVOKED | admin_id={admin_id} | target_user_id={target_user_id} | target_email={target_email}")
+    _log('ADMIN_REVOKED', admin_id=admin_id, target_user_id=target_user_id, target_email=target_email)
 
 
 def log_account_deleted(user_id: int, email: str, ip_address: str = None):
     """Логирование удаления аккаунта"""
-    audit_logger.info(f"ACCOUNT_DELETED | user_id={user_id} | email={email} | ip={ip_address or 'unknown'}")
+    _log('ACCOUNT_DELETED', user_id=user_id, email=email, ip=ip_address)
 
 
-def log_security_event(event_type: str, details: str, ip_address: str = None):
+def log_security_event(event_type: str, details: str, ip_address: str = None, user_id: int = None):
     """Логирование событий безопасности"""
-    audit_logger.warning(f"SECURITY_EVENT | type={event_type} | details={details} | ip={ip_address or 'unknown'}")
+    _log('SECURITY_EVENT', logging.WARNING, type=event_type, details=details, ip=ip_address, user_id=user_id)
 
 
 def log_ip_blocked(ip_address: str, attempts: int):
     """Логирование блокировки IP"""
-    audit_logger.warning(f"IP_BLOCKED | ip={ip_address} | attempts={attempts}")
-
+    _log('IP_BLOCKED', logging.WARNING, ip=ip_address, attempts=attempts)
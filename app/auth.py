@@ -5,21 +5,22 @@
 from datetime import datetime, timedelta
 from functools import wraps
 from flask import session, request, redirect, url_for, flash, g
-from typing import Dict, List, Optional, Tuple
-import bcrypt
+from typing import Optional, Tuple
 import secrets
 import re
 
+from app import login_throttle, session_store
+from app.password_hasher import password_hasher
+
 # Конфигурация
 MAX_ATTEMPTS = 3
 BLOCK_DURATION_MINUTES = 5
+ATTEMPT_WINDOW_MINUTES = 10  # Окно, в котором считаются неудачные попытки
 TOKEN_EXPIRY_HOURS = 24  # Для email verification и password reset
 PASSWORD_MIN_LENGTH = 8
 
-# Хранилище попыток входа (IP -> список попыток)
-# В production лучше использовать Redis
-login_attempts: Dict[str, List[datetime]] = {}
-blocked_ips: Dict[str, datetime] = {}
+# Попытки входа и блокировки хранятся в app.login_throttle
+# (Redis, общий для всех workers; fallback - ограниченный LRU в памяти)
 
 
 # ==================== ВСПОМОГАТЕЛЬНЫЕ ФУНКЦИИ ====================
@@ -61,17 +62,33 @@ def is_strong_password(password: str) -> Tuple[bool, Optional[str]]:
 
 # ==================== РАБОТА С ПАРОЛЯМИ ====================
 
+# bcrypt выполняется в ограниченном пуле app.password_hasher.
+# При перегрузке пула выбрасывается HashingBusyError (в web -> 429/503).
+
 def hash_password(password: str) -> str:
     """Хеширование пароля с использованием bcrypt"""
-    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+    return password_hasher.hash(password)
 
 
 def verify_password(password: str, password_hash: str) -> bool:
     """Проверка пароля"""
-    try:
-        return bcrypt.checkpw(password.encode('utf-8'), password_hash.encode('utf-8'))
-    except Exception:
+    return password_hasher.verify(password, password_hash)
+
+
+def check_user_password(user_id: int, password: str) -> bool:
+    """
+    Подтверждение пароля уже вошедшего пользователя
+    (смена email/пароля, удаление аккаунта) - без полного повторного входа
+    """
+    from app.db_sa import get_session
+    from app.models_sa import UserORM
+    
+    with get_session() as db:
+        password_hash = db.query(UserORM.password_hash).filter_by(id=user_id).scalar()
+    
+    if not password_hash:
         return False
+    return verify_password(password, password_hash)
 
 
 # ==================== РАБОТА С ПОЛЬЗОВАТЕЛЯМИ ====================
@@ -139,6 +156,11 @@ def authenticate_user(email: str, password: str) -> Optional[int]:
         if not verify_password(password, user.password_hash):
             return None
         
+        # Стоимость bcrypt изменилась - перехешируем, пока знаем пароль
+        if password_hasher.needs_rehash(user.password_hash):
+            user.password_hash = hash_password(password)
+            user.updated_at = datetime.now().isoformat()
+        
         # Обновляем время последнего входа
         user.last_login_at = datetime.now().isoformat()
         db.flush()
@@ -172,13 +194,56 @@ def get_user_by_email(email: str):
         return user
 
 
+def start_user_session(user_id: int) -> None:
+    """Вход: создать серверную сессию и записать её в cookie"""
+    token = session_store.create_session(
+        user_id,
+        ip_address=get_client_ip(),
+        user_agent=request.headers.get('User-Agent'),
+    )
+    session['user_id'] = user_id
+    session['session_token'] = token
+    session.permanent = True  # Cookie на 30 дней
+
+
+def end_user_session() -> None:
+    """Выход: отозвать серверную сессию и очистить cookie"""
+    token = session.get('session_token')
+    if token:
+        session_store.revoke_session(token)
+    session.clear()
+
+
+def get_session_user_id() -> Optional[int]:
+    """
+    user_id из cookie, подтверждённый серверной сессией
+    Returns: None если сессия отозвана или истекла
+    """
+    if 'session_user_id' in g:
+        return g.session_user_id
+    
+    user_id = session.get('user_id')
+    token = session.get('session_token')
+    if user_id and not token:
+        # Cookie без серверной сессии (выдана до их появления) не отзывается
+        # выходом со всех устройств и сменой пароля - требуем войти заново
+        session.clear()
+        user_id = None
+    
+    if user_id and session_store.validate_session(token) != user_id:
+        user_id = None
+    
+    g.session_user_id = user_id
+    return user_id
+
+
 def get_current_user():
     """
     Получить текущего пользователя из сессии
     Используется в декораторе login_required и в шаблонах
     """
     if not hasattr(g, 'user'):
-        user_id = session.get('user_id')
+        user_id = get_session_user_id()
         if user_id:
             g.user = get_user_by_id(user_id)
         else:
@@ -345,16 +410,7 @@ def reset_password(token: str, new_password: str) -> bool:
 
 def is_ip_blocked(ip: str) -> bool:
     """Проверить заблокирован ли IP"""
-    if ip in blocked_ips:
-        block_time = blocked_ips[ip]
-        if datetime.now() < block_time:
-            return True
-        else:
-            # Блокировка истекла
-            del blocked_ips[ip]
-            if ip in login_attempts:
-                del login_attempts[ip]
-    return False
+    return login_throttle.block_time_remaining(ip) > 0
 
 
 def add_login_attempt(ip: str) -> int:
@@ -362,43 +418,22 @@ def add_login_attempt(ip: str) -> int:
     Добавить попытку входа
     Возвращает количество оставшихся попыток
     """
-    now = datetime.now()
-    
-    # Инициализируем список попыток для IP
-    if ip not in login_attempts:
-        login_attempts[ip] = []
-    
-    # Добавляем текущую попытку
-    login_attempts[ip].append(now)
-    
-    # Убираем старые попытки (старше 10 минут)
-    login_attempts[ip] = [
-        attempt for attempt in login_attempts[ip]
-        if now - attempt < timedelta(minutes=10)
-    ]
-    
-    attempts_count = len(login_attempts[ip])
-    
-    # Если превышено количество попыток - блокируем
-    if attempts_count >= MAX_ATTEMPTS:
-        blocked_ips[ip] = now + timedelta(minutes=BLOCK_DURATION_MINUTES)
-        return 0
-    
-    return MAX_ATTEMPTS - attempts_count
+    return login_throttle.add_attempt(
+        ip,
+        max_attempts=MAX_ATTEMPTS,
+        window_seconds=ATTEMPT_WINDOW_MINUTES * 60,
+        block_seconds=BLOCK_DURATION_MINUTES * 60,
+    )
 
 
 def clear_login_attempts(ip: str):
     """Очистить попытки входа для IP"""
-    if ip in login_attempts:
-        del login_attempts[ip]
+    login_throttle.clear(ip)
 
 
 def get_block_time_remaining(ip: str) -> int:
     """Получить оставшееся время блокировки в секундах"""
-    if ip in blocked_ips:
-        remaining = (blocked_ips[ip] - datetime.now()).total_seconds()
-        return max(0, int(remaining))
-    return 0
+    return login_throttle.block_time_remaining(ip)
 
 
 # ==================== ДЕКОРАТОРЫ ====================
@@ -407,8 +442,9 @@ def login_required(f):
     """Декоратор для защиты маршрутов - требуется вход в систему"""
     @wraps(f)
     def decorated_function(*args, **kwargs):
-        user_id = session.get('user_id')
+        user_id = get_session_user_id()
         if not user_id:
+            session.clear()
             flash('Пожалуйста, войдите в систему', 'warning')
             return redirect(url_for('auth.login', next=request.url))
         
@@ -430,8 +466,9 @@ def admin_required(f):
     """Декоратор для защиты admin маршрутов"""
     @wraps(f)
     def decorated_function(*args, **kwargs):
-        user_id = session.get('user_id')
+        user_id = get_session_user_id()
         if not user_id:
+            session.clear()
             flash('Пожалуйста, войдите в систему', 'warning')
             return redirect(url_for('auth.login', next=request.url))
         
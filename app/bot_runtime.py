@@ -0,0 +1,145 @@
+"""
+Среда выполнения Telegram-бота: работа с БД вне цикла событий и метрики
+
+Обработчики python-telegram-bot - корутины одного цикла событий. Синхронный
+SQLAlchemy (и Redis) прямо в обработчике останавливает весь цикл: пока идёт
+один медленный запрос, нажатия кнопок в остальных чатах ждут. Поэтому
+обработчики выполняют работу с БД через run_db(): функция уходит в
+ограниченный пул потоков (BOT_DB_WORKERS - не больше соединений в пуле
+движка), а цикл тем временем обслуживает другие обновления.
+
+timed() оборачивает обработчик и собирает метрики по каждому обновлению:
+полное время, время в БД (включая ожидание свободного потока), ошибки.
+Медленные обновления пишутся в лог сразу, сводка - раз в
+BOT_METRICS_LOG_EVERY обновлений; snapshot() отдаёт её целиком.
+"""
+import asyncio
+import contextvars
+import functools
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Optional
+
+from app.config import BOT_DB_WORKERS, BOT_METRICS_LOG_EVERY, BOT_SLOW_UPDATE_SECONDS
+
+# Последних длительностей на обработчик - для перцентилей
+METRICS_WINDOW = 1000
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+# Время в БД текущего обновления: [секунды]; задаётся в timed()
+_db_seconds: contextvars.ContextVar = contextvars.ContextVar("bot_db_seconds", default=None)
+
+
+def db_executor() -> ThreadPoolExecutor:
+    """Общий пул потоков для БД (создаётся при первом обращении)"""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=BOT_DB_WORKERS, thread_name_prefix="bot-db")
+    return _executor
+
+
+def shutdown_db_executor() -> None:
+    """Дождаться запросов в работе и закрыть пул (при остановке бота)"""
+    global _executor
+    with _executor_lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=True)
+
+
+async def run_db(fn: Callable, *args, **kwargs):
+    """Выполнить синхронную функцию работы с БД в пуле, не блокируя цикл событий"""
+    started = time.perf_counter()
+    try:
+        return await asyncio.get_running_loop().run_in_executor(
+            db_executor(), functools.partial(fn, *args, **kwargs)
+        )
+    finally:
+        spent = _db_seconds.get()
+        if spent is not None:
+            spent[0] += time.perf_counter() - started
+
+
+class UpdateMetrics:
+    """Метрики обработки обновлений по обработчикам (потокобезопасно)"""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._handlers: Dict[str, dict] = {}
+        self._updates = 0
+
+    def record(self, handler: str, seconds: float, db_seconds: float, failed: bool) -> int:
+        """Returns: общее число обработанных обновлений"""
+        with self._lock:
+            stats = self._handlers.setdefault(handler, {
+                "count": 0, "errors": 0, "total_seconds": 0.0, "db_seconds": 0.0, "max_seconds": 0.0,
+                "recent": deque(maxlen=METRICS_WINDOW),
+            })
+            stats["count"] += 1
+            stats["errors"] += int(failed)
+            stats["total_seconds"] += seconds
+            stats["db_seconds"] += db_seconds
+            stats["max_seconds"] = max(stats["max_seconds"], seconds)
+            stats["recent"].append(seconds)
+            self._updates += 1
+            return self._updates
+
+    def snapshot(self) -> Dict[str, dict]:
+        """{обработчик: count, errors, avg/p50/p95/max (мс), db_share}"""
+        with self._lock:
+            result = {}
+            for handler, stats in self._handlers.items():
+                recent = sorted(stats["recent"])
+                result[handler] = {
+                    "count": stats["count"],
+                    "errors": stats["errors"],
+                    "avg_ms": round(stats["total_seconds"] / stats["count"] * 1000, 1),
+                    "p50_ms": round(recent[len(recent) // 2] * 1000, 1),
+                    "p95_ms": round(recent[min(len(recent) - 1, int(len(recent) * 0.95))] * 1000, 1),
+                    "max_ms": round(stats["max_seconds"] * 1000, 1),
+                    # Доля времени в БД (с ожиданием потока) от полного времени обработки
+                    "db_share": round(stats["db_seconds"] / stats["total_seconds"], 2) if stats["total_seconds"] else 0.0,
+                }
+            return result
+
+    def summary(self) -> str:
+        return "; ".join(
+            f"{handler}: {s['count']} шт., p50 {s['p50_ms']} мс, p95 {s['p95_ms']} мс, "
+            f"max {s['max_ms']} мс, БД {s['db_share']:.0%}, ошибок {s['errors']}"
+            for handler, s in sorted(self.snapshot().items())
+        )
+
+
+metrics = UpdateMetrics()
+
+
+def timed(handler: Callable) -> Callable:
+    """Декоратор обработчика: метрики по каждому обновлению"""
+    name = handler.__name__
+
+    @functools.wraps(handler)
+    async def wrapper(update, context):
+        spent = [0.0]
+        token = _db_seconds.set(spent)
+        started = time.perf_counter()
+        failed = False
+        try:
+            return await handler(update, context)
+        except Exception:
+            failed = True
+            raise
+        finally:
+            seconds = time.perf_counter() - started
+            _db_seconds.reset(token)
+            total = metrics.record(name, seconds, spent[0], failed)
+            if seconds >= BOT_SLOW_UPDATE_SECONDS:
+                print(f"⚠️  Slow update in {name}: {seconds * 1000:.0f} ms (DB {spent[0] * 1000:.0f} ms)")
+            if BOT_METRICS_LOG_EVERY and total % BOT_METRICS_LOG_EVERY == 0:
+                print(f"📊 Bot metrics after {total} updates: {metrics.summary()}")
+
+    return wrapper
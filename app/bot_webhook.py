@@ -0,0 +1,202 @@
+"""
+Webhook-режим Telegram-бота: приём обновлений по HTTP вместо long polling
+
+Telegram сам присылает POST с обновлением на BOT_WEBHOOK_URL (nginx
+проксирует на BOT_WEBHOOK_LISTEN:BOT_WEBHOOK_PORT). Обработчик запроса
+только проверяет секрет из заголовка X-Telegram-Bot-Api-Secret-Token (до
+чтения тела - чужой запрос не заставит читать мегабайты), кладёт обновление в ограниченную очередь (BOT_WEBHOOK_QUEUE_SIZE) и сразу
+отвечает 200 - Telegram не ждёт, пока бот сходит в БД. Очередь разбирают
+BOT_CONCURRENT_UPDATES воркеров в цикле событий бота через
+application.process_update(), те же обработчики, что и в polling.
+
+Ответы:
+- 200 - принято (или тело не обновление: повторять его бессмысленно);
+- 403 - неверный секрет;
+- 404 - чужой путь;
+- 413 - тело больше MAX_BODY_BYTES;
+- 503 - очередь полна: Telegram повторит доставку позже.
+
+HTTP-сервер - стандартный ThreadingHTTPServer в отдельном потоке (без
+tornado и прочих зависимостей). Место в очереди занимается семафором прямо
+в HTTP-потоке, а обновление передаётся в цикл событий через
+call_soon_threadsafe: ответ Telegram не ждёт занятый обработкой цикл.
+"""
+import asyncio
+import hmac
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional
+from urllib.parse import urlparse
+
+from app.config import BOT_CONCURRENT_UPDATES, BOT_WEBHOOK_QUEUE_SIZE
+
+SECRET_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+# Сколько при остановке ждать обработки уже принятых обновлений
+DRAIN_TIMEOUT_SECONDS = 30
+# Обновления Telegram - единицы килобайт (файлы приходят ссылками)
+MAX_BODY_BYTES = 1024 * 1024
+
+
+class _WebhookHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # Telegram открывает до max_connections соединений одновременно
+    request_queue_size = 128
+
+
+class WebhookServer:
+    """HTTP-приём обновлений, очередь и пул воркеров поверх Application"""
+
+    def __init__(self, application, url: str, listen: str, port: int, secret: str,
+                 queue_size: int = BOT_WEBHOOK_QUEUE_SIZE, workers: int = BOT_CONCURRENT_UPDATES) -> None:
+        if not secret:
+            raise ValueError("Для webhook нужен TELEGRAM_WEBHOOK_SECRET")
+        self.application = application
+        self.url = url
+        self.path = urlparse(url).path or "/"
+        self.listen = listen
+        self.port = port
+        self.secret = secret
+        self.queue_size = queue_size
+        self.workers = workers
+        self.stats: Dict[str, int] = {"accepted": 0, "forbidden": 0, "queue_full": 0, "invalid": 0, "failed": 0}
+        self._stats_lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue: Optional[asyncio.Queue] = None
+        # Свободные места в очереди (занимает HTTP-поток, освобождает воркер, взяв обновление)
+        self._slots = threading.BoundedSemaphore(queue_size)
+        self._tasks = []
+        self._httpd: Optional[_WebhookHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+
+    # ---------- цикл событий ----------
+
+    async def start(self, register: bool = True) -> None:
+        """
+        Запустить воркеры и HTTP-сервер; register - сообщить URL в Telegram (setWebhook)
+        Raises: TelegramError, если Telegram не принял webhook
+        """
+        self._loop = asyncio.get_running_loop()
+        # Размер ограничивает _slots: put_nowait из HTTP-потока всегда проходит
+        self._queue = asyncio.Queue()
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+        self._httpd = _WebhookHTTPServer((self.listen, self.port), self._handler_class())
+        self.port = self._httpd.server_address[1]
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="bot-webhook", daemon=True)
+        self._thread.start()
+
+        if register:
+            from telegram import Update
+
+            await self.application.bot.set_webhook(
+                url=self.url,
+                secret_token=self.secret,
+                allowed_updates=Update.ALL_TYPES,
+                max_connections=min(100, self.workers),
+            )
+
+    async def stop(self) -> None:
+        """Перестать принимать запросы, дообработать очередь, остановить воркеры"""
+        if self._httpd is not None:
+            await asyncio.get_running_loop().run_in_executor(None, self._httpd.shutdown)
+            self._httpd.server_close()
+            self._httpd = None
+        if self._queue is not None:
+            try:
+                await asyncio.wait_for(self._queue.join(), DRAIN_TIMEOUT_SECONDS)
+            except asyncio.TimeoutError:
+                print(f"⚠️  Webhook: не обработано {self._queue.qsize()} обновлений при остановке")
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def pending(self) -> int:
+        """Обновлений в очереди"""
+        return self._queue.qsize() if self._queue is not None else 0
+
+    async def _worker(self) -> None:
+        while True:
+            update = await self._queue.get()
+            self._slots.release()
+            try:
+                await self.application.process_update(update)
+            except Exception as e:
+                self._count("failed")
+                print(f"❌ Webhook: ошибка обработки обновления {update.update_id}: {e}")
+            finally:
+                self._queue.task_done()
+
+    # ---------- HTTP-поток ----------
+
+    def _count(self, key: str) -> None:
+        with self._stats_lock:
+            self.stats[key] += 1
+
+    def authorize(self, path: str, secret: Optional[str]) -> Optional[int]:
+        """Проверить путь и секрет (по заголовкам, до чтения тела). Returns: HTTP-статус отказа или None"""
+        if urlparse(path).path != self.path:
+            return 404
+        if not hmac.compare_digest((secret or "").encode(), self.secret.encode()):
+            self._count("forbidden")
+            return 403
+        return None
+
+    def accept(self, path: str, secret: Optional[str], body: bytes) -> int:
+        """Разобрать запрос Telegram и поставить обновление в очередь. Returns: HTTP-статус"""
+        denied = self.authorize(path, secret)
+        if denied:
+            return denied
+        from telegram import Update
+
+        try:
+            data = json.loads(body)
+            if not isinstance(data, dict) or "update_id" not in data:
+                raise ValueError("not an update")
+            update = Update.de_json(data, self.application.bot)
+        except Exception:
+            # Не только ValueError: de_json на поле не того типа ({"message": "x"}) бросает
+            # AttributeError/TypeError - такое тело повторять бессмысленно
+            self._count("invalid")
+            return 200
+        if not self._slots.acquire(blocking=False):
+            self._count("queue_full")
+            return 503
+        try:
+            self._loop.call_soon_threadsafe(self._queue.put_nowait, update)
+        except RuntimeError:
+            # Цикл событий уже закрыт (остановка)
+            self._slots.release()
+            return 503
+        self._count("accepted")
+        return 200
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                secret = self.headers.get(SECRET_HEADER)
+                status = server.authorize(self.path, secret)
+                if status is None:
+                    try:
+                        length = int(self.headers.get("Content-Length") or 0)
+                    except ValueError:
+                        length = -1
+                    if not 0 <= length <= MAX_BODY_BYTES:
+                        status = 413
+                    else:
+                        body = self.rfile.read(length) if length else b""
+                        status = server.accept(self.path, secret, body)
+                if status in (403, 404, 413):
+                    # Тело не прочитано - соединение дальше не годится
+                    self.close_connection = True
+                self.send_response(status)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
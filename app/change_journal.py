@@ -0,0 +1,307 @@
+"""
+Журнал изменений (change_log) и инкрементальные бэкапы
+
+Триггеры на таблицах данных дописывают в change_log строку на каждую
+вставку/изменение/удаление: (version, table_name, row_id, op, changed_at).
+Триггеры ловят любые записи - ORM, пакетные UPDATE/DELETE, сырой SQL.
+
+Бэкап:
+- полный - выгрузка всех таблиц (с хешами паролей) + водяной знак = max(version);
+- инкрементальный - только строки, изменённые после водяного знака: текущее
+  состояние изменённых строк ("row") и id удалённых ("delete").
+Восстановление: полный бэкап, затем инкременты по порядку (upsert по id).
+
+Схема создаётся ensure_journal_schema() из команды миграции (app.db_sa.create_schema).
+"""
+import json
+import os
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, TextIO
+
+from sqlalchemy import delete, func, select
+from sqlalchemy.engine import Engine
+
+from app.data_export import EXPORT_FORMAT, EXPORT_TABLES, EXPORT_VERSION, _dumps, export_stream
+from app.models_sa import Base, ChangeLogORM
+
+JOURNAL_TABLE = "change_log"
+# Таблицы под журналом - те же, что попадают в выгрузку
+JOURNALED_TABLES = EXPORT_TABLES
+
+# Транзакция может закоммитить меньшую версию позже большей: каждый
+# инкремент заново захватывает изменения последних минут (повтор безвреден)
+JOURNAL_OVERLAP_MINUTES = 10
+JOURNAL_BATCH_SIZE = 1000
+
+# ==================== СХЕМА ====================
+
+_PG_FUNCTION = """
+    CREATE OR REPLACE FUNCTION journal_change() RETURNS trigger AS $$
+    BEGIN
+        INSERT INTO change_log (version, table_name, row_id, op, changed_at)
+        VALUES (
+            nextval('change_log_version_seq'),
+            TG_TABLE_NAME,
+            CASE WHEN TG_OP = 'DELETE' THEN OLD.id ELSE NEW.id END,
+            left(TG_OP, 1),
+            to_char(clock_timestamp() AT TIME ZONE 'UTC', 'YYYY-MM-DD"T"HH24:MI:SS.US')
+        );
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql
+"""
+
+
+def _pg_schema() -> List[str]:
+    statements = [_PG_FUNCTION]
+    for table in JOURNALED_TABLES:
+        statements += [
+            f"DROP TRIGGER IF EXISTS journal_{table} ON {table}",
+            f"""CREATE TRIGGER journal_{table} AFTER INSERT OR UPDATE OR DELETE ON {table}
+                FOR EACH ROW EXECUTE FUNCTION journal_change()""",
+        ]
+    return statements
+
+
+def _sqlite_schema() -> List[str]:
+    statements = []
+    now = "strftime('%Y-%m-%dT%H:%M:%f', 'now')"
+    for table in JOURNALED_TABLES:
+        for suffix, event, ref, op in (("ai", "INSERT", "new", "I"),
+                                       ("au", "UPDATE", "new", "U"),
+                                       ("ad", "DELETE", "old", "D")):
+            statements.append(
+                f"""CREATE TRIGGER IF NOT EXISTS journal_{table}_{suffix} AFTER {event} ON {table} BEGIN
+                        INSERT INTO change_log (table_name, row_id, op, changed_at)
+                        VALUES ('{table}', {ref}.id, '{op}', {now});
+                    END"""
+            )
+    return statements
+
+
+def ensure_journal_schema(engine: Engine) -> None:
+    """Создать триггеры журнала (таблица change_log создаётся create_all)"""
+    statements = _sqlite_schema() if engine.dialect.name == "sqlite" else _pg_schema()
+    with engine.begin() as conn:
+        for statement in statements:
+            conn.exec_driver_sql(statement)
+
+
+def drop_journal_triggers(engine: Engine) -> None:
+    """
+    Убрать триггеры журнала (SQLite) - на время массовой загрузки (app/table_copy.py);
+    вернуть - ensure_journal_schema(). В PostgreSQL загрузка идёт с session_replication_role = replica
+    """
+    if engine.dialect.name != "sqlite":
+        return
+    with engine.begin() as conn:
+        for table in JOURNALED_TABLES:
+            for suffix in ("ai", "au", "ad"):
+                conn.exec_driver_sql(f"DROP TRIGGER IF EXISTS journal_{table}_{suffix}")
+
+
+# ==================== ВОДЯНЫЕ ЗНАКИ ====================
+
+def current_version(conn) -> int:
+    """Последняя версия журнала (0 - журнал пуст)"""
+    return conn.execute(select(func.coalesce(func.max(ChangeLogORM.version), 0))).scalar_one()
+
+
+def issued_version(conn) -> int:
+    """
+    Последняя выданная версия: не меньше current_version, даже если журнал
+    очищен prune_journal (берётся из последовательности / sqlite_sequence)
+    """
+    if conn.dialect.name == "sqlite":
+        issued = conn.exec_driver_sql(
+            f"SELECT seq FROM sqlite_sequence WHERE name = '{JOURNAL_TABLE}'"
+        ).scalar()
+    else:
+        issued = conn.exec_driver_sql(
+            "SELECT CASE WHEN is_called THEN last_value ELSE 0 END FROM change_log_version_seq"
+        ).scalar()
+    return max(issued or 0, current_version(conn))
+
+
+def advance_version(engine: Engine, version: int) -> None:
+    """Следующие версии журнала - больше version (после переноса базы, app/table_copy.py)"""
+    if version <= 0:
+        return
+    with engine.begin() as conn:
+        if engine.dialect.name == "sqlite":
+            updated = conn.exec_driver_sql(
+                f"UPDATE sqlite_sequence SET seq = max(seq, ?) WHERE name = '{JOURNAL_TABLE}'", (version,)
+            ).rowcount
+            if not updated:
+                conn.exec_driver_sql(
+                    f"INSERT INTO sqlite_sequence (name, seq) VALUES ('{JOURNAL_TABLE}', ?)", (version,)
+                )
+        else:
+            conn.exec_driver_sql(
+                "SELECT setval('change_log_version_seq', %(version)s) "
+                "WHERE %(version)s > (SELECT CASE WHEN is_called THEN last_value ELSE 0 END "
+                "FROM change_log_version_seq)",
+                {"version": version},
+            )
+
+
+def load_state(path: str) -> Optional[dict]:
+    """Состояние бэкапов: {'watermark', 'taken_at'} или None до первого полного бэкапа"""
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_state(path: str, watermark: int, taken_at: str) -> None:
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"watermark": watermark, "taken_at": taken_at}, f)
+    os.replace(tmp, path)
+
+
+def _utc_now() -> str:
+    return datetime.utcnow().isoformat()
+
+
+# ==================== БЭКАПЫ ====================
+
+def write_full_backup(engine: Engine, out: TextIO) -> dict:
+    """
+    Полный бэкап (выгрузка с секретами)
+    Returns: {'watermark', 'taken_at', 'counts'}
+    """
+    taken_at = _utc_now()
+    with engine.connect() as conn:
+        # Знак берётся до выгрузки: изменения во время неё попадут в следующий инкремент
+        watermark = current_version(conn)
+    counts = export_stream(engine, out, include_secrets=True)
+    return {"watermark": watermark, "taken_at": taken_at, "counts": counts}
+
+
+def _changed_rows(conn, since: int, until: int, overlap_from: str) -> Dict[str, set]:
+    """{таблица: id изменённых строк} за интервал версий (с перекрытием по времени)"""
+    journal = ChangeLogORM.__table__
+    query = select(journal.c.table_name, journal.c.row_id).where(
+        journal.c.version <= until,
+        (journal.c.version > since) | (journal.c.changed_at >= overlap_from),
+    ).distinct()
+    changed: Dict[str, set] = {}
+    for table_name, row_id in conn.execute(query):
+        changed.setdefault(table_name, set()).add(row_id)
+    return changed
+
+
+def write_incremental_backup(engine: Engine, out: TextIO, state: dict) -> dict:
+    """
+    Инкремент после state['watermark']: текущие версии изменённых строк и удаления
+    Returns: {'watermark', 'taken_at', 'counts'}
+    """
+    taken_at = _utc_now()
+    overlap_from = (datetime.fromisoformat(state["taken_at"])
+                    - timedelta(minutes=JOURNAL_OVERLAP_MINUTES)).isoformat()
+    counts = {}
+
+    with engine.connect() as conn:
+        until = current_version(conn)
+        changed = _changed_rows(conn, state["watermark"], until, overlap_from)
+
+        out.write(_dumps({
+            "format": EXPORT_FORMAT,
+            "version": EXPORT_VERSION,
+            "kind": "increment",
+            "exported_at": datetime.now().isoformat(),
+            "since": state["watermark"],
+            "until": until,
+            "tables": [t for t in JOURNALED_TABLES if t in changed],
+        }) + "\n")
+
+        deleted: Dict[str, List[int]] = {}
+        for name in JOURNALED_TABLES:
+            ids = sorted(changed.get(name, ()))
+            if not ids:
+                continue
+            table = Base.metadata.tables[name]
+            present = set()
+            for i in range(0, len(ids), JOURNAL_BATCH_SIZE):
+                chunk = ids[i:i + JOURNAL_BATCH_SIZE]
+                rows = conn.execute(select(*table.c).where(table.c.id.in_(chunk)).order_by(table.c.id)).all()
+                for row in rows:
+                    out.write(_dumps({"table": name, "row": dict(row._mapping)}) + "\n")
+                    present.add(row.id)
+            deleted[name] = [row_id for row_id in ids if row_id not in present]
+            counts[name] = {"upserted": len(present), "deleted": len(deleted[name])}
+
+        # Удаления - после всех upsert и от детей к родителям
+        for name in reversed(JOURNALED_TABLES):
+            for row_id in deleted.get(name, ()):
+                out.write(_dumps({"table": name, "delete": row_id}) + "\n")
+
+    out.write(_dumps({"summary": counts}) + "\n")
+    return {"watermark": until, "taken_at": taken_at, "counts": counts}
+
+
+def prune_journal(engine: Engine, state: dict) -> int:
+    """
+    Удалить записи журнала, уже покрытые бэкапами (старше знака и окна перекрытия)
+    Returns: количество удалённых записей
+    """
+    overlap_from = (datetime.fromisoformat(state["taken_at"])
+                    - timedelta(minutes=JOURNAL_OVERLAP_MINUTES)).isoformat()
+    journal = ChangeLogORM.__table__
+    with engine.begin() as conn:
+        return conn.execute(delete(journal).where(
+            journal.c.version <= state["watermark"],
+            journal.c.changed_at < overlap_from,
+        )).rowcount or 0
+
+
+# ==================== ВОССТАНОВЛЕНИЕ ====================
+
+def _upsert(conn, table, rows: List[dict]) -> None:
+    if conn.dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    columns = [c.name for c in table.c]
+    rows = [{c: row.get(c) for c in columns} for row in rows]
+    stmt = insert(table)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.id],
+        set_={c: stmt.excluded[c] for c in columns if c != "id"},
+    )
+    conn.execute(stmt, rows)
+
+
+def apply_backup(engine: Engine, records: Iterable[dict], batch_size: int = JOURNAL_BATCH_SIZE) -> Dict[str, int]:
+    """
+    Применить полный бэкап или инкремент (id сохраняются, строки - upsert)
+    Returns: {таблица: применено записей}
+    """
+    applied: Dict[str, int] = {}
+    table_name, batch = None, []
+
+    with engine.begin() as conn:
+        def flush():
+            if batch:
+                _upsert(conn, Base.metadata.tables[table_name], batch)
+                applied[table_name] = applied.get(table_name, 0) + len(batch)
+                batch.clear()
+
+        for record in records:
+            if "table" not in record:
+                continue  # заголовок / итог
+            if record["table"] not in JOURNALED_TABLES:
+                raise ValueError(f"Неизвестная таблица в бэкапе: {record['table']}")
+            if record["table"] != table_name or len(batch) >= batch_size or "delete" in record:
+                flush()
+            table_name = record["table"]
+            if "delete" in record:
+                table = Base.metadata.tables[table_name]
+                conn.execute(delete(table).where(table.c.id == record["delete"]))
+                applied[table_name] = applied.get(table_name, 0) + 1
+            else:
+                batch.append(record["row"])
+        flush()
+
+    return applied
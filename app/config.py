@@ -32,3 +32,81 @@ if USE_SQLITE:
     # Используем локальную SQLite базу
     local_db_path = Path(__file__).parent.parent / "mikrokredit.db"
     DATABASE_URL = f"sqlite:///{local_db_path.absolute()}"
+
+# Хеширование паролей (bcrypt)
+# Стоимость bcrypt; при изменении старые хеши прозрачно перехешируются при входе
+PASSWORD_HASH_ROUNDS = int(os.environ.get("PASSWORD_HASH_ROUNDS", "12"))
+# Сколько хеширований одновременно выполняется в одном процессе
+PASSWORD_HASH_WORKERS = int(os.environ.get("PASSWORD_HASH_WORKERS", "2"))
+# Сколько запросов может ждать свободного потока, остальные сразу получают отказ
+# (вместе с PASSWORD_HASH_WORKERS - меньше threads в gunicorn.conf.py, чтобы страницам оставались потоки)
+PASSWORD_HASH_QUEUE_SIZE = int(os.environ.get("PASSWORD_HASH_QUEUE_SIZE", "4"))
+# Сколько секунд запрос ждёт в очереди, прежде чем получить отказ
+PASSWORD_HASH_QUEUE_TIMEOUT = float(os.environ.get("PASSWORD_HASH_QUEUE_TIMEOUT", "2.0"))
+
+# Очередь отправки email (app/email_queue.py)
+# Сколько писем может ждать отправки в одном процессе, лишние отбрасываются
+EMAIL_QUEUE_SIZE = int(os.environ.get("EMAIL_QUEUE_SIZE", "1000"))
+# Сколько попыток отправки одного письма до отказа
+EMAIL_MAX_ATTEMPTS = int(os.environ.get("EMAIL_MAX_ATTEMPTS", "5"))
+# Пауза перед повтором: base * 2^(попытка-1), но не больше max (секунды)
+EMAIL_RETRY_BASE_SECONDS = float(os.environ.get("EMAIL_RETRY_BASE_SECONDS", "2"))
+EMAIL_RETRY_MAX_SECONDS = float(os.environ.get("EMAIL_RETRY_MAX_SECONDS", "300"))
+# Через сколько секунд простоя закрывать SMTP-соединение
+EMAIL_IDLE_TIMEOUT_SECONDS = float(os.environ.get("EMAIL_IDLE_TIMEOUT_SECONDS", "60"))
+# Каталог, где лежат ещё не доставленные письма (переживают падение процесса); пусто - не сохранять
+EMAIL_SPOOL_DIR = os.environ.get("EMAIL_SPOOL_DIR", str(Path(__file__).parent.parent / "spool" / "email"))
+
+# Локальная копия данных десктопного клиента (app/local_replica.py)
+# Файл SQLite, из которого читает интерфейс; изменения уходят на сервер при синхронизации
+LOCAL_REPLICA_PATH = os.environ.get(
+    "MIKROKREDIT_REPLICA_PATH", str(Path(__file__).parent.parent / "mikrokredit_replica.db")
+)
+# Чьи кредиты держать в локальной копии (не задано - все кредиты базы)
+DESKTOP_USER_ID = int(os.environ["MIKROKREDIT_DESKTOP_USER_ID"]) if os.environ.get("MIKROKREDIT_DESKTOP_USER_ID") else None
+# Период фоновой синхронизации (секунды)
+REPLICA_SYNC_INTERVAL_SECONDS = float(os.environ.get("REPLICA_SYNC_INTERVAL_SECONDS", "60"))
+# При активации окна синхронизировать, если с прошлой прошло больше (секунды)
+REPLICA_SYNC_ON_FOCUS_SECONDS = float(os.environ.get("REPLICA_SYNC_ON_FOCUS_SECONDS", "15"))
+
+# Напоминания в трее (app/reminder.py)
+# За сколько дней до срока платежа показывать напоминание
+REMINDER_DAYS_BEFORE = int(os.environ.get("REMINDER_DAYS_BEFORE", "7"))
+# В котором часу (локальное время) напоминать о платежах, вошедших в этот срок
+REMINDER_HOUR = int(os.environ.get("REMINDER_HOUR", "9"))
+
+# SQLite (app/db.py, SQLite-ветка app/db_sa.py, локальная копия десктопа)
+# Сколько мс ждать освобождения базы другим писателем, прежде чем вернуть "database is locked"
+SQLITE_BUSY_TIMEOUT_MS = int(os.environ.get("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+# Сколько байт файла базы читать через mmap (без копирования страниц в кэш процесса)
+SQLITE_MMAP_SIZE = int(os.environ.get("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+# Кэш страниц одного соединения (КиБ)
+SQLITE_CACHE_SIZE_KB = int(os.environ.get("SQLITE_CACHE_SIZE_KB", "20000"))
+# Сколько подготовленных выражений хранит соединение sqlite3 (app/db.py)
+SQLITE_CACHED_STATEMENTS = int(os.environ.get("SQLITE_CACHED_STATEMENTS", "256"))
+
+# Telegram-бот (scripts/telegram_bot_server.py, app/bot_runtime.py)
+# Потоков для запросов к БД из обработчиков (не больше pool_size движка в app/db_sa.py)
+BOT_DB_WORKERS = int(os.environ.get("BOT_DB_WORKERS", "8"))
+# Сколько обновлений обрабатывать одновременно (нажатия в разных чатах не ждут друг друга)
+BOT_CONCURRENT_UPDATES = int(os.environ.get("BOT_CONCURRENT_UPDATES", "64"))
+# Обновления дольше этого (секунды) пишутся в лог как медленные
+BOT_SLOW_UPDATE_SECONDS = float(os.environ.get("BOT_SLOW_UPDATE_SECONDS", "1.0"))
+# Раз в сколько обновлений печатать сводку метрик
+BOT_METRICS_LOG_EVERY = int(os.environ.get("BOT_METRICS_LOG_EVERY", "100"))
+
+# Webhook-режим бота (app/bot_webhook.py). Пустой BOT_WEBHOOK_URL - long polling
+# Публичный HTTPS-адрес, который Telegram вызывает (nginx проксирует на listen:port)
+BOT_WEBHOOK_URL = os.environ.get("BOT_WEBHOOK_URL", "")
+BOT_WEBHOOK_LISTEN = os.environ.get("BOT_WEBHOOK_LISTEN", "127.0.0.1")
+BOT_WEBHOOK_PORT = int(os.environ.get("BOT_WEBHOOK_PORT", "8003"))
+# Очередь принятых обновлений; при переполнении отвечаем 503 - Telegram повторит позже
+BOT_WEBHOOK_QUEUE_SIZE = int(os.environ.get("BOT_WEBHOOK_QUEUE_SIZE", "1000"))
+
+# Напоминания о платежах по займам (scripts/telegram_notifier.py, app/loan_notifications.py)
+# За сколько дней до срока напоминать (просроченные - каждый день)
+LOAN_NOTIFY_DAYS_BEFORE = int(os.environ.get("LOAN_NOTIFY_DAYS_BEFORE", "2"))
+# Параллельных отправок в Telegram (общий пул HTTP-соединений, app/telegram_notifier.py)
+TELEGRAM_SEND_WORKERS = int(os.environ.get("TELEGRAM_SEND_WORKERS", "4"))
+# Сколько раз повторять отправку после 429 Too Many Requests
+TELEGRAM_SEND_MAX_RETRIES = int(os.environ.get("TELEGRAM_SEND_MAX_RETRIES", "3"))
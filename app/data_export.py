@@ -0,0 +1,157 @@
+"""
+Потоковая выгрузка данных (NDJSON, опционально gzip/zstd)
+
+Формат файла - одна JSON-запись на строку:
+    {"format": "mikrokredit-export", "version": 2, ...}   заголовок
+    {"table": "loans", "row": {...}}                        строки таблиц
+    {"summary": {"loans": 10, ...}}                         итог
+
+Таблицы идут в порядке зависимостей (родители раньше детей), поэтому файл
+можно загружать последовательно (scripts/import_data.py). Строки читаются
+серверным курсором пачками по batch_size и сразу пишутся в поток - память
+не зависит от размера базы. Секреты (хеши паролей, токены, сессии) не
+выгружаются.
+"""
+import gzip
+import io
+import json
+from datetime import datetime
+from typing import Dict, Optional, TextIO
+
+from sqlalchemy import select
+from sqlalchemy.engine import Engine
+
+from app.models_sa import Base
+
+EXPORT_FORMAT = "mikrokredit-export"
+EXPORT_VERSION = 2
+EXPORT_BATCH_SIZE = 1000
+
+# Таблицы выгрузки: родители раньше детей
+EXPORT_TABLES = (
+    "users",
+    "task_categories",
+    "loans",
+    "installments",
+    "tasks",
+    "subtasks",
+    "task_schedules",
+    "reminder_rules",
+    "task_reminders",
+    "reminder_templates",
+    "reminder_rule_templates",
+)
+
+# Колонки, которые не покидают базу
+SECRET_COLUMNS = {
+    "users": ("password_hash",),
+}
+
+# Общие справочники без владельца - в выгрузку пользователя не попадают
+GLOBAL_TABLES = ("reminder_templates",)
+
+
+def _table(name: str):
+    return Base.metadata.tables[name]
+
+
+def _user_filter(table, user_id: int):
+    """Условие "строка принадлежит пользователю" (None - таблица общая)"""
+    if table.name == "users":
+        return table.c.id == user_id
+    if "user_id" in table.c:
+        return table.c.user_id == user_id
+    if "loan_id" in table.c:
+        loans = _table("loans")
+        return table.c.loan_id.in_(select(loans.c.id).where(loans.c.user_id == user_id))
+    if "task_id" in table.c:
+        tasks = _table("tasks")
+        return table.c.task_id.in_(select(tasks.c.id).where(tasks.c.user_id == user_id))
+    if "created_by" in table.c:
+        return table.c.created_by == user_id
+    return None
+
+
+def _export_query(table, user_id: Optional[int], include_secrets: bool = False):
+    secret = () if include_secrets else SECRET_COLUMNS.get(table.name, ())
+    query = select(*[c for c in table.c if c.name not in secret])
+    if user_id is not None:
+        query = query.where(_user_filter(table, user_id))
+    return query.order_by(*table.primary_key.columns)
+
+
+def _dumps(record) -> str:
+    return json.dumps(record, ensure_ascii=False, separators=(",", ":"), default=str)
+
+
+def export_stream(engine: Engine, out: TextIO, user_id: Optional[int] = None,
+                  batch_size: int = EXPORT_BATCH_SIZE, progress=None,
+                  include_secrets: bool = False) -> Dict[str, int]:
+    """
+    Записать выгрузку в текстовый поток out
+    user_id - выгрузить только данные одного пользователя (запрос на выдачу данных)
+    include_secrets - с хешами паролей (только для бэкапов, app/change_journal.py)
+    progress(table, count) вызывается после каждой таблицы
+    Returns: {таблица: количество строк}
+    """
+    tables = [t for t in EXPORT_TABLES if user_id is None or t not in GLOBAL_TABLES]
+    counts = {}
+
+    out.write(_dumps({
+        "format": EXPORT_FORMAT,
+        "version": EXPORT_VERSION,
+        "exported_at": datetime.now().isoformat(),
+        "user_id": user_id,
+        "tables": tables,
+    }) + "\n")
+
+    with engine.connect() as conn:
+        if engine.dialect.name == "postgresql":
+            # Один снимок на все таблицы - выгрузка согласована
+            conn = conn.execution_options(isolation_level="REPEATABLE READ")
+        conn = conn.execution_options(stream_results=True, yield_per=batch_size)
+
+        for name in tables:
+            table = _table(name)
+            count = 0
+            result = conn.execute(_export_query(table, user_id, include_secrets))
+            for rows in result.partitions():
+                out.write("".join(
+                    _dumps({"table": name, "row": dict(row._mapping)}) + "\n" for row in rows
+                ))
+                count += len(rows)
+            counts[name] = count
+            if progress:
+                progress(name, count)
+
+    out.write(_dumps({"summary": counts}) + "\n")
+    return counts
+
+
+def open_output(path: str) -> TextIO:
+    """Открыть файл выгрузки на запись; сжатие по расширению (.gz, .zst)"""
+    if path.endswith(".gz"):
+        return gzip.open(path, "wt", encoding="utf-8", compresslevel=6)
+    if path.endswith(".zst"):
+        try:
+            import zstandard
+        except ImportError:
+            raise RuntimeError("Для .zst нужен пакет zstandard: pip install zstandard")
+        raw = open(path, "wb")
+        writer = zstandard.ZstdCompressor(level=6).stream_writer(raw, closefd=True)
+        return io.TextIOWrapper(writer, encoding="utf-8")
+    return open(path, "w", encoding="utf-8")
+
+
+def open_input(path: str) -> TextIO:
+    """Открыть файл выгрузки на чтение; распаковка по расширению (.gz, .zst)"""
+    if path.endswith(".gz"):
+        return gzip.open(path, "rt", encoding="utf-8")
+    if path.endswith(".zst"):
+        try:
+            import zstandard
+        except ImportError:
+            raise RuntimeError("Для .zst нужен пакет zstandard: pip install zstandard")
+        reader = zstandard.ZstdDecompressor().stream_reader(open(path, "rb"), closefd=True)
+        return io.TextIOWrapper(reader, encoding="utf-8")
+    return open(path, "r", encoding="utf-8")
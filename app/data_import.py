@@ -0,0 +1,311 @@
+"""
+Потоковая загрузка выгрузки (app/data_export.py) в базу
+
+- Файл читается построчно, строки одной таблицы вставляются пачками по
+  batch_size: один INSERT ... RETURNING id на пачку (insertmanyvalues с
+  сохранением порядка параметров), из него строится карта старый id -> новый.
+- Внешние ключи (loan_id, task_id, category_id, user_id, created_by)
+  переводятся на новые id по картам родительских таблиц.
+- Пользователи сопоставляются по email: существующий пользователь не
+  создаётся заново. Хеши паролей не выгружаются - новые пользователи
+  получают непригодный хеш и входят через восстановление пароля.
+  С target_user_id все данные файла достаются одному существующему пользователю.
+- Карты id и позиция в файле хранятся в файле контрольной точки (SQLite),
+  поэтому прерванную загрузку миллиона строк можно продолжить с места остановки.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from sqlalchemy import delete, insert, select
+from sqlalchemy.engine import Engine
+
+from app.data_export import EXPORT_FORMAT, EXPORT_TABLES, open_input
+from app.models_sa import Base
+
+IMPORT_BATCH_SIZE = 1000
+# Хеш, который bcrypt не примет ни для какого пароля
+UNUSABLE_PASSWORD_HASH = "!"
+# Ссылки на пользователя без внешнего ключа
+USER_REFERENCE_COLUMNS = {"reminder_rule_templates": ("created_by",)}
+# Ограничение SQLite на число параметров в IN (...)
+_LOOKUP_CHUNK = 500
+
+
+def _fingerprint(table, values: dict) -> str:
+    """
+    Отпечаток значений строки: одинаков для значений INSERT и строки, прочитанной из базы
+    (значения приводятся к python-типу столбца: 1 и True для Boolean совпадают)
+    """
+    normalized = []
+    for name in sorted(values):
+        value = values[name]
+        if value is not None:
+            try:
+                value = table.c[name].type.python_type(value)
+            except (NotImplementedError, TypeError, ValueError):
+                pass
+        normalized.append([name, value])
+    return hashlib.sha1(json.dumps(normalized, default=str).encode()).hexdigest()[:16]
+
+
+class ImportCheckpoint:
+    """
+    Контрольная точка загрузки: сколько строк файла обработано и карты id
+
+    Новые id пачки (из INSERT ... RETURNING) и отпечатки вставленных значений
+    записываются в контрольную точку до коммита пачки в базу. Если процесс
+    упал между коммитом в базу и записью итогов пачки, при продолжении
+    удаляются строки с этими id, отпечаток которых совпал, и пачка
+    вставляется заново. Совпадения id мало: если транзакция пачки откатилась,
+    SQLite выдаёт те же rowid следующим вставкам (sqlite_sequence тоже
+    откатывается), и под ними уже лежат чужие строки - их не трогаем.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.db = sqlite3.connect(path)
+        self.db.executescript("""
+            CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+            CREATE TABLE IF NOT EXISTS id_map (
+                tbl TEXT NOT NULL, old_id INTEGER NOT NULL, new_id INTEGER NOT NULL,
+                PRIMARY KEY (tbl, old_id)
+            ) WITHOUT ROWID;
+        """)
+
+    def get(self, key: str, default=None):
+        row = self.db.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row else default
+
+    def set(self, key: str, value) -> None:
+        self.db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, json.dumps(value)))
+
+    @property
+    def line(self) -> int:
+        return self.get("line", 0)
+
+    def begin_batch(self, table: str, columns: List[str], rows: List[Tuple[int, str]]) -> None:
+        """columns - столбцы INSERT; rows: [(новый id, отпечаток значений этих столбцов)]"""
+        self.set("pending", {"table": table, "columns": columns, "rows": rows})
+        self.db.commit()
+
+    def finish_batch(self, table: str, pairs: List[Tuple[int, int]], line: int) -> None:
+        self.db.executemany("INSERT OR REPLACE INTO id_map (tbl, old_id, new_id) VALUES (?, ?, ?)",
+                            [(table, old, new) for old, new in pairs])
+        self.set("line", line)
+        self.set("pending", None)
+        self.db.commit()
+
+    def lookup(self, table: str, old_ids) -> Dict[int, int]:
+        """Новые id для старых id таблицы"""
+        old_ids = list(old_ids)
+        found = {}
+        for i in range(0, len(old_ids), _LOOKUP_CHUNK):
+            chunk = old_ids[i:i + _LOOKUP_CHUNK]
+            placeholders = ",".join("?" * len(chunk))
+            found.update(self.db.execute(
+                f"SELECT old_id, new_id FROM id_map WHERE tbl = ? AND old_id IN ({placeholders})",
+                [table, *chunk],
+            ))
+        return found
+
+    def close(self, remove: bool = False) -> None:
+        self.db.close()
+        if remove:
+            os.remove(self.path)
+
+
+def _read_records(path: str, start_line: int) -> Iterator[Tuple[int, dict]]:
+    """(номер строки, запись) начиная со строки start_line"""
+    with open_input(path) as f:
+        first = f.readline()
+        try:
+            header = json.loads(first)
+        except ValueError:
+            header = None
+        if not isinstance(header, dict) or header.get("format") != EXPORT_FORMAT:
+            # Старый формат (один JSON документ с loans/installments) - небольшой, читаем целиком
+            yield from _legacy_records(first + f.read(), start_line)
+            return
+
+        for number, line in enumerate(f, start=2):
+            if number > start_line and line.strip():
+                yield number, json.loads(line)
+
+
+def _legacy_records(content: str, start_line: int) -> Iterator[Tuple[int, dict]]:
+    data = json.loads(content)
+    records = [{"table": "loans", "row": row} for row in data.get("loans", [])]
+    records += [{"table": "installments", "row": row} for row in data.get("installments", [])]
+    for number, record in enumerate(records, start=2):
+        if number > start_line:
+            yield number, record
+
+
+class BulkImporter:
+    """Загрузка выгрузки в базу пачками с переводом id"""
+
+    def __init__(self, engine: Engine, checkpoint: ImportCheckpoint,
+                 target_user_id: Optional[int] = None, batch_size: int = IMPORT_BATCH_SIZE,
+                 progress=None):
+        self.engine = engine
+        self.checkpoint = checkpoint
+        self.target_user_id = target_user_id
+        self.batch_size = batch_size
+        self.progress = progress
+        self.counts: Dict[str, int] = {}
+        self.skipped: Dict[str, int] = {}
+
+    # ---------- восстановление после сбоя ----------
+
+    def _recover_pending(self) -> None:
+        pending = self.checkpoint.get("pending")
+        if not pending:
+            return
+        table = Base.metadata.tables[pending["table"]]
+        expected = dict(pending["rows"])
+        ids = list(expected)
+        removed = foreign = 0
+        with self.engine.begin() as conn:
+            for i in range(0, len(ids), _LOOKUP_CHUNK):
+                chunk = ids[i:i + _LOOKUP_CHUNK]
+                ours = []
+                for row in conn.execute(select(table).where(table.c.id.in_(chunk))).mappings():
+                    values = {name: row[name] for name in pending["columns"]}
+                    if _fingerprint(table, values) == expected[row["id"]]:
+                        ours.append(row["id"])
+                    else:
+                        foreign += 1
+                if ours:
+                    removed += conn.execute(delete(table).where(table.c.id.in_(ours))).rowcount
+        if removed:
+            print(f"⚠️  {table.name}: удалено {removed} строк незавершённой пачки, она будет загружена заново")
+        if foreign:
+            # Пачка откатилась, и SQLite выдал её id другим записям
+            print(f"⚠️  {table.name}: {foreign} строк с id незавершённой пачки - чужие, не удалены")
+        self.checkpoint.set("pending", None)
+        self.checkpoint.db.commit()
+
+    # ---------- подготовка строк ----------
+
+    def _remap(self, table, rows: List[dict]) -> List[Tuple[int, dict]]:
+        """
+        Перевести ссылки пачки на новые id. Returns: [(старый id, значения для INSERT)]
+        Raises: ValueError, если у строк нет владельца (старый формат без user_id) и target_user_id не задан
+        """
+        if self.target_user_id is None and "user_id" in table.c and not table.c.user_id.nullable:
+            missing = sum(1 for row in rows if row.get("user_id") is None)
+            if missing:
+                raise ValueError(f"{table.name}: строк без user_id - {missing} (старый формат выгрузки); "
+                                 f"укажите пользователя, которому загрузить данные (--user ID)")
+        references = [(fk.parent, fk.column.table.name) for fk in table.foreign_keys]
+        references += [(table.c[name], "users") for name in USER_REFERENCE_COLUMNS.get(table.name, ())]
+
+        maps = {}
+        for column, parent in references:
+            if parent == "users" and self.target_user_id is not None:
+                continue
+            old_ids = {row[column.name] for row in rows if row.get(column.name) is not None}
+            maps[column.name] = self.checkpoint.lookup(parent, old_ids)
+
+        prepared = []
+        for row in rows:
+            values = {k: v for k, v in row.items() if k in table.c and k != "id"}
+            if self.target_user_id is not None:
+                # В том числе старый формат, где user_id ещё не было
+                if "user_id" in table.c:
+                    values["user_id"] = self.target_user_id
+                for name in USER_REFERENCE_COLUMNS.get(table.name, ()):
+                    if values.get(name) is not None:
+                        values[name] = self.target_user_id
+            for column, parent in references:
+                old = values.get(column.name)
+                if old is None or column.name not in maps:
+                    continue
+                new = maps[column.name].get(old)
+                if new is None and not column.nullable and column.foreign_keys:
+                    # Родитель не загружен - строка без владельца не нужна
+                    values = None
+                    break
+                values[column.name] = new
+            if values is None:
+                self.skipped[table.name] = self.skipped.get(table.name, 0) + 1
+                continue
+            prepared.append((row.get("id"), values))
+        return prepared
+
+    def _match_users(self, conn, rows: List[dict]) -> Tuple[List[Tuple[int, int]], List[dict]]:
+        """Существующие пользователи (по email) -> пары id; остальные - на вставку"""
+        users = Base.metadata.tables["users"]
+        if self.target_user_id is not None:
+            return [(row["id"], self.target_user_id) for row in rows], []
+
+        emails = [row["email"] for row in rows]
+        existing = dict(conn.execute(select(users.c.email, users.c.id).where(users.c.email.in_(emails))).all())
+        pairs = [(row["id"], existing[row["email"]]) for row in rows if row["email"] in existing]
+        new_rows = [row for row in rows if row["email"] not in existing]
+        for row in new_rows:
+            row.setdefault("password_hash", UNUSABLE_PASSWORD_HASH)
+        return pairs, new_rows
+
+    # ---------- вставка ----------
+
+    def _insert_batch(self, table_name: str, rows: List[dict], last_line: int) -> None:
+        table = Base.metadata.tables[table_name]
+        pairs: List[Tuple[int, int]] = []
+
+        with self.engine.connect() as conn:
+            if table_name == "users":
+                pairs, rows = self._match_users(conn, rows)
+            prepared = self._remap(table, rows)
+
+            if prepared:
+                conn.rollback()
+                with conn.begin():
+                    result = conn.execute(
+                        insert(table).returning(table.c.id, sort_by_parameter_order=True),
+                        [values for _, values in prepared],
+                    )
+                    new_ids = result.scalars().all()
+                    # До коммита: при сбое после него продолжение удалит ровно эти строки
+                    self.checkpoint.begin_batch(table_name, sorted(prepared[0][1]), [
+                        (new_id, _fingerprint(table, values)) for new_id, (_, values) in zip(new_ids, prepared)
+                    ])
+                pairs += [(old, new) for (old, _), new in zip(prepared, new_ids) if old is not None]
+
+        self.checkpoint.finish_batch(table_name, pairs, last_line)
+        self.counts[table_name] = self.counts.get(table_name, 0) + len(prepared)
+
+    def run(self, path: str) -> Dict[str, int]:
+        """
+        Загрузить файл (продолжая с контрольной точки)
+        Returns: {таблица: вставлено строк}
+        """
+        self._recover_pending()
+        start_line = self.checkpoint.line
+        if start_line:
+            print(f"Продолжение с контрольной точки: строка {start_line}")
+
+        table_name, batch, last_line = None, [], start_line
+        for number, record in _read_records(path, start_line):
+            if "table" not in record:
+                continue  # итоговая запись summary
+            if record["table"] not in EXPORT_TABLES:
+                raise ValueError(f"Неизвестная таблица в файле: {record['table']}")
+            if batch and (record["table"] != table_name or len(batch) >= self.batch_size):
+                self._flush(table_name, batch, last_line)
+                batch = []
+            table_name = record["table"]
+            batch.append(record["row"])
+            last_line = number
+
+        if batch:
+            self._flush(table_name, batch, last_line)
+        return self.counts
+
+    def _flush(self, table_name: str, batch: List[dict], last_line: int) -> None:
+        self._insert_batch(table_name, batch, last_line)
+        if self.progress:
+            self.progress(table_name, self.counts.get(table_name, 0))
@@ -0,0 +1,181 @@
+"""
+Версия данных пользователя и условные GET-запросы (ETag / Last-Modified)
+
+Для каждого пользователя в Redis хранится счётчик версии данных. Он
+увеличивается после каждого коммита, который изменил займы, платежи,
+задачи (с подзадачами, расписаниями, правилами и напоминаниями task_reminders -
+их пересоздаёт ReminderGenerator, не трогая саму задачу) или категории этого
+пользователя - через события сессии SQLAlchemy, без правок во views.
+
+Версия растёт монотонно и привязана ко времени (не меньше текущих
+миллисекунд), поэтому переживает перезапуск Redis и годится как Last-Modified.
+
+Модуль подключается к каждой сессии (app/db_sa.py) - в вебе, боте, cron-
+скриптах и десктопе - поэтому не зависит от Flask. Условные GET по версии
+(декоратор conditional_get) - в web/conditional.py.
+"""
+import time
+from typing import Iterable, Optional
+
+from sqlalchemy import event, inspect, select
+from sqlalchemy.orm.util import identity_key
+
+from app.config import PROJECT_NAME
+from app.integration import REDIS_RETRY_INTERVAL, get_redis, is_connection_error, mark_redis_down
+
+KEY_PREFIX = f"{PROJECT_NAME}:data_version"
+# Общие (не пользовательские) данные: шаблоны напоминаний
+GLOBAL_SCOPE = "global"
+
+# KEYS[1] - ключ версии, ARGV[1] - текущее время в мс
+_BUMP_LUA = """
+local current = tonumber(redis.call('GET', KEYS[1]) or '0')
+local now = tonumber(ARGV[1])
+local version = math.max(current + 1, now)
+redis.call('SET', KEYS[1], version)
+return version
+"""
+
+_bump_script = None
+_bump_script_client = None
+# Когда последний раз предупреждали о сбое bump (не чаще раза за REDIS_RETRY_INTERVAL)
+_bump_warned_at: Optional[float] = None
+
+
+def _key(scope) -> str:
+    return f"{KEY_PREFIX}:{scope}"
+
+
+def _now_ms() -> int:
+    return int(time.time() * 1000)
+
+
+def current_version(scope) -> Optional[int]:
+    """
+    Текущая версия данных (user_id или GLOBAL_SCOPE)
+    Returns: None если Redis недоступен (условные запросы отключаются)
+    """
+    client = get_redis()
+    if client is None:
+        return None
+    try:
+        value = client.get(_key(scope))
+        if value is None:
+            # Первое обращение (или Redis потерял данные): версия = сейчас
+            client.set(_key(scope), _now_ms(), nx=True)
+            value = client.get(_key(scope))
+        return int(value)
+    except Exception as e:
+        if is_connection_error(e):
+            mark_redis_down()
+        return None
+
+
+def bump(scopes: Iterable) -> None:
+    """Увеличить версию данных (после коммита изменений)"""
+    global _bump_script, _bump_script_client
+    scopes = list(scopes)
+    if not scopes:
+        return
+    client = get_redis()
+    if client is None:
+        return
+    try:
+        if _bump_script is None or _bump_script_client is not client:
+            _bump_script = client.register_script(_BUMP_LUA)
+            _bump_script_client = client
+        now = _now_ms()
+        for scope in scopes:
+            _bump_script(keys=[_key(scope)], args=[now])
+    except Exception as e:
+        if is_connection_error(e):
+            mark_redis_down()
+        _warn_bump_failed(e)
+
+
+def _warn_bump_failed(e: Exception) -> None:
+    """Предупреждение о сбое bump - одно на окно REDIS_RETRY_INTERVAL, а не на каждый коммит"""
+    global _bump_warned_at
+    now = time.monotonic()
+    if _bump_warned_at is not None and now - _bump_warned_at < REDIS_RETRY_INTERVAL:
+        return
+    _bump_warned_at = now
+    print(f"⚠️  Data version bump failed: {e} (следующее предупреждение - не раньше чем через "
+          f"{REDIS_RETRY_INTERVAL} с)")
+
+
+# ==================== СОБЫТИЯ СЕССИИ ====================
+
+_PENDING_KEY = "data_version_pending"
+
+
+def _collect_scopes(session) -> set:
+    """Пользователи (и GLOBAL_SCOPE), чьи данные затронуты текущим flush"""
+    from app.models_sa import (
+        LoanORM, InstallmentORM, TaskORM, TaskCategoryORM, SubtaskORM,
+        TaskScheduleORM, ReminderRuleORM, ReminderRuleTemplateORM, TaskReminderORM,
+    )
+
+    scopes = set()
+    loan_ids, task_ids = set(), set()
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, (LoanORM, TaskORM, TaskCategoryORM)):
+            scopes.add(obj.user_id)
+        elif isinstance(obj, InstallmentORM):
+            loan_ids.add(obj.loan_id)
+        elif isinstance(obj, (SubtaskORM, TaskScheduleORM, ReminderRuleORM, TaskReminderORM)):
+            task_ids.add(obj.task_id)
+        elif isinstance(obj, ReminderRuleTemplateORM):
+            scopes.add(GLOBAL_SCOPE)
+
+    # Владельцев дочерних строк берём из уже загруженных в сессию родителей, остальных -
+    # одним запросом на таблицу: лишний SELECT внутри пишущей транзакции держит блокировку SQLite
+    for model, ids in ((LoanORM, loan_ids), (TaskORM, task_ids)):
+        ids.discard(None)
+        for row_id in list(ids):
+            parent = session.identity_map.get(identity_key(model, row_id))
+            user_id = inspect(parent).dict.get("user_id") if parent is not None else None
+            if user_id is not None:
+                scopes.add(user_id)
+                ids.discard(row_id)
+        if ids:
+            scopes.update(session.connection().execute(select(model.user_id).where(model.id.in_(ids))).scalars())
+
+    scopes.discard(None)
+    return scopes
+
+
+def _after_flush(session, flush_context):
+    try:
+        scopes = _collect_scopes(session)
+    except Exception as e:
+        print(f"⚠️  Data version tracking failed: {e}")
+        return
+    if scopes:
+        session.info.setdefault(_PENDING_KEY, set()).update(scopes)
+
+
+def _after_commit(session):
+    scopes = session.info.pop(_PENDING_KEY, None)
+    if scopes:
+        bump(scopes)
+
+
+def _after_rollback(session):
+    session.info.pop(_PENDING_KEY, None)
+
+
+def mark_changed(session, scopes: Iterable) -> None:
+    """
+    Отметить данные затронутыми текущей транзакцией (версия вырастет после коммита).
+    Нужно для массовых INSERT/UPDATE/DELETE через session.execute: они идут мимо
+    unit of work, и after_flush их не видит.
+    """
+    session.info.setdefault(_PENDING_KEY, set()).update(scope for scope in scopes if scope is not None)
+
+
+def register_session_events(session_factory) -> None:
+    """Подписать фабрику сессий на отслеживание изменений"""
+    event.listen(session_factory, "after_flush", _after_flush)
+    event.listen(session_factory, "after_commit", _after_commit)
+    event.listen(session_factory, "after_rollback", _after_rollback)
@@ -1,23 +1,68 @@
 import os
 import sqlite3
+import threading
 from datetime import date
 from typing import Optional
 
+from .config import SQLITE_BUSY_TIMEOUT_MS, SQLITE_CACHE_SIZE_KB, SQLITE_CACHED_STATEMENTS, SQLITE_MMAP_SIZE
+
 DB_FILENAME = os.environ.get("MIKROKREDIT_DB", "mikrokredit.db")
 
+# Соединение на поток: переиспользуется всеми вызовами репозитория в этом потоке
+_local = threading.local()
+# Соединения, унаследованные от родителя при fork: закрывать их в дочернем процессе
+# нельзя (SQLite снимет блокировки файла, принадлежащие родителю)
+_inherited = []
+
 
 def get_db_path() -> str:
     return os.path.abspath(DB_FILENAME)
 
 
+def apply_sqlite_pragmas(dbapi_connection, foreign_keys: bool = True) -> None:
+    """
+    Настройки SQLite для нового соединения (sqlite3 и SQLAlchemy).
+
+    WAL: читатели не блокируют писателя и наоборот, а "database is locked"
+    при параллельной записи (воркеры + cron) заменяется ожиданием busy_timeout.
+    synchronous=NORMAL в режиме WAL не портит базу при сбое - теряется лишь
+    последняя транзакция, зато коммит не ждёт fsync.
+    """
+    cursor = dbapi_connection.cursor()
+    try:
+        cursor.execute("PRAGMA journal_mode = WAL")
+        cursor.execute("PRAGMA synchronous = NORMAL")
+        cursor.execute(f"PRAGMA busy_timeout = {SQLITE_BUSY_TIMEOUT_MS}")
+        cursor.execute(f"PRAGMA mmap_size = {SQLITE_MMAP_SIZE}")
+        cursor.execute(f"PRAGMA cache_size = -{SQLITE_CACHE_SIZE_KB}")
+        cursor.execute(f"PRAGMA foreign_keys = {'ON' if foreign_keys else 'OFF'}")
+    finally:
+        cursor.close()
+
+
 def get_connection() -> sqlite3.Connection:
-    conn = sqlite3.connect(get_db_path())
+    """
+    Соединение текущего потока (открывается один раз на поток и процесс).
+
+    Повторное использование соединения включает кэш подготовленных выражений
+    sqlite3: одинаковый SQL репозитория не разбирается заново при каждом вызове.
+    `with get_connection() as conn:` по-прежнему фиксирует или откатывает
+    транзакцию, но соединение не закрывает.
+    """
+    conn = getattr(_local, "conn", None)
+    if conn is not None and _local.pid == os.getpid():
+        return conn
+    if conn is not None:
+        _inherited.append(conn)
+
+    conn = sqlite3.connect(
+        get_db_path(),
+        timeout=SQLITE_BUSY_TIMEOUT_MS / 1000,
+        cached_statements=SQLITE_CACHED_STATEMENTS,
+    )
     conn.row_factory = sqlite3.Row
-    # Ensure FK constraints work
-    try:
-        conn.execute("PRAGMA foreign_keys = ON;")
-    except Exception:
-        pass
+    apply_sqlite_pragmas(conn)
+    _local.conn, _local.pid = conn, os.getpid()
     return conn
 
 
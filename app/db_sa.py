@@ -1,7 +1,12 @@
 from __future__ import annotations
 import os
+import logging
+import threading
 from contextlib import contextmanager
+from typing import Optional
+
 from sqlalchemy import create_engine
+from sqlalchemy.engine import Engine
 from sqlalchemy.orm import sessionmaker, Session
 
 # Импортируем конфигурацию
@@ -12,39 +17,139 @@ except ImportError:
     DATABASE_URL = os.environ.get("DATABASE_URL") or f"sqlite:///{os.path.abspath(os.environ.get('MIKROKREDIT_DB', 'mikrokredit.db'))}"
     USE_SQLITE = False
 
-print(f"DEBUG: DATABASE_URL = {DATABASE_URL}")
-print(f"DEBUG: USE_SQLITE = {USE_SQLITE}")
-
-# SQLite needs check_same_thread=False for use across threads
-# For PostgreSQL, use psycopg2 driver with connection pooling
-if DATABASE_URL.startswith("sqlite:"):
-    print("DEBUG: Using SQLite database")
-    connect_args = {"check_same_thread": False}
-    engine = create_engine(DATABASE_URL, echo=False, future=True, connect_args=connect_args)
-else:
-    print("DEBUG: Using PostgreSQL database")
-    try:
-        # Настройки для PostgreSQL с улучшенным управлением подключениями
-        engine = create_engine(
-            DATABASE_URL,
-            echo=False,
-            future=True,
-            pool_size=10,  # Размер пула подключений
-            max_overflow=20,  # Дополнительные подключения при нагрузке
-            pool_pre_ping=True,  # Проверка подключения перед использованием
-            pool_recycle=3600,  # Переиспользование подключений каждый час
-        )
-        print("DEBUG: Engine created successfully")
-    except Exception as e:
-        print(f"DEBUG: Error creating engine: {e}")
-        raise
+logger = logging.getLogger(__name__)
+
+# Engine и фабрика сессий создаются лениво при первом обращении:
+# импорт модуля не должен подключать драйвер БД и открывать пул
+# (важно для cron-скриптов, которые запускаются каждую минуту)
+_engine: Optional[Engine] = None
+_session_factory: Optional[sessionmaker] = None
+_lock = threading.Lock()
+
+
+def _create_engine() -> Engine:
+    logger.debug("DATABASE_URL = %s, USE_SQLITE = %s", DATABASE_URL, USE_SQLITE)
+    # SQLite needs check_same_thread=False for use across threads
+    # For PostgreSQL, use psycopg2 driver with connection pooling
+    if DATABASE_URL.startswith("sqlite:"):
+        from sqlalchemy import event
+        from app.db import apply_sqlite_pragmas
+        connect_args = {"check_same_thread": False}
+        # Файловая база в SQLAlchemy 2.0 - QueuePool: соединения переиспользуются
+        engine = create_engine(DATABASE_URL, echo=False, future=True, connect_args=connect_args)
+        event.listen(engine, "connect", lambda dbapi_connection, _record: apply_sqlite_pragmas(dbapi_connection))
+        return engine
+
+    # Настройки для PostgreSQL с улучшенным управлением подключениями
+    return create_engine(
+        DATABASE_URL,
+        echo=False,
+        future=True,
+        pool_size=10,  # Размер пула подключений
+        max_overflow=20,  # Дополнительные подключения при нагрузке
+        pool_pre_ping=True,  # Проверка подключения перед использованием
+        pool_recycle=3600,  # Переиспользование подключений каждый час
+    )
+
+
+def get_engine() -> Engine:
+    """Получить (и при первом вызове создать) engine процесса"""
+    global _engine
+    if _engine is None:
+        with _lock:
+            if _engine is None:
+                _engine = _create_engine()
+    return _engine
+
+
+def get_session_factory() -> sessionmaker:
+    """Получить фабрику сессий, привязанную к engine процесса"""
+    global _session_factory
+    if _session_factory is None:
+        engine = get_engine()
+        with _lock:
+            if _session_factory is None:
+                from app.data_version import register_session_events
+                factory = sessionmaker(bind=engine, autoflush=False, autocommit=False, future=True)
+                # Версия данных пользователя растёт после каждого коммита изменений
+                register_session_events(factory)
+                _session_factory = factory
+    return _session_factory
+
 
-SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False, future=True)
+def __getattr__(name: str):
+    # Обратная совместимость: `from app.db_sa import engine` / `SessionLocal`
+    if name == "engine":
+        return get_engine()
+    if name == "SessionLocal":
+        return get_session_factory()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def create_schema() -> None:
+    """
+    Создать недостающие таблицы (CREATE TABLE IF NOT EXISTS).
+    Вызывается явно командой миграции, а не при каждом старте воркера.
+    """
+    from app.change_journal import ensure_journal_schema
+    from app.models_sa import Base
+    from app.search import ensure_search_schema
+    engine = get_engine()
+    Base.metadata.create_all(bind=engine)
+    ensure_search_schema(engine)
+    ensure_journal_schema(engine)
+
+
+class SchemaMismatchError(RuntimeError):
+    """Схема базы не соответствует моделям - нужна миграция (scripts/migrate.py)"""
+
+
+# Подсказка пользователю к SchemaMismatchError (загрузка и синхронизация десктопа)
+MIGRATE_HINT = "Обновите схему базы данных: python scripts/migrate.py"
+
+
+class EmptyDatabaseError(SchemaMismatchError):
+    """В базе нет ни одной таблицы - новая установка, схему можно создать create_schema()"""
+
+
+def verify_schema(conn, tables) -> None:
+    """
+    Проверить, что таблицы и все их столбцы из моделей есть в базе.
+    В отличие от create_schema() ничего не создаёт: один запрос
+    SELECT <все столбцы> ... WHERE false (один round trip до сервера);
+    подробности через inspect - только если запрос не прошёл.
+    """
+    from sqlalchemy import LABEL_STYLE_TABLENAME_PLUS_COL, false, inspect, select
+    from sqlalchemy.exc import DBAPIError
+
+    tables = list(tables)
+    source = tables[0]
+    for table in tables[1:]:
+        source = source.join(table, false())
+    query = select(*[c for t in tables for c in t.c]).select_from(source).where(false())
+    try:
+        conn.execute(query.set_label_style(LABEL_STYLE_TABLENAME_PLUS_COL)).all()
+    except DBAPIError as e:
+        conn.rollback()
+        inspector = inspect(conn)
+        existing = set(inspector.get_table_names())
+        if not existing:
+            raise EmptyDatabaseError("база данных пуста: нет ни одной таблицы") from e
+        problems = []
+        for table in tables:
+            if table.name not in existing:
+                problems.append(f"нет таблицы {table.name}")
+                continue
+            columns = {c["name"] for c in inspector.get_columns(table.name)}
+            missing = [c.name for c in table.c if c.name not in columns]
+            if missing:
+                problems.append(f"{table.name}: нет столбцов {', '.join(missing)}")
+        raise SchemaMismatchError("; ".join(problems) or str(e.orig)) from e
 
 
 @contextmanager
 def get_session():
-    session = SessionLocal()
+    session = get_session_factory()()
     try:
         yield session
         session.commit()
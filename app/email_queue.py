@@ -0,0 +1,400 @@
+"""
+Фоновая очередь отправки email
+
+Обработчики запросов только кладут письмо в очередь (enqueue) и сразу
+отвечают пользователю; отправкой занимается один фоновый поток на процесс:
+- SMTP-соединение (STARTTLS + login) открывается один раз и переиспользуется
+  для всех писем, накопившихся в очереди; закрывается после
+  EMAIL_IDLE_TIMEOUT_SECONDS простоя;
+- перед отправкой после паузы соединение проверяется NOOP - сервер мог
+  закрыть его раньше нас;
+- при обрыве соединение открывается заново, письмо повторяется с
+  экспоненциальной паузой (до EMAIL_MAX_ATTEMPTS попыток);
+- постоянные ошибки (5xx: адрес не существует и т.п.) не повторяются.
+
+Поток запускается при первом письме (после fork воркера gunicorn), при
+выходе процесса очередь дописывается не дольше EMAIL_FLUSH_TIMEOUT_SECONDS.
+
+Письма не теряются при падении процесса (SIGKILL, таймаут воркера) и при
+выходе короткоживущего скрипта до отправки: enqueue сначала записывает
+письмо в каталог процесса в EMAIL_SPOOL_DIR, файл удаляется после отправки
+(или переносится в failed/ после отказа). Каталог процесса заблокирован
+flock, пока процесс жив; запускаясь, очередь забирает письма из каталогов
+без блокировки - оставшиеся от завершившихся процессов - и отправляет их.
+"""
+import atexit
+import email
+import email.policy
+import heapq
+import itertools
+import os
+import queue
+import random
+import smtplib
+import threading
+import time
+import uuid
+from email.message import Message
+from typing import Callable, List, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: один процесс, блокировка не нужна
+    fcntl = None
+
+from app.config import (
+    EMAIL_QUEUE_SIZE, EMAIL_MAX_ATTEMPTS, EMAIL_RETRY_BASE_SECONDS,
+    EMAIL_RETRY_MAX_SECONDS, EMAIL_IDLE_TIMEOUT_SECONDS, EMAIL_SPOOL_DIR,
+)
+
+# Сколько писем отправляется подряд, прежде чем проверить отложенные повторы
+EMAIL_BATCH_SIZE = 50
+# Соединение, простоявшее дольше, проверяется NOOP перед отправкой
+EMAIL_NOOP_AFTER_SECONDS = 10
+EMAIL_FLUSH_TIMEOUT_SECONDS = 10
+
+_STOP = object()
+_SPOOL_LOCK = ".lock"
+_SPOOL_FAILED = "failed"
+
+
+class _Outgoing:
+    """Письмо в очереди, номер следующей попытки и его файл в каталоге писем"""
+    __slots__ = ("message", "attempt", "path")
+
+    def __init__(self, message: Message, path: Optional[str] = None):
+        self.message = message
+        self.attempt = 1
+        self.path = path
+
+
+def _is_permanent(error: Exception) -> bool:
+    """Ошибка 5xx - повтор не поможет"""
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return all(code >= 500 for code, _ in error.recipients.values())
+    code = getattr(error, "smtp_code", None)
+    return isinstance(code, int) and code >= 500
+
+
+class EmailQueue:
+    """Очередь писем с одним фоновым отправителем"""
+
+    def __init__(self, connect: Callable[[], smtplib.SMTP], queue_size: int = EMAIL_QUEUE_SIZE,
+                 max_attempts: int = EMAIL_MAX_ATTEMPTS, retry_base: float = EMAIL_RETRY_BASE_SECONDS,
+                 retry_max: float = EMAIL_RETRY_MAX_SECONDS, idle_timeout: float = EMAIL_IDLE_TIMEOUT_SECONDS,
+                 spool_dir: Optional[str] = EMAIL_SPOOL_DIR):
+        self.connect = connect
+        self.spool_dir = spool_dir or None
+        self.queue_size = queue_size
+        self.max_attempts = max(1, max_attempts)
+        self.retry_base = retry_base
+        self.retry_max = retry_max
+        self.idle_timeout = idle_timeout
+
+        self._lock = threading.Lock()
+        self._pid = None
+        self._queue: Optional[queue.Queue] = None
+        self._thread: Optional[threading.Thread] = None
+        self._atexit_registered = False
+        # Каталог писем этого процесса и открытый (заблокированный) файл блокировки
+        self._spool: Optional[str] = None
+        self._spool_lock = None
+
+        # Состояние ниже принадлежит потоку-отправителю
+        self._retries: list = []  # heap: (когда, порядковый номер, _Outgoing)
+        self._seq = itertools.count()
+        self._conn: Optional[smtplib.SMTP] = None
+        self._last_used = 0.0
+
+        self.stats = {"queued": 0, "sent": 0, "retried": 0, "failed": 0, "dropped": 0, "connections": 0,
+                      "recovered": 0}
+
+    # ---------- для обработчиков запросов ----------
+
+    def enqueue(self, message: Message) -> bool:
+        """
+        Поставить письмо в очередь (не блокирует)
+        Returns: False, если очередь переполнена и письмо отброшено
+        """
+        self._ensure_started()
+        item = _Outgoing(message, self._spool_write(message))
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            self._spool_remove(item)
+            self.stats["dropped"] += 1
+            print(f"⚠️  Очередь email переполнена, письмо '{message['Subject']}' → {message['To']} отброшено")
+            return False
+        self.stats["queued"] += 1
+        return True
+
+    def start(self) -> None:
+        """Запустить отправитель заранее (при старте процесса) - он сразу заберёт письма завершившихся процессов"""
+        self._ensure_started()
+
+    def flush(self, timeout: float = EMAIL_FLUSH_TIMEOUT_SECONDS) -> bool:
+        """
+        Отправить всё, что в очереди, и остановить поток (повторы не ждём:
+        недоставленные письма остаются в каталоге писем до следующего запуска)
+        Returns: True, если поток успел завершиться
+        """
+        with self._lock:
+            thread, q = self._thread, self._queue
+            if thread is None or self._pid != os.getpid():
+                return True
+            self._thread = None
+        q.put(_STOP)
+        thread.join(timeout)
+        return not thread.is_alive()
+
+    def _ensure_started(self) -> None:
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is not None and self._pid == os.getpid():
+                return
+            # Новый процесс (fork) или первый запуск: поток родителя сюда не перешёл
+            self._pid = os.getpid()
+            self._queue = queue.Queue(maxsize=self.queue_size)
+            self._retries = []
+            self._conn = None
+            recovered = self._spool_open()
+            self._thread = threading.Thread(target=self._run, args=(self._queue,),
+                                            name="email-sender", daemon=True)
+            self._thread.start()
+            if not self._atexit_registered:
+                atexit.register(self._flush_at_exit)
+                self._atexit_registered = True
+        for item in recovered:
+            try:
+                self._queue.put_nowait(item)
+            except queue.Full:
+                break  # Остальные остаются в каталоге до следующего запуска
+            self.stats["recovered"] += 1
+        if recovered:
+            print(f"📬 Email: найдено {len(recovered)} неотправленных писем завершившихся процессов")
+
+    def _flush_at_exit(self):
+        try:
+            if not self.flush():
+                print("⚠️  Очередь email не успела отправиться до выхода")
+            self._spool_close()
+        except Exception as e:
+            print(f"⚠️  Email queue flush failed: {e}")
+
+    # ---------- каталог писем ----------
+
+    def _spool_open(self) -> List[_Outgoing]:
+        """Создать каталог процесса и забрать письма из каталогов завершившихся процессов"""
+        self._spool = self._spool_lock = None
+        if not self.spool_dir:
+            return []
+        try:
+            os.makedirs(self.spool_dir, exist_ok=True)
+            own = os.path.join(self.spool_dir, f"{os.getpid()}-{uuid.uuid4().hex[:8]}")
+            os.makedirs(own)
+            lock = open(os.path.join(own, _SPOOL_LOCK), "w")
+            if fcntl is not None:
+                fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError as e:
+            print(f"⚠️  Каталог писем {self.spool_dir} недоступен, письма не сохраняются на диск: {e}")
+            return []
+        self._spool, self._spool_lock = own, lock
+
+        recovered = []
+        for name in sorted(os.listdir(self.spool_dir)):
+            path = os.path.join(self.spool_dir, name)
+            if path == own or name == _SPOOL_FAILED or not os.path.isdir(path):
+                continue
+            try:
+                recovered += self._adopt(path)
+            except OSError as e:
+                print(f"⚠️  Не удалось забрать письма из {path}: {e}")
+        return recovered
+
+    def _adopt(self, path: str) -> List[_Outgoing]:
+        """Перенести письма из каталога завершившегося процесса в свой"""
+        lock_path = os.path.join(path, _SPOOL_LOCK)
+        try:
+            lock = open(lock_path)
+        except FileNotFoundError:
+            return []  # Каталог уже забрал другой процесс
+        with lock:
+            if fcntl is not None:
+                try:
+                    fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except OSError:
+                    return []  # Процесс жив (или каталог уже забирает другой)
+            adopted = []
+            for name in sorted(os.listdir(path)):
+                if not name.endswith(".eml"):
+                    continue
+                target = os.path.join(self._spool, name)
+                os.replace(os.path.join(path, name), target)
+                with open(target, "rb") as f:
+                    message = email.message_from_binary_file(f, policy=email.policy.SMTP)
+                adopted.append(_Outgoing(message, target))
+            if fcntl is not None:
+                # Под блокировкой: после этого каталог никто другой не откроет
+                os.remove(lock_path)
+        for name in os.listdir(path):
+            os.remove(os.path.join(path, name))  # недописанные .tmp
+        os.rmdir(path)
+        return adopted
+
+    def _spool_close(self) -> None:
+        """При выходе: пустой каталог процесса удаляется, с письмами - остаётся следующему запуску"""
+        if self._spool is None or self._pid != os.getpid() or self._thread is not None:
+            return
+        names = os.listdir(self._spool)
+        if any(name.endswith(".eml") for name in names):
+            print(f"📬 Email: {sum(name.endswith('.eml') for name in names)} писем не отправлено, "
+                  f"отправит следующий запуск")
+            return
+        for name in names:
+            os.remove(os.path.join(self._spool, name))
+        os.rmdir(self._spool)
+        self._spool_lock.close()
+        self._spool = self._spool_lock = None
+
+    def _spool_write(self, message: Message) -> Optional[str]:
+        if self._spool is None:
+            return None
+        path = os.path.join(self._spool, f"{time.time_ns()}-{next(self._seq)}.eml")
+        try:
+            with open(path + ".tmp", "wb") as f:
+                f.write(message.as_bytes())
+            os.replace(path + ".tmp", path)
+        except OSError as e:
+            print(f"⚠️  Письмо '{message['Subject']}' не сохранено на диск: {e}")
+            return None
+        return path
+
+    def _spool_remove(self, item: _Outgoing, failed: bool = False) -> None:
+        if item.path is None:
+            return
+        try:
+            if failed:
+                # Отказ - письмо остаётся для разбора, но больше не отправляется
+                failed_dir = os.path.join(self.spool_dir, _SPOOL_FAILED)
+                os.makedirs(failed_dir, exist_ok=True)
+                os.replace(item.path, os.path.join(failed_dir, os.path.basename(item.path)))
+            else:
+                os.remove(item.path)
+        except OSError as e:
+            print(f"⚠️  Email: не удалось убрать {item.path}: {e}")
+
+    # ---------- поток-отправитель ----------
+
+    def _run(self, q: queue.Queue) -> None:
+        while True:
+            batch, stop = self._next_batch(q)
+            if batch:
+                self._send_batch(batch)
+            elif self._conn is not None and time.monotonic() - self._last_used >= self.idle_timeout:
+                self._close()
+            if stop:
+                break
+        self._close()
+
+    def _wait_timeout(self) -> Optional[float]:
+        timeouts = []
+        if self._conn is not None:
+            timeouts.append(self._last_used + self.idle_timeout - time.monotonic())
+        if self._retries:
+            timeouts.append(self._retries[0][0] - time.monotonic())
+        return max(0.0, min(timeouts)) if timeouts else None
+
+    def _next_batch(self, q: queue.Queue):
+        """Returns: (письма к отправке, получен сигнал остановки)"""
+        batch: List[_Outgoing] = []
+        stop = False
+        try:
+            item = q.get(timeout=self._wait_timeout())
+        except queue.Empty:
+            item = None
+
+        # Всё, что накопилось, уходит через одно соединение
+        while item is not None:
+            if item is _STOP:
+                stop = True
+            else:
+                batch.append(item)
+            if stop or len(batch) >= EMAIL_BATCH_SIZE:
+                break
+            try:
+                item = q.get_nowait()
+            except queue.Empty:
+                item = None
+
+        now = time.monotonic()
+        while self._retries and self._retries[0][0] <= now and len(batch) < EMAIL_BATCH_SIZE:
+            batch.append(heapq.heappop(self._retries)[2])
+        return batch, stop
+
+    def _ensure_connection(self) -> smtplib.SMTP:
+        if self._conn is not None and time.monotonic() - self._last_used > EMAIL_NOOP_AFTER_SECONDS:
+            try:
+                if self._conn.noop()[0] != 250:
+                    self._close()
+            except (smtplib.SMTPException, OSError):
+                self._close()
+        if self._conn is None:
+            self._conn = self.connect()
+            self.stats["connections"] += 1
+        return self._conn
+
+    def _close(self) -> None:
+        if self._conn is None:
+            return
+        try:
+            self._conn.quit()
+        except (smtplib.SMTPException, OSError):
+            try:
+                self._conn.close()
+            except OSError:
+                pass
+        self._conn = None
+
+    def _send_batch(self, batch: List[_Outgoing]) -> None:
+        for index, item in enumerate(batch):
+            try:
+                conn = self._ensure_connection()
+            except Exception as e:
+                # Сервер недоступен - откладываем всю оставшуюся пачку
+                print(f"❌ SMTP недоступен: {e}")
+                for rest in batch[index:]:
+                    self._retry_or_fail(rest, e)
+                return
+            try:
+                conn.send_message(item.message)
+            except Exception as e:
+                # После отказа по письму smtplib делает RSET и соединение живо;
+                # после обрыва (и 421) сокет уже закрыт
+                if conn.sock is None or not isinstance(e, smtplib.SMTPException):
+                    self._close()
+                if _is_permanent(e):
+                    self.stats["failed"] += 1
+                    self._spool_remove(item, failed=True)
+                    print(f"❌ Письмо '{item.message['Subject']}' → {item.message['To']} отклонено: {e}")
+                else:
+                    self._retry_or_fail(item, e)
+                continue
+            self._last_used = time.monotonic()
+            self.stats["sent"] += 1
+            self._spool_remove(item)
+            print(f"✅ Email отправлен: {item.message['Subject']} → {item.message['To']}")
+
+    def _retry_or_fail(self, item: _Outgoing, error: Exception) -> None:
+        if item.attempt >= self.max_attempts:
+            self.stats["failed"] += 1
+            self._spool_remove(item, failed=True)
+            print(f"❌ Письмо '{item.message['Subject']}' → {item.message['To']} не отправлено "
+                  f"после {item.attempt} попыток: {error}")
+            return
+        delay = min(self.retry_max, self.retry_base * 2 ** (item.attempt - 1))
+        # Разброс, чтобы воркеры не ломились в сервер одновременно
+        delay *= random.uniform(0.8, 1.2)
+        item.attempt += 1
+        self.stats["retried"] += 1
+        heapq.heappush(self._retries, (time.monotonic() + delay, next(self._seq), item))
@@ -1,13 +1,20 @@
 """
 Email сервис для отправки уведомлений
 Поддержка: подтверждение регистрации, восстановление пароля, приветственные письма
+Письма отправляются фоновой очередью (app/email_queue.py)
 """
 import smtplib
 from email.mime.text import MIMEText
+from email.message import Message
 from email.mime.multipart import MIMEMultipart
-from typing import Optional
+from typing import List, Optional
 import os
 
+from app.email_queue import EmailQueue
+
+# Таймаут сетевых операций SMTP (соединение открывает фоновый поток очереди)
+SMTP_TIMEOUT_SECONDS = 30
+
 
 class EmailService:
     """Сервис отправки email"""
@@ -17,12 +24,13 @@ class EmailService:
         try:
             from app.secrets import (
                 SMTP_HOST, SMTP_PORT, SMTP_USER, SMTP_PASSWORD,
-                EMAIL_FROM, SITE_URL
+                SMTP_STARTTLS, EMAIL_FROM, SITE_URL
             )
             self.smtp_host = SMTP_HOST
             self.smtp_port = SMTP_PORT
             self.smtp_user = SMTP_USER
             self.smtp_password = SMTP_PASSWORD
+            self.smtp_starttls = SMTP_STARTTLS
             self.email_from = EMAIL_FROM
             self.site_url = SITE_URL
         except ImportError:
@@ -31,15 +39,41 @@ class EmailService:
             self.smtp_port = int(os.getenv('SMTP_PORT', '587'))
             self.smtp_user = os.getenv('SMTP_USER', '')
             self.smtp_password = os.getenv('SMTP_PASSWORD', '')
+            self.smtp_starttls = os.getenv('SMTP_STARTTLS', '1').lower() in ('1', 'true', 'yes')
             self.email_from = os.getenv('EMAIL_FROM', 'noreply@mikrokredit.local')
             self.site_url = os.getenv('SITE_URL', 'http://localhost:5000')
         
         self.enabled = bool(self.smtp_user and self.smtp_password)
+        self.queue = EmailQueue(self._connect)
+    
+    def _connect(self) -> smtplib.SMTP:
+        """Открыть SMTP-соединение: STARTTLS + login (вызывается из очереди)"""
+        server = smtplib.SMTP(self.smtp_host, self.smtp_port, timeout=SMTP_TIMEOUT_SECONDS)
+        try:
+            if self.smtp_starttls:
+                server.starttls()
+            server.login(self.smtp_user, self.smtp_password)
+        except BaseException:
+            server.close()
+            raise
+        return server
+    
+    def _build_message(self, to_email: str, subject: str, html_body: str, text_body: str = None) -> MIMEMultipart:
+        msg = MIMEMultipart('alternative')
+        msg['Subject'] = subject
+        msg['From'] = self.email_from
+        msg['To'] = to_email
+        
+        # Добавляем текстовую и HTML версии
+        if text_body:
+            msg.attach(MIMEText(text_body, 'plain', 'utf-8'))
+        msg.attach(MIMEText(html_body, 'html', 'utf-8'))
+        return msg
     
     def _send_email(self, to_email: str, subject: str, html_body: str, text_body: str = None) -> bool:
         """
-        Внутренний метод для отправки email
-        Returns: True если успешно, иначе False
+        Поставить письмо в очередь отправки (app/email_queue.py), не блокирует запрос
+        Returns: True если письмо принято в очередь, иначе False
         """
         if not self.enabled:
             print(f"⚠️  Email не настроен. Письмо '{subject}' не отправлено на {to_email}")
@@ -47,31 +81,9 @@ class EmailService:
             return False
         
         try:
-            # Создаем сообщение
-            msg = MIMEMultipart('alternative')
-            msg['Subject'] = subject
-            msg['From'] = self.email_from
-            msg['To'] = to_email
-            
-            # Добавляем текстовую и HTML версии
-            if text_body:
-                part1 = MIMEText(text_body, 'plain', 'utf-8')
-                msg.attach(part1)
-            
-            part2 = MIMEText(html_body, 'html', 'utf-8')
-            msg.attach(part2)
-            
-            # Отправляем с коротким таймаутом
-            with smtplib.SMTP(self.smtp_host, self.smtp_port, timeout=5) as server:
-                server.starttls()
-                server.login(self.smtp_user, self.smtp_password)
-                server.send_message(msg)
-            
-            print(f"✅ Email отправлен: {subject} → {to_email}")
-            return True
-            
+            return self.queue.enqueue(self._build_message(to_email, subject, html_body, text_body))
         except Exception as e:
-            print(f"❌ Ошибка отправки email на {to_email}: {e}")
+            print(f"❌ Ошибка постановки email в очередь для {to_email}: {e}")
             return False
     
     def send_verification_email(self, user_email: str, user_name: str, token: str) -> bool:
@@ -274,6 +286,126 @@ class EmailService:
         
         return self._send_email(user_email, subject, html_body, text_body)
 
+    
+    def build_loan_due_email(self, user_email: str, user_name: str, loans: list) -> MIMEMultipart:
+        """
+        Письмо-напоминание о ближайших платежах по займам (отправляет send_now)
+        loans: [{org_name, website, due_date, amount, days_left}] (app/loan_notifications.py)
+        """
+        total = sum(loan['amount'] for loan in loans)
+        subject = f"Платежи по займам: {len(loans)} на {total:,.2f} ₽"
+        
+        rows_html = ""
+        rows_text = ""
+        for loan in loans:
+            days_left = loan['days_left']
+            if days_left < 0:
+                when = f"просрочен на {abs(days_left)} дн."
+            elif days_left == 0:
+                when = "сегодня"
+            elif days_left == 1:
+                when = "завтра"
+            else:
+                when = f"через {days_left} дн."
+            org_name = loan['org_name'] or loan['website'] or "Без названия"
+            rows_html += (
+                f"<tr><td>{org_name}</td><td style=\"text-align: right;\">{loan['amount']:,.2f} ₽</td>"
+                f"<td>{loan['due_date']}</td><td>{when}</td></tr>"
+            )
+            rows_text += f"        - {org_name}: {loan['amount']:,.2f} ₽, {loan['due_date']} ({when})\n"
+        
+        # HTML версия
+        html_body = f"""
+        <!DOCTYPE html>
+        <html>
+        <head>
+            <meta charset="utf-8">
+            <style>
+                body {{ font-family: Arial, sans-serif; line-height: 1.6; color: #333; }}
+                .container {{ max-width: 600px; margin: 0 auto; padding: 20px; }}
+                .header {{ background: #fd7e14; color: white; padding: 20px; text-align: center; border-radius: 5px 5px 0 0; }}
+                .content {{ background: #f9f9f9; padding: 30px; border: 1px solid #ddd; border-top: none; }}
+                table {{ width: 100%; border-collapse: collapse; }}
+                td {{ padding: 6px; border-bottom: 1px solid #ddd; }}
+                .button {{ display: inline-block; padding: 12px 30px; background: #007bff; color: white; text-decoration: none; border-radius: 5px; margin: 20px 0; }}
+            </style>
+        </head>
+        <body>
+            <div class="container">
+                <div class="header">
+                    <h1>🔥 Ближайшие платежи</h1>
+                </div>
+                <div class="content">
+                    <h2>Здравствуйте, {user_name or 'пользователь'}!</h2>
+                    <p>Подходит срок оплаты по займам ({len(loans)} на <b>{total:,.2f} ₽</b>):</p>
+                    <table>{rows_html}</table>
+                    <p style="text-align: center;">
+                        <a href="{self.site_url}/" class="button">Открыть МикроКредит</a>
+                    </p>
+                </div>
+            </div>
+        </body>
+        </html>
+        """
+        
+        # Текстовая версия
+        text_body = f"""
+        Здравствуйте, {user_name or 'пользователь'}!
+        
+        Подходит срок оплаты по займам ({len(loans)} на {total:,.2f} ₽):
+{rows_text}
+        Открыть МикроКредит: {self.site_url}/
+        """
+        
+        return self._build_message(user_email, subject, html_body, text_body)
+    
+    def send_now(self, messages: List[Message]) -> List[bool]:
+        """
+        Отправить письма сразу, минуя очередь, через одно SMTP-соединение
+        Для cron-скриптов, которым нужно знать, что сервер принял письмо
+        (очередь повторяет попытки в фоне и результата не сообщает).
+        Returns: [принято ли письмо сервером] по порядку
+        """
+        if not messages:
+            return []
+        if not self.enabled:
+            print(f"⚠️  Email не настроен. Писем не отправлено: {len(messages)}")
+            return [False] * len(messages)
+        
+        results = []
+        conn = None
+        try:
+            for index, message in enumerate(messages):
+                # Оборванное соединение открываем заново один раз на письмо
+                for attempt in (1, 2):
+                    if conn is None:
+                        try:
+                            conn = self._connect()
+                        except Exception as e:
+                            print(f"❌ SMTP недоступен: {e}; не отправлено писем: {len(messages) - index}")
+                            return results + [False] * (len(messages) - index)
+                    try:
+                        conn.send_message(message)
+                        results.append(True)
+                        break
+                    except Exception as e:
+                        # После отказа по письму соединение живо; после обрыва (и 421) сокет закрыт
+                        dropped = conn.sock is None or not isinstance(e, smtplib.SMTPException)
+                        if dropped:
+                            conn.close()
+                            conn = None
+                        if attempt == 2 or not dropped:
+                            print(f"❌ Письмо '{message['Subject']}' → {message['To']} не отправлено: {e}")
+                            results.append(False)
+                            break
+        finally:
+            if conn is not None:
+                try:
+                    conn.quit()
+                except (smtplib.SMTPException, OSError):
+                    conn.close()
+        return results
+
 
 # Глобальный экземпляр сервиса
 email_service = EmailService()
@@ -0,0 +1,196 @@
+"""
+Прогноз денежного потока: сколько и когда предстоит заплатить по займам
+
+Все неоплаченные платежи пользователя (или всех пользователей - для админа)
+загружаются одним запросом, отсортированными по дате, в две колонки: даты
+(ISO-строки, их лексикографический порядок совпадает с хронологическим) и
+суммы (array('d')). Разбиение на дни/недели/месяцы не перебирает платежи в
+Python: границы корзин находятся bisect'ом по колонке дат, а суммы корзин -
+разностью префиксных сумм (itertools.accumulate). Стоимость после загрузки -
+O(корзины * log платежей), а не O(платежи).
+
+Результат кэшируется в Redis (cache_manager) с ключом по версии данных
+пользователя (app/data_version), для всех пользователей - по версии журнала
+изменений (app/change_journal), и по текущей дате: корзины отсчитываются от
+сегодняшнего дня.
+"""
+import json
+from array import array
+from bisect import bisect_left
+from datetime import date, timedelta
+from itertools import accumulate
+from typing import List, Optional, Tuple
+
+from sqlalchemy import func, select
+
+from app.models_sa import InstallmentORM, LoanORM
+
+GRANULARITIES = ("day", "week", "month")
+FORECAST_DEFAULT_MONTHS = 6
+FORECAST_MAX_MONTHS = 24
+# Ключ и так меняется с версией данных и датой; TTL лишь убирает старые ключи
+FORECAST_CACHE_TTL_SECONDS = 24 * 60 * 60
+# Строк в текстовом прогнозе (Telegram ограничивает длину сообщения)
+FORECAST_TEXT_MAX_LINES = 40
+
+_MONTHS_RU = ("янв", "фев", "мар", "апр", "май", "июн", "июл", "авг", "сен", "окт", "ноя", "дек")
+
+
+def add_months(day: date, months: int) -> date:
+    """Дата через months месяцев (31 января + 1 месяц = 28/29 февраля)"""
+    month_index = day.month - 1 + months
+    year, month = day.year + month_index // 12, month_index % 12 + 1
+    next_month = date(year + month // 12, month % 12 + 1, 1)
+    return date(year, month, min(day.day, (next_month - timedelta(days=1)).day))
+
+
+def load_unpaid(session, user_id: Optional[int] = None) -> Tuple[List[str], array]:
+    """
+    Неоплаченные платежи одним запросом (индекс ix_installments_unpaid_due)
+    Returns: (даты по возрастанию, суммы в том же порядке)
+    """
+    query = select(InstallmentORM.due_date, func.coalesce(InstallmentORM.amount, 0.0)).where(
+        InstallmentORM.paid == 0, InstallmentORM.due_date.isnot(None),
+    )
+    if user_id is not None:
+        query = query.join(LoanORM, LoanORM.id == InstallmentORM.loan_id).where(LoanORM.user_id == user_id)
+    rows = session.execute(query.order_by(InstallmentORM.due_date)).all()
+    if not rows:
+        return [], array("d")
+    dates, amounts = zip(*rows)
+    return list(dates), array("d", amounts)
+
+
+def bucket_starts(today: date, end: date, granularity: str) -> List[date]:
+    """Начала корзин от today до end (первая корзина - неполная неделя/месяц)"""
+    if granularity == "day":
+        return [today + timedelta(days=i) for i in range((end - today).days)]
+    starts = [today]
+    if granularity == "week":
+        current = today + timedelta(days=7 - today.weekday())
+        step = lambda d: d + timedelta(days=7)
+    else:
+        current = add_months(today.replace(day=1), 1)
+        step = lambda d: add_months(d, 1)
+    while current < end:
+        starts.append(current)
+        current = step(current)
+    return starts
+
+
+def _check_params(granularity: str, months: int) -> int:
+    """Returns: горизонт в месяцах, ограниченный 1..FORECAST_MAX_MONTHS"""
+    if granularity not in GRANULARITIES:
+        raise ValueError(f"granularity должен быть одним из: {', '.join(GRANULARITIES)}")
+    return max(1, min(FORECAST_MAX_MONTHS, int(months)))
+
+
+def _label(start: date, last: date, granularity: str) -> str:
+    if granularity == "day":
+        return start.strftime("%d.%m")
+    if granularity == "week":
+        return f"{start:%d.%m}–{last:%d.%m}"
+    return f"{_MONTHS_RU[start.month - 1]} {start.year}"
+
+
+def build_forecast(dates: List[str], amounts: array, today: date,
+                   granularity: str = "month", months: int = FORECAST_DEFAULT_MONTHS) -> dict:
+    """Разбить отсортированные платежи на корзины (без цикла по платежам)"""
+    months = _check_params(granularity, months)
+    end = add_months(today, months)
+    starts = bucket_starts(today, end, granularity)
+
+    # prefix[i] - сумма первых i платежей; сумма диапазона [a, b) = prefix[b] - prefix[a]
+    prefix = array("d", accumulate(amounts, initial=0.0))
+    bounds = [bisect_left(dates, start.isoformat()) for start in starts]
+    bounds.append(bisect_left(dates, end.isoformat()))
+
+    def total(lo: int, hi: int) -> dict:
+        return {"amount": round(prefix[hi] - prefix[lo], 2), "count": hi - lo}
+
+    buckets = []
+    for i, start in enumerate(starts):
+        last = (starts[i + 1] if i + 1 < len(starts) else end) - timedelta(days=1)
+        buckets.append({
+            "start": start.isoformat(),
+            "end": last.isoformat(),
+            "label": _label(start, last, granularity),
+            **total(bounds[i], bounds[i + 1]),
+        })
+
+    return {
+        "today": today.isoformat(),
+        "granularity": granularity,
+        "months": months,
+        "overdue": total(0, bounds[0]),
+        "buckets": buckets,
+        "later": total(bounds[-1], len(dates)),
+        "total": total(0, len(dates)),
+    }
+
+
+def _data_version(session, user_id: Optional[int]) -> Optional[int]:
+    """Версия данных для ключа кэша; None - кэш не используется"""
+    if user_id is not None:
+        from app.data_version import current_version
+        return current_version(user_id)
+    from app.change_journal import current_version
+    try:
+        with session.begin_nested():
+            return current_version(session.connection())
+    except Exception as e:
+        # Журнал изменений ещё не создан (не запускалась миграция)
+        print(f"⚠️  Forecast cache disabled: {e}")
+        return None
+
+
+def get_forecast(user_id: Optional[int] = None, granularity: str = "month",
+                 months: int = FORECAST_DEFAULT_MONTHS, today: Optional[date] = None) -> dict:
+    """
+    Прогноз выплат пользователя (user_id=None - по всем пользователям)
+    Raises: ValueError при неизвестной granularity
+    """
+    from app.db_sa import get_session
+    from app.integration import cache_manager
+
+    months = _check_params(granularity, months)
+    today = today or date.today()
+    scope = "all" if user_id is None else user_id
+
+    with get_session() as session:
+        # Версия берётся до загрузки: изменения во время расчёта дадут новый ключ
+        version = _data_version(session, user_id)
+        cache_key = None
+        if version is not None:
+            cache_key = f"forecast:{scope}:{version}:{today.isoformat()}:{granularity}:{months}"
+            cached = cache_manager.get(cache_key)
+            if cached:
+                return json.loads(cached)
+        dates, amounts = load_unpaid(session, user_id)
+
+    forecast = build_forecast(dates, amounts, today, granularity, months)
+    forecast["scope"] = scope
+    if cache_key is not None:
+        cache_manager.set(cache_key, json.dumps(forecast, ensure_ascii=False), FORECAST_CACHE_TTL_SECONDS)
+    return forecast
+
+
+def format_forecast_text(forecast: dict) -> str:
+    """Прогноз для Telegram (HTML): только корзины с платежами"""
+    lines = [f"📈 <b>Прогноз платежей на {forecast['months']} мес.</b>", ""]
+    if forecast["overdue"]["count"]:
+        lines.append(f"⚠️ Просрочено: <b>{forecast['overdue']['amount']:.2f} ₽</b> "
+                     f"({forecast['overdue']['count']} шт.)")
+    filled = [bucket for bucket in forecast["buckets"] if bucket["count"]]
+    for bucket in filled[:FORECAST_TEXT_MAX_LINES]:
+        lines.append(f"• {bucket['label']}: {bucket['amount']:.2f} ₽ ({bucket['count']} шт.)")
+    if len(filled) > FORECAST_TEXT_MAX_LINES:
+        rest = filled[FORECAST_TEXT_MAX_LINES:]
+        lines.append(f"• и ещё {len(rest)} периодов: {sum(b['amount'] for b in rest):.2f} ₽")
+    if forecast["later"]["count"]:
+        lines.append(f"• позже: {forecast['later']['amount']:.2f} ₽ ({forecast['later']['count']} шт.)")
+    if not forecast["total"]["count"]:
+        lines.append("Неоплаченных платежей нет 🎉")
+    else:
+        lines += ["", f"Всего к оплате: <b>{forecast['total']['amount']:.2f} ₽</b>"]
+    return "\n".join(lines)
@@ -1,47 +1,104 @@
 from __future__ import annotations
-import redis
-import requests
 import json
+import threading
+import time
 from typing import Optional, Dict, Any
 from app.config import REDIS_URL, API_GATEWAY_URL, PROJECT_NAME
 
+# Таймауты Redis: при недоступном сервере запрос должен падать быстро,
+# а не висеть на стандартном socket timeout
+REDIS_SOCKET_TIMEOUT = 0.5
+# Сколько секунд не пытаться переподключаться после ошибки соединения
+REDIS_RETRY_INTERVAL = 30
+
+_redis_client = None
+_redis_down_until = 0.0
+_redis_lock = threading.Lock()
+
+
+def get_redis():
+    """
+    Общий для процесса Redis клиент, создаётся лениво при первом обращении.
+    Импорт redis и подключение не выполняются при импорте модуля.
+    Returns: клиент или None, если Redis недавно был недоступен
+    """
+    global _redis_client
+    if time.monotonic() < _redis_down_until:
+        return None
+    if _redis_client is None:
+        with _redis_lock:
+            if _redis_client is None:
+                try:
+                    import redis
+                    _redis_client = redis.from_url(
+                        REDIS_URL,
+                        decode_responses=True,
+                        socket_connect_timeout=REDIS_SOCKET_TIMEOUT,
+                        socket_timeout=REDIS_SOCKET_TIMEOUT,
+                    )
+                except Exception as e:
+                    print(f"Warning: Redis client init failed: {e}")
+                    mark_redis_down()
+                    return None
+    return _redis_client
+
+
+def mark_redis_down() -> None:
+    """Отметить Redis недоступным на REDIS_RETRY_INTERVAL секунд"""
+    global _redis_down_until
+    _redis_down_until = time.monotonic() + REDIS_RETRY_INTERVAL
+
+
+def is_connection_error(exc: Exception) -> bool:
+    """Является ли исключение ошибкой соединения с Redis"""
+    try:
+        import redis
+    except ImportError:
+        return False
+    return isinstance(exc, (redis.ConnectionError, redis.TimeoutError))
+
 
 class CacheManager:
     """Redis cache manager for MikroKredit project"""
     
-    def __init__(self):
-        try:
-            self.redis_client = redis.from_url(REDIS_URL, decode_responses=True)
-            self.redis_client.ping()  # Test connection
-        except Exception as e:
-            print(f"Warning: Redis connection failed: {e}")
-            self.redis_client = None
+    @property
+    def redis_client(self):
+        return get_redis()
     
     def get(self, key: str) -> Optional[str]:
         """Get value from cache"""
-        if not self.redis_client:
+        client = self.redis_client
+        if not client:
             return None
         try:
-            return self.redis_client.get(f"{PROJECT_NAME}:{key}")
-        except Exception:
+            return client.get(f"{PROJECT_NAME}:{key}")
+        except Exception as e:
+            if is_connection_error(e):
+                mark_redis_down()
             return None
     
     def set(self, key: str, value: str, expire: int = 3600) -> bool:
         """Set value in cache with expiration"""
-        if not self.redis_client:
+        client = self.redis_client
+        if not client:
             return False
         try:
-            return self.redis_client.setex(f"{PROJECT_NAME}:{key}", expire, value)
-        except Exception:
+            return client.setex(f"{PROJECT_NAME}:{key}", expire, value)
+        except Exception as e:
+            if is_connection_error(e):
+                mark_redis_down()
             return False
     
     def delete(self, key: str) -> bool:
         """Delete value from cache"""
-        if not self.redis_client:
+        client = self.redis_client
+        if not client:
             return False
         try:
-            return self.redis_client.delete(f"{PROJECT_NAME}:{key}")
-        except Exception:
+            return client.delete(f"{PROJECT_NAME}:{key}")
+        except Exception as e:
+            if is_connection_error(e):
+                mark_redis_down()
             return False
     
     def cache_loans_data(self, data: Dict[str, Any], expire: int = 300) -> bool:
@@ -72,6 +129,7 @@ class APIGatewayClient:
     
     def register_project(self) -> bool:
         """Register this project with the API Gateway"""
+        import requests
         try:
             payload = {
                 "project_name": self.project_name,
@@ -92,6 +150,7 @@ class APIGatewayClient:
     
     def get_project_status(self, project_name: str) -> Optional[Dict[str, Any]]:
         """Get status of another project"""
+        import requests
         try:
             response = requests.get(
                 f"{self.base_url}/projects/{project_name}/status",
@@ -105,6 +164,7 @@ class APIGatewayClient:
     
     def send_notification(self, message: str, target_projects: list = None) -> bool:
         """Send notification to other projects"""
+        import requests
         try:
             payload = {
                 "from_project": self.project_name,
@@ -124,6 +184,6 @@ class APIGatewayClient:
             return False
 
 
-# Global instances
+# Global instances (cheap: no network I/O until first use)
 cache_manager = CacheManager()
 api_gateway_client = APIGatewayClient()
@@ -0,0 +1,158 @@
+"""
+Напоминания о платежах по займам: кому и о чём напомнить сегодня
+
+Один запрос на всех пользователей:
+- ближайший неоплаченный платёж каждого займа со сроком до порога
+  (today + LOAN_NOTIFY_DAYS_BEFORE) - ROW_NUMBER() по installments
+  в диапазоне индекса ix_installments_unpaid_due (paid, due_date);
+- займы без графика платежей (неоплаченные, срок до порога) - индекс
+  ix_loans_unpaid_due (is_paid, due_date);
+- к ним - владелец займа с настройками каналов (telegram_chat_id,
+  telegram_notifications, email_notifications) и отметки, отправлено ли
+  уже сегодня напоминание по каждому каналу (loan_notifications).
+
+Отправленное записывается в loan_notifications (loan_id, due_date, channel,
+sent_on): повторный запуск в тот же день напоминает только о том, что ещё
+не ушло. Просроченные платежи напоминаются каждый день, пока не оплачены.
+"""
+from datetime import date, datetime, timedelta
+from itertools import groupby
+from typing import Dict, List
+
+from sqlalchemy import and_, exists, func, insert, or_, select, union_all
+from sqlalchemy.orm import aliased
+
+from app.config import LOAN_NOTIFY_DAYS_BEFORE
+from app.models_sa import InstallmentORM, LoanNotificationORM, LoanORM, UserORM
+
+CHANNEL_TELEGRAM = "telegram"
+CHANNEL_EMAIL = "email"
+CHANNELS = (CHANNEL_TELEGRAM, CHANNEL_EMAIL)
+
+
+def due_statement(today: date, days: int = LOAN_NOTIFY_DAYS_BEFORE):
+    """Запрос (пользователь, займ, ближайший платёж до порога) с настройками и отметками отправки"""
+    threshold = (today + timedelta(days=days)).isoformat()
+
+    ranked = (
+        select(
+            InstallmentORM.loan_id.label("loan_id"),
+            InstallmentORM.due_date.label("due_date"),
+            InstallmentORM.amount.label("amount"),
+            func.row_number().over(
+                partition_by=InstallmentORM.loan_id,
+                order_by=(InstallmentORM.due_date, InstallmentORM.id),
+            ).label("rn"),
+        )
+        .where(InstallmentORM.paid == 0, InstallmentORM.due_date <= threshold)
+        .subquery()
+    )
+    # Ранний неоплаченный платёж в окне - он же ближайший неоплаченный вообще
+    next_installments = select(ranked.c.loan_id, ranked.c.due_date, ranked.c.amount).where(ranked.c.rn == 1)
+    # Займы без графика: срок и сумма - у самого займа
+    single_loans = select(LoanORM.id, LoanORM.due_date, LoanORM.amount_due).where(
+        LoanORM.is_paid == 0,
+        LoanORM.due_date <= threshold,
+        LoanORM.amount_due > 0,
+        ~exists().where(InstallmentORM.loan_id == LoanORM.id),
+    )
+    due = union_all(next_installments, single_loans).subquery()
+
+    sent = {channel: aliased(LoanNotificationORM, name=f"sent_{channel}") for channel in CHANNELS}
+
+    telegram_on = and_(UserORM.telegram_chat_id.is_not(None), UserORM.telegram_notifications.is_(True))
+    email_on = and_(UserORM.email_notifications.is_(True), UserORM.email_verified.is_(True))
+
+    stmt = (
+        select(
+            UserORM.id.label("user_id"),
+            UserORM.email,
+            UserORM.full_name,
+            UserORM.telegram_chat_id,
+            telegram_on.label("telegram_on"),
+            email_on.label("email_on"),
+            LoanORM.id.label("loan_id"),
+            LoanORM.org_name,
+            LoanORM.website,
+            due.c.due_date,
+            due.c.amount,
+            *(sent[channel].id.is_not(None).label(f"sent_{channel}") for channel in CHANNELS),
+        )
+        .select_from(due)
+        .join(LoanORM, LoanORM.id == due.c.loan_id)
+        .join(UserORM, UserORM.id == LoanORM.user_id)
+        .where(UserORM.is_active.is_(True), or_(telegram_on, email_on))
+        .order_by(UserORM.id, due.c.due_date, LoanORM.id)
+    )
+    for channel in CHANNELS:
+        stmt = stmt.outerjoin(sent[channel], and_(
+            sent[channel].loan_id == due.c.loan_id,
+            sent[channel].due_date == due.c.due_date,
+            sent[channel].channel == channel,
+            sent[channel].sent_on == today.isoformat(),
+        ))
+    return stmt
+
+
+def find_due(session, today: date, days: int = LOAN_NOTIFY_DAYS_BEFORE) -> List[dict]:
+    """
+    Пользователи с платежами до порога
+    Returns: [{user_id, email, name, telegram_chat_id, channels, loans: [{loan_id, org_name,
+              website, due_date, amount, days_left, sent: {канал: bool}}]}], платежи по сроку
+    """
+    users = []
+    rows = session.execute(due_statement(today, days)).all()
+    for user_id, user_rows in groupby(rows, key=lambda row: row.user_id):
+        user_rows = list(user_rows)
+        first = user_rows[0]
+        channels = [channel for channel, on in ((CHANNEL_TELEGRAM, first.telegram_on), (CHANNEL_EMAIL, first.email_on))
+                    if on]
+        loans = []
+        for row in user_rows:
+            try:
+                days_left = (date.fromisoformat(row.due_date[:10]) - today).days
+            except ValueError:
+                continue  # Неверный формат даты
+            loans.append({
+                "loan_id": row.loan_id,
+                "org_name": row.org_name,
+                "website": row.website,
+                "due_date": row.due_date,
+                "amount": float(row.amount or 0.0),
+                "days_left": days_left,
+                "sent": {channel: bool(getattr(row, f"sent_{channel}")) for channel in CHANNELS},
+            })
+        if loans:
+            users.append({
+                "user_id": user_id,
+                "email": first.email,
+                "name": first.full_name,
+                "telegram_chat_id": first.telegram_chat_id,
+                "channels": channels,
+                "loans": loans,
+            })
+    return users
+
+
+def pending(user: dict, channel: str) -> List[dict]:
+    """Платежи пользователя, о которых сегодня ещё не напомнили по каналу"""
+    if channel not in user["channels"]:
+        return []
+    return [loan for loan in user["loans"] if not loan["sent"][channel]]
+
+
+def record_sent(session, sent: Dict[str, List[dict]], today: date) -> int:
+    """
+    Отметить отправленное: {канал: [{user_id, loan}]} одним INSERT
+    Returns: число записей
+    """
+    now = datetime.now().isoformat()
+    rows = [
+        {"user_id": item["user_id"], "loan_id": item["loan"]["loan_id"], "due_date": item["loan"]["due_date"],
+         "channel": channel, "sent_on": today.isoformat(), "created_at": now}
+        for channel, items in sent.items()
+        for item in items
+    ]
+    if rows:
+        session.execute(insert(LoanNotificationORM), rows)
+    return len(rows)
@@ -0,0 +1,571 @@
+"""
+Локальная копия кредитов и платежей для десктопного клиента (offline-first)
+
+Интерфейс читает и пишет только локальный SQLite-файл (LOCAL_REPLICA_PATH):
+запросы не ждут удалённый PostgreSQL и работают без сети. Репозитории те же,
+что и для сервера (app/repository_sa.py), только с сессией локальной копии.
+Синхронизация с сервером - ReplicaSync.sync() в фоне (по таймеру и при
+активации окна):
+
+- push: события сессии копии записывают каждое локальное изменение в очередь
+  pending_changes; изменения одной строки сливаются в одну запись. Обновление
+  несёт исходные значения полей (base): поле, которое на сервере успели
+  изменить, не перезаписывается (конфликт - побеждает сервер). Новые строки
+  создаются с отрицательным id и после отправки получают id сервера.
+- pull: строки, изменённые после водяного знака - версии журнала change_log
+  (app/change_journal.py), - перечитываются с сервера. Первая синхронизация
+  (или журнал очищен дальше знака) - полная выгрузка.
+"""
+from __future__ import annotations
+import json
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import (
+    Column, Integer, MetaData, String, Table, Text, UniqueConstraint,
+    create_engine, delete, event, func, inspect, select, update,
+)
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import sessionmaker
+
+from app.config import DESKTOP_USER_ID, LOCAL_REPLICA_PATH
+from app.models_sa import InstallmentORM, LoanORM
+from app.repository_sa import InstallmentRepositorySA, LoanRepositorySA
+
+logger = logging.getLogger(__name__)
+
+REPLICA_MODELS = {"loans": LoanORM, "installments": InstallmentORM}
+# Поля, которые пересчитываются из платежей (и на сервере тоже) - не отправляются
+DERIVED_FIELDS = {"loans": {"amount_due", "is_paid"}, "installments": set()}
+REPLICA_BATCH_SIZE = 500
+
+# Служебные таблицы копии (на сервере их нет)
+LOCAL_METADATA = MetaData()
+
+pending_changes = Table(
+    "pending_changes", LOCAL_METADATA,
+    Column("id", Integer, primary_key=True, autoincrement=True),  # порядок отправки
+    Column("table_name", String(64), nullable=False),
+    Column("row_id", Integer, nullable=False),
+    Column("op", String(10), nullable=False),  # insert / update / delete
+    Column("fields", Text, nullable=False, default="{}"),  # новые значения (JSON)
+    Column("base", Text, nullable=False, default="{}"),  # значения до изменения (JSON)
+    Column("revision", Integer, nullable=False, default=0),  # растёт при слиянии
+    UniqueConstraint("table_name", "row_id"),
+    sqlite_autoincrement=True,
+)
+
+# Показанные напоминания в трее (app/reminder.py): новый срок платежа - новое напоминание
+reminders_shown = Table(
+    "reminders_shown", LOCAL_METADATA,
+    Column("installment_id", Integer, primary_key=True),
+    Column("due_date", String, primary_key=True),
+    Column("shown_at", String, nullable=False),
+)
+
+sync_state = Table(
+    "sync_state", LOCAL_METADATA,
+    Column("key", String(64), primary_key=True),
+    Column("value", Text, nullable=True),
+)
+
+
+def _utc_now() -> str:
+    return datetime.utcnow().isoformat()
+
+
+def _tracked_fields(table_name: str) -> List[str]:
+    table = REPLICA_MODELS[table_name].__table__
+    return [c.name for c in table.c if c.name != "id" and c.name not in DERIVED_FIELDS[table_name]]
+
+
+# ==================== ЛОКАЛЬНАЯ КОПИЯ ====================
+
+class LocalReplica:
+    """SQLite-файл с кредитами, платежами и очередью изменений."""
+
+    def __init__(self, path: str, user_id: Optional[int] = None):
+        self.path = path
+        # Чьи кредиты в копии (None - все); проставляется новым кредитам
+        self.user_id = user_id
+        self._engine: Optional[Engine] = None
+        self._factory: Optional[sessionmaker] = None
+        self._init_lock = threading.Lock()
+        # Локальные транзакции по очереди: UI-запись, применение pull, итог push
+        self._write_lock = threading.RLock()
+
+    def get_engine(self) -> Engine:
+        """Engine копии; при первом вызове создаёт файл и таблицы."""
+        if self._engine is None:
+            with self._init_lock:
+                if self._engine is None:
+                    engine = create_engine(f"sqlite:///{self.path}", future=True,
+                                           connect_args={"check_same_thread": False})
+                    event.listen(engine, "connect", self._on_connect)
+                    for table in (LoanORM.__table__, InstallmentORM.__table__):
+                        table.create(engine, checkfirst=True)
+                        # Индексы, добавленные в модели после создания файла копии
+                        for index in table.indexes:
+                            index.create(engine, checkfirst=True)
+                    LOCAL_METADATA.create_all(engine)
+                    factory = sessionmaker(bind=engine, autoflush=False, future=True)
+                    event.listen(factory, "before_flush", self._before_flush)
+                    self._engine, self._factory = engine, factory
+        return self._engine
+
+    @staticmethod
+    def _on_connect(dbapi_connection, _record):
+        from app.db import apply_sqlite_pragmas
+        # Чтение не ждёт запись синхронизации (WAL); пользователей в копии нет - без внешних ключей
+        apply_sqlite_pragmas(dbapi_connection, foreign_keys=False)
+
+    @contextmanager
+    def session(self):
+        """Сессия копии (подставляется в репозитории вместо get_session)."""
+        self.get_engine()
+        with self._write_lock:
+            session = self._factory()
+            try:
+                yield session
+                session.commit()
+            except Exception:
+                session.rollback()
+                raise
+            finally:
+                session.close()
+
+    @contextmanager
+    def begin(self):
+        """Транзакция копии на уровне Core (для синхронизации)."""
+        engine = self.get_engine()
+        with self._write_lock, engine.begin() as conn:
+            yield conn
+
+    # ---------- состояние ----------
+
+    def get_state(self) -> Dict[str, str]:
+        with self.get_engine().connect() as conn:
+            return {key: value for key, value in conn.execute(select(sync_state.c.key, sync_state.c.value))}
+
+    @staticmethod
+    def _set_state(conn, **values) -> None:
+        from sqlalchemy.dialects.sqlite import insert
+        for key, value in values.items():
+            stmt = insert(sync_state).values(key=key, value=None if value is None else str(value))
+            conn.execute(stmt.on_conflict_do_update(index_elements=[sync_state.c.key],
+                                                    set_={"value": stmt.excluded.value}))
+
+    def pending_count(self) -> int:
+        with self.get_engine().connect() as conn:
+            return conn.execute(select(func.count()).select_from(pending_changes)).scalar_one()
+
+    # ---------- запись изменений в очередь ----------
+
+    def _before_flush(self, session, _flush_context, _instances):
+        conn = session.connection()
+        for table_name, model in REPLICA_MODELS.items():
+            new = [obj for obj in session.new if isinstance(obj, model)]
+            if new:
+                # Локальные id отрицательные - не пересекаются с id сервера
+                lowest = conn.execute(select(func.min(model.id))).scalar() or 0
+                for obj in new:
+                    if obj.id is None:
+                        lowest = min(lowest, 0) - 1
+                        obj.id = lowest
+                    if table_name == "loans" and obj.user_id is None:
+                        obj.user_id = self.user_id
+
+        # Родители раньше детей при создании, дети раньше родителей при удалении
+        for table_name in ("loans", "installments"):
+            model = REPLICA_MODELS[table_name]
+            for obj in session.new:
+                if isinstance(obj, model):
+                    fields = {c.name: getattr(obj, c.name) for c in model.__table__.c if c.name != "id"}
+                    self._record(conn, table_name, obj.id, "insert",
+                                 {k: v for k, v in fields.items() if v is not None}, {})
+        for table_name in ("loans", "installments"):
+            model = REPLICA_MODELS[table_name]
+            for obj in session.dirty:
+                if not isinstance(obj, model) or obj in session.new:
+                    continue
+                state = inspect(obj)
+                fields, base = {}, {}
+                for name in _tracked_fields(table_name):
+                    history = state.attrs[name].history
+                    if not history.has_changes():
+                        continue
+                    old = history.deleted[0] if history.deleted else None
+                    value = history.added[0] if history.added else None
+                    if old != value:
+                        fields[name], base[name] = value, old
+                if fields:
+                    self._record(conn, table_name, obj.id, "update", fields, base)
+        for table_name in ("installments", "loans"):
+            model = REPLICA_MODELS[table_name]
+            for obj in session.deleted:
+                if isinstance(obj, model):
+                    self._record(conn, table_name, obj.id, "delete", {}, {})
+
+    @staticmethod
+    def _record(conn, table_name: str, row_id: int, op: str, fields: dict, base: dict) -> None:
+        """Добавить изменение в очередь, слив с уже ожидающим изменением строки."""
+        key = (pending_changes.c.table_name == table_name) & (pending_changes.c.row_id == row_id)
+        existing = conn.execute(select(pending_changes).where(key)).first()
+        if existing is None:
+            if op == "delete" and row_id < 0:
+                return
+            conn.execute(pending_changes.insert().values(
+                table_name=table_name, row_id=row_id, op=op,
+                fields=json.dumps(fields), base=json.dumps(base), revision=0,
+            ))
+            return
+
+        old_fields, old_base = json.loads(existing.fields), json.loads(existing.base)
+        if op == "delete":
+            if existing.op == "insert":
+                # Строка не успела попасть на сервер
+                conn.execute(delete(pending_changes).where(key))
+                return
+            values = {"op": "delete", "fields": "{}", "base": "{}"}
+        elif existing.op == "insert":
+            values = {"fields": json.dumps({**old_fields, **fields})}
+        else:
+            # Исходное значение поля - из самого раннего изменения (так его видел сервер)
+            values = {"op": op, "fields": json.dumps({**old_fields, **fields}),
+                      "base": json.dumps({**base, **old_base})}
+        conn.execute(update(pending_changes).where(key).values(revision=existing.revision + 1, **values))
+
+
+# ==================== СИНХРОНИЗАЦИЯ ====================
+
+class ReplicaSync:
+    """Обмен изменениями между локальной копией и сервером."""
+
+    def __init__(self, replica: LocalReplica):
+        self.replica = replica
+        self._lock = threading.Lock()
+        self._schema_checked = False
+
+    def is_initialized(self) -> bool:
+        """Была ли хоть одна успешная синхронизация (есть ли данные в копии)."""
+        return "watermark" in self.replica.get_state()
+
+    def sync(self) -> dict:
+        """
+        Отправить локальные изменения и получить изменения сервера.
+        Ошибка связи прерывает синхронизацию: неотправленное остаётся в очереди.
+        Returns: {'pushed', 'conflicts', 'remapped', 'full', 'upserted', 'deleted',
+                  'changed_loan_ids', 'pending', 'seconds'}
+        """
+        with self._lock:
+            started = time.perf_counter()
+            pushed, conflicts, remapped, refetch = self._push()
+            pulled = self._pull(refetch)
+            return {
+                "pushed": pushed,
+                "conflicts": conflicts,
+                "remapped": remapped,
+                **pulled,
+                "pending": self.replica.pending_count(),
+                "seconds": time.perf_counter() - started,
+            }
+
+    # ---------- push ----------
+
+    def _push(self) -> Tuple[int, List[str], Dict[int, int], Set[Tuple[str, int]]]:
+        pushed, conflicts, remapped = 0, [], {}
+        refetch: Set[Tuple[str, int]] = set()
+        last_id = 0
+        while True:
+            with self.replica.get_engine().connect() as conn:
+                change = conn.execute(
+                    select(pending_changes).where(pending_changes.c.id > last_id).order_by(pending_changes.c.id).limit(1)
+                ).first()
+            if change is None:
+                break
+            last_id = change.id
+            result = self._send(change)
+            self._complete(change, result)
+            pushed += 1
+            if result["conflicts"] or result["rejected"]:
+                if result["id"] > 0:
+                    refetch.add((change.table_name, result["id"]))
+                conflicts.append(self._describe_conflict(change, result))
+            if change.op == "insert" and not result["rejected"] and change.table_name == "loans":
+                remapped[change.row_id] = result["id"]
+        return pushed, conflicts, remapped, refetch
+
+    @staticmethod
+    def _describe_conflict(change, result) -> str:
+        what = "кредит" if change.table_name == "loans" else "платеж"
+        if result["rejected"]:
+            message = f"{what} #{change.row_id}: изменение отклонено сервером ({result['rejected']})"
+        else:
+            message = f"{what} #{change.row_id}: на сервере уже изменены поля {', '.join(result['conflicts'])}"
+        logger.warning("Sync conflict: %s", message)
+        return message
+
+    def _send(self, change) -> dict:
+        """Применить одно изменение на сервере (одна транзакция)."""
+        from sqlalchemy.exc import IntegrityError
+        from app.db_sa import get_session
+        from app.repository_sa import installment_repo
+
+        model = REPLICA_MODELS[change.table_name]
+        fields, base = json.loads(change.fields), json.loads(change.base)
+        result = {"id": change.row_id, "applied": {}, "conflicts": [], "server": {}, "rejected": None}
+        try:
+            with get_session() as session:
+                loan_id = None
+                if change.op == "insert":
+                    if change.table_name == "installments":
+                        loan_id = fields["loan_id"]
+                        if loan_id < 0 or session.get(LoanORM, loan_id) is None:
+                            result["rejected"] = "кредит удалён на сервере"
+                            return result
+                    obj = model(**fields)
+                    session.add(obj)
+                    session.flush()
+                    result["id"] = obj.id
+                    result["applied"] = fields
+                elif change.op == "update":
+                    obj = session.get(model, change.row_id, with_for_update=True)
+                    if obj is None:
+                        result["rejected"] = "строка удалена на сервере"
+                        return result
+                    for name, value in fields.items():
+                        current = getattr(obj, name)
+                        if name in base and current != base[name] and current != value:
+                            result["conflicts"].append(name)
+                            result["server"][name] = current
+                            continue
+                        setattr(obj, name, value)
+                        result["applied"][name] = value
+                    loan_id = getattr(obj, "loan_id", None)
+                else:
+                    # Удаление безусловно; уже удалённая строка - не ошибка
+                    obj = session.get(model, change.row_id)
+                    if obj is not None:
+                        loan_id = getattr(obj, "loan_id", None)
+                        session.delete(obj)
+                if loan_id is not None:
+                    session.flush()
+                    installment_repo._recalculate_loan_fields(session, loan_id)
+        except IntegrityError as e:
+            # Повтор не поможет - изменение отбрасывается, строка перечитывается
+            result["rejected"] = str(e.orig)
+        return result
+
+    def _complete(self, change, result: dict) -> None:
+        """Убрать отправленное изменение из очереди (с учётом правок во время отправки)."""
+        key = (pending_changes.c.table_name == change.table_name) & (pending_changes.c.row_id == change.row_id)
+        model = REPLICA_MODELS[change.table_name]
+        table = model.__table__
+        with self.replica.begin() as conn:
+            current = conn.execute(select(pending_changes).where(key)).first()
+
+            if change.op == "insert" and result["rejected"]:
+                conn.execute(delete(pending_changes).where(key))
+                conn.execute(delete(table).where(table.c.id == change.row_id))
+                if change.table_name == "loans":
+                    self._drop_local_children(conn, change.row_id)
+                return
+
+            if current is None:
+                if change.op == "insert":
+                    # Строку удалили локально, пока она создавалась на сервере
+                    LocalReplica._record(conn, change.table_name, result["id"], "delete", {}, {})
+                return
+
+            if current.revision == change.revision:
+                conn.execute(delete(pending_changes).where(key))
+            elif change.op == "insert":
+                # Строку правили во время отправки: дальше это обновление строки сервера
+                later = {k: v for k, v in json.loads(current.fields).items() if result["applied"].get(k) != v}
+                if later:
+                    conn.execute(update(pending_changes).where(key).values(
+                        op="update", fields=json.dumps(later),
+                        base=json.dumps({k: result["applied"].get(k) for k in later}),
+                    ))
+                else:
+                    conn.execute(delete(pending_changes).where(key))
+            elif current.op == "update":
+                # Сервер теперь хранит отправленные значения (или свои при конфликте)
+                base = json.loads(current.base)
+                base.update(result["applied"])
+                base.update(result["server"])
+                later = {k: v for k, v in json.loads(current.fields).items() if base.get(k) != v}
+                if later:
+                    conn.execute(update(pending_changes).where(key).values(
+                        fields=json.dumps(later), base=json.dumps({k: base.get(k) for k in later}),
+                    ))
+                else:
+                    conn.execute(delete(pending_changes).where(key))
+
+            if change.op == "insert":
+                self._remap(conn, change.table_name, change.row_id, result["id"])
+
+    @staticmethod
+    def _remap(conn, table_name: str, local_id: int, server_id: int) -> None:
+        """Заменить локальный id строки на id сервера."""
+        table = REPLICA_MODELS[table_name].__table__
+        conn.execute(update(table).where(table.c.id == local_id).values(id=server_id))
+        conn.execute(update(pending_changes).where(
+            (pending_changes.c.table_name == table_name) & (pending_changes.c.row_id == local_id)
+        ).values(row_id=server_id))
+        if table_name == "installments":
+            conn.execute(update(reminders_shown).where(reminders_shown.c.installment_id == local_id)
+                         .values(installment_id=server_id))
+            return
+        installments = InstallmentORM.__table__
+        conn.execute(update(installments).where(installments.c.loan_id == local_id).values(loan_id=server_id))
+        # Ожидающие создания платежи кредита ссылаются на старый id
+        for change in conn.execute(select(pending_changes).where(
+            (pending_changes.c.table_name == "installments") & (pending_changes.c.op == "insert")
+        )).all():
+            fields = json.loads(change.fields)
+            if fields.get("loan_id") == local_id:
+                fields["loan_id"] = server_id
+                conn.execute(update(pending_changes).where(pending_changes.c.id == change.id)
+                             .values(fields=json.dumps(fields)))
+
+    @staticmethod
+    def _drop_local_children(conn, loan_id: int) -> None:
+        installments = InstallmentORM.__table__
+        ids = conn.execute(select(installments.c.id).where(installments.c.loan_id == loan_id)).scalars().all()
+        if ids:
+            conn.execute(delete(installments).where(installments.c.id.in_(ids)))
+            conn.execute(delete(pending_changes).where(
+                (pending_changes.c.table_name == "installments") & pending_changes.c.row_id.in_(ids)
+            ))
+
+    # ---------- pull ----------
+
+    def _pull(self, refetch: Set[Tuple[str, int]]) -> dict:
+        from app.change_journal import JOURNAL_OVERLAP_MINUTES, current_version
+        from app.db_sa import EmptyDatabaseError, create_schema, get_engine, verify_schema
+        from app.models_sa import ChangeLogORM
+
+        state = self.replica.get_state()
+        pulled_at = _utc_now()
+        watermark = int(state["watermark"]) if "watermark" in state else None
+        rows: Dict[str, Dict[int, dict]] = {"loans": {}, "installments": {}}
+        changed: Dict[str, Set[int]] = {"loans": set(), "installments": set()}
+
+        with get_engine().connect() as conn:
+            if not self._schema_checked:
+                try:
+                    verify_schema(conn, [LoanORM.__table__, InstallmentORM.__table__, ChangeLogORM.__table__])
+                except EmptyDatabaseError:
+                    # Новая установка на пустой базе: создаём схему, как scripts/migrate.py
+                    print("⚠️  База данных пуста - создаю схему")
+                    create_schema()
+                self._schema_checked = True
+            until = current_version(conn)
+            full = watermark is None or self._journal_pruned(conn, watermark)
+            if full:
+                for table_name in rows:
+                    for row in conn.execute(self._rows_query(table_name)):
+                        rows[table_name][row.id] = dict(row._mapping)
+            else:
+                journal = ChangeLogORM.__table__
+                # Транзакция могла закоммитить меньшую версию позже: окно перекрытия как у бэкапов
+                overlap_from = (datetime.fromisoformat(state["pulled_at"])
+                                - timedelta(minutes=JOURNAL_OVERLAP_MINUTES)).isoformat()
+                query = select(journal.c.table_name, journal.c.row_id).where(
+                    journal.c.table_name.in_(list(rows)),
+                    journal.c.version <= until,
+                    (journal.c.version > watermark) | (journal.c.changed_at >= overlap_from),
+                ).distinct()
+                for table_name, row_id in conn.execute(query):
+                    changed[table_name].add(row_id)
+                for table_name, row_id in refetch:
+                    changed[table_name].add(row_id)
+                for table_name, ids in changed.items():
+                    ids = sorted(ids)
+                    for i in range(0, len(ids), REPLICA_BATCH_SIZE):
+                        chunk = ids[i:i + REPLICA_BATCH_SIZE]
+                        for row in conn.execute(self._rows_query(table_name, chunk)):
+                            rows[table_name][row.id] = dict(row._mapping)
+
+        upserted, deleted, loan_ids = self._apply_pull(full, rows, changed, until, pulled_at)
+        return {"full": full, "upserted": upserted, "deleted": deleted, "changed_loan_ids": sorted(loan_ids)}
+
+    def _rows_query(self, table_name: str, ids: Optional[List[int]] = None):
+        table = REPLICA_MODELS[table_name].__table__
+        query = select(*table.c)
+        if ids is not None:
+            query = query.where(table.c.id.in_(ids))
+        if self.replica.user_id is not None:
+            loans = LoanORM.__table__
+            if table_name == "loans":
+                query = query.where(loans.c.user_id == self.replica.user_id)
+            else:
+                query = query.where(table.c.loan_id.in_(
+                    select(loans.c.id).where(loans.c.user_id == self.replica.user_id)
+                ))
+        return query
+
+    @staticmethod
+    def _journal_pruned(conn, watermark: int) -> bool:
+        """Удалены ли из журнала записи новее водяного знака (prune_journal после бэкапа)."""
+        from app.models_sa import ChangeLogORM
+        oldest = conn.execute(select(func.min(ChangeLogORM.version))).scalar()
+        if oldest is None:
+            return watermark > 0
+        return oldest > watermark + 1
+
+    def _apply_pull(self, full: bool, rows: Dict[str, Dict[int, dict]], changed: Dict[str, Set[int]],
+                    watermark: int, pulled_at: str) -> Tuple[int, int, Set[int]]:
+        """
+        Записать полученные строки в копию (только отличающиеся от локальных)
+        Returns: (записано строк, удалено строк, id затронутых кредитов)
+        """
+        from app.change_journal import _upsert
+
+        upserted = deleted = 0
+        loan_ids: Set[int] = set()
+        with self.replica.begin() as conn:
+            # Строки с неотправленными изменениями не трогаем - их отправит следующий push
+            pending = set(conn.execute(select(pending_changes.c.table_name, pending_changes.c.row_id)).all())
+            for table_name in ("installments", "loans"):
+                table = REPLICA_MODELS[table_name].__table__
+                ids = set(rows[table_name]) | (changed[table_name] if not full else set())
+                if full:
+                    ids |= set(conn.execute(select(table.c.id).where(table.c.id > 0)).scalars())
+                ids = sorted(row_id for row_id in ids if (table_name, row_id) not in pending)
+
+                gone, batch = [], []
+                for i in range(0, len(ids), REPLICA_BATCH_SIZE):
+                    chunk = ids[i:i + REPLICA_BATCH_SIZE]
+                    local = {row.id: dict(row._mapping)
+                             for row in conn.execute(select(*table.c).where(table.c.id.in_(chunk)))}
+                    for row_id in chunk:
+                        row = rows[table_name].get(row_id)
+                        if row is None:
+                            if row_id in local:
+                                gone.append(local[row_id])
+                        elif local.get(row_id) != row:
+                            batch.append(row)
+
+                for i in range(0, len(gone), REPLICA_BATCH_SIZE):
+                    conn.execute(delete(table).where(table.c.id.in_([r["id"] for r in gone[i:i + REPLICA_BATCH_SIZE]])))
+                for i in range(0, len(batch), REPLICA_BATCH_SIZE):
+                    _upsert(conn, table, batch[i:i + REPLICA_BATCH_SIZE])
+                upserted += len(batch)
+                deleted += len(gone)
+                key = "id" if table_name == "loans" else "loan_id"
+                loan_ids.update(r[key] for r in gone + batch)
+            LocalReplica._set_state(conn, watermark=watermark, pulled_at=pulled_at)
+        return upserted, deleted, loan_ids
+
+
+# Копия процесса и репозитории поверх неё (интерфейс десктопного клиента)
+replica = LocalReplica(LOCAL_REPLICA_PATH, user_id=DESKTOP_USER_ID)
+replica_sync = ReplicaSync(replica)
+local_loan_repo = LoanRepositorySA(replica.session)
+local_installment_repo = InstallmentRepositorySA(replica.session)
@@ -0,0 +1,184 @@
+"""
+Ограничение частоты попыток входа (защита от брутфорса)
+
+Основное хранилище - Redis: скользящее окно попыток в sorted set и ключ
+блокировки с TTL, обновляются атомарно Lua-скриптом. Состояние общее для
+всех gunicorn workers и само истекает по TTL.
+
+Если Redis недоступен - используется локальный LRU с ограниченным числом
+отслеживаемых IP, чтобы перебор с множества адресов не раздувал память.
+"""
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from typing import Optional
+
+from app.config import PROJECT_NAME
+from app.integration import get_redis, is_connection_error, mark_redis_down
+
+KEY_PREFIX = f"{PROJECT_NAME}:login"
+
+# Сколько IP максимум держим в памяти процесса (fallback без Redis)
+LOCAL_MAX_TRACKED_IPS = 10000
+
+# KEYS[1] - sorted set попыток, KEYS[2] - ключ блокировки
+# ARGV: now_ms, window_ms, max_attempts, block_ms, member
+# Возвращает количество оставшихся попыток (0 = заблокирован)
+_ADD_ATTEMPT_LUA = """
+local now = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local max_attempts = tonumber(ARGV[3])
+local block_ms = tonumber(ARGV[4])
+
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now - window)
+redis.call('ZADD', KEYS[1], now, ARGV[5])
+redis.call('ZREMRANGEBYRANK', KEYS[1], 0, -(max_attempts + 1))
+redis.call('PEXPIRE', KEYS[1], window)
+
+local count = redis.call('ZCARD', KEYS[1])
+if count >= max_attempts then
+    redis.call('SET', KEYS[2], '1', 'PX', block_ms)
+    redis.call('DEL', KEYS[1])
+    return 0
+end
+return max_attempts - count
+"""
+
+
+class RedisThrottleBackend:
+    """Скользящее окно попыток в Redis (общее для всех процессов)"""
+
+    def __init__(self, client):
+        self.client = client
+        self._add_attempt = client.register_script(_ADD_ATTEMPT_LUA)
+
+    @staticmethod
+    def _keys(ip: str):
+        return f"{KEY_PREFIX}:attempts:{ip}", f"{KEY_PREFIX}:blocked:{ip}"
+
+    def add_attempt(self, ip: str, max_attempts: int, window_seconds: int, block_seconds: int) -> int:
+        attempts_key, blocked_key = self._keys(ip)
+        now_ms = int(time.time() * 1000)
+        member = f"{now_ms}:{uuid.uuid4().hex[:8]}"
+        return int(self._add_attempt(
+            keys=[attempts_key, blocked_key],
+            args=[now_ms, window_seconds * 1000, max_attempts, block_seconds * 1000, member],
+        ))
+
+    def block_time_remaining(self, ip: str) -> int:
+        _, blocked_key = self._keys(ip)
+        ttl_ms = self.client.pttl(blocked_key)
+        # -2: ключа нет, -1: нет TTL (не должно случаться)
+        return max(0, (int(ttl_ms) + 999) // 1000) if ttl_ms and ttl_ms > 0 else 0
+
+    def clear(self, ip: str) -> None:
+        attempts_key, _ = self._keys(ip)
+        self.client.delete(attempts_key)
+
+
+class LocalThrottleBackend:
+    """
+    Fallback в памяти процесса: LRU с ограниченным числом IP.
+    При переполнении вытесняются давно не встречавшиеся адреса.
+    """
+
+    def __init__(self, max_tracked_ips: int = LOCAL_MAX_TRACKED_IPS):
+        self.max_tracked_ips = max_tracked_ips
+        self._attempts: "OrderedDict[str, deque]" = OrderedDict()
+        self._blocked: "OrderedDict[str, float]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _trim(store: OrderedDict, limit: int) -> None:
+        while len(store) > limit:
+            store.popitem(last=False)
+
+    def add_attempt(self, ip: str, max_attempts: int, window_seconds: int, block_seconds: int) -> int:
+        now = time.monotonic()
+        with self._lock:
+            attempts = self._attempts.get(ip)
+            if attempts is None:
+                attempts = deque(maxlen=max_attempts)
+                self._attempts[ip] = attempts
+            else:
+                self._attempts.move_to_end(ip)
+
+            # Окно упорядочено по времени - снимаем устаревшие попытки слева
+            while attempts and now - attempts[0] >= window_seconds:
+                attempts.popleft()
+            attempts.append(now)
+
+            if len(attempts) >= max_attempts:
+                del self._attempts[ip]
+                self._blocked[ip] = now + block_seconds
+                self._blocked.move_to_end(ip)
+                self._trim(self._blocked, self.max_tracked_ips)
+                return 0
+
+            self._trim(self._attempts, self.max_tracked_ips)
+            return max_attempts - len(attempts)
+
+    def block_time_remaining(self, ip: str) -> int:
+        with self._lock:
+            until = self._blocked.get(ip)
+            if until is None:
+                return 0
+            remaining = until - time.monotonic()
+            if remaining <= 0:
+                # Блокировка истекла
+                del self._blocked[ip]
+                return 0
+            return int(remaining + 0.999)
+
+    def clear(self, ip: str) -> None:
+        with self._lock:
+            self._attempts.pop(ip, None)
+
+    def __len__(self) -> int:
+        return len(self._attempts) + len(self._blocked)
+
+
+_local_backend = LocalThrottleBackend()
+_redis_backend: Optional[RedisThrottleBackend] = None
+
+
+def _get_redis_backend() -> Optional[RedisThrottleBackend]:
+    global _redis_backend
+    client = get_redis()
+    if client is None:
+        return None
+    if _redis_backend is None or _redis_backend.client is not client:
+        _redis_backend = RedisThrottleBackend(client)
+    return _redis_backend
+
+
+def _call(method: str, *args):
+    """Вызвать метод Redis-бэкенда, при ошибке соединения - локального"""
+    backend = _get_redis_backend()
+    if backend is not None:
+        try:
+            return getattr(backend, method)(*args)
+        except Exception as e:
+            if not is_connection_error(e):
+                raise
+            mark_redis_down()
+    return getattr(_local_backend, method)(*args)
+
+
+def add_attempt(ip: str, max_attempts: int, window_seconds: int, block_seconds: int) -> int:
+    """
+    Зарегистрировать неудачную попытку входа
+    Returns: количество оставшихся попыток (0 - IP заблокирован)
+    """
+    return _call("add_attempt", ip, max_attempts, window_seconds, block_seconds)
+
+
+def block_time_remaining(ip: str) -> int:
+    """Оставшееся время блокировки IP в секундах (0 - не заблокирован)"""
+    return _call("block_time_remaining", ip)
+
+
+def clear(ip: str) -> None:
+    """Сбросить счётчик попыток IP (после успешного входа)"""
+    _call("clear", ip)
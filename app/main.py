@@ -3,6 +3,9 @@ import os
 import logging
 import time
 
+# Момент запуска процесса - для замера времени до готового окна
+STARTED_AT = time.perf_counter()
+
 from PyQt6.QtWidgets import QApplication, QMessageBox
 from PyQt6.QtCore import QLocale, QTimer
 
@@ -12,9 +15,6 @@ PROJECT_ROOT = os.path.dirname(CURRENT_DIR)
 if PROJECT_ROOT not in sys.path:
     sys.path.insert(0, PROJECT_ROOT)
 
-from app.db_sa import engine
-from app.models_sa import Base
-from app.ui.main_window_sa import MainWindow
 from app.ui.splash_screen import SplashScreen, LoadingThread
 
 
@@ -41,15 +41,8 @@ def _excepthook(exctype, value, tb):
 sys.excepthook = _excepthook
 
 
-def init_database():
-    """Инициализация базы данных."""
-    try:
-        # Создаем таблицы, если их нет
-        Base.metadata.create_all(bind=engine)
-        logging.info("Database initialized successfully")
-    except Exception as e:
-        logging.error(f"Database initialization error: {e}")
-        raise
+# Замер запуска: показать окно, вывести тайминги и выйти (scripts/bench_desktop_startup.py)
+STARTUP_BENCHMARK = os.environ.get("MIKROKREDIT_STARTUP_BENCHMARK") == "1"
 
 
 class AppLoader:
@@ -87,18 +80,20 @@ class AppLoader:
         # Показываем загрузочное окно
         self.splash.show()
         
-        return self.app.exec()
+        exit_code = self.app.exec()
+        # Дожидаемся фоновых запросов (запись в локальную копию, синхронизация)
+        from app.ui.background import db_pool
+        db_pool().waitForDone()
+        return exit_code
     
     def _on_loading_finished(self):
         """Обработчик завершения загрузки."""
         try:
-            # Инициализируем базу данных
-            self.splash.set_status("Инициализация базы данных...")
-            init_database()
+            # Модуль уже импортирован в LoadingThread (прогрев)
+            from app.ui.main_window_sa import MainWindow
             
-            # Создаем главное окно
-            self.splash.set_status("Создание интерфейса...")
-            self.main_window = MainWindow()
+            # Кредиты загружены при запуске - окно сразу показывает таблицу
+            self.main_window = MainWindow(loans=self.loading_thread.loans)
             
             # Закрываем загрузочное окно
             self.splash.close_splash()
@@ -106,19 +101,40 @@ class AppLoader:
             # Показываем главное окно
             self.main_window.show()
             
-            logging.info("Application loaded successfully")
+            timings = ", ".join(f"{step}={seconds:.3f}s" for step, seconds in self.loading_thread.timings.items())
+            logging.info(f"Application loaded successfully in {time.perf_counter() - STARTED_AT:.3f}s ({timings})")
+            
+            if STARTUP_BENCHMARK:
+                # После первой отрисовки окна
+                QTimer.singleShot(0, self._report_startup)
             
         except Exception as e:
             self._on_loading_error(str(e))
     
+    def _report_startup(self):
+        """Вывод времени запуска для бенчмарка и выход."""
+        print(f"startup_seconds={time.perf_counter() - STARTED_AT:.4f}", flush=True)
+        for step, seconds in self.loading_thread.timings.items():
+            print(f"step_{step}_seconds={seconds:.4f}", flush=True)
+        self.app.quit()
+    
     def _on_loading_error(self, error_message: str):
         """Обработчик ошибки загрузки."""
         logging.error(f"Loading error: {error_message}")
         
+        from app.db_sa import MIGRATE_HINT, SchemaMismatchError
+        if isinstance(getattr(self.loading_thread, "error", None), SchemaMismatchError):
+            error_message += f"\n\n{MIGRATE_HINT}"
+        
         # Закрываем загрузочное окно
         if self.splash:
             self.splash.close_splash()
         
+        if STARTUP_BENCHMARK:
+            print(f"startup_error={error_message!r}", flush=True)
+            self.app.exit(1)
+            return
+        
         # Показываем ошибку
         QMessageBox.critical(None, "Ошибка загрузки", 
                            f"Не удалось запустить приложение:\n{error_message}")
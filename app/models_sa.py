@@ -1,6 +1,6 @@
 from __future__ import annotations
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
-from sqlalchemy import Integer, String, Text, Float, Boolean, ForeignKey, Sequence, Index
+from sqlalchemy import Integer, String, Text, Float, Boolean, ForeignKey, Sequence, Index, UniqueConstraint, text
 from typing import List, Optional
 
 
@@ -40,7 +40,7 @@ class UserORM(Base):
     telegram_notifications: Mapped[bool] = mapped_column(Boolean, default=True, nullable=False)
     
     # Временные метки
-    created_at: Mapped[str] = mapped_column(String, nullable=False)
+    created_at: Mapped[str] = mapped_column(String, nullable=False, index=True)
     updated_at: Mapped[str] = mapped_column(String, nullable=False)
     last_login_at: Mapped[Optional[str]] = mapped_column(String, nullable=True)
     
@@ -98,7 +98,8 @@ class UserSessionORM(Base):
     
     created_at: Mapped[str] = mapped_column(String, nullable=False)
     last_activity_at: Mapped[str] = mapped_column(String, nullable=False)
-    expires_at: Mapped[str] = mapped_column(String, nullable=False)
+    # Индекс - для удаления истёкших сессий (sweep_expired_sessions)
+    expires_at: Mapped[str] = mapped_column(String, nullable=False, index=True)
     
     user: Mapped[UserORM] = relationship(back_populates="sessions")
 
@@ -108,6 +109,10 @@ class UserSessionORM(Base):
 
 class LoanORM(Base):
     __tablename__ = "loans"
+    __table_args__ = (
+        # Неоплаченные займы без графика со сроком до даты (напоминания о платежах)
+        Index("ix_loans_unpaid_due", "is_paid", "due_date"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, Sequence('loans_id_seq'), primary_key=True, autoincrement=True)
     user_id: Mapped[int] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
@@ -138,6 +143,12 @@ class LoanORM(Base):
 
 class InstallmentORM(Base):
     __tablename__ = "installments"
+    __table_args__ = (
+        # Ближайшие неоплаченные платежи (напоминания, следующий платеж кредита)
+        Index("ix_installments_unpaid_due", "paid", "due_date"),
+        # Платежи займа по сроку (календарь месяца, список платежей кредита)
+        Index("ix_installments_loan_due", "loan_id", "due_date"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, Sequence('installments_id_seq'), primary_key=True, autoincrement=True)
     loan_id: Mapped[int] = mapped_column(ForeignKey("loans.id", ondelete="CASCADE"), nullable=False)
@@ -150,6 +161,22 @@ class InstallmentORM(Base):
     loan: Mapped[LoanORM] = relationship(back_populates="installments")
 
 
+class LoanNotificationORM(Base):
+    """Отправленные напоминания о платежах (app/loan_notifications.py): повторный запуск за день их не дублирует"""
+    __tablename__ = "loan_notifications"
+    __table_args__ = (
+        UniqueConstraint("loan_id", "due_date", "channel", "sent_on", name="uq_loan_notifications_sent"),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, Sequence('loan_notifications_id_seq'), primary_key=True, autoincrement=True)
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    loan_id: Mapped[int] = mapped_column(ForeignKey("loans.id", ondelete="CASCADE"), nullable=False)
+    due_date: Mapped[str] = mapped_column(String, nullable=False)  # срок платежа, о котором напомнили
+    channel: Mapped[str] = mapped_column(String(20), nullable=False)  # telegram / email
+    sent_on: Mapped[str] = mapped_column(String, nullable=False)  # YYYY-MM-DD
+    created_at: Mapped[str] = mapped_column(String, nullable=False)
+
+
 # ==================== ОРГАНАЙЗЕР ЗАДАЧ ====================
 
 class TaskCategoryORM(Base):
@@ -171,6 +198,14 @@ class TaskCategoryORM(Base):
 class TaskORM(Base):
     """Задачи"""
     __tablename__ = "tasks"
+    __table_args__ = (
+        # Список задач пользователя: сортировка важность/срок (без срока - в конце)/id;
+        # выражение совпадает с TASK_DUE_SORT_KEY в web/tasks_views.py
+        Index("ix_tasks_user_listing", "user_id", "importance", text("coalesce(due_date, '9999-12-31')"), "id"),
+        # То же с фильтром по статусу (невыполненные, выполненные, важные)
+        Index("ix_tasks_user_status_listing", "user_id", "status", "importance",
+              text("coalesce(due_date, '9999-12-31')"), "id"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, Sequence('tasks_id_seq'), primary_key=True, autoincrement=True)
     user_id: Mapped[int] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
@@ -220,7 +255,7 @@ class SubtaskORM(Base):
     __tablename__ = "subtasks"
 
     id: Mapped[int] = mapped_column(Integer, Sequence('subtasks_id_seq'), primary_key=True, autoincrement=True)
-    task_id: Mapped[int] = mapped_column(ForeignKey("tasks.id", ondelete="CASCADE"), nullable=False)
+    task_id: Mapped[int] = mapped_column(ForeignKey("tasks.id", ondelete="CASCADE"), nullable=False, index=True)
     title: Mapped[str] = mapped_column(String(200), nullable=False)
     completed: Mapped[bool] = mapped_column(Boolean, default=False, nullable=False)
     order: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
@@ -232,6 +267,10 @@ class SubtaskORM(Base):
 class TaskReminderORM(Base):
     """Напоминания для задач"""
     __tablename__ = "task_reminders"
+    __table_args__ = (
+        # Напоминания задачи за период (календарь месяца)
+        Index("ix_task_reminders_task_time", "task_id", "reminder_time"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, Sequence('task_reminders_id_seq'), primary_key=True, autoincrement=True)
     task_id: Mapped[int] = mapped_column(ForeignKey("tasks.id", ondelete="CASCADE"), nullable=False)
@@ -363,3 +402,18 @@ class ReminderRuleORM(Base):
     updated_at: Mapped[str] = mapped_column(String, nullable=False)
 
     task: Mapped[TaskORM] = relationship(back_populates="reminder_rules")
+
+
+# ==================== ЖУРНАЛ ИЗМЕНЕНИЙ ====================
+
+class ChangeLogORM(Base):
+    """Журнал изменений строк (заполняется триггерами, см. app/change_journal.py)"""
+    __tablename__ = "change_log"
+    __table_args__ = {"sqlite_autoincrement": True}  # версии не переиспользуются
+
+    # Версия изменения - монотонно растёт, служит водяным знаком бэкапов
+    version: Mapped[int] = mapped_column(Integer, Sequence('change_log_version_seq'), primary_key=True, autoincrement=True)
+    table_name: Mapped[str] = mapped_column(String(64), nullable=False)
+    row_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    op: Mapped[str] = mapped_column(String(1), nullable=False)  # I / U / D
+    changed_at: Mapped[str] = mapped_column(String, nullable=False, index=True)  # UTC
@@ -0,0 +1,181 @@
+"""
+Календарь месяца: платежи по займам и напоминания задач по дням
+
+Данные месяца собираются двумя запросами по диапазону дат:
+- платежи: installments JOIN loans по (loans.user_id, installments.loan_id,
+  due_date) - индексы ix_loans_user_id и ix_installments_loan_due;
+- напоминания: task_reminders JOIN tasks по (tasks.user_id, task_id,
+  reminder_time) - индекс ix_task_reminders_task_time.
+Задачи типа calendar_reminder не хранят напоминаний в task_reminders: их
+расписание (schedule_config - месяцы и дни или дни недели, плюс время)
+раскладывается по дням месяца здесь же, по списку таких задач пользователя.
+
+Результат кэшируется в Redis по пользователю и месяцу с ключом по версии
+данных пользователя (app/data_version): любое изменение займов, платежей,
+задач или их напоминаний (в том числе пересоздание cron-скриптом
+regenerate_reminders.py) даёт новую версию, и старый ключ просто перестаёт читаться.
+"""
+import json
+from collections import defaultdict
+from datetime import date, timedelta
+from typing import Dict, List, Optional
+
+from sqlalchemy import select
+
+from app.forecast import add_months
+from app.models_sa import InstallmentORM, LoanORM, TaskORM, TaskReminderORM
+
+# Ключ меняется с версией данных; TTL лишь убирает старые ключи
+CALENDAR_CACHE_TTL_SECONDS = 24 * 60 * 60
+# Допустимые годы: у крайних месяцев нет соседних (add_months вышел бы за date)
+MIN_YEAR, MAX_YEAR = 1900, 9998
+
+
+def parse_month(value: Optional[str], today: Optional[date] = None) -> date:
+    """
+    Первый день месяца из 'YYYY-MM' (пусто - текущий месяц)
+    Raises: ValueError при неверном формате или годе вне MIN_YEAR..MAX_YEAR
+    """
+    if not value:
+        return (today or date.today()).replace(day=1)
+    try:
+        year, month = value.split("-")
+        first = date(int(year), int(month), 1)
+    except (ValueError, TypeError):
+        raise ValueError("Месяц должен быть в формате ГГГГ-ММ")
+    if not MIN_YEAR <= first.year <= MAX_YEAR:
+        raise ValueError(f"Год должен быть от {MIN_YEAR} до {MAX_YEAR}")
+    return first
+
+
+def _int_set(values) -> set:
+    result = set()
+    for value in values or []:
+        try:
+            result.add(int(value))
+        except (TypeError, ValueError):
+            continue
+    return result
+
+
+def schedule_days(config: dict, first: date, last: date) -> List[date]:
+    """Дни диапазона [first, last], попадающие в расписание calendar_reminder"""
+    if config.get("mode") == "weekly":
+        weekdays = _int_set(config.get("weekdays"))  # 1 = понедельник
+        match = lambda d: d.isoweekday() in weekdays
+    else:
+        months, days = _int_set(config.get("months")), _int_set(config.get("days"))
+        match = lambda d: d.month in months and d.day in days
+    return [first + timedelta(days=i) for i in range((last - first).days + 1) if match(first + timedelta(days=i))]
+
+
+def _reminder_item(task, times: List[str], computed: bool) -> dict:
+    return {
+        "task_id": task.id,
+        "title": task.title,
+        "importance": task.importance,
+        "done": task.status == 1,
+        "times": sorted(times),
+        "computed": computed,
+    }
+
+
+def build_month(session, user_id: int, first: date) -> dict:
+    """Календарь месяца (без кэша): дни с платежами и напоминаниями"""
+    next_first = add_months(first, 1)
+    last = next_first - timedelta(days=1)
+    installments: Dict[str, List[dict]] = defaultdict(list)
+    reminders: Dict[str, List[dict]] = defaultdict(list)
+
+    rows = session.execute(
+        select(InstallmentORM.id, InstallmentORM.loan_id, InstallmentORM.due_date, InstallmentORM.amount,
+               InstallmentORM.paid, LoanORM.org_name, LoanORM.website)
+        .join(LoanORM, LoanORM.id == InstallmentORM.loan_id)
+        .where(LoanORM.user_id == user_id,
+               InstallmentORM.due_date >= first.isoformat(), InstallmentORM.due_date < next_first.isoformat())
+        .order_by(InstallmentORM.due_date, InstallmentORM.id)
+    ).all()
+    for row in rows:
+        installments[row.due_date[:10]].append({
+            "id": row.id,
+            "loan_id": row.loan_id,
+            "org_name": row.org_name or row.website,
+            "amount": float(row.amount or 0.0),
+            "paid": bool(row.paid),
+        })
+
+    # Напоминания одной задачи за день сворачиваются в один элемент со списком времени
+    scheduled = defaultdict(list)
+    tasks = {}
+    for task, reminder_time in session.execute(
+        select(TaskORM, TaskReminderORM.reminder_time)
+        .join(TaskORM, TaskORM.id == TaskReminderORM.task_id)
+        .where(TaskORM.user_id == user_id,
+               TaskReminderORM.reminder_time >= first.isoformat(),
+               TaskReminderORM.reminder_time < next_first.isoformat())
+        .order_by(TaskReminderORM.reminder_time)
+    ):
+        tasks[task.id] = task
+        scheduled[(reminder_time[:10], task.id)].append(reminder_time[11:16])
+    for (day, task_id), times in scheduled.items():
+        reminders[day].append(_reminder_item(tasks[task_id], times, computed=False))
+
+    for task in session.execute(
+        select(TaskORM).where(TaskORM.user_id == user_id, TaskORM.task_type == "calendar_reminder",
+                              TaskORM.status == 0)
+    ).scalars():
+        try:
+            config = json.loads(task.schedule_config or "{}")
+        except ValueError:
+            continue
+        times = [str(t) for t in config.get("times") or []]
+        if not times:
+            continue
+        start = first
+        if task.is_paused and task.paused_until:
+            try:
+                start = max(first, date.fromisoformat(task.paused_until[:10]))
+            except ValueError:
+                pass
+        for day in schedule_days(config, start, last):
+            reminders[day.isoformat()].append(_reminder_item(task, times, computed=True))
+
+    days = []
+    for i in range((last - first).days + 1):
+        day = (first + timedelta(days=i)).isoformat()
+        items = installments.get(day, [])
+        days.append({
+            "date": day,
+            "installments": items,
+            "due_total": round(sum(item["amount"] for item in items if not item["paid"]), 2),
+            "reminders": sorted(reminders.get(day, []), key=lambda r: (r["times"][:1], r["importance"])),
+        })
+
+    return {
+        "month": first.strftime("%Y-%m"),
+        "prev": add_months(first, -1).strftime("%Y-%m"),
+        "next": next_first.strftime("%Y-%m"),
+        "days": days,
+        "due_total": round(sum(day["due_total"] for day in days), 2),
+    }
+
+
+def get_month(user_id: int, first: date) -> dict:
+    """Календарь месяца пользователя (из кэша, если версия данных не менялась)"""
+    from app.data_version import current_version
+    from app.db_sa import get_session
+    from app.integration import cache_manager
+
+    # Версия берётся до чтения: изменения во время расчёта дадут новый ключ
+    version = current_version(user_id)
+    cache_key = None if version is None else f"calendar:{user_id}:{version}:{first:%Y-%m}"
+    if cache_key is not None:
+        cached = cache_manager.get(cache_key)
+        if cached:
+            return json.loads(cached)
+
+    with get_session() as session:
+        result = build_month(session, user_id, first)
+    if cache_key is not None:
+        cache_manager.set(cache_key, json.dumps(result, ensure_ascii=False), CALENDAR_CACHE_TTL_SECONDS)
+    return result
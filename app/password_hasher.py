@@ -0,0 +1,116 @@
+"""
+Выделенный пул для хеширования паролей (bcrypt)
+
+bcrypt.hashpw/checkpw занимают ~250 мс CPU. Чтобы всплеск входов не съедал
+все ядра и не останавливал обычные страницы, хеширование выполняется в
+отдельном пуле с ограничением параллельности и очередью ожидания:
+- не более PASSWORD_HASH_WORKERS операций одновременно на процесс;
+- не более PASSWORD_HASH_QUEUE_SIZE ожидающих (иначе сразу отказ, 429);
+- ожидание в очереди не дольше PASSWORD_HASH_QUEUE_TIMEOUT секунд (503).
+Ограничение действует внутри процесса, поэтому воркеры gunicorn многопоточные
+(gthread, gunicorn.conf.py): у sync-воркера один запрос и очередь не возникает.
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+import bcrypt
+
+from app.config import (
+    PASSWORD_HASH_ROUNDS, PASSWORD_HASH_WORKERS,
+    PASSWORD_HASH_QUEUE_SIZE, PASSWORD_HASH_QUEUE_TIMEOUT,
+)
+
+
+class HashingBusyError(RuntimeError):
+    """Пул хеширования перегружен - запрос нужно повторить позже"""
+
+    def __init__(self, message: str, status_code: int = 503, retry_after: int = 2):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+class PasswordHasher:
+    """Хеширование/проверка паролей с контролем допуска"""
+
+    def __init__(self, rounds: int, workers: int, queue_size: int, queue_timeout: float):
+        self.rounds = rounds
+        self.workers = max(1, workers)
+        self.queue_size = max(0, queue_size)
+        self.queue_timeout = queue_timeout
+        self._slots = threading.BoundedSemaphore(self.workers)
+        self._waiting = 0
+        self._waiting_lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._executor_lock = threading.Lock()
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            with self._executor_lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.workers, thread_name_prefix="password-hash"
+                    )
+        return self._executor
+
+    def _acquire_slot(self) -> None:
+        # Быстрый путь: свободный поток есть
+        if self._slots.acquire(blocking=False):
+            return
+
+        with self._waiting_lock:
+            if self._waiting >= self.queue_size:
+                raise HashingBusyError("Слишком много одновременных входов", status_code=429)
+            self._waiting += 1
+        try:
+            if not self._slots.acquire(timeout=self.queue_timeout):
+                raise HashingBusyError("Сервер перегружен, повторите попытку", status_code=503)
+        finally:
+            with self._waiting_lock:
+                self._waiting -= 1
+
+    def _run(self, fn, *args):
+        self._acquire_slot()
+        try:
+            future = self._get_executor().submit(fn, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        # Слот освобождается, когда работа действительно закончилась
+        future.add_done_callback(lambda _: self._slots.release())
+        return future.result()
+
+    def hash(self, password: str) -> str:
+        """Хешировать пароль с текущей стоимостью"""
+        salt = bcrypt.gensalt(rounds=self.rounds)
+        return self._run(bcrypt.hashpw, password.encode('utf-8'), salt).decode('utf-8')
+
+    def verify(self, password: str, password_hash: str) -> bool:
+        """Проверить пароль (HashingBusyError пробрасывается наружу)"""
+        try:
+            encoded_hash = password_hash.encode('utf-8')
+        except Exception:
+            return False
+        try:
+            return self._run(bcrypt.checkpw, password.encode('utf-8'), encoded_hash)
+        except HashingBusyError:
+            raise
+        except Exception:
+            return False
+
+    def needs_rehash(self, password_hash: str) -> bool:
+        """Хеш создан с другой стоимостью, чем настроена сейчас"""
+        try:
+            # $2b$12$<salt+hash>
+            return int(password_hash.split('$')[2]) != self.rounds
+        except (IndexError, ValueError, AttributeError):
+            return True
+
+
+password_hasher = PasswordHasher(
+    rounds=PASSWORD_HASH_ROUNDS,
+    workers=PASSWORD_HASH_WORKERS,
+    queue_size=PASSWORD_HASH_QUEUE_SIZE,
+    queue_timeout=PASSWORD_HASH_QUEUE_TIMEOUT,
+)
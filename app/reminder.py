@@ -1,33 +1,45 @@
 from __future__ import annotations
-from typing import List
-from datetime import date
+from typing import List, Optional, Tuple
+from datetime import date, datetime, time, timedelta
 
 from PyQt6.QtCore import QObject, QTimer
 from PyQt6.QtGui import QIcon
 from PyQt6.QtWidgets import QSystemTrayIcon, QStyle, QApplication
+from sqlalchemy import and_, func, select
 
-from .repository import get_due_soon_loans, mark_loan_reminded
+from .config import REMINDER_DAYS_BEFORE, REMINDER_HOUR
+from .local_replica import LocalReplica, reminders_shown, replica as default_replica
+from .models_sa import InstallmentORM, LoanORM
+
+# QTimer принимает не больше 2^31 мс (~24 дня); раз в сутки срок пересчитывается
+# заново - на случай сна компьютера или перевода часов
+MAX_TIMER_MS = 24 * 60 * 60 * 1000
+# Сколько платежей перечислять в одном уведомлении
+MAX_LISTED = 5
 
 
 class ReminderService(QObject):
-    """Periodic checker that shows tray notifications for loans due within 7 days.
+    """Tray notifications for unpaid installments due within REMINDER_DAYS_BEFORE days.
 
-    It marks each loan as reminded once a notification is shown to avoid duplicates.
+    Reads the same local replica as MainWindow. Instead of polling, a single-shot
+    timer is armed for the next moment an installment enters the reminder window
+    (found by an indexed query over unpaid installments); reschedule() re-arms it
+    after data changes. Each installment is reminded once per due date.
     """
 
-    def __init__(self, parent=None) -> None:
+    def __init__(self, parent=None, replica: LocalReplica = default_replica) -> None:
         super().__init__(parent)
+        self.replica = replica
         self.tray = QSystemTrayIcon(self._default_icon())
         self.tray.setToolTip("MikroKredit Organizer")
         self.tray.setVisible(True)
 
-        # Check immediately on start, then every 6 hours
         self.timer = QTimer(self)
-        self.timer.setInterval(6 * 60 * 60 * 1000)
-        self.timer.timeout.connect(self.check_and_notify)
-        self.timer.start()
+        self.timer.setSingleShot(True)
+        self.timer.timeout.connect(self.reschedule)
+        self.next_at: Optional[datetime] = None
 
-        QTimer.singleShot(2000, self.check_and_notify)
+        QTimer.singleShot(2000, self.reschedule)
 
     def _default_icon(self) -> QIcon:
         app = QApplication.instance()
@@ -35,19 +47,78 @@ class ReminderService(QObject):
             return app.style().standardIcon(QStyle.StandardPixmap.SP_DialogYesButton)
         return QIcon()
 
-    def check_and_notify(self) -> None:
-        loans = get_due_soon_loans(7)
-        if not loans:
-            return
-        for loan in loans:
-            self._notify_loan(loan.id, loan.website, loan.due_date, loan.amount_due)
-
-    def _notify_loan(self, loan_id: int, website: str, due_date: str, amount_due: float) -> None:
-        days_left = self._days_until(due_date)
-        title = "Скоро срок погашения кредита"
-        message = f"{website}: до {due_date} нужно вернуть {amount_due:.2f}. Осталось дней: {days_left}."
-        self.tray.showMessage(title, message, QSystemTrayIcon.MessageIcon.Information, 15000)
-        mark_loan_reminded(loan_id)
+    def reschedule(self) -> None:
+        """Notify about installments already due for a reminder and arm the timer for the next one."""
+        from .ui.background import run_in_background
+        run_in_background(self.collect, on_result=self._on_collected,
+                          on_error=lambda error: print(f"⚠️  Reminder check failed: {error}"))
+
+    def collect(self, now: Optional[datetime] = None) -> Tuple[List[dict], Optional[datetime]]:
+        """
+        Installments to remind about now (marked as shown) and the next reminder moment.
+        Returns: (installments, next moment or None if there are no unpaid installments ahead)
+        """
+        now = now or datetime.now()
+        today = now.date()
+        # Сегодняшний час напоминания ещё не наступил - окно начинается со вчерашнего дня
+        window_end = today + timedelta(days=REMINDER_DAYS_BEFORE - (0 if now.hour >= REMINDER_HOUR else 1))
+
+        due_query = select(
+            InstallmentORM.id, InstallmentORM.due_date, InstallmentORM.amount, LoanORM.org_name, LoanORM.website,
+        ).join(LoanORM, LoanORM.id == InstallmentORM.loan_id).outerjoin(
+            reminders_shown, and_(reminders_shown.c.installment_id == InstallmentORM.id,
+                                  reminders_shown.c.due_date == InstallmentORM.due_date),
+        ).where(
+            InstallmentORM.paid == 0,
+            InstallmentORM.due_date.between(today.isoformat(), window_end.isoformat()),
+            reminders_shown.c.installment_id.is_(None),
+        ).order_by(InstallmentORM.due_date, InstallmentORM.id)
+        # Первый платеж за окном - по индексу (paid, due_date)
+        next_query = select(func.min(InstallmentORM.due_date)).where(
+            InstallmentORM.paid == 0, InstallmentORM.due_date > window_end.isoformat(),
+        )
+
+        with self.replica.begin() as conn:
+            due = [dict(row._mapping) for row in conn.execute(due_query)]
+            next_due = conn.execute(next_query).scalar()
+            if due:
+                conn.execute(reminders_shown.insert(), [
+                    {"installment_id": row["id"], "due_date": row["due_date"], "shown_at": now.isoformat()}
+                    for row in due
+                ])
+
+        next_at = None
+        if next_due:
+            try:
+                enters_window = date.fromisoformat(next_due) - timedelta(days=REMINDER_DAYS_BEFORE)
+            except ValueError:
+                enters_window = today
+            next_at = datetime.combine(enters_window, time(REMINDER_HOUR))
+        return due, next_at
+
+    def _on_collected(self, result: Tuple[List[dict], Optional[datetime]]) -> None:
+        due, self.next_at = result
+        if due:
+            self._notify(due)
+        # Без будущих платежей таймер всё равно раз в сутки перепроверяет (смена даты)
+        delay_ms = MAX_TIMER_MS
+        if self.next_at is not None:
+            delay_ms = min(MAX_TIMER_MS, max(0, int((self.next_at - datetime.now()).total_seconds() * 1000)))
+        self.timer.start(delay_ms)
+
+    def _notify(self, due: List[dict]) -> None:
+        if len(due) == 1:
+            title = "Скоро срок платежа по кредиту"
+        else:
+            title = f"Скоро срок платежей по кредитам: {len(due)}"
+        lines = [
+            f"{row['org_name'] or row['website']}: {row['amount']:.2f} до {row['due_date']} "
+            f"(осталось дней: {self._days_until(row['due_date'])})"
+            for row in due[:MAX_LISTED]
+        ]
+        if len(due) > MAX_LISTED:
+            lines.append(f"и ещё {len(due) - MAX_LISTED}")
+        self.tray.showMessage(title, "\n".join(lines), QSystemTrayIcon.MessageIcon.Information, 15000)
 
     @staticmethod
     def _days_until(date_iso: str) -> int:
@@ -101,7 +101,7 @@ def get_due_soon_loans(days_before: int = 7) -> List[Loan]:
         rows = conn.execute(
             """
             SELECT * FROM loans
-            WHERE date(due_date) BETWEEN date(?) AND date(?)
+            WHERE due_date BETWEEN ? AND ?
               AND reminded_pre_due = 0
             ORDER BY due_date ASC
             """,
@@ -5,9 +5,9 @@
 
 from __future__ import annotations
 from datetime import date, datetime
-from typing import List, Optional
+from typing import Callable, List, Optional
 from sqlalchemy.orm import Session
-from sqlalchemy import func, select
+from sqlalchemy import case, func, select
 
 from .db_sa import get_session
 from .models_sa import LoanORM, InstallmentORM
@@ -16,47 +16,44 @@ from .models_sa import LoanORM, InstallmentORM
 class LoanRepositorySA:
     """Репозиторий для работы с кредитами через SQLAlchemy."""
     
+    def __init__(self, session_scope: Callable = get_session):
+        # session_scope - контекстный менеджер сессии (сервер или локальная копия)
+        self._session_scope = session_scope
+    
     def get_all_loans(self) -> List[dict]:
-        """Получить все кредиты с обогащенной информацией."""
-        with get_session() as session:
-            loans = session.execute(select(LoanORM)).scalars().all()
+        """Получить все кредиты с обогащенной информацией (один запрос)."""
+        unpaid = InstallmentORM.paid == 0
+        totals = select(
+            InstallmentORM.loan_id.label("loan_id"),
+            func.coalesce(func.sum(case((unpaid, InstallmentORM.amount), else_=0.0)), 0.0).label("remaining"),
+            func.coalesce(func.sum(InstallmentORM.amount), 0.0).label("total_due"),
+            func.max(InstallmentORM.due_date).label("last_date"),
+        ).group_by(InstallmentORM.loan_id).subquery()
+        
+        # Ближайший неоплаченный платеж каждого кредита
+        ranked = select(
+            InstallmentORM.loan_id.label("loan_id"),
+            InstallmentORM.due_date.label("next_date"),
+            InstallmentORM.amount.label("next_amount"),
+            func.row_number().over(
+                partition_by=InstallmentORM.loan_id,
+                order_by=(InstallmentORM.due_date.asc(), InstallmentORM.id.asc()),
+            ).label("rn"),
+        ).where(unpaid).subquery()
+        
+        query = select(
+            LoanORM, totals.c.remaining, totals.c.total_due, totals.c.last_date,
+            ranked.c.next_date, ranked.c.next_amount,
+        ).outerjoin(
+            totals, totals.c.loan_id == LoanORM.id
+        ).outerjoin(
+            ranked, (ranked.c.loan_id == LoanORM.id) & (ranked.c.rn == 1)
+        )
+        
+        with self._session_scope() as session:
             enriched = []
-            
-            for loan in loans:
-                # Получаем информацию о платежах
-                unpaid_total = session.execute(
-                    select(func.coalesce(func.sum(InstallmentORM.amount), 0.0)).where(
-                        InstallmentORM.loan_id == loan.id, InstallmentORM.paid == 0
-                    )
-                ).scalar_one()
-                
-                derived_paid = unpaid_total == 0
-                
-                # Ближайший неоплаченный платеж
-                next_row = None if derived_paid else session.execute(
-                    select(InstallmentORM).where(
-                        InstallmentORM.loan_id == loan.id, 
-                        InstallmentORM.paid == 0
-                    ).order_by(
-                        InstallmentORM.due_date.asc(), 
-                        InstallmentORM.id.asc()
-                    ).limit(1)
-                ).scalar_one_or_none()
-                
-                # Последняя дата платежа
-                last_date = session.execute(
-                    select(func.max(InstallmentORM.due_date)).where(
-                        InstallmentORM.loan_id == loan.id
-                    )
-                ).scalar_one()
-                
-                # Общая сумма к возврату
-                total_due = session.execute(
-                    select(func.coalesce(func.sum(InstallmentORM.amount), 0.0)).where(
-                        InstallmentORM.loan_id == loan.id
-                    )
-                ).scalar_one()
-                
+            for loan, remaining, total_due, last_date, next_date, next_amount in session.execute(query):
+                remaining = float(remaining or 0.0)
                 enriched.append({
                     "id": loan.id,
                     "org_name": loan.org_name,
@@ -70,10 +67,10 @@ class LoanRepositorySA:
                     "payment_methods": loan.payment_methods,
                     "reminded_pre_due": bool(loan.reminded_pre_due),
                     "created_at": loan.created_at,
-                    "is_paid": derived_paid,
-                    "next_date": next_row.due_date if next_row else None,
-                    "next_amount": next_row.amount if next_row else None,
-                    "remaining": float(unpaid_total or 0.0),
+                    "is_paid": remaining == 0,
+                    "next_date": next_date,
+                    "next_amount": next_amount,
+                    "remaining": remaining,
                     "last_date": last_date,
                 })
             
@@ -81,7 +78,7 @@ class LoanRepositorySA:
     
     def get_loan_by_id(self, loan_id: int) -> Optional[dict]:
         """Получить кредит по ID."""
-        with get_session() as session:
+        with self._session_scope() as session:
             loan = session.get(LoanORM, loan_id)
             if not loan:
                 return None
@@ -114,7 +111,7 @@ class LoanRepositorySA:
     
     def create_loan(self, loan_data: dict) -> int:
         """Создать новый кредит."""
-        with get_session() as session:
+        with self._session_scope() as session:
             loan = LoanORM(
                 org_name=loan_data["org_name"],
                 website=loan_data["website"],
@@ -135,7 +132,7 @@ class LoanRepositorySA:
     
     def update_loan(self, loan_id: int, loan_data: dict) -> bool:
         """Обновить кредит."""
-        with get_session() as session:
+        with self._session_scope() as session:
             loan = session.get(LoanORM, loan_id)
             if not loan:
                 return False
@@ -153,7 +150,7 @@ class LoanRepositorySA:
     
     def delete_loan(self, loan_id: int) -> bool:
         """Удалить кредит."""
-        with get_session() as session:
+        with self._session_scope() as session:
             loan = session.get(LoanORM, loan_id)
             if not loan:
                 return False
@@ -165,9 +162,12 @@ class LoanRepositorySA:
 class InstallmentRepositorySA:
     """Репозиторий для работы с платежами через SQLAlchemy."""
     
+    def __init__(self, session_scope: Callable = get_session):
+        self._session_scope = session_scope
+    
     def get_installments_by_loan_id(self, loan_id: int) -> List[dict]:
         """Получить все платежи по ID кредита."""
-        with get_session() as session:
+        with self._session_scope() as session:
             installments = session.execute(
                 select(InstallmentORM).where(
                     InstallmentORM.loan_id == loan_id
@@ -192,7 +192,7 @@ class InstallmentRepositorySA:
     
     def create_installment(self, installment_data: dict) -> int:
         """Создать новый платеж."""
-        with get_session() as session:
+        with self._session_scope() as session:
             installment = InstallmentORM(
                 loan_id=installment_data["loan_id"],
                 due_date=installment_data["due_date"],
@@ -211,7 +211,7 @@ class InstallmentRepositorySA:
     
     def update_installment(self, installment_id: int, installment_data: dict) -> bool:
         """Обновить платеж."""
-        with get_session() as session:
+        with self._session_scope() as session:
             installment = session.get(InstallmentORM, installment_id)
             if not installment:
                 return False
@@ -226,7 +226,7 @@ class InstallmentRepositorySA:
     
     def toggle_installment_paid(self, installment_id: int, paid: bool) -> bool:
         """Переключить статус оплаты платежа."""
-        with get_session() as session:
+        with self._session_scope() as session:
             installment = session.get(InstallmentORM, installment_id)
             if not installment:
                 return False
@@ -241,7 +241,7 @@ class InstallmentRepositorySA:
     
     def delete_installment(self, installment_id: int) -> bool:
         """Удалить платеж."""
-        with get_session() as session:
+        with self._session_scope() as session:
             installment = session.get(InstallmentORM, installment_id)
             if not installment:
                 return False
@@ -0,0 +1,190 @@
+"""
+График платежей для займов в рассрочку (loan_type='installment')
+
+Методы:
+- annuity: равные платежи; проценты - на остаток долга;
+- differentiated: равные доли основного долга, проценты - на остаток,
+  платежи убывают;
+- equal_principal: равные доли основного долга, проценты - на исходную
+  сумму (фиксированная переплата, как в рассрочке МФО), платежи равные.
+
+Все суммы - Decimal с округлением до копеек (ROUND_HALF_UP); копеечный
+остаток округлений уходит в последний платёж, так что основной долг по
+графику в точности равен сумме займа. Для differentiated и equal_principal
+остатки и проценты считаются сразу по всем периодам в закрытой форме; в
+аннуитете остаток рекуррентен (проценты каждого месяца округляются), это
+один проход по периодам. Аннуитетный платёж пересчитывается каждый период
+по остатку долга и оставшемуся сроку: ошибка округления не растёт как
+(1 + i)^n (при ставках МФО и длинных сроках последний платёж иначе уходил
+в минус), платежи совпадают с точностью до копеек, ни один не отрицателен.
+
+Ставка - годовая, в процентах (LoanORM.interest_rate); платежи ежемесячные,
+первый - в дату start, следующие - в тот же день месяца (31 января ->
+28/29 февраля -> 31 марта).
+"""
+from datetime import date
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+from functools import lru_cache
+from typing import List, NamedTuple, Tuple
+
+from sqlalchemy import delete, func, insert, select
+
+from app.forecast import add_months
+from app.models_sa import InstallmentORM, LoanORM
+
+METHODS = ("annuity", "differentiated", "equal_principal")
+MAX_TERM_MONTHS = 600
+MAX_PRINCIPAL = Decimal("1000000000")
+MAX_RATE = Decimal("1000")
+# Разные наборы параметров предпросмотра, которые помнит процесс
+PREVIEW_CACHE_SIZE = 256
+
+CENT = Decimal("0.01")
+
+
+class SchedulePeriod(NamedTuple):
+    number: int
+    due_date: str  # YYYY-MM-DD
+    payment: Decimal
+    principal: Decimal
+    interest: Decimal
+    balance: Decimal  # остаток основного долга после платежа
+
+
+def _cents(value: Decimal) -> Decimal:
+    return value.quantize(CENT, rounding=ROUND_HALF_UP)
+
+
+def parse_params(data) -> Tuple[Decimal, Decimal, int, date, str]:
+    """
+    Параметры графика из формы/JSON: principal, rate, term, start, method
+    Raises: ValueError с понятным пользователю сообщением
+    """
+    try:
+        principal = Decimal(str(data.get("principal", "")))
+        rate = Decimal(str(data.get("rate", 0) or 0))
+        term = int(data.get("term", 0))
+        # NaN/Infinity: сравнение NaN с границами ниже бросило бы InvalidOperation (500)
+        if not (principal.is_finite() and rate.is_finite()):
+            raise ValueError
+        principal = _cents(principal)
+    except (InvalidOperation, TypeError, ValueError):
+        raise ValueError("Сумма, ставка и срок должны быть числами")
+    try:
+        start = date.fromisoformat(str(data.get("start", "")))
+    except ValueError:
+        raise ValueError("Дата первого платежа должна быть в формате ГГГГ-ММ-ДД")
+    method = data.get("method", "annuity")
+
+    if not (Decimal(0) < principal <= MAX_PRINCIPAL):
+        raise ValueError("Сумма должна быть больше нуля")
+    if not (Decimal(0) <= rate <= MAX_RATE):
+        raise ValueError(f"Ставка должна быть от 0 до {MAX_RATE}% годовых")
+    if not (1 <= term <= MAX_TERM_MONTHS):
+        raise ValueError(f"Срок должен быть от 1 до {MAX_TERM_MONTHS} месяцев")
+    if method not in METHODS:
+        raise ValueError(f"Метод должен быть одним из: {', '.join(METHODS)}")
+    return principal, rate, term, start, method
+
+
+def _equal_parts(principal: Decimal, term: int) -> List[Decimal]:
+    """Равные доли основного долга; остаток округления - в последней"""
+    part = _cents(principal / term)
+    return [part] * (term - 1) + [principal - part * (term - 1)]
+
+
+@lru_cache(maxsize=PREVIEW_CACHE_SIZE)
+def generate_schedule(principal: Decimal, rate: Decimal, term: int, start: date,
+                      method: str = "annuity") -> Tuple[SchedulePeriod, ...]:
+    """
+    График платежей (мемоизирован: одинаковые параметры считаются один раз)
+    Параметры - как после parse_params; результат неизменяемый
+    """
+    monthly = rate / 1200
+    dates = [add_months(start, k).isoformat() for k in range(term)]
+
+    if method == "annuity" and monthly:
+        # discounts[r] = (1 + monthly) ** -r - для платежа по остатку на r периодов
+        discounts, factor = [Decimal(1)], 1 / (1 + monthly)
+        for _ in range(term):
+            discounts.append(discounts[-1] * factor)
+        principals, interests = [], []
+        balance = principal
+        for k in range(term - 1):
+            interest = _cents(balance * monthly)
+            # Платёж не меньше процентов: округление монотонно, а balance * monthly / (1 - d) >= balance * monthly
+            payment = _cents(balance * monthly / (1 - discounts[term - k]))
+            principals.append(payment - interest)
+            interests.append(interest)
+            balance -= payment - interest
+        # Последний платёж закрывает остаток целиком
+        principals.append(balance)
+        interests.append(_cents(balance * monthly))
+    else:
+        # Без процентов аннуитет совпадает с равными долями
+        principals = _equal_parts(principal, term)
+        if method == "equal_principal":
+            interests = [_cents(principal * monthly)] * term
+        else:
+            # Остаток до k-го платежа: principal - k * доля (доли равны, кроме последней)
+            part = principals[0]
+            interests = [_cents((principal - part * k) * monthly) for k in range(term)]
+
+    balances, balance = [], principal
+    for part in principals:
+        balance -= part
+        balances.append(balance)
+
+    return tuple(
+        SchedulePeriod(k + 1, dates[k], principals[k] + interests[k], principals[k], interests[k], balances[k])
+        for k in range(term)
+    )
+
+
+def schedule_to_json(schedule: Tuple[SchedulePeriod, ...]) -> dict:
+    """Предпросмотр для JS: периоды и итоги (суммы - числа с копейками)"""
+    periods = [
+        {
+            "number": p.number,
+            "due_date": p.due_date,
+            "amount": float(p.payment),
+            "principal": float(p.principal),
+            "interest": float(p.interest),
+            "balance": float(p.balance),
+        }
+        for p in schedule
+    ]
+    return {
+        "periods": periods,
+        "total": float(sum(p.payment for p in schedule)),
+        "overpayment": float(sum(p.interest for p in schedule)),
+    }
+
+
+def save_schedule(session, loan: LoanORM, schedule: Tuple[SchedulePeriod, ...], rate: Decimal) -> int:
+    """
+    Заменить неоплаченные платежи займа графиком (оплаченные остаются)
+    Строки вставляются одним массовым INSERT мимо unit of work.
+    Returns: число вставленных платежей
+    """
+    from app.data_version import mark_changed
+
+    now = date.today().isoformat()
+    session.execute(delete(InstallmentORM).where(InstallmentORM.loan_id == loan.id, InstallmentORM.paid == 0))
+    session.execute(insert(InstallmentORM), [
+        {"loan_id": loan.id, "due_date": p.due_date, "amount": float(p.payment), "paid": 0,
+         "paid_date": None, "created_at": now}
+        for p in schedule
+    ])
+    mark_changed(session, [loan.user_id])
+
+    paid_total, last_paid = session.execute(
+        select(func.coalesce(func.sum(InstallmentORM.amount), 0.0), func.max(InstallmentORM.due_date))
+        .where(InstallmentORM.loan_id == loan.id, InstallmentORM.paid == 1)
+    ).one()
+    loan.loan_type = "installment"
+    loan.interest_rate = float(rate)
+    loan.amount_due = float(paid_total or 0.0) + float(sum(p.payment for p in schedule))
+    loan.due_date = max(schedule[-1].due_date, last_paid or "")
+    loan.is_paid = 0
+    return len(schedule)
@@ -0,0 +1,202 @@
+"""
+Полнотекстовый поиск по задачам, подзадачам и займам
+
+PostgreSQL: генерируемые колонки search_vector (tsvector, словарь 'russian')
+и GIN индексы, ранжирование ts_rank_cd.
+SQLite: FTS5 таблицы с внешним содержимым (tasks_fts, subtasks_fts,
+loans_fts), синхронизируются триггерами, ранжирование bm25. Русская
+морфология приближается отсечением окончаний + префиксным поиском.
+
+Схема создаётся ensure_search_schema() из команды миграции (app.db_sa.create_schema).
+"""
+import re
+from typing import Dict, List, Sequence
+
+from sqlalchemy import bindparam, text
+from sqlalchemy.engine import Engine
+
+MAX_QUERY_TERMS = 8
+MIN_STEM_LENGTH = 3
+
+# ==================== СХЕМА ====================
+
+_PG_SCHEMA = [
+    """ALTER TABLE tasks ADD COLUMN IF NOT EXISTS search_vector tsvector
+       GENERATED ALWAYS AS (
+           setweight(to_tsvector('russian', coalesce(title, '')), 'A') ||
+           setweight(to_tsvector('russian', coalesce(description, '')), 'B')
+       ) STORED""",
+    "CREATE INDEX IF NOT EXISTS ix_tasks_search_vector ON tasks USING GIN (search_vector)",
+    """ALTER TABLE subtasks ADD COLUMN IF NOT EXISTS search_vector tsvector
+       GENERATED ALWAYS AS (to_tsvector('russian', coalesce(title, ''))) STORED""",
+    "CREATE INDEX IF NOT EXISTS ix_subtasks_search_vector ON subtasks USING GIN (search_vector)",
+    """ALTER TABLE loans ADD COLUMN IF NOT EXISTS search_vector tsvector
+       GENERATED ALWAYS AS (
+           setweight(to_tsvector('russian', coalesce(org_name, '')), 'A') ||
+           setweight(to_tsvector('simple', coalesce(website, '')), 'B') ||
+           setweight(to_tsvector('russian', coalesce(notes, '')), 'C')
+       ) STORED""",
+    "CREATE INDEX IF NOT EXISTS ix_loans_search_vector ON loans USING GIN (search_vector)",
+]
+
+# таблица -> индексируемые колонки
+_FTS_TABLES = {
+    "tasks": ("title", "description"),
+    "subtasks": ("title",),
+    "loans": ("org_name", "website", "notes"),
+}
+
+
+def _sqlite_schema() -> List[str]:
+    statements = []
+    for table, columns in _FTS_TABLES.items():
+        fts = f"{table}_fts"
+        cols = ", ".join(columns)
+        new_values = ", ".join(f"new.{c}" for c in columns)
+        old_values = ", ".join(f"old.{c}" for c in columns)
+        statements += [
+            f"""CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5(
+                    {cols}, content='{table}', content_rowid='id',
+                    tokenize='unicode61 remove_diacritics 2')""",
+            f"""CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {table} BEGIN
+                    INSERT INTO {fts}(rowid, {cols}) VALUES (new.id, {new_values});
+                END""",
+            f"""CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {table} BEGIN
+                    INSERT INTO {fts}({fts}, rowid, {cols}) VALUES ('delete', old.id, {old_values});
+                END""",
+            f"""CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF {cols} ON {table} BEGIN
+                    INSERT INTO {fts}({fts}, rowid, {cols}) VALUES ('delete', old.id, {old_values});
+                    INSERT INTO {fts}(rowid, {cols}) VALUES (new.id, {new_values});
+                END""",
+            # Переиндексация существующих строк (идемпотентно)
+            f"INSERT INTO {fts}({fts}) VALUES ('rebuild')",
+        ]
+    return statements
+
+
+def ensure_search_schema(engine: Engine) -> None:
+    """Создать колонки/индексы (PostgreSQL) или FTS5 таблицы и триггеры (SQLite)"""
+    statements = _sqlite_schema() if engine.dialect.name == "sqlite" else _PG_SCHEMA
+    with engine.begin() as conn:
+        for statement in statements:
+            conn.exec_driver_sql(statement)
+
+
+# ==================== РАЗБОР ЗАПРОСА ====================
+
+# Окончания русских слов, от длинных к коротким (упрощённый Snowball)
+_RU_ENDINGS = sorted("""
+    иями ями ами ией иям ием ях ах ов ев ей ом ем ам ям ой ий ый ая яя ое ее ые ие
+    ого его ому ему ими ыми ую юю ия ья ию ью иться ться ить ать ять еть уть ешь ет
+    ем ут ют ит ат ят ил ыл ла ло ли ны на но ен ан ость ости а я о е ы и у ю ь й
+""".split(), key=len, reverse=True)
+
+
+def _stem_ru(word: str) -> str:
+    """Грубое отсечение окончания: 'кредитами' -> 'кредит'"""
+    if not re.search("[а-яё]", word):
+        return word
+    for ending in _RU_ENDINGS:
+        if word.endswith(ending) and len(word) - len(ending) >= MIN_STEM_LENGTH:
+            return word[:-len(ending)]
+    return word
+
+
+def parse_terms(query: str) -> List[str]:
+    """Слова запроса в нижнем регистре (без операторов и пунктуации)"""
+    return re.findall(r"\w+", (query or "").lower())[:MAX_QUERY_TERMS]
+
+
+def _pg_tsquery(terms: Sequence[str]) -> str:
+    # Каждое слово - префикс; словарь 'russian' сам приводит его к основе
+    return " & ".join(f"{term}:*" for term in terms)
+
+
+def _fts5_match(terms: Sequence[str]) -> str:
+    return " ".join(f'"{_stem_ru(term)}"*' for term in terms)
+
+
+# ==================== ПОИСК ====================
+
+_PG_SEARCH = """
+    WITH q AS (
+        SELECT to_tsquery('russian', :tsquery) AS query,
+               to_tsquery('simple', :tsquery) AS simple_query
+    )
+    SELECT kind, id, task_id, title, rank FROM (
+        SELECT 'task' AS kind, t.id, t.id AS task_id, t.title,
+               ts_rank_cd(t.search_vector, q.query) AS rank
+        FROM tasks t CROSS JOIN q
+        WHERE t.user_id = :user_id AND t.search_vector @@ q.query
+        UNION ALL
+        SELECT 'subtask', s.id, s.task_id, s.title,
+               ts_rank_cd(s.search_vector, q.query)
+        FROM subtasks s JOIN tasks t ON t.id = s.task_id CROSS JOIN q
+        WHERE t.user_id = :user_id AND s.search_vector @@ q.query
+        UNION ALL
+        SELECT 'loan', l.id, NULL, coalesce(l.org_name, l.website),
+               ts_rank_cd(l.search_vector, q.query || q.simple_query)
+        FROM loans l CROSS JOIN q
+        WHERE l.user_id = :user_id AND l.search_vector @@ (q.query || q.simple_query)
+    ) hits
+    WHERE kind IN :kinds
+    ORDER BY rank DESC, kind, id
+    LIMIT :limit OFFSET :offset
+"""
+
+_SQLITE_SEARCH = """
+    SELECT kind, id, task_id, title, rank FROM (
+        SELECT 'task' AS kind, t.id AS id, t.id AS task_id, t.title AS title,
+               -bm25(tasks_fts, 10.0, 4.0) AS rank
+        FROM tasks_fts JOIN tasks t ON t.id = tasks_fts.rowid
+        WHERE tasks_fts MATCH :match AND t.user_id = :user_id
+        UNION ALL
+        SELECT 'subtask', s.id, s.task_id, s.title,
+               -bm25(subtasks_fts)
+        FROM subtasks_fts JOIN subtasks s ON s.id = subtasks_fts.rowid
+             JOIN tasks t ON t.id = s.task_id
+        WHERE subtasks_fts MATCH :match AND t.user_id = :user_id
+        UNION ALL
+        SELECT 'loan', l.id, NULL, coalesce(l.org_name, l.website),
+               -bm25(loans_fts, 10.0, 4.0, 1.0)
+        FROM loans_fts JOIN loans l ON l.id = loans_fts.rowid
+        WHERE loans_fts MATCH :match AND l.user_id = :user_id
+    )
+    WHERE kind IN :kinds
+    ORDER BY rank DESC, kind, id
+    LIMIT :limit OFFSET :offset
+"""
+
+ALL_KINDS = ("task", "subtask", "loan")
+
+
+def search(session, user_id: int, query: str, kinds: Sequence[str] = ALL_KINDS,
+           limit: int = 20, offset: int = 0) -> List[Dict]:
+    """
+    Ранжированный поиск по данным пользователя
+    Returns: [{'kind', 'id', 'task_id', 'title', 'rank'}, ...] от лучших к худшим
+    """
+    terms = parse_terms(query)
+    kinds = tuple(k for k in kinds if k in ALL_KINDS)
+    if not terms or not kinds:
+        return []
+
+    params = {"user_id": user_id, "kinds": kinds, "limit": limit, "offset": offset}
+    if session.get_bind().dialect.name == "sqlite":
+        sql = _SQLITE_SEARCH
+        params["match"] = _fts5_match(terms)
+    else:
+        sql = _PG_SEARCH
+        params["tsquery"] = _pg_tsquery(terms)
+
+    stmt = text(sql).bindparams(bindparam("kinds", expanding=True))
+    return [
+        {"kind": row.kind, "id": row.id, "task_id": row.task_id, "title": row.title, "rank": float(row.rank)}
+        for row in session.execute(stmt, params)
+    ]
+
+
+def search_loan_ids(session, user_id: int, query: str, limit: int = 1000) -> List[int]:
+    """id займов пользователя, подходящих под запрос (по релевантности)"""
+    return [hit["id"] for hit in search(session, user_id, query, kinds=("loan",), limit=limit)]
+
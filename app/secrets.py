@@ -83,6 +83,8 @@ AUTH_PASSWORD = get_secret("AUTH_PASSWORD")
 # === TELEGRAM ===
 TELEGRAM_BOT_TOKEN = get_secret("TELEGRAM_BOT_TOKEN")
 TELEGRAM_CHAT_ID = get_secret("TELEGRAM_CHAT_ID")
+# Секрет webhook: Telegram присылает его в заголовке X-Telegram-Bot-Api-Secret-Token
+TELEGRAM_WEBHOOK_SECRET = get_secret("TELEGRAM_WEBHOOK_SECRET", "")
 
 
 # === YANDEX.DISK ===
@@ -100,6 +102,8 @@ SMTP_HOST = get_secret("SMTP_HOST", "smtp.yandex.ru")
 SMTP_PORT = int(get_secret("SMTP_PORT", "587"))
 SMTP_USER = get_secret("SMTP_USER", "")
 SMTP_PASSWORD = get_secret("SMTP_PASSWORD", "")
+# Отключать только для локального тестового сервера: без TLS пароль идёт открытым текстом
+SMTP_STARTTLS = get_secret("SMTP_STARTTLS", "1").lower() in ("1", "true", "yes")
 EMAIL_FROM = get_secret("EMAIL_FROM", "noreply@mikrokredit.local")
 EMAIL_NAME = get_secret("EMAIL_NAME", "МикроКредит")
 
@@ -0,0 +1,343 @@
+"""
+Серверные сессии пользователей (таблица user_sessions)
+
+Cookie Flask хранит только user_id и session_token; сама сессия живёт в БД,
+поэтому её можно отозвать и показать пользователю список устройств.
+
+- Проверка сессии на каждом запросе - попадание в кэш (Redis, иначе
+  небольшой LRU в памяти процесса); в БД идём только при промахе.
+- last_activity_at не пишется на каждый запрос: отметки копятся в памяти
+  и сбрасываются одной пачкой не чаще раза в ACTIVITY_FLUSH_MINUTES;
+  тем же UPDATE срок сессии продлевается до активности + SESSION_LIFETIME_DAYS
+  (скользящий срок: активного пользователя не выкидывает через 30 дней).
+- Истёкшие сессии удаляются одним DELETE (по индексу ix_user_sessions_expires_at)
+  не чаще раза в SWEEP_INTERVAL_MINUTES.
+"""
+import atexit
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from app.config import PROJECT_NAME
+from app.integration import get_redis, is_connection_error, mark_redis_down
+
+SESSION_LIFETIME_DAYS = 30
+ACTIVITY_FLUSH_MINUTES = 5
+SWEEP_INTERVAL_MINUTES = 60
+
+# Redis: сколько держать запись сессии в кэше (отзыв удаляет ключ сразу)
+CACHE_TTL_SECONDS = 3600
+# Локальный кэш не видит отзыв в других workers - держим его недолго
+LOCAL_CACHE_TTL_SECONDS = 60
+LOCAL_CACHE_MAX_ENTRIES = 10000
+
+CACHE_PREFIX = f"{PROJECT_NAME}:session"
+
+_local_cache: "OrderedDict[str, tuple]" = OrderedDict()  # token -> (user_id, expires_at, cached_until)
+_local_lock = threading.Lock()
+
+_pending_activity: Dict[str, str] = {}  # token -> last_activity_at
+_pending_lock = threading.Lock()
+_last_flush = time.monotonic()
+_last_sweep = 0.0
+
+
+# ==================== КЭШ ====================
+
+def _cache_get(token: str) -> Optional[tuple]:
+    """Returns: (user_id, expires_at) или None при промахе"""
+    client = get_redis()
+    if client is not None:
+        try:
+            value = client.get(f"{CACHE_PREFIX}:{token}")
+            if value is None:
+                return None
+            user_id, expires_at = value.split("|", 1)
+            return int(user_id), expires_at
+        except Exception as e:
+            if is_connection_error(e):
+                mark_redis_down()
+            else:
+                return None
+
+    with _local_lock:
+        entry = _local_cache.get(token)
+        if entry is None:
+            return None
+        if entry[2] < time.monotonic():
+            del _local_cache[token]
+            return None
+        _local_cache.move_to_end(token)
+        return entry[0], entry[1]
+
+
+def _cache_set(token: str, user_id: int, expires_at: str) -> None:
+    client = get_redis()
+    if client is not None:
+        try:
+            client.setex(f"{CACHE_PREFIX}:{token}", CACHE_TTL_SECONDS, f"{user_id}|{expires_at}")
+            return
+        except Exception as e:
+            if is_connection_error(e):
+                mark_redis_down()
+
+    with _local_lock:
+        _local_cache[token] = (user_id, expires_at, time.monotonic() + LOCAL_CACHE_TTL_SECONDS)
+        _local_cache.move_to_end(token)
+        while len(_local_cache) > LOCAL_CACHE_MAX_ENTRIES:
+            _local_cache.popitem(last=False)
+
+
+def _cache_delete(tokens: List[str]) -> None:
+    if not tokens:
+        return
+    client = get_redis()
+    if client is not None:
+        try:
+            client.delete(*[f"{CACHE_PREFIX}:{token}" for token in tokens])
+        except Exception as e:
+            if is_connection_error(e):
+                mark_redis_down()
+
+    with _local_lock:
+        for token in tokens:
+            _local_cache.pop(token, None)
+
+
+# ==================== СЕССИИ ====================
+
+def create_session(user_id: int, ip_address: str = None, user_agent: str = None) -> str:
+    """
+    Создать серверную сессию
+    Returns: session_token для cookie
+    """
+    from app.db_sa import get_session
+    from app.models_sa import UserSessionORM
+
+    token = secrets.token_urlsafe(32)
+    now = datetime.now()
+    expires_at = (now + timedelta(days=SESSION_LIFETIME_DAYS)).isoformat()
+
+    with get_session() as db:
+        db.add(UserSessionORM(
+            user_id=user_id,
+            session_token=token,
+            ip_address=ip_address,
+            user_agent=(user_agent or "")[:500] or None,
+            created_at=now.isoformat(),
+            last_activity_at=now.isoformat(),
+            expires_at=expires_at,
+        ))
+
+    _cache_set(token, user_id, expires_at)
+    return token
+
+
+def _load_session(token: str) -> Optional[tuple]:
+    """Returns: (user_id, expires_at) из БД или None, если сессии нет"""
+    from app.db_sa import get_session
+    from app.models_sa import UserSessionORM
+
+    with get_session() as db:
+        row = db.query(UserSessionORM.user_id, UserSessionORM.expires_at).filter_by(
+            session_token=token
+        ).first()
+    return None if row is None else (row.user_id, row.expires_at)
+
+
+def validate_session(token: str) -> Optional[int]:
+    """
+    Проверить сессию и отметить активность
+    Returns: user_id если сессия действительна, иначе None
+    """
+    if not token:
+        return None
+
+    cached = _cache_get(token)
+    if cached is None:
+        cached = _load_session(token)
+        if cached is None:
+            return None
+        _cache_set(token, *cached)
+
+    user_id, expires_at = cached
+    now = datetime.now().isoformat()
+    if expires_at <= now:
+        # В кэше мог остаться срок до продления (flush_activity) - проверяем по БД
+        row = _load_session(token)
+        if row is None or row[1] <= now:
+            return None
+        user_id, expires_at = row
+        _cache_set(token, user_id, expires_at)
+
+    touch_session(token, now)
+    return user_id
+
+
+def touch_session(token: str, when: str = None) -> None:
+    """Отметить активность сессии (в буфер; в БД - пачкой, см. flush_activity)"""
+    with _pending_lock:
+        _pending_activity[token] = when or datetime.now().isoformat()
+    if time.monotonic() - _last_flush >= ACTIVITY_FLUSH_MINUTES * 60:
+        try:
+            flush_activity()
+        except Exception as e:
+            # Отметка активности не должна ломать запрос
+            print(f"⚠️  Session activity flush failed: {e}")
+
+
+def flush_activity() -> int:
+    """
+    Записать накопленные отметки last_activity_at одним пакетным UPDATE
+    и продлить сессии: expires_at = активность + SESSION_LIFETIME_DAYS
+    Returns: количество обновлённых сессий
+    """
+    global _last_flush
+    from sqlalchemy import bindparam, update
+    from app.db_sa import get_session
+    from app.models_sa import UserSessionORM
+
+    with _pending_lock:
+        _last_flush = time.monotonic()
+        pending = list(_pending_activity.items())
+        _pending_activity.clear()
+
+    if pending:
+        stmt = (
+            update(UserSessionORM)
+            .where(UserSessionORM.session_token == bindparam("token"))
+            .values(last_activity_at=bindparam("activity"), expires_at=bindparam("expires"))
+            .execution_options(synchronize_session=False)
+        )
+        lifetime = timedelta(days=SESSION_LIFETIME_DAYS)
+        with get_session() as db:
+            db.connection().execute(stmt, [
+                {"token": t, "activity": a, "expires": (datetime.fromisoformat(a) + lifetime).isoformat()}
+                for t, a in pending
+            ])
+
+    if time.monotonic() - _last_sweep >= SWEEP_INTERVAL_MINUTES * 60:
+        sweep_expired_sessions()
+
+    return len(pending)
+
+
+def sweep_expired_sessions() -> int:
+    """
+    Удалить все истёкшие сессии одним запросом
+    Returns: количество удалённых
+    """
+    global _last_sweep
+    from sqlalchemy import delete
+    from app.db_sa import get_session
+    from app.models_sa import UserSessionORM
+
+    _last_sweep = time.monotonic()
+    with get_session() as db:
+        result = db.execute(
+            delete(UserSessionORM)
+            .where(UserSessionORM.expires_at < datetime.now().isoformat())
+            .execution_options(synchronize_session=False)
+        )
+        return result.rowcount or 0
+
+
+def revoke_session(token: str) -> None:
+    """Отозвать сессию (выход)"""
+    revoke_sessions([token])
+
+
+def revoke_sessions(tokens: List[str], user_id: int = None) -> int:
+    """
+    Отозвать несколько сессий (при user_id - только сессии этого пользователя)
+    Returns: количество удалённых
+    """
+    from sqlalchemy import delete
+    from app.db_sa import get_session
+    from app.models_sa import UserSessionORM
+
+    tokens = [t for t in tokens if t]
+    if not tokens:
+        return 0
+
+    stmt = delete(UserSessionORM).where(UserSessionORM.session_token.in_(tokens))
+    if user_id is not None:
+        stmt = stmt.where(UserSessionORM.user_id == user_id)
+
+    with get_session() as db:
+        deleted = db.execute(stmt.execution_options(synchronize_session=False)).rowcount or 0
+
+    _cache_delete(tokens)
+    with _pending_lock:
+        for token in tokens:
+            _pending_activity.pop(token, None)
+    return deleted
+
+
+def revoke_user_sessions(user_id: int, except_token: str = None) -> int:
+    """Отозвать все сессии пользователя, кроме текущей (после смены пароля)"""
+    from app.db_sa import get_session
+    from app.models_sa import UserSessionORM
+
+    with get_session() as db:
+        query = db.query(UserSessionORM.session_token).filter_by(user_id=user_id)
+        if except_token:
+            query = query.filter(UserSessionORM.session_token != except_token)
+        tokens = [row.session_token for row in query]
+
+    return revoke_sessions(tokens, user_id=user_id)
+
+
+def revoke_session_by_id(user_id: int, session_id: int) -> bool:
+    """Отозвать сессию пользователя по id строки (кнопка на странице безопасности)"""
+    from app.db_sa import get_session
+    from app.models_sa import UserSessionORM
+
+    with get_session() as db:
+        token = db.query(UserSessionORM.session_token).filter_by(id=session_id, user_id=user_id).scalar()
+
+    return bool(token) and revoke_sessions([token], user_id=user_id) > 0
+
+
+def list_user_sessions(user_id: int, current_token: str = None) -> List[dict]:
+    """Активные сессии пользователя (устройства) для страницы безопасности"""
+    from app.db_sa import get_session
+    from app.models_sa import UserSessionORM
+
+    with get_session() as db:
+        rows = db.query(
+            UserSessionORM.id, UserSessionORM.session_token, UserSessionORM.ip_address,
+            UserSessionORM.user_agent, UserSessionORM.created_at, UserSessionORM.last_activity_at,
+        ).filter(
+            UserSessionORM.user_id == user_id,
+            UserSessionORM.expires_at > datetime.now().isoformat(),
+        ).order_by(UserSessionORM.last_activity_at.desc()).all()
+
+    with _pending_lock:
+        pending = dict(_pending_activity)
+
+    return [
+        {
+            "id": row.id,
+            "is_current": row.session_token == current_token,
+            "ip_address": row.ip_address,
+            "user_agent": row.user_agent,
+            "created_at": row.created_at,
+            "last_activity_at": max(row.last_activity_at, pending.get(row.session_token, "")),
+        }
+        for row in rows
+    ]
+
+
+def _flush_at_exit():
+    try:
+        if _pending_activity:
+            flush_activity()
+    except Exception as e:
+        print(f"⚠️  Session activity flush failed: {e}")
+
+
+atexit.register(_flush_at_exit)
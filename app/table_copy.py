@@ -0,0 +1,323 @@
+"""
+Копирование базы данных между серверами (SQLite <-> PostgreSQL)
+
+- Таблицы берутся из моделей и копируются по уровням зависимостей внешних
+  ключей: таблицы одного уровня - параллельно, родители раньше детей.
+- Каждая таблица делится на диапазоны первичного ключа по chunk_size строк,
+  диапазоны читаются и пишутся параллельно в workers потоков.
+- Запись в PostgreSQL - COPY FROM STDIN, в остальные базы - executemany.
+- Id сохраняются, после копирования последовательности PostgreSQL
+  выставляются на max(id) (reset_sequences).
+- Журнал изменений (app/change_journal.py) копию не пишет: в PostgreSQL
+  запись идёт с session_replication_role = replica (нужны права
+  суперпользователя; заодно не проверяются внешние ключи - порядок по
+  уровням и сверка в конце это покрывают), в SQLite триггеры журнала
+  создаются после копирования. Последовательность версий журнала
+  сдвигается за последнюю версию исходной базы: инкрементальные бэкапы и
+  синхронизация реплик видят только изменения после переноса.
+- В конце сверяются количество строк и контрольная сумма каждой таблицы.
+
+Копируются все таблицы моделей, включая служебные (сессии, токены) - это
+перенос базы целиком, а не выгрузка данных (см. app/data_export.py).
+"""
+import hashlib
+import io
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Sequence as SequenceType
+
+from sqlalchemy import Sequence, create_engine, delete, func, insert, select, text
+from sqlalchemy.engine import Engine
+
+from app.models_sa import Base
+
+COPY_CHUNK_SIZE = 10000
+COPY_WORKERS = 4
+
+
+class CopyVerificationError(RuntimeError):
+    """Данные в целевой базе не совпали с исходной"""
+
+
+def _dependency_levels(tables) -> List[list]:
+    """Таблицы по уровням: уровень 0 ни на кого не ссылается, N - только на уровни < N"""
+    level = {}
+    for table in tables:  # sorted_tables: родители уже обработаны
+        parents = [fk.column.table for fk in table.foreign_keys if fk.column.table is not table]
+        level[table] = 1 + max((level.get(p, -1) for p in parents), default=-1)
+    levels: List[list] = [[] for _ in range(max(level.values(), default=-1) + 1)]
+    for table in tables:
+        levels[level[table]].append(table)
+    return levels
+
+
+def _pk(table):
+    columns = list(table.primary_key.columns)
+    if len(columns) != 1:
+        raise ValueError(f"{table.name}: поддерживается только простой первичный ключ")
+    return columns[0]
+
+
+def _copy_value(value) -> str:
+    """Значение для COPY ... FROM STDIN (текстовый формат)"""
+    if value is None:
+        return "\\N"
+    if isinstance(value, bool):
+        return "t" if value else "f"
+    return (str(value).replace("\\", "\\\\").replace("\t", "\\t")
+            .replace("\n", "\\n").replace("\r", "\\r"))
+
+
+class TableCopier:
+    """Копирование набора таблиц из source в target"""
+
+    def __init__(self, source: Engine, target: Engine, workers: int = COPY_WORKERS,
+                 chunk_size: int = COPY_CHUNK_SIZE, progress=None, replica: bool = False):
+        self.source = source
+        self.target = target
+        # PostgreSQL: писать без пользовательских триггеров (журнал изменений)
+        self.replica = replica
+        self.chunk_size = chunk_size
+        # SQLite допускает одного писателя - параллельная запись только замедлит
+        self.workers = 1 if target.dialect.name == "sqlite" else max(1, workers)
+        self.progress = progress
+        self._copied: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    # ---------- чтение ----------
+
+    def _chunks(self, table) -> List[tuple]:
+        pk = _pk(table)
+        with self.source.connect() as conn:
+            low, high = conn.execute(select(func.min(pk), func.max(pk))).one()
+        if low is None:
+            return []
+        return [(start, start + self.chunk_size) for start in range(low, high + 1, self.chunk_size)]
+
+    def _read_chunk(self, table, start: int, stop: int) -> list:
+        pk = _pk(table)
+        with self.source.connect() as conn:
+            return conn.execute(
+                select(*table.c).where(pk >= start, pk < stop).order_by(pk)
+            ).all()
+
+    # ---------- запись ----------
+
+    def _write_copy(self, table, rows: list) -> None:
+        columns = [c.name for c in table.c]
+        buffer = io.StringIO()
+        for row in rows:
+            buffer.write("\t".join(_copy_value(v) for v in row))
+            buffer.write("\n")
+        buffer.seek(0)
+
+        raw = self.target.raw_connection()
+        try:
+            cursor = raw.cursor()
+            if self.replica:
+                # Только до конца этой транзакции - соединение вернётся в пул чистым
+                cursor.execute("SET LOCAL session_replication_role = replica")
+            column_list = ", ".join(f'"{c}"' for c in columns)
+            cursor.copy_expert(f'COPY "{table.name}" ({column_list}) FROM STDIN', buffer)
+            raw.commit()
+        finally:
+            raw.close()
+
+    def _write_executemany(self, table, rows: list) -> None:
+        with self.target.begin() as conn:
+            conn.execute(insert(table), [dict(row._mapping) for row in rows])
+
+    def _copy_chunk(self, table, start: int, stop: int) -> None:
+        rows = self._read_chunk(table, start, stop)
+        if rows:
+            if self.target.dialect.name == "postgresql":
+                self._write_copy(table, rows)
+            else:
+                self._write_executemany(table, rows)
+        with self._lock:
+            self._copied[table.name] = self._copied.get(table.name, 0) + len(rows)
+            copied = self._copied[table.name]
+        if self.progress:
+            self.progress(table.name, copied)
+
+    # ---------- весь процесс ----------
+
+    def copy(self, tables) -> Dict[str, int]:
+        """
+        Скопировать таблицы (целевые таблицы должны существовать и быть пустыми)
+        Returns: {таблица: скопировано строк}
+        """
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="table-copy") as pool:
+            for level in _dependency_levels(tables):
+                futures = []
+                for table in level:
+                    self._copied.setdefault(table.name, 0)
+                    futures += [pool.submit(self._copy_chunk, table, start, stop)
+                                for start, stop in self._chunks(table)]
+                # Следующий уровень ссылается на этот - ждём его целиком
+                for future in futures:
+                    future.result()
+        return dict(self._copied)
+
+
+# ==================== ПОСЛЕДОВАТЕЛЬНОСТИ ====================
+
+def reset_sequences(engine: Engine, tables=None) -> Dict[str, int]:
+    """
+    Выставить последовательности PostgreSQL на max(id) таблиц
+    Returns: {последовательность: новое значение}
+    """
+    if engine.dialect.name != "postgresql":
+        return {}
+    tables = tables if tables is not None else Base.metadata.sorted_tables
+    result = {}
+    with engine.begin() as conn:
+        for table in tables:
+            pk = _pk(table)
+            if isinstance(pk.default, Sequence):
+                sequence = pk.default.name
+            else:
+                sequence = conn.execute(
+                    text("SELECT pg_get_serial_sequence(:table, :column)"),
+                    {"table": table.name, "column": pk.name},
+                ).scalar()
+            if not sequence:
+                continue
+            max_id = conn.execute(select(func.max(pk))).scalar()
+            # Пустая таблица: следующий nextval вернёт 1
+            conn.execute(text("SELECT setval(:sequence, :value, :called)"),
+                         {"sequence": sequence, "value": max_id or 1, "called": max_id is not None})
+            result[sequence] = max_id or 0
+    return result
+
+
+# ==================== ПРОВЕРКА ====================
+
+def _normalize(value) -> str:
+    # Одинаковое представление для SQLite и PostgreSQL
+    if value is None:
+        return "\\N"
+    if isinstance(value, bool):
+        return "1" if value else "0"
+    if isinstance(value, float):
+        return repr(value)
+    return str(value)
+
+
+def table_checksum(engine: Engine, table, batch_size: int = COPY_CHUNK_SIZE) -> tuple:
+    """Returns: (количество строк, sha256 всех строк в порядке первичного ключа)"""
+    digest = hashlib.sha256()
+    count = 0
+    with engine.connect() as conn:
+        conn = conn.execution_options(stream_results=True, yield_per=batch_size)
+        result = conn.execute(select(*table.c).order_by(_pk(table)))
+        for rows in result.partitions():
+            for row in rows:
+                digest.update("\t".join(_normalize(v) for v in row).encode("utf-8"))
+                digest.update(b"\n")
+            count += len(rows)
+    return count, digest.hexdigest()
+
+
+def verify_tables(source: Engine, target: Engine, tables, workers: int = COPY_WORKERS) -> Dict[str, dict]:
+    """
+    Сравнить количество строк и контрольные суммы таблиц
+    Returns: {таблица: {'rows', 'ok'}}; при расхождении - CopyVerificationError
+    """
+    with ThreadPoolExecutor(max_workers=max(1, workers) * 2, thread_name_prefix="table-verify") as pool:
+        futures = {
+            table.name: (pool.submit(table_checksum, source, table), pool.submit(table_checksum, target, table))
+            for table in tables
+        }
+        report = {}
+        for name, (source_future, target_future) in futures.items():
+            source_sum, target_sum = source_future.result(), target_future.result()
+            report[name] = {"rows": source_sum[0], "target_rows": target_sum[0], "ok": source_sum == target_sum}
+
+    failed = [name for name, item in report.items() if not item["ok"]]
+    if failed:
+        raise CopyVerificationError(f"Данные не совпали: {', '.join(failed)}")
+    return report
+
+
+# ==================== ТОЧКА ВХОДА ====================
+
+def select_tables(names: Optional[SequenceType[str]] = None) -> list:
+    """Таблицы моделей в порядке зависимостей (все или перечисленные)"""
+    from app.change_journal import JOURNAL_TABLE
+    # Журнал изменений - история исходной базы; в целевой его ведут её триггеры
+    tables = [t for t in Base.metadata.sorted_tables if t.name != JOURNAL_TABLE]
+    if not names:
+        return tables
+    unknown = set(names) - {t.name for t in tables}
+    if unknown:
+        raise ValueError(f"Неизвестные таблицы: {', '.join(sorted(unknown))}")
+    return [t for t in tables if t.name in names]
+
+
+def _create_engine(url: str, workers: int) -> Engine:
+    if url.startswith("sqlite"):
+        return create_engine(url)
+    # Чтение и проверка идут в workers * 2 потоков
+    return create_engine(url, pool_size=max(1, workers) * 2, max_overflow=2)
+
+
+def copy_database(source_url: str, target_url: str, table_names=None, workers: int = COPY_WORKERS,
+                  chunk_size: int = COPY_CHUNK_SIZE, truncate: bool = False, verify: bool = True,
+                  progress=None) -> Dict[str, dict]:
+    """
+    Перенести данные source -> target: схема, копирование, последовательности, проверка
+    Returns: {таблица: {'rows', 'seconds', 'ok'}}
+    """
+    from app.change_journal import (
+        JOURNAL_TABLE, advance_version, drop_journal_triggers, ensure_journal_schema, issued_version,
+    )
+    from app.search import ensure_search_schema
+
+    source = _create_engine(source_url, workers)
+    target = _create_engine(target_url, workers)
+    tables = select_tables(table_names)
+    replica = target.dialect.name == "postgresql"
+
+    try:
+        Base.metadata.create_all(target)
+        ensure_search_schema(target)
+        if replica:
+            ensure_journal_schema(target)
+        else:
+            # Триггеры журнала - после копирования, иначе каждая строка копии попадёт в change_log
+            drop_journal_triggers(target)
+
+        try:
+            with target.begin() as conn:
+                if replica:
+                    conn.exec_driver_sql("SET LOCAL session_replication_role = replica")
+                not_empty = [t.name for t in tables if conn.execute(select(func.count()).select_from(t)).scalar()]
+                if not_empty and not truncate:
+                    raise RuntimeError(f"Целевые таблицы не пусты: {', '.join(not_empty)} (используйте truncate)")
+                for table in reversed(tables):
+                    conn.execute(delete(table))
+
+            started = time.perf_counter()
+            copied = TableCopier(source, target, workers=workers, chunk_size=chunk_size, progress=progress,
+                                 replica=replica).copy(tables)
+            seconds = time.perf_counter() - started
+        finally:
+            if not replica:
+                ensure_journal_schema(target)
+        reset_sequences(target, tables)
+
+        with source.connect() as conn:
+            has_journal = conn.dialect.has_table(conn, JOURNAL_TABLE)
+            source_version = issued_version(conn) if has_journal else 0
+        advance_version(target, source_version)
+
+        report = {name: {"rows": rows, "seconds": seconds, "ok": None} for name, rows in copied.items()}
+        if verify:
+            for name, item in verify_tables(source, target, tables, workers).items():
+                report[name]["ok"] = item["ok"]
+        return report
+    finally:
+        source.dispose()
+        target.dispose()
@@ -3,17 +3,10 @@
 Использует Redis для хранения временных кодов привязки
 """
 import secrets
-import redis
 from typing import Optional
 from datetime import timedelta
 
-# Подключение к Redis
-try:
-    from app.config import REDIS_URL
-    redis_client = redis.from_url(REDIS_URL, decode_responses=True)
-except Exception as e:
-    print(f"⚠️  Redis connection failed: {e}")
-    redis_client = None
+from app.integration import get_redis
 
 # Настройки
 CODE_LENGTH = 6
@@ -31,6 +24,7 @@ def generate_link_code(user_id: int) -> str:
     # Генерируем уникальный код
     code = ''.join([str(secrets.randbelow(10)) for _ in range(CODE_LENGTH)])
     
+    redis_client = get_redis()
     if redis_client:
         # Сохраняем в Redis: код -> user_id
         key = f"{CODE_PREFIX}{code}"
@@ -49,6 +43,7 @@ def verify_link_code(code: str) -> Optional[int]:
     
     Returns: user_id если код валиден, иначе None
     """
+    redis_client = get_redis()
     if not redis_client:
         print("⚠️  Redis unavailable, cannot verify code")
         return None
@@ -1,20 +1,48 @@
 """
 Сервис отправки уведомлений в Telegram
+
+Запросы к Bot API идут через одну requests.Session на процесс: соединения
+переиспользуются (keep-alive), а send_many() рассылает пачку сообщений
+параллельно (TELEGRAM_SEND_WORKERS) через тот же пул. На 429 Too Many
+Requests отправка повторяется после указанного Telegram retry_after.
 """
-import requests
-from typing import Optional
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Tuple
 from datetime import datetime
 
+from app.config import TELEGRAM_SEND_MAX_RETRIES, TELEGRAM_SEND_WORKERS
 from app.secrets import TELEGRAM_BOT_TOKEN, TELEGRAM_CHAT_ID
 
+TELEGRAM_API_URL = "https://api.telegram.org"
+
 
 class TelegramNotifier:
     """Отправка уведомлений в Telegram"""
     
-    def __init__(self, bot_token: str = None, chat_id: str = None):
+    def __init__(self, bot_token: str = None, chat_id: str = None, api_url: str = None):
         self.bot_token = bot_token or TELEGRAM_BOT_TOKEN
         self.chat_id = chat_id or TELEGRAM_CHAT_ID
-        self.base_url = f"https://api.telegram.org/bot{self.bot_token}"
+        self.base_url = f"{api_url or TELEGRAM_API_URL}/bot{self.bot_token}"
+        self._http = None
+        self._http_lock = threading.Lock()
+    
+    def _session(self):
+        """Общая HTTP-сессия (создаётся при первой отправке)"""
+        if self._http is None:
+            with self._http_lock:
+                if self._http is None:
+                    # requests импортируется лениво: он заметно удлиняет старт cron-скриптов
+                    import requests
+                    from requests.adapters import HTTPAdapter
+                    
+                    http = requests.Session()
+                    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=TELEGRAM_SEND_WORKERS)
+                    http.mount("https://", adapter)
+                    http.mount("http://", adapter)
+                    self._http = http
+        return self._http
     
     def send_to_user(self, user_id: int, text: str, parse_mode: str = "HTML", reply_markup=None) -> Optional[int]:
         """
@@ -72,7 +100,13 @@ class TelegramNotifier:
             if reply_markup:
                 payload["reply_markup"] = reply_markup
             
-            response = requests.post(url, json=payload, timeout=10)
+            for attempt in range(TELEGRAM_SEND_MAX_RETRIES + 1):
+                response = self._session().post(url, json=payload, timeout=10)
+                if response.status_code != 429 or attempt == TELEGRAM_SEND_MAX_RETRIES:
+                    break
+                # Лимит Telegram: ждём, сколько он сказал
+                retry_after = response.json().get("parameters", {}).get("retry_after", 1)
+                time.sleep(retry_after)
             
             if response.status_code == 200:
                 result = response.json()
@@ -88,6 +122,20 @@ class TelegramNotifier:
             print(f"❌ Telegram send error: {e}")
             return None
     
+    def send_many(self, messages: List[Tuple[str, str]], parse_mode: str = "HTML") -> List[Optional[int]]:
+        """
+        Разослать сообщения [(chat_id, text)] параллельно через общий пул соединений
+        
+        Returns:
+            message_id (или None при ошибке) для каждого сообщения, в том же порядке
+        """
+        if len(messages) <= 1:
+            return [self._send_to_chat(chat_id, text, parse_mode) for chat_id, text in messages]
+        
+        with ThreadPoolExecutor(max_workers=min(TELEGRAM_SEND_WORKERS, len(messages)),
+                                thread_name_prefix="telegram-send") as pool:
+            return list(pool.map(lambda message: self._send_to_chat(message[0], message[1], parse_mode), messages))
+    
     def send_message(self, text: str, parse_mode: str = "HTML") -> Optional[int]:
         """
         Отправляет сообщение в Telegram на дефолтный chat_id
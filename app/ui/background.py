@@ -0,0 +1,74 @@
+"""
+Выполнение запросов к базе вне UI-потока.
+
+Запрос к удалённому PostgreSQL может идти сотни миллисекунд; в UI-потоке
+это замораживает окно. run_in_background() выполняет функцию в пуле
+потоков, а результат или ошибку доставляет сигналом обратно в UI-поток.
+"""
+
+from __future__ import annotations
+from typing import Callable, Optional
+
+from PyQt6.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal, pyqtSlot
+
+# Запросы к одной базе: больше пары потоков только добавит очередь на сервере
+DB_POOL_THREADS = 2
+
+_pool: Optional[QThreadPool] = None
+# Задачи живут, пока их сигналы не доставлены (пул удаляет QRunnable сразу после run)
+_running: set = set()
+
+
+def db_pool() -> QThreadPool:
+    """Пул потоков для запросов к базе (один на приложение)."""
+    global _pool
+    if _pool is None:
+        _pool = QThreadPool()
+        _pool.setMaxThreadCount(DB_POOL_THREADS)
+    return _pool
+
+
+class _TaskSignals(QObject):
+    result = pyqtSignal(object)
+    error = pyqtSignal(str)
+
+
+class BackgroundTask(QRunnable):
+    """
+    Функция, выполняемая в пуле; сигналы приходят в поток, создавший задачу.
+    Сигнал ошибки несёт текст, само исключение - в атрибуте error (как у LoadingThread).
+    """
+
+    def __init__(self, fn: Callable, *args, **kwargs):
+        super().__init__()
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        # Объект сигналов создаётся в UI-потоке - слоты вызываются там же
+        self.signals = _TaskSignals()
+        self.error: Optional[Exception] = None
+
+    @pyqtSlot()
+    def run(self):
+        try:
+            result = self.fn(*self.args, **self.kwargs)
+        except Exception as e:
+            self.error = e
+            self.signals.error.emit(str(e))
+            return
+        self.signals.result.emit(result)
+
+
+def run_in_background(fn: Callable, *args, on_result: Callable = None,
+                      on_error: Callable = None, **kwargs) -> BackgroundTask:
+    """Выполнить fn(*args, **kwargs) в пуле; on_result/on_error вызываются в UI-потоке."""
+    task = BackgroundTask(fn, *args, **kwargs)
+    _running.add(task)
+    task.signals.result.connect(lambda _: _running.discard(task))
+    task.signals.error.connect(lambda _: _running.discard(task))
+    if on_result is not None:
+        task.signals.result.connect(on_result)
+    if on_error is not None:
+        task.signals.error.connect(on_error)
+    db_pool().start(task)
+    return task
@@ -0,0 +1,233 @@
+"""
+Модель таблицы кредитов для главного окна.
+
+Строки хранятся в модели в порядке поступления, сортировку делает
+QSortFilterProxyModel. Новый список кредитов применяется как разница:
+удалённые строки - rowsRemoved, изменённые - dataChanged, новые -
+rowsInserted. Представление перерисовывает только затронутые строки,
+выделение и позиция прокрутки сохраняются.
+"""
+
+from __future__ import annotations
+from datetime import date, datetime
+from typing import Dict, List, Optional
+
+from PyQt6.QtCore import (
+    Qt, QAbstractTableModel, QModelIndex, QSortFilterProxyModel, QEvent, QRectF, pyqtSignal,
+)
+from PyQt6.QtGui import QBrush, QColor, QPainter
+from PyQt6.QtWidgets import QStyledItemDelegate, QStyle
+
+COLUMNS = ["ID", "Банк", "Платеж", "Действие", "Взято", "Осталось", "Риск", "Дата"]
+COL_ID, COL_ORG, COL_NEXT, COL_ACTION, COL_BORROWED, COL_REMAINING, COL_RISK, COL_LAST = range(len(COLUMNS))
+
+# Платёж ближе этого числа дней - "горящий"
+URGENT_DAYS = 5
+
+PAID_BRUSH = QBrush(QColor(212, 237, 218))
+URGENT_BRUSH = QBrush(QColor(248, 215, 218))
+NORMAL_BRUSH = QBrush(QColor(255, 243, 205))
+
+# Роль с ключом сортировки (для прокси)
+SORT_ROLE = Qt.ItemDataRole.UserRole + 1
+
+
+def _parse_date(value: Optional[str]) -> Optional[date]:
+    if not value:
+        return None
+    try:
+        return datetime.strptime(value, "%Y-%m-%d").date()
+    except ValueError:
+        return None
+
+
+def _format_date(value: Optional[str]) -> str:
+    parsed = _parse_date(value)
+    if parsed is None:
+        return value or ""
+    return parsed.strftime("%d %B %Y")
+
+
+class _LoanRow:
+    """Кредит и заранее подготовленные значения ячеек."""
+    __slots__ = ("loan", "display", "sort", "next_date")
+
+    def __init__(self, loan: dict):
+        self.loan = loan
+        self.next_date = _parse_date(loan["next_date"])
+        self.display = [
+            str(loan["id"] or ""),
+            loan["org_name"] or "",
+            _format_date(loan["next_date"]),
+            "Погашен" if loan["is_paid"] else "Оплатить",
+            f"{loan['amount_borrowed']:.2f}",
+            f"{loan['remaining']:.2f}",
+            "⚠️" if loan["risky_org"] else "",
+            _format_date(loan["last_date"]),
+        ]
+        self.sort = [
+            loan["id"] or 0,
+            (loan["org_name"] or "").lower(),
+            # Без платежей - в конце; при равной дате - по id
+            f"{loan['next_date'] or '9999-12-31'}|{loan['id'] or 0:010d}",
+            int(bool(loan["is_paid"])),
+            loan["amount_borrowed"] or 0.0,
+            loan["remaining"] or 0.0,
+            int(bool(loan["risky_org"])),
+            loan["last_date"] or "",
+        ]
+
+    def days_left(self, today: date) -> Optional[int]:
+        return None if self.next_date is None else (self.next_date - today).days
+
+    def background(self, today: date) -> Optional[QBrush]:
+        if self.loan["is_paid"]:
+            return PAID_BRUSH
+        days_left = self.days_left(today)
+        if days_left is None:
+            return None
+        return URGENT_BRUSH if days_left < URGENT_DAYS else NORMAL_BRUSH
+
+
+class LoanTableModel(QAbstractTableModel):
+    """Кредиты (словари из loan_repo.get_all_loans) как табличная модель."""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._rows: List[_LoanRow] = []
+        self._row_by_id: Dict[int, int] = {}
+
+    # ---------- QAbstractTableModel ----------
+
+    def rowCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self._rows)
+
+    def columnCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(COLUMNS)
+
+    def headerData(self, section: int, orientation: Qt.Orientation, role: int = Qt.ItemDataRole.DisplayRole):
+        if role == Qt.ItemDataRole.DisplayRole and orientation == Qt.Orientation.Horizontal:
+            return COLUMNS[section]
+        return None
+
+    def data(self, index: QModelIndex, role: int = Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        row = self._rows[index.row()]
+        if role == Qt.ItemDataRole.DisplayRole:
+            return row.display[index.column()]
+        if role == Qt.ItemDataRole.BackgroundRole:
+            return row.background(date.today())
+        if role == Qt.ItemDataRole.UserRole:
+            return row.loan["id"]
+        if role == SORT_ROLE:
+            return row.sort[index.column()]
+        return None
+
+    # ---------- данные ----------
+
+    def loan_at(self, row: int) -> dict:
+        return self._rows[row].loan
+
+    def row_of(self, loan_id: int) -> int:
+        """Номер строки кредита или -1."""
+        return self._row_by_id.get(loan_id, -1)
+
+    def summary(self) -> tuple:
+        """Returns: (горящих, всего кредитов, не оплачено всего)"""
+        today = date.today()
+        urgent = 0
+        for row in self._rows:
+            days_left = row.days_left(today)
+            if days_left is not None and days_left < URGENT_DAYS and not row.loan["is_paid"]:
+                urgent += 1
+        return urgent, len(self._rows), sum(row.loan["remaining"] for row in self._rows)
+
+    def remap_ids(self, mapping: Dict[int, int]) -> None:
+        """Заменить id кредитов на месте (локальный id -> id сервера после синхронизации)."""
+        last_column = len(COLUMNS) - 1
+        for row, current in enumerate(self._rows):
+            new_id = mapping.get(current.loan["id"])
+            if new_id is not None:
+                self._rows[row] = _LoanRow({**current.loan, "id": new_id})
+                self.dataChanged.emit(self.index(row, 0), self.index(row, last_column))
+        self._row_by_id = {row.loan["id"]: i for i, row in enumerate(self._rows)}
+
+    def set_loans(self, loans: List[dict]) -> None:
+        """Применить новый список кредитов как разницу с текущим."""
+        new_by_id = {loan["id"]: loan for loan in loans}
+
+        # Удалённые - снизу вверх, чтобы номера строк выше не сдвигались
+        for row in range(len(self._rows) - 1, -1, -1):
+            if self._rows[row].loan["id"] not in new_by_id:
+                self.beginRemoveRows(QModelIndex(), row, row)
+                del self._rows[row]
+                self.endRemoveRows()
+
+        # Изменённые - только их строки
+        last_column = len(COLUMNS) - 1
+        for row, current in enumerate(self._rows):
+            loan = new_by_id[current.loan["id"]]
+            if loan != current.loan:
+                self._rows[row] = _LoanRow(loan)
+                self.dataChanged.emit(self.index(row, 0), self.index(row, last_column))
+
+        # Новые - в конец
+        known = {row.loan["id"] for row in self._rows}
+        added = [_LoanRow(loan) for loan in loans if loan["id"] not in known]
+        if added:
+            first = len(self._rows)
+            self.beginInsertRows(QModelIndex(), first, first + len(added) - 1)
+            self._rows.extend(added)
+            self.endInsertRows()
+
+        self._row_by_id = {row.loan["id"]: i for i, row in enumerate(self._rows)}
+
+
+class LoanSortProxyModel(QSortFilterProxyModel):
+    """Сортировка по ключам SORT_ROLE (даты, суммы - как значения, а не как текст)."""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setSortRole(SORT_ROLE)
+        self.setDynamicSortFilter(True)
+
+
+class ActionButtonDelegate(QStyledItemDelegate):
+    """Рисует в ячейке кнопку "Оплатить"/"Погашен" без создания виджета на строку."""
+
+    clicked = pyqtSignal(QModelIndex)
+
+    PAY_COLOR = QColor("#007bff")
+    PAID_COLOR = QColor("#28a745")
+
+    def paint(self, painter: QPainter, option, index: QModelIndex):
+        # Фон строки (цвет статуса, выделение) - как у остальных ячеек
+        self.initStyleOption(option, index)
+        option.text = ""
+        option.widget.style().drawControl(QStyle.ControlElement.CE_ItemViewItem, option, painter, option.widget)
+
+        text = index.data(Qt.ItemDataRole.DisplayRole)
+        painter.save()
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+        rect = QRectF(option.rect.adjusted(6, 4, -6, -4))
+        painter.setPen(Qt.PenStyle.NoPen)
+        painter.setBrush(self.PAID_COLOR if text == "Погашен" else self.PAY_COLOR)
+        painter.drawRoundedRect(rect, 5, 5)
+        painter.setPen(QColor("white"))
+        painter.drawText(rect, Qt.AlignmentFlag.AlignCenter, text)
+        painter.restore()
+
+    def sizeHint(self, option, index: QModelIndex):
+        size = super().sizeHint(option, index)
+        size.setWidth(max(size.width() + 40, 120))
+        size.setHeight(max(size.height(), 38))
+        return size
+
+    def editorEvent(self, event, model, option, index: QModelIndex) -> bool:
+        if (event.type() == QEvent.Type.MouseButtonRelease
+                and event.button() == Qt.MouseButton.LeftButton
+                and option.rect.contains(event.position().toPoint())):
+            self.clicked.emit(index)
+            return True
+        return super().editorEvent(event, model, option, index)
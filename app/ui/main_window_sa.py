@@ -1,10 +1,11 @@
 from __future__ import annotations
 from typing import List, Optional, Tuple
-from datetime import date, datetime
+from datetime import datetime
+import time
 import webbrowser
 
-from PyQt6.QtCore import Qt, QUrl, QDate, QLocale, QObject, QEvent
-from PyQt6.QtGui import QAction, QColor, QBrush, QDesktopServices
+from PyQt6.QtCore import Qt, QUrl, QDate, QLocale, QObject, QEvent, QTimer
+from PyQt6.QtGui import QAction, QDesktopServices
 from PyQt6.QtWidgets import (
     QWidget,
     QMainWindow,
@@ -14,6 +15,8 @@ from PyQt6.QtWidgets import (
     QPushButton,
     QTableWidget,
     QTableWidgetItem,
+    QTableView,
+    QAbstractItemView,
     QMessageBox,
     QToolBar,
     QApplication,
@@ -29,7 +32,16 @@ from PyQt6.QtWidgets import (
     QScrollArea,
 )
 
-from ..repository_sa import loan_repo, installment_repo
+from ..config import REPLICA_SYNC_INTERVAL_SECONDS, REPLICA_SYNC_ON_FOCUS_SECONDS
+from ..local_replica import local_installment_repo, local_loan_repo, replica_sync
+from ..reminder import ReminderService
+from .background import run_in_background
+from .loan_table_model import (
+    COL_ACTION, COL_NEXT, LoanTableModel, LoanSortProxyModel, ActionButtonDelegate,
+)
+
+# Через сколько мс после сохранения отправлять изменения (серия правок - одной синхронизацией)
+SYNC_AFTER_CHANGE_MS = 2000
 
 
 class MouseWheelEventFilter(QObject):
@@ -45,13 +57,26 @@ class MouseWheelEventFilter(QObject):
 class MainWindow(QMainWindow):
     """Главное окно приложения."""
 
-    def __init__(self):
+    def __init__(self, loans: Optional[List[dict]] = None):
+        """loans - список кредитов, уже загруженный при запуске (иначе - загрузка в фоне)."""
         super().__init__()
         self._create_mode = False
-        self._last_selected_row = 0
+        self._last_selected_loan_id = None
+        # Загрузка таблицы идёт в фоне; повторный запрос во время загрузки
+        # не запускает второй, а повторяет загрузку после текущей
+        self._refresh_running = False
+        self._refresh_pending = False
+        self._details_loan_id = None
         self._suppress_selection_prompt = False
         self._unsaved_changes = False
         self._current_loan_id = None
+        # Синхронизация с сервером - в фоне, по одной за раз (как загрузка таблицы)
+        self._sync_running = False
+        self._sync_pending = False
+        self._last_sync_at = 0.0
+        self._sync_task = None
+        # Предупреждение об устаревшей схеме - одно за сеанс, а не на каждую синхронизацию
+        self._schema_warned = False
         self._mouse_wheel_filter = MouseWheelEventFilter()
         
         self.setWindowTitle("Микрокредиты - Органайзер")
@@ -59,7 +84,13 @@ class MainWindow(QMainWindow):
         
         self._setup_global_styles()
         self._setup_ui()
-        self._refresh_data()
+        # Напоминания в трее - по той же локальной копии
+        self.reminders = ReminderService(self)
+        self._setup_sync()
+        if loans is not None:
+            self._apply_loans(loans)
+        else:
+            self._refresh_data()
 
     def _setup_global_styles(self):
         """Настройка глобальных стилей приложения."""
@@ -143,28 +174,37 @@ class MainWindow(QMainWindow):
         toolbar.addAction(add_action)
         
         refresh_action = QAction("Обновить", self)
-        refresh_action.triggered.connect(self._refresh_data)
+        refresh_action.triggered.connect(self._sync_now)
         toolbar.addAction(refresh_action)
         
         layout.addWidget(toolbar)
         
-        # Таблица кредитов
-        self.table = QTableWidget()
-        self.table.setColumnCount(8)
-        self.table.setHorizontalHeaderLabels([
-            "ID", "Банк", "Платеж", "Действие", "Взято", "Осталось", "Риск", "Дата"
-        ])
+        # Таблица кредитов: модель + прокси сортировки
+        self.loan_model = LoanTableModel(self)
+        self.loan_proxy = LoanSortProxyModel(self)
+        self.loan_proxy.setSourceModel(self.loan_model)
+        
+        self.table = QTableView()
+        self.table.setModel(self.loan_proxy)
+        
+        self.action_delegate = ActionButtonDelegate(self.table)
+        self.action_delegate.clicked.connect(self._on_action_clicked)
+        self.table.setItemDelegateForColumn(COL_ACTION, self.action_delegate)
         
         # Настройка таблицы
-        self.table.setSelectionBehavior(QTableWidget.SelectionBehavior.SelectRows)
+        self.table.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
+        self.table.setSelectionMode(QAbstractItemView.SelectionMode.SingleSelection)
+        self.table.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
         self.table.setAlternatingRowColors(True)
         self.table.setSortingEnabled(True)
+        self.table.sortByColumn(COL_NEXT, Qt.SortOrder.AscendingOrder)
+        self.table.verticalHeader().setVisible(False)
         self.table.horizontalHeader().setStretchLastSection(True)
         self.table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.ResizeToContents)
         
         # Обработчики событий
-        self.table.itemSelectionChanged.connect(self._on_selection_changed)
-        self.table.cellDoubleClicked.connect(self._on_cell_double_clicked)
+        self.table.selectionModel().selectionChanged.connect(self._on_selection_changed)
+        self.table.doubleClicked.connect(self._on_cell_double_clicked)
         
         layout.addWidget(self.table)
         
@@ -308,145 +348,167 @@ class MainWindow(QMainWindow):
         return panel
 
     def _refresh_data(self):
-        """Обновление данных в таблице."""
+        """Обновление данных в таблице (загрузка в фоне)."""
+        if self._refresh_running:
+            self._refresh_pending = True
+            return
+        self._refresh_running = True
+        self._refresh_pending = False
+        self.status_label.setText("Загрузка...")
+        run_in_background(
+            local_loan_repo.get_all_loans,
+            on_result=self._on_loans_loaded,
+            on_error=self._on_loans_error,
+        )
+
+    def _on_loans_loaded(self, loans: List[dict]):
+        self._refresh_running = False
+        if self._refresh_pending:
+            # Данные успели измениться во время загрузки
+            self._refresh_data()
+            return
+        self._apply_loans(loans)
+
+    def _on_loans_error(self, error: str):
+        self._refresh_running = False
+        self.status_label.setText("Ошибка загрузки")
+        QMessageBox.critical(self, "Ошибка", f"Ошибка при обновлении данных: {error}")
+        if self._refresh_pending:
+            self._refresh_data()
+
+    def _apply_loans(self, loans: List[dict]):
+        """Применение загруженных кредитов к таблице (только изменившиеся строки)."""
+        self._suppress_selection_prompt = True
         try:
-            # Получаем все кредиты
-            loans = loan_repo.get_all_loans()
-            
-            # Сортируем по дате ближайшего платежа
-            loans.sort(key=lambda x: (
-                "9999-12-31" if x["next_date"] is None else x["next_date"],
-                x["id"] or 0
-            ))
-            
-            # Заполняем таблицу
-            self.table.setRowCount(len(loans))
-            
-            urgent_count = 0
-            for row, loan in enumerate(loans):
-                # ID
-                self.table.setItem(row, 0, QTableWidgetItem(str(loan["id"] or "")))
-                
-                # Банк
-                self.table.setItem(row, 1, QTableWidgetItem(loan["org_name"] or ""))
-                
-                # Платеж (дата)
-                next_date_str = ""
-                if loan["next_date"]:
-                    try:
-                        next_date = datetime.strptime(loan["next_date"], "%Y-%m-%d").date()
-                        next_date_str = next_date.strftime("%d %B %Y")
-                        
-                        # Проверяем, является ли кредит "горящим"
-                        days_left = (next_date - date.today()).days
-                        if days_left < 5 and not loan["is_paid"]:
-                            urgent_count += 1
-                    except ValueError:
-                        next_date_str = loan["next_date"]
-                
-                self.table.setItem(row, 2, QTableWidgetItem(next_date_str))
-                
-                # Действие
-                if loan["is_paid"]:
-                    action_button = QPushButton("Погашен")
-                    action_button.setStyleSheet("""
-                        background-color: #28a745; 
-                        color: white; 
-                        font-size: 12px;
-                        padding: 8px 20px;
-                        min-height: 30px;
-                        min-width: 100px;
-                        border: none;
-                        border-radius: 5px;
-                    """)
-                    action_button.clicked.connect(lambda checked, url=loan["website"]: self._open_payment_site(url))
-                else:
-                    action_button = QPushButton("Оплатить")
-                    action_button.setStyleSheet("""
-                        background-color: #007bff; 
-                        color: white; 
-                        font-size: 12px;
-                        padding: 8px 20px;
-                        min-height: 30px;
-                        min-width: 100px;
-                        border: none;
-                        border-radius: 5px;
-                    """)
-                    action_button.clicked.connect(lambda checked, url=loan["website"]: self._open_payment_site(url))
-                
-                self.table.setCellWidget(row, 3, action_button)
-                
-                # Взято
-                self.table.setItem(row, 4, QTableWidgetItem(f"{loan['amount_borrowed']:.2f}"))
-                
-                # Осталось
-                self.table.setItem(row, 5, QTableWidgetItem(f"{loan['remaining']:.2f}"))
-                
-                # Риск
-                risk_text = "⚠️" if loan["risky_org"] else ""
-                self.table.setItem(row, 6, QTableWidgetItem(risk_text))
-                
-                # Дата (последняя)
-                last_date_str = ""
-                if loan["last_date"]:
-                    try:
-                        last_date = datetime.strptime(loan["last_date"], "%Y-%m-%d").date()
-                        last_date_str = last_date.strftime("%d %B %Y")
-                    except ValueError:
-                        last_date_str = loan["last_date"]
-                
-                self.table.setItem(row, 7, QTableWidgetItem(last_date_str))
-                
-                # Цветовая индикация строк
-                if loan["is_paid"]:
-                    # Зеленый для погашенных
-                    for col in range(self.table.columnCount()):
-                        item = self.table.item(row, col)
-                        if item:
-                            item.setBackground(QBrush(QColor(212, 237, 218)))
-                elif loan["next_date"]:
-                    try:
-                        next_date = datetime.strptime(loan["next_date"], "%Y-%m-%d").date()
-                        days_left = (next_date - date.today()).days
-                        if days_left < 5:
-                            # Красный для "горящих"
-                            for col in range(self.table.columnCount()):
-                                item = self.table.item(row, col)
-                                if item:
-                                    item.setBackground(QBrush(QColor(248, 215, 218)))
-                        else:
-                            # Желтый для обычных
-                            for col in range(self.table.columnCount()):
-                                item = self.table.item(row, col)
-                                if item:
-                                    item.setBackground(QBrush(QColor(255, 243, 205)))
-                    except ValueError:
-                        pass
-            
-            # Автоподбор ширины колонок
-            self.table.resizeColumnsToContents()
-            
-            # Статус с общими данными
-            total_remaining = sum(loan["remaining"] for loan in loans)
-            self.status_label.setText(
-                f"Горящие (<5 дней): {urgent_count} | Всего кредитов: {len(loans)} | Не оплачено всего: {total_remaining:.2f}"
+            self.loan_model.set_loans(loans)
+        finally:
+            self._suppress_selection_prompt = False
+        
+        urgent_count, total_count, total_remaining = self.loan_model.summary()
+        self.status_label.setText(
+            f"Горящие (<5 дней): {urgent_count} | Всего кредитов: {total_count} | Не оплачено всего: {total_remaining:.2f}"
+        )
+        
+        # Выбираем первую строку, если не в режиме создания
+        if not self._create_mode and self.loan_proxy.rowCount() > 0:
+            if not self.table.selectionModel().hasSelection():
+                self._suppress_selection_prompt = True
+                self.table.selectRow(0)
+                self._suppress_selection_prompt = False
+                self._update_details_from_selection()
+        elif not self._create_mode:
+            self._fill_details(None)
+
+    def _selected_loan_id(self) -> Optional[int]:
+        rows = self.table.selectionModel().selectedRows()
+        if not rows:
+            return None
+        return rows[0].data(Qt.ItemDataRole.UserRole)
+
+    def _select_loan(self, loan_id: Optional[int]):
+        """Выделить строку кредита (без вопроса о несохраненных изменениях)."""
+        row = self.loan_model.row_of(loan_id) if loan_id is not None else -1
+        if row < 0:
+            return
+        proxy_index = self.loan_proxy.mapFromSource(self.loan_model.index(row, 0))
+        self._suppress_selection_prompt = True
+        self.table.selectRow(proxy_index.row())
+        self._suppress_selection_prompt = False
+
+    def _setup_sync(self):
+        """Синхронизация локальной копии: по таймеру, при активации окна и после изменений."""
+        self.sync_label = QLabel("")
+        self.statusBar().addPermanentWidget(self.sync_label)
+        
+        self._sync_timer = QTimer(self)
+        self._sync_timer.setInterval(int(REPLICA_SYNC_INTERVAL_SECONDS * 1000))
+        self._sync_timer.timeout.connect(self._sync_now)
+        self._sync_timer.start()
+        
+        self._push_timer = QTimer(self)
+        self._push_timer.setSingleShot(True)
+        self._push_timer.setInterval(SYNC_AFTER_CHANGE_MS)
+        self._push_timer.timeout.connect(self._sync_now)
+        
+        # Первая синхронизация - сразу после показа окна
+        QTimer.singleShot(0, self._sync_now)
+
+    def event(self, event):
+        if (event.type() == QEvent.Type.WindowActivate
+                and time.monotonic() - self._last_sync_at > REPLICA_SYNC_ON_FOCUS_SECONDS):
+            self._sync_now()
+        return super().event(event)
+
+    def _on_local_change(self):
+        """После записи в локальную копию: отправка чуть позже и пересчёт напоминаний."""
+        self._push_timer.start()
+        self.reminders.reschedule()
+
+    def _sync_now(self):
+        if self._sync_running:
+            self._sync_pending = True
+            return
+        self._sync_running = True
+        self._sync_pending = False
+        self.sync_label.setText("Синхронизация...")
+        self._sync_task = run_in_background(replica_sync.sync, on_result=self._on_synced,
+                                            on_error=self._on_sync_error)
+
+    def _on_synced(self, result: dict):
+        self._sync_running = False
+        self._last_sync_at = time.monotonic()
+        
+        # Созданные без сети кредиты получили id сервера
+        remapped = result["remapped"]
+        if remapped:
+            self.loan_model.remap_ids(remapped)
+            self._current_loan_id = remapped.get(self._current_loan_id, self._current_loan_id)
+            self._details_loan_id = remapped.get(self._details_loan_id, self._details_loan_id)
+            self._last_selected_loan_id = remapped.get(self._last_selected_loan_id, self._last_selected_loan_id)
+        
+        changed = set(result["changed_loan_ids"])
+        if changed:
+            self._refresh_data()
+            self.reminders.reschedule()
+            if (self._current_loan_id in changed and not self._unsaved_changes
+                    and not self._create_mode):
+                self._load_loan_details(self._current_loan_id)
+        
+        text = f"Синхронизировано в {datetime.now():%H:%M}"
+        if result["pending"]:
+            text += f", не отправлено изменений: {result['pending']}"
+        self.sync_label.setText(text)
+        self.sync_label.setToolTip("")
+        
+        if result["conflicts"]:
+            QMessageBox.warning(
+                self, "Конфликт изменений",
+                "Часть изменений не сохранена на сервере - там эти данные уже изменили:\n\n"
+                + "\n".join(result["conflicts"]),
             )
-            
-            # Выбираем первую строку, если не в режиме создания
-            if not self._create_mode and self.table.rowCount() > 0:
-                if not self.table.selectedItems():
-                    self._suppress_selection_prompt = True
-                    self.table.selectRow(0)
-                    self._suppress_selection_prompt = False
-                    self._last_selected_row = 0
-                    self._update_details_from_selection()
-            else:
-                self._fill_details(None)
-                
-        except Exception as e:
-            QMessageBox.critical(self, "Ошибка", f"Ошибка при обновлении данных: {e}")
+        if self._sync_pending:
+            self._sync_now()
 
-    def _on_selection_changed(self):
+    def _on_sync_error(self, error: str):
+        from ..db_sa import MIGRATE_HINT, SchemaMismatchError
+
+        self._sync_running = False
+        self._last_sync_at = time.monotonic()
+        if isinstance(getattr(self._sync_task, "error", None), SchemaMismatchError):
+            # Сервер доступен, но его схема старее программы: повтор без миграции не поможет
+            self.sync_label.setText("Схема базы на сервере устарела - работа с локальной копией")
+            self.sync_label.setToolTip(f"{error}\n\n{MIGRATE_HINT}")
+            if not self._schema_warned:
+                self._schema_warned = True
+                QMessageBox.warning(self, "Схема базы данных",
+                                    f"Синхронизация с сервером невозможна:\n{error}\n\n{MIGRATE_HINT}")
+        else:
+            self.sync_label.setText("Нет связи с сервером - работа с локальной копией")
+            self.sync_label.setToolTip(error)
+        if self._sync_pending:
+            self._sync_now()
+
+    def _on_selection_changed(self, *args):
         """Обработчик изменения выбора в таблице."""
         if self._suppress_selection_prompt:
             return
@@ -462,33 +524,40 @@ class MainWindow(QMainWindow):
                 self._save_loan()
             elif reply == QMessageBox.StandardButton.Cancel:
                 # Возвращаемся к предыдущему выбору
-                self._suppress_selection_prompt = True
-                self.table.selectRow(self._last_selected_row)
-                self._suppress_selection_prompt = False
+                self._select_loan(self._last_selected_loan_id)
                 return
         
         self._update_details_from_selection()
 
     def _update_details_from_selection(self):
         """Обновление деталей на основе выбранной строки."""
-        current_row = self.table.currentRow()
-        if current_row >= 0:
-            self._last_selected_row = current_row
-            loan_id = int(self.table.item(current_row, 0).text())
+        loan_id = self._selected_loan_id()
+        if loan_id is not None:
+            self._last_selected_loan_id = loan_id
             self._load_loan_details(loan_id)
 
     def _load_loan_details(self, loan_id: int):
-        """Загрузка деталей кредита."""
-        try:
-            loan = loan_repo.get_loan_by_id(loan_id)
-            if loan:
-                self._current_loan_id = loan_id
-                self._fill_details(loan)
-                self._load_installments(loan_id)
-            else:
-                self._fill_details(None)
-        except Exception as e:
-            QMessageBox.critical(self, "Ошибка", f"Ошибка при загрузке кредита: {e}")
+        """Загрузка деталей кредита и его платежей (в фоне)."""
+        self._details_loan_id = loan_id
+        
+        def load():
+            return local_loan_repo.get_loan_by_id(loan_id), local_installment_repo.get_installments_by_loan_id(loan_id)
+        
+        run_in_background(
+            load,
+            on_result=lambda result: self._on_details_loaded(loan_id, *result),
+            on_error=lambda error: QMessageBox.critical(self, "Ошибка", f"Ошибка при загрузке кредита: {error}"),
+        )
+
+    def _on_details_loaded(self, loan_id: int, loan: Optional[dict], installments: List[dict]):
+        if loan_id != self._details_loan_id:
+            return  # пользователь уже выбрал другой кредит
+        if loan:
+            self._current_loan_id = loan_id
+            self._fill_details(loan)
+            self._fill_installments(installments)
+        else:
+            self._fill_details(None)
 
     def _fill_details(self, loan: Optional[dict]):
         """Заполнение полей деталей кредита."""
@@ -531,81 +600,85 @@ class MainWindow(QMainWindow):
             self._unsaved_changes = False
 
     def _load_installments(self, loan_id: int):
-        """Загрузка платежей для кредита."""
-        try:
-            installments = installment_repo.get_installments_by_loan_id(loan_id)
+        """Загрузка платежей для кредита (в фоне)."""
+        run_in_background(
+            local_installment_repo.get_installments_by_loan_id, loan_id,
+            on_result=lambda installments: (
+                self._fill_installments(installments) if loan_id == self._current_loan_id else None
+            ),
+            on_error=lambda error: QMessageBox.critical(self, "Ошибка", f"Ошибка при загрузке платежей: {error}"),
+        )
+
+    def _fill_installments(self, installments: List[dict]):
+        """Заполнение таблицы платежей."""
+        self.installments_table.setRowCount(len(installments))
+        
+        for row, inst in enumerate(installments):
+            # Дата
+            try:
+                inst_date = datetime.strptime(inst["due_date"], "%Y-%m-%d").date()
+                date_str = inst_date.strftime("%d %B %Y")
+            except ValueError:
+                date_str = inst["due_date"]
             
-            self.installments_table.setRowCount(len(installments))
+            self.installments_table.setItem(row, 0, QTableWidgetItem(date_str))
             
-            for row, inst in enumerate(installments):
-                # Дата
-                try:
-                    inst_date = datetime.strptime(inst["due_date"], "%Y-%m-%d").date()
-                    date_str = inst_date.strftime("%d %B %Y")
-                except ValueError:
-                    date_str = inst["due_date"]
-                
-                self.installments_table.setItem(row, 0, QTableWidgetItem(date_str))
-                
-                # Сумма
-                self.installments_table.setItem(row, 1, QTableWidgetItem(f"{inst['amount']:.2f}"))
-                
-                # Оплачен
-                paid_text = "Да" if inst["paid"] else "Нет"
-                self.installments_table.setItem(row, 2, QTableWidgetItem(paid_text))
-                
-                # Действие
-                action_layout = QHBoxLayout()
-                action_layout.setContentsMargins(5, 5, 5, 5)
-                action_layout.setSpacing(8)
-                
-                toggle_button = QPushButton("Оплачен" if not inst["paid"] else "Не оплачен")
-                toggle_button.setStyleSheet("""
-                    background-color: #28a745; 
-                    color: white; 
-                    font-size: 12px;
-                    padding: 6px 16px;
-                    min-height: 25px;
-                    min-width: 80px;
-                    border: none;
-                    border-radius: 4px;
-                """ if not inst["paid"] else """
-                    background-color: #dc3545; 
-                    color: white; 
-                    font-size: 12px;
-                    padding: 6px 16px;
-                    min-height: 25px;
-                    min-width: 80px;
-                    border: none;
-                    border-radius: 4px;
-                """)
-                toggle_button.clicked.connect(lambda checked, inst_id=inst["id"], current_paid=inst["paid"]: self._toggle_installment_paid(inst_id, not current_paid))
-                
-                delete_button = QPushButton("Удалить")
-                delete_button.setStyleSheet("""
-                    background-color: #dc3545; 
-                    color: white; 
-                    font-size: 12px;
-                    padding: 6px 16px;
-                    min-height: 25px;
-                    min-width: 70px;
-                    border: none;
-                    border-radius: 4px;
-                """)
-                delete_button.clicked.connect(lambda checked, inst_id=inst["id"]: self._delete_installment(inst_id))
-                
-                action_layout.addWidget(toggle_button)
-                action_layout.addWidget(delete_button)
-                
-                action_widget = QWidget()
-                action_widget.setLayout(action_layout)
-                self.installments_table.setCellWidget(row, 3, action_widget)
+            # Сумма
+            self.installments_table.setItem(row, 1, QTableWidgetItem(f"{inst['amount']:.2f}"))
             
-            # Автоподбор высоты таблицы
-            self.installments_table.setMaximumHeight(self.installments_table.rowHeight(0) * (len(installments) + 1) + 50)
+            # Оплачен
+            paid_text = "Да" if inst["paid"] else "Нет"
+            self.installments_table.setItem(row, 2, QTableWidgetItem(paid_text))
             
-        except Exception as e:
-            QMessageBox.critical(self, "Ошибка", f"Ошибка при загрузке платежей: {e}")
+            # Действие
+            action_layout = QHBoxLayout()
+            action_layout.setContentsMargins(5, 5, 5, 5)
+            action_layout.setSpacing(8)
+            
+            toggle_button = QPushButton("Оплачен" if not inst["paid"] else "Не оплачен")
+            toggle_button.setStyleSheet("""
+                background-color: #28a745; 
+                color: white; 
+                font-size: 12px;
+                padding: 6px 16px;
+                min-height: 25px;
+                min-width: 80px;
+                border: none;
+                border-radius: 4px;
+            """ if not inst["paid"] else """
+                background-color: #dc3545; 
+                color: white; 
+                font-size: 12px;
+                padding: 6px 16px;
+                min-height: 25px;
+                min-width: 80px;
+                border: none;
+                border-radius: 4px;
+            """)
+            toggle_button.clicked.connect(lambda checked, inst_id=inst["id"], current_paid=inst["paid"]: self._toggle_installment_paid(inst_id, not current_paid))
+            
+            delete_button = QPushButton("Удалить")
+            delete_button.setStyleSheet("""
+                background-color: #dc3545; 
+                color: white; 
+                font-size: 12px;
+                padding: 6px 16px;
+                min-height: 25px;
+                min-width: 70px;
+                border: none;
+                border-radius: 4px;
+            """)
+            delete_button.clicked.connect(lambda checked, inst_id=inst["id"]: self._delete_installment(inst_id))
+            
+            action_layout.addWidget(toggle_button)
+            action_layout.addWidget(delete_button)
+            
+            action_widget = QWidget()
+            action_widget.setLayout(action_layout)
+            self.installments_table.setCellWidget(row, 3, action_widget)
+        
+        # Автоподбор высоты таблицы
+        self.installments_table.setMaximumHeight(self.installments_table.rowHeight(0) * (len(installments) + 1) + 50)
 
     def _add_loan(self):
         """Добавление нового кредита."""
@@ -617,42 +690,63 @@ class MainWindow(QMainWindow):
         self._unsaved_changes = False
 
     def _save_loan(self):
-        """Сохранение кредита."""
-        try:
-            loan_data = {
-                "org_name": self.org_name_edit.text().strip(),
-                "website": self.website_edit.text().strip(),
-                "loan_date": self.loan_date_edit.date().toString("yyyy-MM-dd"),
-                "amount_borrowed": self.amount_borrowed_edit.value(),
-                "due_date": self.due_date_edit.date().toString("yyyy-MM-dd"),
-                "risky_org": self.risky_org_checkbox.isChecked(),
-                "notes": self.notes_edit.toPlainText().strip(),
-                "payment_methods": self.payment_methods_edit.toPlainText().strip(),
-            }
-            
-            if not loan_data["org_name"] or not loan_data["website"]:
-                QMessageBox.warning(self, "Предупреждение", "Заполните название организации и сайт")
-                return
-            
-            if self._create_mode:
-                # Создание нового кредита
-                loan_id = loan_repo.create_loan(loan_data)
-                self._current_loan_id = loan_id
-                self._create_mode = False
-                QMessageBox.information(self, "Успех", "Кредит создан")
-            else:
-                # Обновление существующего кредита
-                if loan_repo.update_loan(self._current_loan_id, loan_data):
-                    QMessageBox.information(self, "Успех", "Кредит обновлен")
-                else:
-                    QMessageBox.critical(self, "Ошибка", "Не удалось обновить кредит")
-                    return
-            
-            self._unsaved_changes = False
+        """Сохранение кредита (запись в фоне)."""
+        loan_data = {
+            "org_name": self.org_name_edit.text().strip(),
+            "website": self.website_edit.text().strip(),
+            "loan_date": self.loan_date_edit.date().toString("yyyy-MM-dd"),
+            "amount_borrowed": self.amount_borrowed_edit.value(),
+            "due_date": self.due_date_edit.date().toString("yyyy-MM-dd"),
+            "risky_org": self.risky_org_checkbox.isChecked(),
+            "notes": self.notes_edit.toPlainText().strip(),
+            "payment_methods": self.payment_methods_edit.toPlainText().strip(),
+        }
+        
+        if not loan_data["org_name"] or not loan_data["website"]:
+            QMessageBox.warning(self, "Предупреждение", "Заполните название организации и сайт")
+            return
+        
+        # Повторное нажатие до ответа базы не создаст второй кредит
+        self.save_button.setEnabled(False)
+        self._unsaved_changes = False
+        
+        def on_error(error: str):
+            self.save_button.setEnabled(True)
+            QMessageBox.critical(self, "Ошибка", f"Ошибка при сохранении кредита: {error}")
+        
+        if self._create_mode:
+            # Создание нового кредита
+            run_in_background(local_loan_repo.create_loan, loan_data, on_result=self._on_loan_created, on_error=on_error)
+        else:
+            # Обновление существующего кредита
+            run_in_background(
+                local_loan_repo.update_loan, self._current_loan_id, loan_data,
+                on_result=self._on_loan_updated, on_error=on_error,
+            )
+
+    def _on_loan_created(self, loan_id: int):
+        self._current_loan_id = loan_id
+        self._create_mode = False
+        self.save_button.setEnabled(True)
+        QMessageBox.information(self, "Успех", "Кредит создан")
+        self._refresh_data()
+        self._on_local_change()
+
+    def _on_loan_updated(self, updated: bool):
+        self.save_button.setEnabled(True)
+        if updated:
+            QMessageBox.information(self, "Успех", "Кредит обновлен")
             self._refresh_data()
-            
-        except Exception as e:
-            QMessageBox.critical(self, "Ошибка", f"Ошибка при сохранении кредита: {e}")
+            self._on_local_change()
+        else:
+            QMessageBox.critical(self, "Ошибка", "Не удалось обновить кредит")
+
+    def _on_installments_changed(self):
+        """После изменения платежей: таблица кредитов и платежи текущего кредита."""
+        self._refresh_data()
+        self._on_local_change()
+        if self._current_loan_id:
+            self._load_installments(self._current_loan_id)
 
     def _add_installment(self):
         """Добавление нового платежа."""
@@ -660,44 +754,43 @@ class MainWindow(QMainWindow):
             QMessageBox.warning(self, "Предупреждение", "Сначала выберите или создайте кредит")
             return
         
-        try:
-            installment_data = {
-                "loan_id": self._current_loan_id,
-                "due_date": self.installment_date_edit.date().toString("yyyy-MM-dd"),
-                "amount": self.installment_amount_edit.value(),
-            }
-            
-            if installment_data["amount"] <= 0:
-                QMessageBox.warning(self, "Предупреждение", "Сумма должна быть больше нуля")
-                return
-            
-            installment_repo.create_installment(installment_data)
+        installment_data = {
+            "loan_id": self._current_loan_id,
+            "due_date": self.installment_date_edit.date().toString("yyyy-MM-dd"),
+            "amount": self.installment_amount_edit.value(),
+        }
+        
+        if installment_data["amount"] <= 0:
+            QMessageBox.warning(self, "Предупреждение", "Сумма должна быть больше нуля")
+            return
+        
+        def on_result(_installment_id: int):
             QMessageBox.information(self, "Успех", "Платеж добавлен")
-            
             # Очищаем поля
             self.installment_date_edit.setDate(QDate.currentDate())
             self.installment_amount_edit.setValue(0.0)
-            
-            # Обновляем данные
-            self._refresh_data()
-            if self._current_loan_id:
-                self._load_installments(self._current_loan_id)
-            
-        except Exception as e:
-            QMessageBox.critical(self, "Ошибка", f"Ошибка при добавлении платежа: {e}")
+            self._on_installments_changed()
+        
+        run_in_background(
+            local_installment_repo.create_installment, installment_data,
+            on_result=on_result,
+            on_error=lambda error: QMessageBox.critical(self, "Ошибка", f"Ошибка при добавлении платежа: {error}"),
+        )
 
     def _toggle_installment_paid(self, installment_id: int, paid: bool):
         """Переключение статуса оплаты платежа."""
-        try:
-            if installment_repo.toggle_installment_paid(installment_id, paid):
+        def on_result(updated: bool):
+            if updated:
                 QMessageBox.information(self, "Успех", "Статус платежа обновлен")
-                self._refresh_data()
-                if self._current_loan_id:
-                    self._load_installments(self._current_loan_id)
+                self._on_installments_changed()
             else:
                 QMessageBox.critical(self, "Ошибка", "Не удалось обновить статус платежа")
-        except Exception as e:
-            QMessageBox.critical(self, "Ошибка", f"Ошибка при обновлении статуса платежа: {e}")
+        
+        run_in_background(
+            local_installment_repo.toggle_installment_paid, installment_id, paid,
+            on_result=on_result,
+            on_error=lambda error: QMessageBox.critical(self, "Ошибка", f"Ошибка при обновлении статуса платежа: {error}"),
+        )
 
     def _delete_installment(self, installment_id: int):
         """Удаление платежа."""
@@ -706,18 +799,21 @@ class MainWindow(QMainWindow):
             "Удалить этот платеж?",
             QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No
         )
+        if reply != QMessageBox.StandardButton.Yes:
+            return
         
-        if reply == QMessageBox.StandardButton.Yes:
-            try:
-                if installment_repo.delete_installment(installment_id):
-                    QMessageBox.information(self, "Успех", "Платеж удален")
-                    self._refresh_data()
-                    if self._current_loan_id:
-                        self._load_installments(self._current_loan_id)
-                else:
-                    QMessageBox.critical(self, "Ошибка", "Не удалось удалить платеж")
-            except Exception as e:
-                QMessageBox.critical(self, "Ошибка", f"Ошибка при удалении платежа: {e}")
+        def on_result(deleted: bool):
+            if deleted:
+                QMessageBox.information(self, "Успех", "Платеж удален")
+                self._on_installments_changed()
+            else:
+                QMessageBox.critical(self, "Ошибка", "Не удалось удалить платеж")
+        
+        run_in_background(
+            local_installment_repo.delete_installment, installment_id,
+            on_result=on_result,
+            on_error=lambda error: QMessageBox.critical(self, "Ошибка", f"Ошибка при удалении платежа: {error}"),
+        )
 
     def _open_payment_site(self, url: Optional[str] = None):
         """Открытие сайта для оплаты."""
@@ -737,9 +833,14 @@ class MainWindow(QMainWindow):
         except Exception as e:
             QMessageBox.critical(self, "Ошибка", f"Не удалось открыть сайт: {e}")
 
-    def _on_cell_double_clicked(self, row: int, column: int):
+    def _on_action_clicked(self, proxy_index):
+        """Кнопка "Оплатить"/"Погашен" в строке кредита."""
+        source_index = self.loan_proxy.mapToSource(proxy_index)
+        self._open_payment_site(self.loan_model.loan_at(source_index.row())["website"])
+
+    def _on_cell_double_clicked(self, index):
         """Обработчик двойного клика по ячейке."""
-        if column == 3:  # Кнопка действия
+        if index.column() == COL_ACTION:  # Кнопка действия
             return
         
         self._update_details_from_selection()
@@ -7,9 +7,11 @@ from PyQt6.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QLabel, QProgressBar, 
     QApplication, QFrame, QGraphicsDropShadowEffect
 )
-from PyQt6.QtCore import Qt, QTimer, QThread, pyqtSignal, QPropertyAnimation, QEasingCurve
+from PyQt6.QtCore import Qt, QThread, pyqtSignal, QPropertyAnimation, QEasingCurve
 from PyQt6.QtGui import QFont, QPalette, QColor, QPainter, QLinearGradient, QBrush
+import threading
 import time
+from typing import Optional
 
 
 class SplashScreen(QWidget):
@@ -148,26 +150,10 @@ class SplashScreen(QWidget):
         inner_layout.addWidget(version_label)
     
     def _setup_animation(self):
-        """Настройка анимации прогресс-бара."""
+        """Плавное движение прогресс-бара к фактическому значению."""
         self.animation = QPropertyAnimation(self.progress_bar, b"value")
-        self.animation.setDuration(3000)  # 3 секунды
-        self.animation.setEasingCurve(QEasingCurve.Type.InOutQuad)
-        
-        # Таймер для обновления статуса
-        self.status_timer = QTimer()
-        self.status_timer.timeout.connect(self._update_status)
-        self.status_timer.start(200)  # Обновляем каждые 200мс
-        
-        self.current_step = 0
-        self.status_messages = [
-            "Инициализация...",
-            "Загрузка модулей...",
-            "Подключение к базе данных...",
-            "Проверка соединения...",
-            "Загрузка данных...",
-            "Создание интерфейса...",
-            "Завершение загрузки..."
-        ]
+        self.animation.setDuration(150)
+        self.animation.setEasingCurve(QEasingCurve.Type.OutQuad)
     
     def _center_window(self):
         """Центрирование окна на экране."""
@@ -176,24 +162,17 @@ class SplashScreen(QWidget):
         y = (screen.height() - self.height()) // 2
         self.move(x, y)
     
-    def _update_status(self):
-        """Обновление статуса загрузки."""
-        if self.current_step < len(self.status_messages):
-            self.status_label.setText(self.status_messages[self.current_step])
-            self.current_step += 1
-        else:
-            self.status_timer.stop()
-    
     def start_loading(self):
-        """Запуск анимации загрузки."""
-        self.animation.setStartValue(0)
-        self.animation.setEndValue(100)
-        self.animation.start()
+        """Показ загрузочного окна (прогресс - по мере реальной загрузки)."""
+        self.progress_bar.setValue(0)
         self.show()
     
     def set_progress(self, value: int):
         """Установка значения прогресс-бара."""
-        self.progress_bar.setValue(value)
+        self.animation.stop()
+        self.animation.setStartValue(self.progress_bar.value())
+        self.animation.setEndValue(value)
+        self.animation.start()
     
     def set_status(self, message: str):
         """Установка текста статуса."""
@@ -205,16 +184,41 @@ class SplashScreen(QWidget):
 
 
 class LoadingThread(QThread):
-    """Поток для выполнения загрузки в фоне."""
+    """
+    Поток запуска: реальные шаги загрузки, параллельно друг другу.
+
+    - открытие локальной копии данных (app/local_replica.py); при первом
+      запуске - полная синхронизация с сервером, иначе синхронизация идёт
+      в фоне после показа окна и запуск не ждёт сеть;
+    - загрузка списка кредитов из локальной копии;
+    - прогрев: импорт модулей интерфейса и настройка ORM.
+    Прогресс растёт по мере завершения шагов (веса - STARTUP_STEPS).
+    """
     
     progress_updated = pyqtSignal(int)
     status_updated = pyqtSignal(str)
     finished = pyqtSignal()
     error_occurred = pyqtSignal(str)
     
+    # (шаг, что показать по завершении, вес в процентах)
+    STARTUP_STEPS = [
+        ("replica", "Локальная копия данных открыта", 15),
+        ("sync", "Данные получены с сервера", 40),
+        ("loans", "Данные кредитов загружены", 25),
+        ("warmup", "Модули интерфейса загружены", 20),
+    ]
+    
     def __init__(self):
         super().__init__()
         self.splash = None
+        self.loans = None
+        self.error = None
+        self.timings = {}
+        self._started = 0.0
+        self._progress = 0
+        self._lock = threading.Lock()
+        self._weights = {step: weight for step, _, weight in self.STARTUP_STEPS}
+        self._messages = {step: message for step, message, _ in self.STARTUP_STEPS}
     
     def set_splash(self, splash: SplashScreen):
         """Установка ссылки на загрузочное окно."""
@@ -222,55 +226,62 @@ class LoadingThread(QThread):
         self.progress_updated.connect(splash.set_progress)
         self.status_updated.connect(splash.set_status)
     
+    def _step_done(self, step: str, message: Optional[str] = None) -> None:
+        """Шаг завершён (вызывается из рабочих потоков)."""
+        with self._lock:
+            self.timings[step] = time.perf_counter() - self._started
+            self._progress += self._weights[step]
+            progress = self._progress
+        self.progress_updated.emit(progress)
+        self.status_updated.emit(message or self._messages[step])
+    
+    def _load_loans(self) -> list:
+        from app.local_replica import local_loan_repo, replica, replica_sync
+        replica.get_engine()
+        self._step_done("replica")
+        if replica_sync.is_initialized():
+            self._step_done("sync", "Синхронизация с сервером - в фоне")
+        else:
+            # Первый запуск: копия пуста, без сервера показывать нечего
+            replica_sync.sync()
+            self._step_done("sync")
+        loans = local_loan_repo.get_all_loans()
+        self._step_done("loans")
+        return loans
+    
+    def _warm_up(self) -> None:
+        from sqlalchemy.orm import configure_mappers
+        import app.models_sa  # noqa: F401
+        import app.ui.main_window_sa  # noqa: F401
+        configure_mappers()
+        self._step_done("warmup")
+    
     def run(self):
         """Выполнение загрузки."""
-        try:
-            # Шаг 1: Инициализация
-            self.status_updated.emit("Инициализация приложения...")
-            self.progress_updated.emit(5)
-            time.sleep(0.3)
-            
-            # Шаг 2: Импорт модулей
-            self.status_updated.emit("Загрузка модулей PyQt6...")
-            self.progress_updated.emit(15)
-            time.sleep(0.4)
-            
-            # Шаг 3: Импорт SQLAlchemy
-            self.status_updated.emit("Загрузка модулей базы данных...")
-            self.progress_updated.emit(25)
-            time.sleep(0.3)
-            
-            # Шаг 4: Подключение к PostgreSQL
-            self.status_updated.emit("Подключение к PostgreSQL на Render...")
-            self.progress_updated.emit(40)
-            time.sleep(0.8)  # Дольше, так как это реальное подключение
-            
-            # Шаг 5: Проверка соединения
-            self.status_updated.emit("Проверка соединения с базой данных...")
-            self.progress_updated.emit(60)
-            time.sleep(0.6)
-            
-            # Шаг 6: Создание таблиц
-            self.status_updated.emit("Инициализация структуры базы данных...")
-            self.progress_updated.emit(75)
-            time.sleep(0.4)
-            
-            # Шаг 7: Загрузка данных
-            self.status_updated.emit("Загрузка данных кредитов...")
-            self.progress_updated.emit(85)
-            time.sleep(0.3)
-            
-            # Шаг 8: Создание интерфейса
-            self.status_updated.emit("Создание пользовательского интерфейса...")
-            self.progress_updated.emit(95)
-            time.sleep(0.2)
-            
-            # Шаг 9: Завершение
-            self.status_updated.emit("Завершение загрузки...")
-            self.progress_updated.emit(100)
-            time.sleep(0.2)
-            
-            self.finished.emit()
-            
-        except Exception as e:
-            self.error_occurred.emit(str(e))
+        from concurrent.futures import ThreadPoolExecutor, as_completed
+        
+        self._started = time.perf_counter()
+        self.status_updated.emit("Открытие данных...")
+        
+        errors = {}
+        with ThreadPoolExecutor(max_workers=2, thread_name_prefix="startup") as pool:
+            futures = {
+                pool.submit(self._load_loans): "loans",
+                pool.submit(self._warm_up): "warmup",
+            }
+            for future in as_completed(futures):
+                try:
+                    result = future.result()
+                except Exception as e:
+                    errors[futures[future]] = e
+                    continue
+                if futures[future] == "loans":
+                    self.loans = result
+        
+        if errors:
+            self.error = errors.get("loans") or errors.get("warmup")
+            self.error_occurred.emit(str(self.error))
+            return
+        
+        self.status_updated.emit("Создание пользовательского интерфейса...")
+        self.finished.emit()
@@ -7,7 +7,12 @@ backlog = 2048
 
 # Worker processes
 workers = 3
-worker_class = "sync"
+# Потоки, а не sync: иначе воркер держит один запрос и пул хеширования паролей
+# (app/password_hasher.py) никогда не заполняется - всплеск входов занимает
+# все воркеры и страницы ждут. Потоков больше, чем входов может занять пул
+# (PASSWORD_HASH_WORKERS + PASSWORD_HASH_QUEUE_SIZE), - остальные обслуживают страницы
+worker_class = "gthread"
+threads = 8
 worker_connections = 1000
 timeout = 60
 keepalive = 2
@@ -41,3 +46,10 @@ raw_env = [
 
 # Preload app
 preload_app = True
+
+
+def post_fork(server, worker):
+    """Отправитель email в воркере: сразу забирает письма, оставшиеся от завершившихся процессов"""
+    from app.email_service import email_service
+    if email_service.enabled:
+        email_service.queue.start()
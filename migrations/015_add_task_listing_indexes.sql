@@ -0,0 +1,11 @@
+-- Индексы для списка задач (keyset-пагинация) и счётчиков подзадач
+-- Дата: 19 октября 2026
+
+BEGIN;
+
+CREATE INDEX IF NOT EXISTS ix_tasks_user_listing ON tasks (user_id, status, importance, due_date);
+CREATE INDEX IF NOT EXISTS ix_subtasks_task_id ON subtasks (task_id);
+
+COMMIT;
+
+SELECT 'Индексы списка задач созданы' as status;
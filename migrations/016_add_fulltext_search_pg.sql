@@ -0,0 +1,29 @@
+-- Полнотекстовый поиск: генерируемые tsvector колонки и GIN индексы
+-- Дата: 19 октября 2026
+-- Требуется PostgreSQL 12+ (GENERATED ... STORED).
+-- То же самое выполняет scripts/migrate.py (app.search.ensure_search_schema).
+
+BEGIN;
+
+ALTER TABLE tasks ADD COLUMN IF NOT EXISTS search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('russian', coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('russian', coalesce(description, '')), 'B')
+    ) STORED;
+CREATE INDEX IF NOT EXISTS ix_tasks_search_vector ON tasks USING GIN (search_vector);
+
+ALTER TABLE subtasks ADD COLUMN IF NOT EXISTS search_vector tsvector
+    GENERATED ALWAYS AS (to_tsvector('russian', coalesce(title, ''))) STORED;
+CREATE INDEX IF NOT EXISTS ix_subtasks_search_vector ON subtasks USING GIN (search_vector);
+
+ALTER TABLE loans ADD COLUMN IF NOT EXISTS search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('russian', coalesce(org_name, '')), 'A') ||
+        setweight(to_tsvector('simple', coalesce(website, '')), 'B') ||
+        setweight(to_tsvector('russian', coalesce(notes, '')), 'C')
+    ) STORED;
+CREATE INDEX IF NOT EXISTS ix_loans_search_vector ON loans USING GIN (search_vector);
+
+COMMIT;
+
+SELECT 'Полнотекстовый поиск настроен' as status;
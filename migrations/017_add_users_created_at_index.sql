@@ -0,0 +1,10 @@
+-- Индекс для keyset-пагинации списка пользователей в админ-панели
+-- Дата: 19 октября 2026
+
+BEGIN;
+
+CREATE INDEX IF NOT EXISTS ix_users_created_at ON users (created_at);
+
+COMMIT;
+
+SELECT 'Индекс списка пользователей создан' as status;
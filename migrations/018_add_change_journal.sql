@@ -0,0 +1,48 @@
+-- Журнал изменений для инкрементальных бэкапов (app/change_journal.py)
+-- Дата: 19 октября 2026
+
+BEGIN;
+
+CREATE SEQUENCE IF NOT EXISTS change_log_version_seq;
+
+CREATE TABLE IF NOT EXISTS change_log (
+    version INTEGER PRIMARY KEY DEFAULT nextval('change_log_version_seq'),
+    table_name VARCHAR(64) NOT NULL,
+    row_id INTEGER NOT NULL,
+    op VARCHAR(1) NOT NULL,
+    changed_at VARCHAR NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_change_log_changed_at ON change_log (changed_at);
+
+CREATE OR REPLACE FUNCTION journal_change() RETURNS trigger AS $$
+BEGIN
+    INSERT INTO change_log (version, table_name, row_id, op, changed_at)
+    VALUES (
+        nextval('change_log_version_seq'),
+        TG_TABLE_NAME,
+        CASE WHEN TG_OP = 'DELETE' THEN OLD.id ELSE NEW.id END,
+        left(TG_OP, 1),
+        to_char(clock_timestamp() AT TIME ZONE 'UTC', 'YYYY-MM-DD"T"HH24:MI:SS.US')
+    );
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+DO $$
+DECLARE
+    t TEXT;
+BEGIN
+    FOREACH t IN ARRAY ARRAY['users', 'task_categories', 'loans', 'installments', 'tasks', 'subtasks',
+                             'task_schedules', 'reminder_rules', 'task_reminders',
+                             'reminder_templates', 'reminder_rule_templates']
+    LOOP
+        EXECUTE format('DROP TRIGGER IF EXISTS journal_%1$s ON %1$I', t);
+        EXECUTE format('CREATE TRIGGER journal_%1$s AFTER INSERT OR UPDATE OR DELETE ON %1$I
+                        FOR EACH ROW EXECUTE FUNCTION journal_change()', t);
+    END LOOP;
+END
+$$;
+
+COMMIT;
+
+SELECT 'Журнал изменений создан' as status;
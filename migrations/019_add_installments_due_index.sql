@@ -0,0 +1,10 @@
+-- Индекс для поиска ближайших неоплаченных платежей (напоминания в трее)
+-- Дата: 19 октября 2026
+
+BEGIN;
+
+CREATE INDEX IF NOT EXISTS ix_installments_unpaid_due ON installments (paid, due_date);
+
+COMMIT;
+
+SELECT 'Индекс платежей по сроку создан' as status;
@@ -0,0 +1,11 @@
+-- Индексы для календаря месяца: платежи займа и напоминания задачи по дате
+-- Дата: 19 октября 2026
+
+BEGIN;
+
+CREATE INDEX IF NOT EXISTS ix_installments_loan_due ON installments (loan_id, due_date);
+CREATE INDEX IF NOT EXISTS ix_task_reminders_task_time ON task_reminders (task_id, reminder_time);
+
+COMMIT;
+
+SELECT 'Индексы календаря созданы' as status;
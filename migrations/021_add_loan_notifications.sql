@@ -0,0 +1,24 @@
+-- Журнал отправленных напоминаний о платежах и индекс неоплаченных займов по сроку
+-- Дата: 19 октября 2026
+
+BEGIN;
+
+CREATE SEQUENCE IF NOT EXISTS loan_notifications_id_seq;
+
+CREATE TABLE IF NOT EXISTS loan_notifications (
+    id INTEGER PRIMARY KEY DEFAULT nextval('loan_notifications_id_seq'),
+    user_id INTEGER NOT NULL REFERENCES users (id) ON DELETE CASCADE,
+    loan_id INTEGER NOT NULL REFERENCES loans (id) ON DELETE CASCADE,
+    due_date VARCHAR NOT NULL,
+    channel VARCHAR(20) NOT NULL,
+    sent_on VARCHAR NOT NULL,
+    created_at VARCHAR NOT NULL,
+    CONSTRAINT uq_loan_notifications_sent UNIQUE (loan_id, due_date, channel, sent_on)
+);
+CREATE INDEX IF NOT EXISTS ix_loan_notifications_user_id ON loan_notifications (user_id);
+
+CREATE INDEX IF NOT EXISTS ix_loans_unpaid_due ON loans (is_paid, due_date);
+
+COMMIT;
+
+SELECT 'Журнал напоминаний о платежах создан' as status;
@@ -0,0 +1,17 @@
+-- Индексы списка задач под сортировку (importance, coalesce(due_date, '9999-12-31'), id)
+-- Дата: 19 октября 2026
+--
+-- ix_tasks_user_listing из 015 заканчивался на due_date и не обслуживал
+-- сортировку по coalesce(...): задачи без срока идут в конец.
+
+BEGIN;
+
+DROP INDEX IF EXISTS ix_tasks_user_listing;
+CREATE INDEX IF NOT EXISTS ix_tasks_user_listing
+    ON tasks (user_id, importance, (coalesce(due_date, '9999-12-31')), id);
+CREATE INDEX IF NOT EXISTS ix_tasks_user_status_listing
+    ON tasks (user_id, status, importance, (coalesce(due_date, '9999-12-31')), id);
+
+COMMIT;
+
+SELECT 'Индексы сортировки списка задач пересозданы' as status;
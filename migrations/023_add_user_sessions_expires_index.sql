@@ -0,0 +1,10 @@
+-- Индекс по сроку сессии: удаление истёкших (sweep_expired_sessions)
+-- Дата: 19 октября 2026
+
+BEGIN;
+
+CREATE INDEX IF NOT EXISTS ix_user_sessions_expires_at ON user_sessions (expires_at);
+
+COMMIT;
+
+SELECT 'Индекс ix_user_sessions_expires_at создан' as status;
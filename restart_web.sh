@@ -7,6 +7,9 @@ echo "Останавливаем gunicorn..."
 pkill -f gunicorn
 sleep 2
 
+echo "Проверяем схему БД..."
+./.venv/bin/python scripts/migrate.py
+
 echo "Запускаем gunicorn..."
 ./.venv/bin/gunicorn --config gunicorn.conf.py "web:create_app()" --daemon
 
@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Поиск по журналу аудита (logs/audit.jsonl и сжатые audit-*.jsonl.gz)
+
+Сжатые файлы, которые по своему индексу (интервал времени, события,
+пользователи) не могут содержать подходящих событий, не читаются.
+
+Использование:
+    python scripts/audit_query.py --user 42
+    python scripts/audit_query.py --event USER_LOGIN_FAILED --event IP_BLOCKED --since 2026-10-01
+    python scripts/audit_query.py --user 42 --since 2026-10-01T00:00 --until 2026-10-19 --json
+"""
+import argparse
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.audit_log import log_dir, query_events
+
+
+def _until(value: str) -> str:
+    # Дата без времени - включительно весь день
+    return f"{value}T23:59:59" if len(value) == 10 else value
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Поиск по журналу аудита")
+    parser.add_argument("--user", type=int, help="user_id (также target_user_id/admin_id)")
+    parser.add_argument("--event", action="append", help="тип события (можно несколько)")
+    parser.add_argument("--since", help="с какого момента (ISO: 2026-10-01 или 2026-10-01T12:00)")
+    parser.add_argument("--until", help="по какой момент включительно")
+    parser.add_argument("--dir", default=log_dir, help="каталог журнала")
+    parser.add_argument("--json", action="store_true", help="выводить JSON lines")
+    args = parser.parse_args()
+
+    count = 0
+    for entry in query_events(user_id=args.user, events=args.event, since=args.since,
+                              until=_until(args.until) if args.until else None, directory=args.dir):
+        count += 1
+        if args.json:
+            print(json.dumps(entry, ensure_ascii=False))
+        else:
+            details = " | ".join(f"{k}={v}" for k, v in entry.items() if k not in ("ts", "level", "event"))
+            print(f"{entry['ts']} | {entry['level']} | {entry['event']} | {details}")
+
+    if not args.json:
+        print(f"Найдено событий: {count}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Полный или инкрементальный бэкап по журналу изменений (app/change_journal.py)
+
+Полный бэкап - все таблицы; инкремент - только строки, изменённые после
+предыдущего бэкапа. Водяной знак хранится в <dir>/journal_state.json.
+Восстановление - scripts/restore_backup.py.
+
+Использование:
+    python scripts/backup_incremental.py --full [--dir backups]
+    python scripts/backup_incremental.py [--dir backups] [--prune]
+    python scripts/backup_incremental.py --quiet   # вывести только путь к файлу
+"""
+import argparse
+import os
+import sys
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.change_journal import (
+    load_state, prune_journal, save_state, write_full_backup, write_incremental_backup,
+)
+from app.data_export import open_output
+from app.db_sa import get_engine
+
+STATE_FILE = "journal_state.json"
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Полный/инкрементальный бэкап")
+    parser.add_argument("--dir", default="backups", help="каталог бэкапов")
+    parser.add_argument("--full", action="store_true", help="полный бэкап (иначе - инкремент)")
+    parser.add_argument("--prune", action="store_true", help="удалить из журнала записи, уже попавшие в бэкапы")
+    parser.add_argument("--quiet", action="store_true", help="вывести только путь к файлу бэкапа")
+    args = parser.parse_args()
+
+    log = (lambda *a: None) if args.quiet else print
+    os.makedirs(args.dir, exist_ok=True)
+    state_path = os.path.join(args.dir, STATE_FILE)
+    state = load_state(state_path)
+    engine = get_engine()
+
+    full = args.full or state is None
+    if full and not args.full:
+        log("Предыдущего полного бэкапа нет - делаем полный")
+
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    kind = "full" if full else "inc"
+    part_path = os.path.join(args.dir, f"mikrokredit_{kind}_{timestamp}.part.gz")
+
+    with open_output(part_path) as out:
+        result = write_full_backup(engine, out) if full else write_incremental_backup(engine, out, state)
+    # Версия в имени: файлы не перезаписывают друг друга и видно, что покрывает инкремент
+    path = os.path.join(args.dir, f"mikrokredit_{kind}_{timestamp}_v{result['watermark']}.ndjson.gz")
+    os.replace(part_path, path)
+
+    # Знак сдвигается только после того, как файл целиком записан
+    save_state(state_path, result["watermark"], result["taken_at"])
+
+    if full:
+        log(f"✅ Полный бэкап: {sum(result['counts'].values())} строк")
+    else:
+        changed = sum(c["upserted"] + c["deleted"] for c in result["counts"].values())
+        log(f"✅ Инкремент: {changed} изменённых строк (версии до {result['watermark']})")
+
+    if args.prune and state is not None:
+        log(f"Журнал: удалено {prune_journal(engine, state)} записей")
+
+    print(path)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
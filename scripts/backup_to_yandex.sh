@@ -1,5 +1,6 @@
 #!/bin/bash
-# Автоматический бэкап PostgreSQL на Яндекс.Диск
+# Автоматический бэкап базы на Яндекс.Диск (полный раз в неделю, инкременты ежедневно)
+# Восстановление: scripts/restore_backup.py <полный> <инкременты...>
 # Запускается через cron ежедневно в 2:00 MSK
 # Публичная папка: https://yadi.sk/d/gVpI3Fst7J5EIw
 
@@ -15,15 +16,11 @@ fi
 
 # Конфигурация (из .env)
 BACKUP_DIR="/home/valstan/mikrokredit/backups"
-DB_NAME="${DB_NAME:-mikrokredit}"
-DB_USER="${DB_USER:-mikrokredit_user}"
-DB_HOST="${DB_HOST:-localhost}"
-export PGPASSWORD="${DB_PASSWORD}"
 
 # Яндекс.Диск настройки (из .env)
 YANDEX_TOKEN="${YANDEX_DISK_TOKEN}"
 YANDEX_FOLDER="/МикроКредит_Backups"  # Папка на Яндекс.Диске
-MAX_BACKUPS=10  # Максимальное количество бэкапов
+MAX_BACKUPS=30  # Максимальное количество бэкапов (полный + 6 инкрементов в неделю)
 
 # Логирование
 LOG_FILE="/home/valstan/mikrokredit/logs/backup.log"
@@ -38,30 +35,26 @@ log "=== Начало создания бэкапа ==="
 # Создание директории для бэкапов
 mkdir -p "$BACKUP_DIR"
 
-# Генерация имени файла с датой и временем
-TIMESTAMP=$(date +%Y%m%d_%H%M%S)
-BACKUP_FILE="$BACKUP_DIR/mikrokredit_${TIMESTAMP}.sql"
-BACKUP_FILENAME="mikrokredit_${TIMESTAMP}.sql"
-
-log "Создание дампа базы данных: $BACKUP_FILENAME"
+# Полный бэкап по воскресеньям (или FULL_BACKUP=1), в остальные дни - только
+# изменения за сутки по журналу изменений (scripts/backup_incremental.py)
+BACKUP_MODE=""
+if [ "$(date +%u)" = "7" ] || [ "${FULL_BACKUP:-0}" = "1" ]; then
+    BACKUP_MODE="--full"
+    log "Создание полного бэкапа"
+else
+    log "Создание инкрементального бэкапа"
+fi
 
-# Создание дампа PostgreSQL
-if pg_dump -U "$DB_USER" -h "$DB_HOST" "$DB_NAME" > "$BACKUP_FILE" 2>> "$LOG_FILE"; then
-    BACKUP_SIZE=$(du -h "$BACKUP_FILE" | cut -f1)
-    log "✓ Дамп создан успешно (размер: $BACKUP_SIZE)"
+cd "$PROJECT_ROOT"
+if BACKUP_FILE=$(python3 scripts/backup_incremental.py --dir "$BACKUP_DIR" $BACKUP_MODE --prune --quiet 2>> "$LOG_FILE"); then
+    BACKUP_FILENAME=$(basename "$BACKUP_FILE")
+    COMPRESSED_SIZE=$(du -h "$BACKUP_FILE" | cut -f1)
+    log "✓ Бэкап создан: $BACKUP_FILENAME (размер: $COMPRESSED_SIZE)"
 else
-    log "✗ Ошибка создания дампа!"
+    log "✗ Ошибка создания бэкапа!"
     exit 1
 fi
 
-# Сжатие бэкапа
-log "Сжатие бэкапа..."
-gzip -f "$BACKUP_FILE"
-BACKUP_FILE="${BACKUP_FILE}.gz"
-BACKUP_FILENAME="${BACKUP_FILENAME}.gz"
-COMPRESSED_SIZE=$(du -h "$BACKUP_FILE" | cut -f1)
-log "✓ Бэкап сжат (размер: $COMPRESSED_SIZE)"
-
 # Загрузка на Яндекс.Диск
 log "Загрузка на Яндекс.Диск..."
 
@@ -121,10 +114,10 @@ fi
 
 # Удаление локального бэкапа (оставляем только последние 3 локально)
 log "Очистка локальных бэкапов..."
-LOCAL_BACKUP_COUNT=$(ls -1 "$BACKUP_DIR"/mikrokredit_*.sql.gz 2>/dev/null | wc -l)
-if [ "$LOCAL_BACKUP_COUNT" -gt 3 ]; then
-    log "Удаление старых локальных бэкапов (оставляем последние 3)"
-    ls -1t "$BACKUP_DIR"/mikrokredit_*.sql.gz | tail -n +4 | xargs rm -f
+LOCAL_BACKUP_COUNT=$(ls -1 "$BACKUP_DIR"/mikrokredit_*.ndjson.gz 2>/dev/null | wc -l)
+if [ "$LOCAL_BACKUP_COUNT" -gt 14 ]; then
+    log "Удаление старых локальных бэкапов (оставляем последние 14)"
+    ls -1t "$BACKUP_DIR"/mikrokredit_*.ndjson.gz | tail -n +15 | xargs rm -f
     log "✓ Старые локальные бэкапы удалены"
 fi
 
@@ -135,8 +128,5 @@ log "Размер: $COMPRESSED_SIZE"
 log "Локальная копия: $BACKUP_FILE"
 log "Яндекс.Диск: ${YANDEX_FOLDER}/${BACKUP_FILENAME}"
 
-# Очистка переменной с паролем
-unset PGPASSWORD
-
 exit 0
 
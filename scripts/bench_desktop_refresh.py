@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк: обновление таблицы кредитов десктопного клиента при медленной базе
+
+Каждому SQL-запросу добавляется искусственная задержка (имитация удалённого
+PostgreSQL). Измеряется число запросов на одно обновление, время обновления и
+самая долгая пауза цикла событий Qt (насколько "замерзает" окно):
+- синхронно: loan_repo.get_all_loans() с сервера в UI-потоке (как раньше);
+- в фоне: MainWindow._refresh_data() - из локальной копии (app/local_replica.py)
+  через пул потоков; сервер нужен только фоновой синхронизации.
+
+Использование (база - из app/config.py или MIKROKREDIT_DATABASE_URL):
+    QT_QPA_PLATFORM=offscreen python scripts/bench_desktop_refresh.py --latency-ms 40
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PyQt6.QtCore import QEventLoop, QTimer
+from PyQt6.QtWidgets import QApplication
+from sqlalchemy import event
+
+
+class StallMeter:
+    """Самая долгая пауза между тиками таймера в UI-потоке."""
+
+    def __init__(self, interval_ms: int = 5):
+        self.timer = QTimer()
+        self.timer.setInterval(interval_ms)
+        self.timer.timeout.connect(self._tick)
+        self.max_gap = 0.0
+        self._last = None
+
+    def _tick(self):
+        now = time.perf_counter()
+        if self._last is not None:
+            self.max_gap = max(self.max_gap, now - self._last)
+        self._last = now
+
+    def start(self):
+        self.max_gap, self._last = 0.0, time.perf_counter()
+        self.timer.start()
+
+    def stop(self) -> float:
+        self.timer.stop()
+        self._tick()
+        return self.max_gap
+
+
+def wait_until(predicate, timeout: float = 60.0):
+    deadline = time.perf_counter() + timeout
+    while not predicate() and time.perf_counter() < deadline:
+        loop = QEventLoop()
+        QTimer.singleShot(5, loop.quit)
+        loop.exec()
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Обновление таблицы кредитов при медленной базе")
+    parser.add_argument("--latency-ms", type=float, default=40, help="задержка на каждый SQL-запрос")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    app = QApplication(sys.argv)
+
+    from app.db_sa import get_engine
+    from app.repository_sa import loan_repo
+    from app.ui.main_window_sa import MainWindow
+
+    queries = [0]
+
+    @event.listens_for(get_engine(), "before_cursor_execute")
+    def _slow(*_):
+        queries[0] += 1
+        time.sleep(args.latency_ms / 1000)
+
+    window = MainWindow()
+    window.show()
+    wait_until(lambda: not window._refresh_running and not window._sync_running)
+    meter = StallMeter()
+
+    for _ in range(args.repeat):
+        queries[0] = 0
+        meter.start()
+        started = time.perf_counter()
+        loans = loan_repo.get_all_loans()
+        window._apply_loans(loans)
+        seconds = time.perf_counter() - started
+        stall = meter.stop()
+        print(f"Синхронно: {len(loans)} кредитов, запросов: {queries[0]}, "
+              f"{seconds * 1000:.0f} мс, окно замирало на {stall * 1000:.0f} мс")
+
+        queries[0] = 0
+        meter.start()
+        started = time.perf_counter()
+        window._refresh_data()
+        wait_until(lambda: not window._refresh_running)
+        seconds = time.perf_counter() - started
+        stall = meter.stop()
+        print(f"В фоне:    запросов: {queries[0]}, {seconds * 1000:.0f} мс, "
+              f"окно замирало на {stall * 1000:.0f} мс")
+
+    window.close()
+    from app.ui.background import db_pool
+    db_pool().waitForDone()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
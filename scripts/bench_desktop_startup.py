@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк: время запуска десктопного клиента до готового главного окна
+
+Приложение запускается в отдельном процессе с MIKROKREDIT_STARTUP_BENCHMARK=1:
+после показа главного окна с таблицей кредитов оно печатает время запуска и
+тайминги шагов загрузки (connect, schema, loans, warmup) и завершается.
+- холодный запуск: пустой кэш байткода (новый PYTHONPYCACHEPREFIX);
+- тёплые запуски: кэш байткода от предыдущего запуска.
+
+Использование (база - из app/config.py или MIKROKREDIT_DATABASE_URL):
+    python scripts/bench_desktop_startup.py --warm 5
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def run_once(pycache_dir: str) -> dict:
+    env = dict(os.environ)
+    env.setdefault("QT_QPA_PLATFORM", "offscreen")
+    env["MIKROKREDIT_STARTUP_BENCHMARK"] = "1"
+    env["PYTHONPYCACHEPREFIX"] = pycache_dir
+    started = time.perf_counter()
+    proc = subprocess.run([sys.executable, os.path.join(ROOT, "app", "main.py")],
+                          cwd=ROOT, env=env, capture_output=True, text=True, timeout=300)
+    wall = time.perf_counter() - started
+
+    result = {"wall_seconds": wall}
+    for line in proc.stdout.splitlines():
+        key, sep, value = line.partition("=")
+        if not sep:
+            continue
+        if key == "startup_error":
+            raise RuntimeError(f"Приложение не запустилось: {value}")
+        if key == "startup_seconds" or key.startswith("step_"):
+            result[key] = float(value)
+    if "startup_seconds" not in result:
+        raise RuntimeError(f"Нет результата (код {proc.returncode}):\n{proc.stdout}\n{proc.stderr}")
+    return result
+
+
+def _format(result: dict) -> str:
+    steps = ", ".join(f"{key[5:-8]} {value * 1000:.0f}"
+                      for key, value in result.items() if key.startswith("step_"))
+    return (f"окно готово через {result['startup_seconds'] * 1000:.0f} мс "
+            f"(процесс целиком {result['wall_seconds'] * 1000:.0f} мс; шаги, мс: {steps})")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Время запуска десктопного клиента")
+    parser.add_argument("--warm", type=int, default=3, help="число тёплых запусков")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="mikrokredit-pycache-") as pycache_dir:
+        cold = run_once(pycache_dir)
+        print(f"Холодный запуск: {_format(cold)}")
+
+        warm = []
+        for i in range(args.warm):
+            result = run_once(pycache_dir)
+            warm.append(result["startup_seconds"])
+            print(f"Тёплый запуск {i + 1}: {_format(result)}")
+
+    if warm:
+        print(f"Тёплый запуск, медиана: {statistics.median(warm) * 1000:.0f} мс")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
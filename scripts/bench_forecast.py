@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк и проверка прогноза платежей (app/forecast.py)
+
+Временная SQLite-база с одним пользователем и множеством займов. Сравнивается:
+- по займам: запрос платежей каждого займа и цикл по ним в Python;
+- app/forecast: один запрос + bisect/префиксные суммы по колонкам.
+Суммы и количества по корзинам обоих способов должны совпасть.
+
+Использование:
+    python scripts/bench_forecast.py --loans 2000 --installments 6 --months 12
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from bisect import bisect_right
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+WORKDIR = tempfile.mkdtemp(prefix="mikrokredit-forecast-")
+os.environ["MIKROKREDIT_DATABASE_URL"] = f"sqlite:///{os.path.join(WORKDIR, 'server.db')}"
+
+from sqlalchemy import select
+
+from app import forecast
+from app.db_sa import create_schema, get_session
+from app.models_sa import InstallmentORM, LoanORM, UserORM
+
+
+def seed(loans: int, installments: int, today: date) -> int:
+    rng = random.Random(1)
+    with get_session() as session:
+        user = UserORM(email="owner@example.com", password_hash="-", created_at="2026-01-01", updated_at="2026-01-01")
+        session.add(user)
+        session.flush()
+        for i in range(loans):
+            loan = LoanORM(user_id=user.id, website=f"bank{i}.example", org_name=f"Банк {i}",
+                           loan_date="2026-01-01", amount_borrowed=1000.0, amount_due=0.0,
+                           due_date="2026-12-01", created_at="2026-01-01", notes="")
+            session.add(loan)
+            session.flush()
+            first = today + timedelta(days=rng.randint(-30, 60))
+            session.add_all(
+                InstallmentORM(loan_id=loan.id, due_date=(first + timedelta(days=30 * j)).isoformat(),
+                               amount=round(rng.uniform(100, 5000), 2), paid=int(rng.random() < 0.2),
+                               created_at="2026-01-01")
+                for j in range(installments)
+            )
+        return user.id
+
+
+def per_loan_forecast(user_id: int, today: date, granularity: str, months: int) -> dict:
+    """Прогноз по-старому: запрос на каждый займ, цикл по платежам"""
+    end = forecast.add_months(today, months)
+    starts = [s.isoformat() for s in forecast.bucket_starts(today, end, granularity)]
+    buckets = [[0.0, 0] for _ in starts]
+    overdue, later = [0.0, 0], [0.0, 0]
+    with get_session() as session:
+        loan_ids = session.execute(select(LoanORM.id).where(LoanORM.user_id == user_id)).scalars().all()
+        for loan_id in loan_ids:
+            rows = session.execute(select(InstallmentORM.due_date, InstallmentORM.amount).where(
+                InstallmentORM.loan_id == loan_id, InstallmentORM.paid == 0)).all()
+            for due_date, amount in rows:
+                if due_date < starts[0]:
+                    target = overdue
+                elif due_date >= end.isoformat():
+                    target = later
+                else:
+                    target = buckets[bisect_right(starts, due_date) - 1]
+                target[0] += amount
+                target[1] += 1
+    return {"overdue": overdue, "buckets": buckets, "later": later}
+
+
+def same(expected: list, actual: dict) -> bool:
+    return round(expected[0], 2) == actual["amount"] and expected[1] == actual["count"]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Прогноз платежей: по займам против колонок")
+    parser.add_argument("--loans", type=int, default=2000)
+    parser.add_argument("--installments", type=int, default=6, help="платежей на займ")
+    parser.add_argument("--months", type=int, default=12)
+    args = parser.parse_args()
+
+    today = date.today()
+    create_schema()
+    user_id = seed(args.loans, args.installments, today)
+
+    for granularity in forecast.GRANULARITIES:
+        started = time.perf_counter()
+        old = per_loan_forecast(user_id, today, granularity, args.months)
+        old_seconds = time.perf_counter() - started
+
+        started = time.perf_counter()
+        new = forecast.get_forecast(user_id, granularity=granularity, months=args.months, today=today)
+        new_seconds = time.perf_counter() - started
+
+        ok = (same(old["overdue"], new["overdue"]) and same(old["later"], new["later"])
+              and len(old["buckets"]) == len(new["buckets"])
+              and all(same(o, n) for o, n in zip(old["buckets"], new["buckets"])))
+        print(f"{'OK  ' if ok else 'FAIL'} {granularity:>5}: корзин {len(new['buckets'])}, "
+              f"по займам {old_seconds * 1000:.0f} мс, колонки {new_seconds * 1000:.1f} мс "
+              f"(x{old_seconds / new_seconds:.0f}); всего {new['total']['amount']:.2f} ₽ "
+              f"в {new['total']['count']} платежах")
+        if not ok:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк: задержка обычных страниц во время всплеска входов
+
+Сначала измеряет задержку GET-страницы в спокойном состоянии, затем
+запускает всплеск параллельных POST /auth/login и одновременно снова
+измеряет задержку той же страницы. Без ограничения пула хеширования
+задержка страниц во время всплеска растёт в разы; с пулом - остаётся
+примерно на уровне спокойного состояния, а лишние входы получают 429/503.
+
+Использование (сервер должен быть запущен):
+    python scripts/bench_login_burst.py --url http://127.0.0.1:8002 \\
+        --email user@example.com --password secret --logins 60 --concurrency 30
+"""
+import argparse
+import statistics
+import sys
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from collections import Counter
+
+
+def timed_request(url: str, data: bytes = None, headers: dict = None):
+    """Returns: (status, seconds)"""
+    request = urllib.request.Request(url, data=data, headers=headers or {})
+    started = time.perf_counter()
+    try:
+        with urllib.request.urlopen(request, timeout=60) as response:
+            response.read()
+            status = response.status
+    except urllib.error.HTTPError as e:
+        status = e.code
+    except Exception:
+        status = 0
+    return status, time.perf_counter() - started
+
+
+def sample_page(url: str, stop: threading.Event, samples: list, interval: float):
+    while not stop.is_set():
+        status, seconds = timed_request(url)
+        if status == 200:
+            samples.append(seconds)
+        time.sleep(interval)
+
+
+def summarize(title: str, samples: list):
+    if not samples:
+        print(f"{title}: нет успешных замеров")
+        return
+    ordered = sorted(samples)
+    p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+    print(f"{title}: n={len(samples)}  p50={statistics.median(samples) * 1000:.1f} ms  "
+          f"p95={p95 * 1000:.1f} ms  max={ordered[-1] * 1000:.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Задержка страниц во время всплеска входов")
+    parser.add_argument("--url", default="http://127.0.0.1:8002")
+    parser.add_argument("--page", default="/healthz", help="страница для замера задержки")
+    parser.add_argument("--email", required=True, help="существующий пользователь")
+    parser.add_argument("--password", required=True)
+    parser.add_argument("--logins", type=int, default=60, help="всего попыток входа")
+    parser.add_argument("--concurrency", type=int, default=30)
+    parser.add_argument("--baseline-seconds", type=float, default=3.0)
+    parser.add_argument("--interval", type=float, default=0.05)
+    args = parser.parse_args()
+
+    page_url = args.url.rstrip("/") + args.page
+    login_url = args.url.rstrip("/") + "/auth/login"
+    body = urllib.parse.urlencode({"email": args.email, "password": args.password}).encode()
+
+    # 1. Спокойное состояние
+    baseline = []
+    stop = threading.Event()
+    sampler = threading.Thread(target=sample_page, args=(page_url, stop, baseline, args.interval))
+    sampler.start()
+    time.sleep(args.baseline_seconds)
+    stop.set()
+    sampler.join()
+
+    # 2. Всплеск входов + замер страницы параллельно
+    during = []
+    statuses = Counter()
+    login_times = []
+    lock = threading.Lock()
+    counter = iter(range(args.logins))
+
+    def login_worker():
+        for i in counter:
+            # Разные X-Forwarded-For, чтобы не упереться в блокировку по IP
+            headers = {
+                "Content-Type": "application/x-www-form-urlencoded",
+                "X-Forwarded-For": f"10.255.{i // 256}.{i % 256}",
+            }
+            status, seconds = timed_request(login_url, body, headers)
+            with lock:
+                statuses[status] += 1
+                login_times.append(seconds)
+
+    stop = threading.Event()
+    sampler = threading.Thread(target=sample_page, args=(page_url, stop, during, args.interval))
+    sampler.start()
+    started = time.perf_counter()
+    workers = [threading.Thread(target=login_worker) for _ in range(args.concurrency)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    burst_seconds = time.perf_counter() - started
+    stop.set()
+    sampler.join()
+
+    summarize(f"Страница {args.page} (спокойно)   ", baseline)
+    summarize(f"Страница {args.page} (всплеск)    ", during)
+    summarize("Вход /auth/login                ", login_times)
+    print(f"Всплеск: {args.logins} входов за {burst_seconds:.2f} s, статусы: {dict(statuses)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Проверка и бенчмарк генератора графика платежей (app/schedule.py)
+
+1. Инварианты для всех методов, в том числе на ставках МФО до MAX_RATE и
+   сроках до MAX_TERM_MONTHS: основной долг по графику равен сумме займа,
+   остаток после последнего платежа - ноль, ни один платёж, доля долга или
+   процентов не отрицательны, аннуитетные платежи (и последний) расходятся
+   не больше чем на ANNUITY_SPREAD, известный пример аннуитета совпадает.
+2. Время: расчёт графика на --term периодов (первый раз и из кэша) и
+   сохранение во временную SQLite-базу одним INSERT против session.add()
+   по платежу.
+
+Использование:
+    python scripts/bench_schedule.py --term 360 --repeat 20
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import date
+from decimal import Decimal
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+WORKDIR = tempfile.mkdtemp(prefix="mikrokredit-schedule-")
+os.environ["MIKROKREDIT_DATABASE_URL"] = f"sqlite:///{os.path.join(WORKDIR, 'server.db')}"
+
+from sqlalchemy import func, select
+
+from app import schedule
+from app.db_sa import create_schema, get_session
+from app.models_sa import InstallmentORM, LoanORM, UserORM
+
+
+def check(condition: bool, message: str) -> None:
+    print(f"{'OK  ' if condition else 'FAIL'} {message}")
+    if not condition:
+        raise SystemExit(1)
+
+
+# (сумма, ставка % годовых, срок): банковские ставки и ставки МФО на длинных сроках,
+# где ошибка округления аннуитета раньше росла как (1 + i)^n; None - срок из --term
+CASES = (
+    (Decimal("100000.00"), Decimal("12"), None),
+    (Decimal("3000000.00"), Decimal("9.9"), None),
+    (Decimal("999.99"), Decimal("0"), None),
+    (Decimal("100000.00"), Decimal("30"), 360),
+    (Decimal("2489.42"), Decimal("50.85"), 231),
+    (Decimal("9469.66"), Decimal("395.02"), 49),
+    (Decimal("50000.00"), Decimal("292"), 600),
+    (Decimal("100000.00"), schedule.MAX_RATE, schedule.MAX_TERM_MONTHS),
+)
+# Насколько аннуитетные платежи могут расходиться из-за округления до копеек
+ANNUITY_SPREAD = Decimal("0.05")
+
+
+def check_invariants(term: int) -> None:
+    start = date(2026, 1, 31)
+    for method in schedule.METHODS:
+        for principal, rate, case_term in CASES:
+            periods = schedule.generate_schedule(principal, rate, case_term or term, start, method)
+            check(sum(p.principal for p in periods) == principal and periods[-1].balance == 0
+                  and all(p.payment == p.principal + p.interest for p in periods),
+                  f"{method}, {principal} под {rate}% на {len(periods)} мес: долг погашен ровно, "
+                  f"платёж = долг + проценты")
+            check(all(min(p.payment, p.principal, p.interest, p.balance) >= 0 for p in periods),
+                  f"{method}, {principal} под {rate}%: нет отрицательных платежей, долга, процентов и остатка")
+            if method == "annuity" and rate:
+                payments = [p.payment for p in periods]
+                check(max(payments) - min(payments) <= ANNUITY_SPREAD,
+                      f"аннуитет: платежи равны с точностью до копеек "
+                      f"({min(payments)}-{max(payments)}, последний {payments[-1]})")
+    periods = schedule.generate_schedule(Decimal("100000.00"), Decimal("12"), 12, start, "annuity")
+    check(periods[0].payment == Decimal("8884.88"), f"аннуитет 100000 под 12% на 12 мес: {periods[0].payment}")
+    check([p.due_date for p in periods[:3]] == ["2026-01-31", "2026-02-28", "2026-03-31"],
+          "даты: тот же день месяца, конец февраля")
+
+
+def bench(term: int, repeat: int) -> None:
+    create_schema()
+    with get_session() as session:
+        user = UserORM(email="owner@example.com", password_hash="-", created_at="2026-01-01", updated_at="2026-01-01")
+        session.add(user)
+        session.flush()
+        loan = LoanORM(user_id=user.id, website="bank.example", org_name="Банк", loan_date="2026-01-01",
+                       amount_borrowed=5000000.0, amount_due=0.0, due_date="2026-01-01", created_at="2026-01-01")
+        session.add(loan)
+        session.flush()
+        loan_id = loan.id
+
+    params = (Decimal("5000000.00"), Decimal("8.5"), term, date(2026, 2, 1), "annuity")
+    schedule.generate_schedule.cache_clear()
+    started = time.perf_counter()
+    periods = schedule.generate_schedule(*params)
+    cold = time.perf_counter() - started
+    started = time.perf_counter()
+    for _ in range(repeat):
+        schedule.generate_schedule(*params)
+    warm = (time.perf_counter() - started) / repeat
+    print(f"Расчёт {term} периодов: {cold * 1000:.2f} мс, из кэша {warm * 1e6:.1f} мкс")
+
+    started = time.perf_counter()
+    for _ in range(repeat):
+        with get_session() as session:
+            schedule.save_schedule(session, session.get(LoanORM, loan_id), periods, params[1])
+    bulk = (time.perf_counter() - started) / repeat
+
+    started = time.perf_counter()
+    for _ in range(repeat):
+        with get_session() as session:
+            for inst in session.execute(select(InstallmentORM).where(InstallmentORM.loan_id == loan_id)).scalars():
+                session.delete(inst)
+            for p in periods:
+                session.add(InstallmentORM(loan_id=loan_id, due_date=p.due_date, amount=float(p.payment),
+                                           paid=0, created_at="2026-01-01"))
+    orm = (time.perf_counter() - started) / repeat
+
+    with get_session() as session:
+        count = session.execute(select(func.count()).where(InstallmentORM.loan_id == loan_id)).scalar_one()
+    check(count == term, f"в базе {count} платежей займа")
+    print(f"Сохранение {term} платежей: массовый INSERT {bulk * 1000:.1f} мс, "
+          f"session.add по платежу {orm * 1000:.1f} мс")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Генератор графика платежей")
+    parser.add_argument("--term", type=int, default=360)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    check_invariants(args.term)
+    bench(args.term, args.repeat)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк: настройки SQLite по умолчанию против профиля app/db.py
+
+- по умолчанию: новое соединение sqlite3 на каждый вызов репозитория, журнал
+  отката (journal_mode=DELETE), synchronous=FULL - как было раньше;
+- профиль: соединение на поток (кэш подготовленных выражений), WAL,
+  synchronous=NORMAL, busy_timeout, mmap, кэш страниц.
+
+Замеряются операции легаси-репозитория (app/repository.py) в одном процессе и
+смесь чтения/записи из нескольких процессов одновременно (как воркеры
+gunicorn + cron): время, операций в секунду и ошибки "database is locked".
+
+Использование:
+    python scripts/bench_sqlite.py --loans 300 --ops 3000 --processes 4
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import db, repository
+from app.models import Installment, Loan
+
+
+def legacy_connection() -> sqlite3.Connection:
+    """get_connection() до настройки: новое соединение на каждый вызов."""
+    conn = sqlite3.connect(db.get_db_path())
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA foreign_keys = ON;")
+    return conn
+
+
+def use_profile(profile: str, path: str) -> None:
+    db.DB_FILENAME = path
+    db._local.__dict__.clear()
+    repository.get_connection = legacy_connection if profile == "defaults" else db.get_connection
+
+
+def prepare(path: str, profile: str, loans: int) -> None:
+    use_profile("tuned", path)
+    db.init_db()
+    rng = random.Random(1)
+    for i in range(loans):
+        loan_id = repository.add_loan(Loan(
+            id=None, website=f"bank{i}.example", loan_date="2026-09-01", amount_borrowed=1000.0,
+            amount_due=0.0, due_date=f"2026-{rng.randint(10, 12)}-{rng.randint(10, 28):02d}",
+            risky_org=False, notes="", payment_methods="", org_name=f"Банк {i}",
+        ))
+        for j in range(3):
+            repository.add_installment(Installment(
+                id=None, loan_id=loan_id, due_date=f"2026-{10 + j}-15", amount=300.0, paid=False, paid_date=None,
+            ))
+    conn = db.get_connection()
+    conn.execute(f"PRAGMA journal_mode = {'DELETE' if profile == 'defaults' else 'WAL'}")
+    conn.close()
+    db._local.__dict__.clear()
+
+
+def workload(profile: str, path: str, ops: int, loans: int, seed: int) -> tuple:
+    """Смесь операций экрана кредита: 80% чтение, 20% запись. Returns: (секунды, ошибок блокировки)"""
+    use_profile(profile, path)
+    rng = random.Random(seed)
+    locked = 0
+    started = time.perf_counter()
+    for _ in range(ops):
+        loan_id = rng.randint(1, loans)
+        try:
+            if rng.random() < 0.8:
+                repository.list_installments(loan_id)
+                repository.get_installments_unpaid_total(loan_id)
+                repository.get_next_unpaid_installment(loan_id)
+            else:
+                installment = repository.list_installments(loan_id)[0]
+                repository.mark_installment_paid(installment.id, not installment.paid)
+                repository.recalc_loan_amount_due(loan_id)
+        except sqlite3.OperationalError as e:
+            if "locked" not in str(e):
+                raise
+            locked += 1
+    return time.perf_counter() - started, locked
+
+
+def _worker(args):
+    return workload(*args)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="SQLite: настройки по умолчанию против профиля")
+    parser.add_argument("--loans", type=int, default=300)
+    parser.add_argument("--ops", type=int, default=3000, help="операций в одном процессе")
+    parser.add_argument("--processes", type=int, default=4, help="процессов в параллельном замере")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="mikrokredit-sqlite-") as workdir:
+        for profile in ("defaults", "tuned"):
+            path = os.path.join(workdir, f"{profile}.db")
+            prepare(path, profile, args.loans)
+
+            seconds, locked = workload(profile, path, args.ops, args.loans, seed=0)
+            print(f"{profile:>8}, 1 процесс:  {args.ops / seconds:7.0f} оп/с ({seconds:.2f} с), "
+                  f"ошибок блокировки: {locked}")
+
+            jobs = [(profile, path, args.ops // args.processes, args.loans, seed)
+                    for seed in range(1, args.processes + 1)]
+            started = time.perf_counter()
+            with multiprocessing.get_context("spawn").Pool(args.processes) as pool:
+                results = pool.map(_worker, jobs)
+            seconds = time.perf_counter() - started
+            total = sum(job[2] for job in jobs)
+            print(f"{profile:>8}, {args.processes} процесса: {total / seconds:7.0f} оп/с ({seconds:.2f} с), "
+                  f"ошибок блокировки: {sum(locked for _, locked in results)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+"""
+Проверка параллельной обработки обновлений Telegram-бота
+
+Поднимает локальный поддельный Bot API (getMe, answerCallbackQuery,
+editMessageText, sendMessage), временную SQLite-базу с задачами и
+напоминаниями и отправляет в приложение бота (build_application из
+scripts/telegram_bot_server.py) пачку нажатий «Выполнено» одновременно.
+Каждое чтение задачи (SELECT tasks) искусственно замедляется на --slow-ms;
+замедлять запись в SQLite бессмысленно - она идёт под блокировкой базы.
+
+Проверяется:
+- все задачи выполнены, неотправленные напоминания удалены, на каждое
+  нажатие ушёл ответ editMessageText;
+- задержка цикла событий (тикер раз в 10 мс) остаётся малой: работа с БД
+  идёт в пуле потоков, а не в цикле;
+- общее время ~ updates * slow / BOT_DB_WORKERS, а не updates * slow.
+
+С --inline запросы к БД выполняются прямо в цикле событий (как до
+run_db) - для сравнения.
+
+Использование:
+    python scripts/check_bot_concurrency.py --updates 200 --slow-ms 50
+    python scripts/check_bot_concurrency.py --updates 200 --slow-ms 50 --inline
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+sys.path.insert(0, os.path.join(PROJECT_ROOT, "scripts"))
+
+WORKDIR = tempfile.mkdtemp(prefix="mikrokredit-bot-")
+os.environ["MIKROKREDIT_DATABASE_URL"] = f"sqlite:///{os.path.join(WORKDIR, 'server.db')}"
+os.environ.setdefault("TELEGRAM_BOT_TOKEN", "123456:TEST")
+# Сводку выводим сами в конце
+os.environ.setdefault("BOT_METRICS_LOG_EVERY", "0")
+
+from sqlalchemy import event, func, select
+from telegram import Update
+
+import telegram_bot_server
+from app.bot_runtime import metrics
+from app.config import BOT_CONCURRENT_UPDATES, BOT_DB_WORKERS
+from app.db_sa import create_schema, get_engine, get_session
+from app.models_sa import TaskORM, TaskReminderORM, UserORM
+
+BOT_USER = {"id": 1, "is_bot": True, "first_name": "MikroKredit", "username": "mikrokredit_bot"}
+CHAT_ID = 1000
+
+
+class FakeBotServer(ThreadingHTTPServer):
+    request_queue_size = 256
+
+
+class FakeBotAPI(BaseHTTPRequestHandler):
+    """Поддельный Bot API: отвечает ok на любой метод, считает вызовы и помнит параметры"""
+    calls = {}
+    params = {}
+    sent_to = {}  # chat_id -> число sendMessage
+    lock = threading.Lock()
+
+    def do_POST(self):
+        method = self.path.rsplit("/", 1)[-1]
+        body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        if self.headers.get("Content-Type", "").startswith("application/json"):
+            params = json.loads(body or b"{}")
+        else:
+            params = {key: values[0] for key, values in parse_qs(body.decode()).items()}
+        with self.lock:
+            self.calls[method] = self.calls.get(method, 0) + 1
+            self.params[method] = params
+            if method == "sendMessage":
+                chat_id = str(params.get("chat_id"))
+                self.sent_to[chat_id] = self.sent_to.get(chat_id, 0) + 1
+        if method == "getMe":
+            result = BOT_USER
+        elif method in ("editMessageText", "sendMessage"):
+            result = {"message_id": 1, "date": int(time.time()), "chat": {"id": CHAT_ID, "type": "private"},
+                      "text": "ok"}
+        else:
+            result = True
+        body = json.dumps({"ok": True, "result": result}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def seed(count: int) -> list:
+    """Задачи с одним отправленным и одним будущим напоминанием: [(task_id, reminder_id)]"""
+    create_schema()
+    now = datetime.now().isoformat()
+    pairs = []
+    with get_session() as session:
+        user = UserORM(email="bot@example.com", password_hash="-", created_at=now, updated_at=now,
+                       telegram_chat_id=str(CHAT_ID))
+        session.add(user)
+        session.flush()
+        for i in range(count):
+            task = TaskORM(user_id=user.id, title=f"Задача {i}", created_at=now, updated_at=now)
+            session.add(task)
+            session.flush()
+            sent = TaskReminderORM(task_id=task.id, reminder_time=now, sent=1, sent_at=now, created_at=now)
+            future = TaskReminderORM(task_id=task.id, reminder_time="2099-01-01 09:00:00", created_at=now)
+            session.add_all([sent, future])
+            session.flush()
+            pairs.append((task.id, sent.id))
+    return pairs
+
+
+def slow_down_task_reads(seconds: float) -> None:
+    """Задержка каждого SELECT задач - имитация медленного запроса"""
+    @event.listens_for(get_engine(), "before_cursor_execute")
+    def slow_query(conn, cursor, statement, parameters, context, executemany):
+        if statement.startswith("SELECT tasks."):
+            time.sleep(seconds)
+
+
+def callback_update(update_id: int, task_id: int, reminder_id: int) -> dict:
+    user = {"id": CHAT_ID, "is_bot": False, "first_name": "Тест"}
+    return {
+        "update_id": update_id,
+        "callback_query": {
+            "id": str(update_id),
+            "from": user,
+            "chat_instance": "1",
+            "data": f"task_complete_{task_id}_{reminder_id}",
+            "message": {"message_id": update_id, "date": int(time.time()),
+                        "chat": {"id": CHAT_ID, "type": "private"}, "text": "⏰ Напоминание"},
+        },
+    }
+
+
+async def run(base_url: str, pairs: list) -> dict:
+    application = telegram_bot_server.build_application(os.environ["TELEGRAM_BOT_TOKEN"], base_url=base_url)
+    await application.initialize()
+
+    lag = {"max": 0.0, "stop": False}
+
+    async def ticker():
+        # Насколько позже срабатывает sleep(10 мс) - задержка цикла событий
+        while not lag["stop"]:
+            started = time.perf_counter()
+            await asyncio.sleep(0.01)
+            lag["max"] = max(lag["max"], time.perf_counter() - started - 0.01)
+
+    updates = [Update.de_json(callback_update(i + 1, *pair), application.bot) for i, pair in enumerate(pairs)]
+    tick = asyncio.create_task(ticker())
+    started = time.perf_counter()
+    # Как в Application с concurrent_updates: не больше BOT_CONCURRENT_UPDATES одновременно
+    limit = asyncio.Semaphore(BOT_CONCURRENT_UPDATES)
+
+    async def process(update):
+        async with limit:
+            await application.process_update(update)
+
+    await asyncio.gather(*(process(update) for update in updates))
+    elapsed = time.perf_counter() - started
+    lag["stop"] = True
+    await tick
+    await application.shutdown()
+    return {"elapsed": elapsed, "max_lag": lag["max"]}
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Параллельная обработка обновлений бота")
+    parser.add_argument("--updates", type=int, default=200)
+    parser.add_argument("--slow-ms", type=float, default=50.0, help="задержка SELECT tasks, мс")
+    parser.add_argument("--inline", action="store_true", help="БД прямо в цикле событий (для сравнения)")
+    args = parser.parse_args()
+
+    pairs = seed(args.updates)
+
+    slow_down_task_reads(args.slow_ms / 1000)
+
+    if args.inline:
+        async def run_db_inline(fn, *fn_args, **fn_kwargs):
+            return fn(*fn_args, **fn_kwargs)
+        telegram_bot_server.run_db = run_db_inline
+
+    server = FakeBotServer(("127.0.0.1", 0), FakeBotAPI)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}/bot"
+    try:
+        result = asyncio.run(run(base_url, pairs))
+    finally:
+        server.shutdown()
+
+    with get_session() as session:
+        done = session.execute(select(func.count()).select_from(TaskORM).where(TaskORM.status == 1)).scalar_one()
+        pending = session.execute(
+            select(func.count()).select_from(TaskReminderORM).where(TaskReminderORM.sent == 0)
+        ).scalar_one()
+
+    mode = "в цикле событий" if args.inline else f"пул БД на {BOT_DB_WORKERS} потоков"
+    print(f"Режим: {mode}; обновлений {args.updates}, SELECT задач задержан на {args.slow_ms:.0f} мс")
+    print(f"Время: {result['elapsed']:.2f} с ({args.updates / result['elapsed']:.0f} обновлений/с), "
+          f"макс. задержка цикла событий {result['max_lag'] * 1000:.0f} мс")
+    print(f"Вызовы Bot API: {dict(sorted(FakeBotAPI.calls.items()))}")
+    print(f"Метрики: {metrics.summary()}")
+
+    ok = (done == args.updates and pending == 0
+          and FakeBotAPI.calls.get("editMessageText") == args.updates
+          and metrics.snapshot()["callback_handler"]["errors"] == 0)
+    print(f"{'OK  ' if ok else 'FAIL'} выполнено задач {done}/{args.updates}, будущих напоминаний осталось {pending}")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+Сквозная проверка webhook-режима бота (app/bot_webhook.py)
+
+Поднимает поддельный Bot API и WebhookServer с приложением бота
+(build_application из scripts/telegram_bot_server.py) на временной
+SQLite-базе, затем «Telegram» - пул потоков - шлёт на webhook нажатия
+«Выполнено» с секретом в заголовке. Как и настоящий Telegram, на 503
+доставка повторяется через паузу. Чтение задач замедлено на --slow-ms.
+
+Проверяется:
+- setWebhook вызван с URL и secret_token;
+- неверный секрет - 403, чужой путь - 404, не-JSON - 200 без обработки;
+- webhook отвечает сразу: p95 ответа в разы меньше p50 обработки
+  (абсолютное время ответа здесь завышено - «Telegram», сервер и
+  обработчики делят один процесс и GIL);
+- при полной очереди (--queue-size) - 503, и после повторов все
+  обновления обработаны: задачи выполнены, на каждое ушёл editMessageText.
+
+Использование:
+    python scripts/check_bot_webhook.py --updates 300 --slow-ms 50 --queue-size 50
+"""
+import argparse
+import asyncio
+import os
+import sys
+import threading
+import time
+import json
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+# Временная база, токен и поддельный Bot API - общие с проверкой параллельности
+from check_bot_concurrency import FakeBotAPI, FakeBotServer, callback_update, seed, slow_down_task_reads
+
+from sqlalchemy import func, select
+
+import telegram_bot_server
+from app.bot_runtime import metrics
+from app.bot_webhook import SECRET_HEADER, WebhookServer
+from app.db_sa import get_session
+from app.models_sa import TaskORM, TaskReminderORM
+
+SECRET = "check-webhook-secret"
+PATH = "/telegram/webhook"
+RETRY_DELAY_SECONDS = 0.5
+
+
+def check(condition: bool, message: str) -> bool:
+    print(f"{'OK  ' if condition else 'FAIL'} {message}")
+    return condition
+
+
+def post(url: str, body: bytes, secret: str) -> int:
+    request = urllib.request.Request(url, data=body, method="POST",
+                                     headers={"Content-Type": "application/json", SECRET_HEADER: secret})
+    try:
+        with urllib.request.urlopen(request, timeout=10) as response:
+            return response.status
+    except urllib.error.HTTPError as e:
+        return e.code
+
+
+def deliver(url: str, update: dict, stats: dict, lock: threading.Lock) -> None:
+    """Доставка как у Telegram: повтор, пока webhook не ответит 200"""
+    body = json.dumps(update).encode()
+    while True:
+        started = time.perf_counter()
+        status = post(url, body, SECRET)
+        elapsed = time.perf_counter() - started
+        with lock:
+            stats["latencies"].append(elapsed)
+            stats["statuses"][status] = stats["statuses"].get(status, 0) + 1
+        if status == 200:
+            return
+        time.sleep(RETRY_DELAY_SECONDS)
+
+
+async def run(base_url: str, pairs: list, queue_size: int, senders: int) -> dict:
+    application = telegram_bot_server.build_application(os.environ["TELEGRAM_BOT_TOKEN"], base_url=base_url)
+    await application.initialize()
+    server = WebhookServer(application, f"https://bot.example.com{PATH}", "127.0.0.1", 0, SECRET,
+                           queue_size=queue_size)
+    await server.start()
+    local_url = f"http://127.0.0.1:{server.port}{PATH}"
+    loop = asyncio.get_running_loop()
+    result = {"latencies": [], "statuses": {}}
+    lock = threading.Lock()
+
+    with ThreadPoolExecutor(max_workers=senders) as telegram:
+        probe = json.dumps(callback_update(0, 0, 0)).encode()
+        result["forbidden"] = await loop.run_in_executor(telegram, post, local_url, probe, "wrong")
+        result["not_found"] = await loop.run_in_executor(telegram, post, local_url + "x", probe, SECRET)
+        result["invalid"] = await loop.run_in_executor(telegram, post, local_url, b"not json", SECRET)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(
+            loop.run_in_executor(telegram, deliver, local_url, callback_update(i + 1, *pair), result, lock)
+            for i, pair in enumerate(pairs)
+        ))
+        result["accepted_in"] = time.perf_counter() - started
+
+    await server.stop()
+    result["processed_in"] = time.perf_counter() - started
+    result["stats"] = server.stats
+    await application.shutdown()
+    return result
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Сквозная проверка webhook-режима бота")
+    parser.add_argument("--updates", type=int, default=300)
+    parser.add_argument("--slow-ms", type=float, default=50.0, help="задержка SELECT tasks, мс")
+    parser.add_argument("--queue-size", type=int, default=50)
+    parser.add_argument("--senders", type=int, default=40, help="параллельных соединений «Telegram»")
+    args = parser.parse_args()
+
+    pairs = seed(args.updates)
+    slow_down_task_reads(args.slow_ms / 1000)
+
+    api = FakeBotServer(("127.0.0.1", 0), FakeBotAPI)
+    threading.Thread(target=api.serve_forever, daemon=True).start()
+    try:
+        result = asyncio.run(run(f"http://127.0.0.1:{api.server_address[1]}/bot", pairs,
+                                 args.queue_size, args.senders))
+    finally:
+        api.shutdown()
+
+    with get_session() as session:
+        done = session.execute(select(func.count()).select_from(TaskORM).where(TaskORM.status == 1)).scalar_one()
+        pending = session.execute(
+            select(func.count()).select_from(TaskReminderORM).where(TaskReminderORM.sent == 0)
+        ).scalar_one()
+
+    accepted = sorted(result["latencies"])
+    p50, p95 = accepted[len(accepted) // 2], accepted[int(len(accepted) * 0.95)]
+    registered = FakeBotAPI.params.get("setWebhook", {})
+    handled_p50_ms = metrics.snapshot()["callback_handler"]["p50_ms"]
+    print(f"Обновлений {args.updates}, очередь {args.queue_size}, SELECT задач задержан на {args.slow_ms:.0f} мс")
+    print(f"Ответы webhook: {result['statuses']}; время ответа p50 {p50 * 1000:.1f} мс, "
+          f"p95 {p95 * 1000:.1f} мс, max {accepted[-1] * 1000:.1f} мс")
+    print(f"Все приняты за {result['accepted_in']:.2f} с, обработаны за {result['processed_in']:.2f} с")
+    print(f"Счётчики сервера: {result['stats']}")
+    print(f"Метрики: {metrics.summary()}")
+
+    ok = all([
+        check(registered.get("url") == f"https://bot.example.com{PATH}" and registered.get("secret_token") == SECRET,
+              "setWebhook с URL и secret_token"),
+        check(result["forbidden"] == 403, f"неверный секрет: {result['forbidden']}"),
+        check(result["not_found"] == 404, f"чужой путь: {result['not_found']}"),
+        check(result["invalid"] == 200 and result["stats"]["invalid"] == 1, f"не-JSON: {result['invalid']}"),
+        check(result["stats"]["accepted"] == args.updates and result["stats"]["failed"] == 0,
+              f"принято {result['stats']['accepted']} обновлений, ошибок обработки {result['stats']['failed']}"),
+        check(done == args.updates and pending == 0 and FakeBotAPI.calls.get("editMessageText") == args.updates,
+              f"выполнено задач {done}/{args.updates}, будущих напоминаний осталось {pending}"),
+        check(p95 * 1000 * 5 < handled_p50_ms,
+              f"ответ webhook (p95 {p95 * 1000:.1f} мс) не ждёт обработки (p50 {handled_p50_ms} мс)"),
+    ])
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Проверка очереди email на локальном SMTP-сервере (aiosmtpd)
+
+Поднимает aiosmtpd с AUTH на 127.0.0.1 и отправляет N писем двумя способами:
+- по-старому: отдельное соединение + login на каждое письмо;
+- через EmailQueue: обработчик только ставит письмо в очередь.
+Печатает время, число SMTP-сессий и задержку постановки в очередь.
+С --fail-every K сервер отвечает 421 на каждое K-е письмо (и рвёт
+соединение) - все письма всё равно должны дойти за счёт переподключения
+и повторов.
+
+Использование:
+    pip install aiosmtpd
+    python scripts/check_email_queue.py --messages 200 [--delay-ms 20] [--fail-every 7]
+"""
+import argparse
+import asyncio
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from aiosmtpd.controller import Controller
+from aiosmtpd.smtp import AuthResult
+
+from app.email_queue import EmailQueue
+from app.email_service import EmailService
+
+# aiosmtpd пишет предупреждение об устаревшем атрибуте на каждый login
+logging.getLogger("mail.log").setLevel(logging.ERROR)
+
+
+class CountingHandler:
+    """Считает сессии (login) и принятые письма, имитирует задержку и сбои"""
+
+    def __init__(self, delay: float, fail_every: int):
+        self.delay = delay
+        self.fail_every = fail_every
+        self.logins = 0
+        self.received = 0
+        self.data_commands = 0
+        self.lock = threading.Lock()
+
+    def authenticate(self, server, session, envelope, mechanism, auth_data):
+        with self.lock:
+            self.logins += 1
+        return AuthResult(success=True)
+
+    async def handle_DATA(self, server, session, envelope):
+        await asyncio.sleep(self.delay)
+        with self.lock:
+            self.data_commands += 1
+            if self.fail_every and self.data_commands % self.fail_every == 0:
+                return "421 Service not available, closing transmission channel"
+            self.received += 1
+        return "250 OK"
+
+    def reset(self):
+        with self.lock:
+            self.logins = self.received = self.data_commands = 0
+
+
+def make_service(port: int) -> EmailService:
+    service = EmailService()
+    service.smtp_host, service.smtp_port = "127.0.0.1", port
+    service.smtp_user, service.smtp_password = "bench", "bench"
+    service.smtp_starttls = False  # локальный сервер без TLS
+    service.enabled = True
+    return service
+
+
+def run_direct(service: EmailService, messages: list) -> float:
+    """Старый способ: соединение, login и отправка на каждое письмо"""
+    started = time.perf_counter()
+    for message in messages:
+        server = service._connect()
+        try:
+            server.send_message(message)
+        finally:
+            server.quit()
+    return time.perf_counter() - started
+
+
+def run_queue(service: EmailService, messages: list, handler: CountingHandler, timeout: float):
+    """Returns: (задержки enqueue, секунд до доставки всех писем, очередь)"""
+    email_queue = EmailQueue(service._connect, retry_base=0.05, retry_max=0.5, max_attempts=10,
+                             spool_dir=tempfile.mkdtemp(prefix="mikrokredit-spool-"))
+    latencies = []
+    started = time.perf_counter()
+    for message in messages:
+        t0 = time.perf_counter()
+        email_queue.enqueue(message)
+        latencies.append(time.perf_counter() - t0)
+
+    deadline = time.monotonic() + timeout
+    while handler.received < len(messages) and time.monotonic() < deadline:
+        time.sleep(0.01)
+    elapsed = time.perf_counter() - started
+    email_queue.flush()
+    return latencies, elapsed, email_queue
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Проверка очереди email на aiosmtpd")
+    parser.add_argument("--messages", type=int, default=200)
+    parser.add_argument("--delay-ms", type=float, default=0, help="задержка сервера на DATA")
+    parser.add_argument("--fail-every", type=int, default=0, help="отвечать 421 на каждое K-е письмо")
+    parser.add_argument("--port", type=int, default=8025)
+    parser.add_argument("--skip-direct", action="store_true", help="не измерять старый способ")
+    args = parser.parse_args()
+
+    handler = CountingHandler(args.delay_ms / 1000, args.fail_every)
+    controller = Controller(handler, hostname="127.0.0.1", port=args.port,
+                            authenticator=handler.authenticate, auth_require_tls=False)
+    controller.start()
+    try:
+        service = make_service(args.port)
+        messages = [
+            service._build_message(f"user{i}@example.com", f"Письмо {i}", f"<p>Тест {i}</p>", f"Тест {i}")
+            for i in range(args.messages)
+        ]
+
+        if not args.skip_direct:
+            fail_every, handler.fail_every = handler.fail_every, 0
+            seconds = run_direct(service, messages)
+            print(f"По-старому:   {seconds:.2f} с, сессий: {handler.logins}, "
+                  f"{seconds / len(messages) * 1000:.1f} мс на письмо в обработчике")
+            handler.fail_every = fail_every
+            handler.reset()
+
+        latencies, seconds, email_queue = run_queue(service, messages, handler, timeout=60)
+        latencies_ms = sorted(x * 1000 for x in latencies)
+        print(f"Очередь:      {seconds:.2f} с до доставки всех, сессий: {handler.logins}")
+        print(f"  enqueue: медиана {statistics.median(latencies_ms):.3f} мс, "
+              f"максимум {latencies_ms[-1]:.3f} мс")
+        print(f"  статистика: {email_queue.stats}")
+
+        ok = handler.received == len(messages) and email_queue.stats["failed"] == 0
+        print(f"{'✅' if ok else '❌'} Доставлено {handler.received} из {len(messages)}")
+        return 0 if ok else 1
+    finally:
+        controller.stop()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
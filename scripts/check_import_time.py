@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Проверка бюджета времени импорта для короткоживущих скриптов
+
+Запускает `python -X importtime` для каждого модуля из BUDGETS и сравнивает
+суммарное время импорта с бюджетом. Код возврата 1, если бюджет превышен.
+
+Cron-скрипты работают с БД при каждом запуске, поэтому SQLAlchemy и модели
+(app.models_sa) импортируются всегда, а время импорта самого SQLAlchemy
+зависит от машины и от запуска к запуску (здесь от ~200 до ~450 мс). Поэтому
+бюджет таких модулей - база плюс фиксированный запас, где база - время
+импорта пакетов BASELINE в том же процессе (по строкам -X importtime): проверка
+ловит новые тяжёлые импорты в app.*, а не скорость машины и шум. Лёгкие модули
+без SQLAlchemy имеют абсолютный бюджет. Каждый модуль импортируется --runs раз,
+берётся запуск с наименьшим временем сверх базы.
+
+Использование:
+    python scripts/check_import_time.py           # проверить все
+    python scripts/check_import_time.py --top 15  # + показать самые тяжёлые модули
+    python scripts/check_import_time.py --scale 1.5  # медленная машина: запасы x1.5
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCRIPTS_DIR = os.path.join(PROJECT_ROOT, "scripts")
+
+# Неизбежный минимум для всего, что работает с БД - пакет, время импорта которого
+# в том же процессе служит базой бюджета
+BASELINE = "sqlalchemy"
+
+# модуль -> (база, запас в мс): бюджет = время импорта базы + запас; база None - бюджет абсолютный
+# (суммарное время импорта, без старта интерпретатора)
+BUDGETS = {
+    "send_task_reminders": (BASELINE, 150),  # app.models_sa и сам скрипт (~50-100 мс)
+    "regenerate_reminders": (BASELINE, 150),
+    "app.integration": (None, 30),
+    "app.telegram_auth": (None, 50),
+    "app.db_sa": (BASELINE, 50),  # config и app.data_version (~10-20 мс)
+}
+
+
+def measure(module: str, runs: int = 1):
+    """
+    Импортировать модуль runs раз в отдельных процессах с -X importtime
+    Returns: (total_ms, baseline_ms, [(cumulative_us, name), ...]) запуска с наименьшим total - baseline
+    """
+    return min((_measure_once(module) for _ in range(max(1, runs))), key=lambda result: result[0] - result[1])
+
+
+def _baseline_us(lines) -> int:
+    """
+    Время импорта пакета BASELINE (не вложенного в него же) по строкам -X importtime
+    Строки идут снизу вверх (сначала вложенные), глубина - отступ имени по 2 пробела
+    """
+    total = 0
+    stack = []  # (глубина, внутри BASELINE)
+    for cumulative_us, raw_name in reversed(lines):
+        depth = (len(raw_name) - len(raw_name.lstrip())) // 2
+        while stack and stack[-1][0] >= depth:
+            stack.pop()
+        inside = bool(stack) and stack[-1][1]
+        name = raw_name.strip()
+        is_baseline = name == BASELINE or name.startswith(BASELINE + ".")
+        if is_baseline and not inside:
+            total += cumulative_us
+        stack.append((depth, inside or is_baseline))
+    return total
+
+
+def _measure_once(module: str):
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join([PROJECT_ROOT, SCRIPTS_DIR, env.get("PYTHONPATH", "")])
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=PROJECT_ROOT,
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1] if proc.stderr else "import failed")
+
+    lines = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        # import time:  self [us] | cumulative | imported package
+        _, cumulative_us, name = line.split("|")
+        lines.append((int(cumulative_us), name[1:].rstrip()))
+    rows = [(us, name.strip()) for us, name in lines]
+
+    # Самый верхний уровень (без отступа) - это наш модуль
+    total_us = next((us for us, name in reversed(rows) if name == module), 0)
+    return total_us / 1000.0, _baseline_us(lines) / 1000.0, rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Проверка бюджета времени импорта")
+    parser.add_argument("--top", type=int, default=0, help="показать N самых тяжёлых импортов")
+    parser.add_argument("--scale", type=float, default=1.0, help="множитель запасов для медленных машин")
+    parser.add_argument("--runs", type=int, default=3, help="запусков на модуль (берётся минимум)")
+    args = parser.parse_args()
+
+    failed = False
+    for module, (base, allowance_ms) in BUDGETS.items():
+        try:
+            total_ms, baseline_ms, rows = measure(module, args.runs)
+        except RuntimeError as e:
+            print(f"❌ {module}: {e}")
+            failed = True
+            continue
+
+        budget_ms = (baseline_ms if base else 0.0) + allowance_ms * args.scale
+        ok = total_ms <= budget_ms
+        failed |= not ok
+        over = f"{base} {baseline_ms:.0f} + {allowance_ms * args.scale:.0f}" if base else "абсолютный"
+        print(f"{'✅' if ok else '❌'} {module}: {total_ms:.1f} ms (бюджет {budget_ms:.0f} ms: {over})")
+        if args.top:
+            for us, name in sorted(rows, reverse=True)[1:args.top + 1]:
+                print(f"      {us / 1000.0:8.1f} ms  {name}")
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
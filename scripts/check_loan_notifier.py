@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+Проверка и бенчмарк уведомлений о горящих кредитах (scripts/telegram_notifier.py)
+
+На временной SQLite-базе с --users пользователями (по 4 займа: рассрочка с
+ближайшим платежом в окне, рассрочка со сроком далеко, разовый займ -
+просроченный или будущий, оплаченный займ) и разными настройками каналов:
+
+1. find_due (один запрос) совпадает с прежним алгоритмом - 2-3 запроса на
+   займ по всем займам; печатается время и число запросов обоих.
+2. Рассылка через поддельный Bot API: каждому пользователю с включённым
+   Telegram - одно сообщение в его chat_id; повторный запуск в тот же
+   день не отправляет ничего (loan_notifications).
+
+Использование:
+    python scripts/check_loan_notifier.py --users 2000
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+from datetime import date, datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+# Временная база, токен и поддельный Bot API - общие с проверкой бота
+from check_bot_concurrency import FakeBotAPI, FakeBotServer
+
+from sqlalchemy import event, func, insert, select
+
+import telegram_notifier as notifier_script
+from app.db_sa import create_schema, get_engine, get_session
+from app.loan_notifications import CHANNEL_EMAIL, CHANNEL_TELEGRAM, find_due
+from app.models_sa import InstallmentORM, LoanNotificationORM, LoanORM, UserORM
+from app.telegram_notifier import telegram_notifier
+
+DAYS = 2
+
+
+def check(condition: bool, message: str) -> bool:
+    print(f"{'OK  ' if condition else 'FAIL'} {message}")
+    return condition
+
+
+def seed(users: int, today: date) -> None:
+    create_schema()
+    now = datetime.now().isoformat()
+    day = lambda offset: (today + timedelta(days=offset)).isoformat()
+    with get_session() as session:
+        session.execute(insert(UserORM), [
+            {"id": i, "email": f"user{i}@example.com", "password_hash": "-", "full_name": f"Пользователь {i}",
+             "telegram_chat_id": None if i % 4 == 0 else str(100000 + i),
+             "telegram_notifications": i % 4 != 1, "email_notifications": True,
+             "email_verified": i % 3 == 0, "is_active": i % 10 != 9,
+             "created_at": now, "updated_at": now}
+            for i in range(1, users + 1)
+        ])
+        loans, installments = [], []
+        for i in range(1, users + 1):
+            base = i * 10
+            loans += [
+                {"id": base + 1, "user_id": i, "website": "bank.example", "org_name": f"Рассрочка {i}",
+                 "loan_date": day(-60), "amount_borrowed": 9000.0, "amount_due": 9000.0, "due_date": day(60),
+                 "created_at": now},
+                {"id": base + 2, "user_id": i, "website": "far.example", "org_name": None,
+                 "loan_date": day(-10), "amount_borrowed": 5000.0, "amount_due": 6000.0, "due_date": day(90),
+                 "created_at": now},
+                {"id": base + 3, "user_id": i, "website": "mfo.example", "org_name": f"МФО {i}",
+                 "loan_date": day(-30), "amount_borrowed": 3000.0, "amount_due": 3600.0,
+                 "due_date": day(-1 if i % 2 else 10), "created_at": now},
+                {"id": base + 4, "user_id": i, "website": "paid.example", "org_name": "Оплачен",
+                 "loan_date": day(-30), "amount_borrowed": 1000.0, "amount_due": 1200.0, "due_date": day(0),
+                 "is_paid": 1, "created_at": now},
+            ]
+            installments += [
+                {"loan_id": base + 1, "due_date": day(-29), "amount": 3000.0, "paid": 1, "created_at": now},
+                {"loan_id": base + 1, "due_date": day(i % 3), "amount": 3000.0, "paid": 0, "created_at": now},
+                {"loan_id": base + 1, "due_date": day(31), "amount": 3000.0, "paid": 0, "created_at": now},
+                {"loan_id": base + 2, "due_date": day(30), "amount": 3000.0, "paid": 0, "created_at": now},
+                {"loan_id": base + 2, "due_date": day(60), "amount": 3000.0, "paid": 0, "created_at": now},
+            ]
+        session.execute(insert(LoanORM), loans)
+        session.execute(insert(InstallmentORM), installments)
+
+
+def old_due(session, today: date) -> set:
+    """Прежний алгоритм: все займы, 2-3 запроса на займ. Returns: {(user_id, loan_id, due_date)}"""
+    result = set()
+    users = {u.id: u for u in session.execute(select(UserORM)).scalars()}
+    for loan in session.execute(select(LoanORM)).scalars().all():
+        total = session.execute(select(func.count(InstallmentORM.id)).where(InstallmentORM.loan_id == loan.id)).scalar()
+        unpaid = session.execute(select(func.count(InstallmentORM.id))
+                                 .where(InstallmentORM.loan_id == loan.id, InstallmentORM.paid == 0)).scalar()
+        if unpaid:
+            nxt = session.execute(select(InstallmentORM)
+                                  .where(InstallmentORM.loan_id == loan.id, InstallmentORM.paid == 0)
+                                  .order_by(InstallmentORM.due_date.asc()).limit(1)).scalar_one()
+            due_date = nxt.due_date
+        elif total or loan.is_paid or not loan.amount_due > 0:
+            continue
+        else:
+            due_date = loan.due_date
+        if (date.fromisoformat(due_date) - today).days > DAYS:
+            continue
+        user = users[loan.user_id]
+        telegram_on = user.telegram_chat_id is not None and user.telegram_notifications
+        email_on = user.email_notifications and user.email_verified
+        if user.is_active and (telegram_on or email_on):
+            result.add((user.id, loan.id, due_date))
+    return result
+
+
+def count_queries(fn, *args):
+    queries = [0]
+
+    def counter(*_):
+        queries[0] += 1
+
+    event.listen(get_engine(), "before_cursor_execute", counter)
+    try:
+        started = time.perf_counter()
+        with get_session() as session:
+            result = fn(session, *args)
+        return result, time.perf_counter() - started, queries[0]
+    finally:
+        event.remove(get_engine(), "before_cursor_execute", counter)
+
+
+def run_notifier() -> int:
+    sys.argv = ["telegram_notifier.py", "--days", str(DAYS)]
+    return notifier_script.main()
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Уведомления о горящих кредитах")
+    parser.add_argument("--users", type=int, default=2000)
+    args = parser.parse_args()
+
+    today = date.today()
+    seed(args.users, today)
+
+    users, new_seconds, new_queries = count_queries(find_due, today, DAYS)
+    expected, old_seconds, old_queries = count_queries(old_due, today)
+    found = {(user["user_id"], loan["loan_id"], loan["due_date"]) for user in users for loan in user["loans"]}
+    print(f"Займов {args.users * 4}: прежний алгоритм {old_seconds * 1000:.0f} мс, {old_queries} запросов; "
+          f"один запрос {new_seconds * 1000:.1f} мс, {new_queries} запрос(ов)")
+
+    api = FakeBotServer(("127.0.0.1", 0), FakeBotAPI)
+    threading.Thread(target=api.serve_forever, daemon=True).start()
+    telegram_notifier.base_url = f"http://127.0.0.1:{api.server_address[1]}/bot{telegram_notifier.bot_token}"
+    try:
+        started = time.perf_counter()
+        first = run_notifier()
+        first_seconds = time.perf_counter() - started
+        first_sent = dict(FakeBotAPI.sent_to)
+        second = run_notifier()
+    finally:
+        api.shutdown()
+
+    telegram_users = {user["telegram_chat_id"] for user in users if CHANNEL_TELEGRAM in user["channels"]}
+    with get_session() as session:
+        recorded = session.execute(select(func.count()).select_from(LoanNotificationORM)).scalar_one()
+    expected_records = sum(len(user["loans"]) for user in users if CHANNEL_TELEGRAM in user["channels"])
+    print(f"Рассылка: {len(first_sent)} сообщений за {first_seconds:.2f} с")
+
+    ok = all([
+        check(found == expected and len(found) > 0, f"find_due совпадает с прежним алгоритмом ({len(found)} платежей)"),
+        check(new_queries == 1, "выборка - один запрос"),
+        check(any(CHANNEL_EMAIL in user["channels"] for user in users)
+              and all(user["telegram_chat_id"] or CHANNEL_TELEGRAM not in user["channels"] for user in users),
+              "каналы: email только с подтверждённым адресом, Telegram только с chat_id"),
+        check(first == 0 and set(first_sent) == telegram_users and set(first_sent.values()) == {1},
+              f"первый запуск: по одному сообщению {len(telegram_users)} пользователям с Telegram"),
+        check(recorded == expected_records, f"записано напоминаний: {recorded}"),
+        check(second == 0 and FakeBotAPI.sent_to == first_sent, "повторный запуск за день ничего не отправил"),
+    ])
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+Проверка локальной копии десктопного клиента и её синхронизации (app/local_replica.py)
+
+Сервер - временная SQLite-база со схемой и журналом изменений, клиенты - две
+локальные копии (A и B). Сценарий:
+1. обе копии получают данные полной выгрузкой;
+2. A без сети: правит кредит, отмечает платеж, создаёт кредит с платежом;
+3. B тем временем меняет те же заметки кредита и синхронизируется;
+4. A снова в сети: изменения уходят на сервер, заметки - конфликт (остаются
+   серверные), новый кредит получает id сервера; B получает изменения A;
+5. сервер и обе копии совпадают.
+Затем - время чтения списка кредитов из копии и с сервера с задержкой сети.
+
+Использование:
+    python scripts/check_replica_sync.py --loans 60 --latency-ms 40
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+WORKDIR = tempfile.mkdtemp(prefix="mikrokredit-replica-")
+os.environ["MIKROKREDIT_DATABASE_URL"] = f"sqlite:///{os.path.join(WORKDIR, 'server.db')}"
+os.environ["MIKROKREDIT_REPLICA_PATH"] = os.path.join(WORKDIR, "unused.db")
+
+from sqlalchemy import event, select
+
+from app.db_sa import create_schema, get_engine, get_session
+from app.local_replica import LocalReplica, ReplicaSync
+from app.models_sa import InstallmentORM, LoanORM, UserORM
+from app.repository_sa import InstallmentRepositorySA, LoanRepositorySA, loan_repo
+
+
+class Client:
+    """Десктопный клиент: копия, синхронизация и репозитории поверх копии."""
+
+    def __init__(self, name: str, user_id: int):
+        self.replica = LocalReplica(os.path.join(WORKDIR, f"{name}.db"), user_id=user_id)
+        self.sync = ReplicaSync(self.replica)
+        self.loans = LoanRepositorySA(self.replica.session)
+        self.installments = InstallmentRepositorySA(self.replica.session)
+
+
+def seed(loans: int) -> int:
+    rng = random.Random(1)
+    with get_session() as session:
+        user = UserORM(email="owner@example.com", password_hash="-", created_at="2026-01-01", updated_at="2026-01-01")
+        session.add(user)
+        session.flush()
+        for i in range(loans):
+            loan = LoanORM(user_id=user.id, website=f"bank{i}.example", org_name=f"Банк {i}",
+                           loan_date="2026-09-01", amount_borrowed=1000.0 + i, amount_due=0.0,
+                           due_date="2026-12-01", created_at="2026-09-01", notes="")
+            session.add(loan)
+            session.flush()
+            for j in range(rng.randint(1, 4)):
+                session.add(InstallmentORM(loan_id=loan.id, due_date=f"2026-{10 + j:02d}-15",
+                                           amount=300.0 + j, paid=0, created_at="2026-09-01"))
+        return user.id
+
+
+def snapshot(session_scope) -> tuple:
+    with session_scope() as session:
+        loans = sorted((l.id, l.org_name, l.notes, l.website, l.amount_borrowed)
+                       for l in session.execute(select(LoanORM)).scalars())
+        installments = sorted((i.id, i.loan_id, i.due_date, i.amount, i.paid)
+                              for i in session.execute(select(InstallmentORM)).scalars())
+    return loans, installments
+
+
+def check(condition: bool, message: str) -> None:
+    print(f"{'OK  ' if condition else 'FAIL'} {message}")
+    if not condition:
+        raise SystemExit(1)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Проверка локальной копии и синхронизации")
+    parser.add_argument("--loans", type=int, default=60)
+    parser.add_argument("--latency-ms", type=float, default=40, help="задержка сети на запрос к серверу")
+    args = parser.parse_args()
+
+    create_schema()
+    user_id = seed(args.loans)
+
+    offline = [False]
+    latency = [0.0]
+
+    @event.listens_for(get_engine(), "before_cursor_execute")
+    def _network(*_):
+        if offline[0]:
+            raise ConnectionError("сервер недоступен")
+        time.sleep(latency[0])
+
+    a, b = Client("a", user_id), Client("b", user_id)
+    for client in (a, b):
+        result = client.sync.sync()
+        check(result["full"] and result["upserted"] > 0, f"полная выгрузка в копию: {result['upserted']} строк")
+    check(snapshot(a.replica.session) == snapshot(get_session), "копия совпадает с сервером")
+
+    loan = a.loans.get_all_loans()[0]
+    installment = a.installments.get_installments_by_loan_id(loan["id"])[0]
+
+    # A без сети
+    offline[0] = True
+    edited = {**loan, "notes": "заметка A", "website": "a.example"}
+    check(a.loans.update_loan(loan["id"], edited), "A без сети: кредит изменён локально")
+    check(a.installments.toggle_installment_paid(installment["id"], True), "A без сети: платеж отмечен")
+    new_loan_id = a.loans.create_loan({**loan, "org_name": "Новый банк"})
+    a.installments.create_installment({"loan_id": new_loan_id, "due_date": "2026-11-20", "amount": 500.0})
+    check(new_loan_id < 0, f"A без сети: новый кредит с локальным id {new_loan_id}")
+    try:
+        a.sync.sync()
+        check(False, "синхронизация без сети должна завершиться ошибкой")
+    except ConnectionError:
+        pass
+    check(a.replica.pending_count() == 4, f"A: в очереди {a.replica.pending_count()} изменения")
+    offline[0] = False
+
+    # B меняет те же заметки раньше
+    check(b.loans.update_loan(loan["id"], {**loan, "notes": "заметка B"}), "B: заметки изменены")
+    result = b.sync.sync()
+    check(result["pushed"] == 1 and not result["conflicts"], "B: изменение отправлено без конфликтов")
+
+    result = a.sync.sync()
+    check(result["pushed"] == 4, f"A: отправлено изменений: {result['pushed']}")
+    check(len(result["conflicts"]) == 1, f"A: конфликт: {result['conflicts']}")
+    server_id = result["remapped"].get(new_loan_id)
+    check(server_id is not None and server_id > 0, f"A: новый кредит получил id сервера {server_id}")
+    check(a.replica.pending_count() == 0, "A: очередь пуста")
+
+    server_loan = loan_repo.get_loan_by_id(loan["id"])
+    check(server_loan["notes"] == "заметка B", "сервер: заметки B сохранены (конфликт в пользу сервера)")
+    check(server_loan["website"] == "a.example", "сервер: сайт от A применён (поле без конфликта)")
+    check(a.loans.get_loan_by_id(loan["id"])["notes"] == "заметка B", "A: заметки обновлены с сервера")
+
+    result = b.sync.sync()
+    check(server_id in result["changed_loan_ids"], "B: получил изменения A")
+    server = snapshot(get_session)
+    check(snapshot(a.replica.session) == server and snapshot(b.replica.session) == server,
+          "сервер и обе копии совпадают")
+
+    result = a.sync.sync()
+    check(result["pushed"] == 0 and result["upserted"] == 0, "повторная синхронизация ничего не меняет")
+
+    # Чтение: копия против сервера с задержкой сети
+    latency[0] = args.latency_ms / 1000
+    started = time.perf_counter()
+    loan_repo.get_all_loans()
+    remote = time.perf_counter() - started
+    started = time.perf_counter()
+    a.loans.get_all_loans()
+    local = time.perf_counter() - started
+    started = time.perf_counter()
+    result = a.sync.sync()
+    print(f"Список кредитов: с сервера {remote * 1000:.0f} мс, из копии {local * 1000:.1f} мс; "
+          f"фоновая синхронизация без изменений {result['seconds'] * 1000:.0f} мс "
+          f"(задержка {args.latency_ms:.0f} мс на запрос)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -30,51 +30,74 @@ else:
     print('Бэкапы не найдены')
 "
     echo ""
-    echo "Использование: $0 mikrokredit_YYYYMMDD_HHMMSS.sql.gz"
-    echo "Или:           $0 latest  (скачать последний)"
+    echo "Использование: $0 mikrokredit_full_YYYYMMDD_HHMMSS_vN.ndjson.gz"
+    echo "Или:           $0 latest  (последний полный бэкап и все инкременты после него)"
     exit 0
 fi
 
-BACKUP_FILE="$1"
-
-# Если запрошен последний бэкап
-if [ "$BACKUP_FILE" == "latest" ]; then
-    echo "Получение последнего бэкапа..."
-    BACKUP_FILE=$(curl -s "https://cloud-api.yandex.net/v1/disk/resources?path=${YANDEX_FOLDER}&limit=1&sort=-created" \
+# Если запрошен последний бэкап - последний полный и все инкременты после него
+if [ "$1" == "latest" ]; then
+    echo "Получение последнего полного бэкапа и его инкрементов..."
+    BACKUP_FILES=$(curl -s "https://cloud-api.yandex.net/v1/disk/resources?path=${YANDEX_FOLDER}&limit=1000" \
         -H "Authorization: OAuth ${YANDEX_TOKEN}" \
-        | python3 -c "import sys, json; data=json.load(sys.stdin); print(data['_embedded']['items'][0]['name'] if '_embedded' in data and 'items' in data['_embedded'] and data['_embedded']['items'] else '')")
+        | python3 -c "
+import re, sys, json
+data = json.load(sys.stdin)
+names = [item['name'] for item in data.get('_embedded', {}).get('items', [])]
+# mikrokredit_<full|inc>_YYYYMMDD_HHMMSS_v<версия журнала>.ndjson.gz
+backups = []
+for name in names:
+    match = re.match(r'mikrokredit_(full|inc)_\d{8}_\d{6}_v(\d+)\.ndjson\.gz$', name)
+    if match:
+        backups.append((int(match.group(2)), match.group(1), name))
+fulls = [b for b in backups if b[1] == 'full']
+if fulls:
+    full = max(fulls)
+    print(full[2])
+    for version, kind, name in sorted(backups):
+        if kind == 'inc' and version > full[0]:
+            print(name)
+")
     
-    if [ -z "$BACKUP_FILE" ]; then
-        echo "Ошибка: не найдено ни одного бэкапа"
+    if [ -z "$BACKUP_FILES" ]; then
+        echo "Ошибка: не найдено ни одного полного бэкапа"
         exit 1
     fi
-    echo "Последний бэкап: $BACKUP_FILE"
+    echo "Полный бэкап и инкременты:"
+    echo "$BACKUP_FILES" | sed 's/^/  /'
+else
+    BACKUP_FILES="$1"
 fi
 
-# Получаем ссылку для скачивания
-echo "Получение ссылки для скачивания..."
-DOWNLOAD_URL=$(curl -s "https://cloud-api.yandex.net/v1/disk/resources/download?path=${YANDEX_FOLDER}/${BACKUP_FILE}" \
-    -H "Authorization: OAuth ${YANDEX_TOKEN}" \
-    | grep -o '"href":"[^"]*"' | cut -d'"' -f4)
-
-if [ -z "$DOWNLOAD_URL" ]; then
-    echo "Ошибка: не удалось получить ссылку для скачивания"
-    echo "Проверьте имя файла"
-    exit 1
-fi
+download() {
+    local file="$1"
+    # Получаем ссылку для скачивания
+    local url
+    url=$(curl -s "https://cloud-api.yandex.net/v1/disk/resources/download?path=${YANDEX_FOLDER}/${file}" \
+        -H "Authorization: OAuth ${YANDEX_TOKEN}" \
+        | grep -o '"href":"[^"]*"' | cut -d'"' -f4)
+    
+    if [ -z "$url" ]; then
+        echo "Ошибка: не удалось получить ссылку для скачивания $file"
+        echo "Проверьте имя файла"
+        return 1
+    fi
+    
+    echo "Скачивание: $file"
+    if ! curl -# -L "$url" -o "$file"; then
+        echo "✗ Ошибка скачивания $file"
+        return 1
+    fi
+    echo "✓ Скачан: $file (размер: $(du -h "$file" | cut -f1))"
+}
 
-# Скачиваем
-echo "Скачивание: $BACKUP_FILE"
-if curl -# -L "$DOWNLOAD_URL" -o "$BACKUP_FILE"; then
-    SIZE=$(du -h "$BACKUP_FILE" | cut -f1)
-    echo "✓ Бэкап скачан: $BACKUP_FILE (размер: $SIZE)"
-    echo ""
-    echo "Для восстановления:"
-    echo "  1. gunzip $BACKUP_FILE"
-    echo "  2. export PGPASSWORD='YOUR_DB_PASSWORD'  # из .env файла"
-    echo "  3. psql -U mikrokredit_user -h localhost -d mikrokredit < ${BACKUP_FILE%.gz}"
-else
-    echo "✗ Ошибка скачивания"
-    exit 1
-fi
+for FILE in $BACKUP_FILES; do
+    download "$FILE" || exit 1
+done
 
+# Бэкапы - данные без схемы: схему создаёт migrate.py, затем restore_backup.py
+# проверяет цепочку (инкременты без пропусков) и загружает файлы
+echo ""
+echo "Для восстановления (из $PROJECT_ROOT, с MIKROKREDIT_DATABASE_URL целевой базы):"
+echo "  1. python scripts/migrate.py"
+echo "  2. python scripts/restore_backup.py $(echo $BACKUP_FILES) [--truncate]"
@@ -1,10 +1,10 @@
 #!/usr/bin/env python3
 """
 Скрипт для экспорта данных из базы данных микрокредита.
-Экспортирует все данные из таблиц loans и installments в JSON файл.
+Экспортирует все таблицы (кроме секретов) потоково в NDJSON, со сжатием
+gzip/zstd; либо займы и рассрочки в SQL файл.
 """
 
-import json
 import os
 import sys
 from datetime import datetime
@@ -15,6 +15,7 @@ from typing import Dict, Any, List
 sys.path.append(str(Path(__file__).parent.parent))
 
 from app.config import DATABASE_URL
+from app.data_export import export_stream, open_output
 from app.models_sa import Base, LoanORM, InstallmentORM
 from sqlalchemy import create_engine, text
 from sqlalchemy.orm import sessionmaker
@@ -27,88 +28,37 @@ def create_session():
     return Session()
 
 
-def export_data_to_json(output_file: str = None) -> str:
+def export_data_to_json(output_file: str = None, user_id: int = None) -> str:
     """
-    Экспортирует все данные из базы в JSON файл.
+    Потоково экспортирует все таблицы в NDJSON (см. app/data_export.py).
     
     Args:
-        output_file: Путь к выходному файлу. Если не указан, создается автоматически.
+        output_file: Путь к выходному файлу (.ndjson, .ndjson.gz, .ndjson.zst).
+                     Если не указан, создается автоматически (.ndjson.gz).
+        user_id: Выгрузить только данные одного пользователя.
     
     Returns:
         str: Путь к созданному файлу
     """
     if output_file is None:
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        output_file = f"mikrokredit_export_{timestamp}.json"
+        suffix = f"_user{user_id}" if user_id else ""
+        output_file = f"mikrokredit_export{suffix}_{timestamp}.ndjson.gz"
     
     print(f"Подключение к базе данных...")
-    print(f"URL: {DATABASE_URL}")
+    print(f"URL: {DATABASE_URL.split('@')[-1]}")  # Скрываем учетные данные
     
-    session = create_session()
+    engine = create_engine(DATABASE_URL)
     
     try:
-        print("Экспорт данных из таблицы loans...")
-        loans = session.query(LoanORM).all()
-        
-        loans_data = []
-        for loan in loans:
-            loan_dict = {
-                'id': loan.id,
-                'website': loan.website,
-                'loan_date': loan.loan_date,
-                'amount_borrowed': float(loan.amount_borrowed),
-                'amount_due': float(loan.amount_due),
-                'due_date': loan.due_date,
-                'risky_org': bool(loan.risky_org),
-                'notes': loan.notes,
-                'payment_methods': loan.payment_methods,
-                'reminded_pre_due': bool(loan.reminded_pre_due),
-                'created_at': loan.created_at,
-                'is_paid': bool(loan.is_paid),
-                'org_name': loan.org_name
-            }
-            loans_data.append(loan_dict)
-        
-        print(f"Найдено кредитов: {len(loans_data)}")
-        
-        print("Экспорт данных из таблицы installments...")
-        installments = session.query(InstallmentORM).all()
-        
-        installments_data = []
-        for installment in installments:
-            installment_dict = {
-                'id': installment.id,
-                'loan_id': installment.loan_id,
-                'due_date': installment.due_date,
-                'amount': float(installment.amount),
-                'paid': bool(installment.paid),
-                'paid_date': installment.paid_date,
-                'created_at': installment.created_at
-            }
-            installments_data.append(installment_dict)
-        
-        print(f"Найдено рассрочек: {len(installments_data)}")
-        
-        # Создаем структуру данных для экспорта
-        export_data = {
-            'export_info': {
-                'export_date': datetime.now().isoformat(),
-                'database_url': DATABASE_URL.split('@')[1] if '@' in DATABASE_URL else 'unknown',  # Скрываем учетные данные
-                'total_loans': len(loans_data),
-                'total_installments': len(installments_data)
-            },
-            'loans': loans_data,
-            'installments': installments_data
-        }
-        
-        # Записываем данные в JSON файл
-        with open(output_file, 'w', encoding='utf-8') as f:
-            json.dump(export_data, f, ensure_ascii=False, indent=2)
+        with open_output(output_file) as out:
+            counts = export_stream(
+                engine, out, user_id=user_id,
+                progress=lambda table, count: print(f"   - {table}: {count}"),
+            )
         
         print(f"[OK] Данные успешно экспортированы в файл: {output_file}")
-        print(f"Статистика:")
-        print(f"   - Кредитов: {len(loans_data)}")
-        print(f"   - Рассрочек: {len(installments_data)}")
+        print(f"Всего строк: {sum(counts.values())}")
         
         return output_file
         
@@ -116,7 +66,7 @@ def export_data_to_json(output_file: str = None) -> str:
         print(f"[ERROR] Ошибка при экспорте данных: {e}")
         raise
     finally:
-        session.close()
+        engine.dispose()
 
 
 def export_data_to_sql(output_file: str = None) -> str:
@@ -220,22 +170,25 @@ def main():
     print("Скрипт экспорта данных микрокредита")
     print("=" * 50)
     
-    if len(sys.argv) > 1:
-        if sys.argv[1] == "--sql":
-            # Экспорт в SQL формат
-            output_file = sys.argv[2] if len(sys.argv) > 2 else None
-            export_data_to_sql(output_file)
-        elif sys.argv[1] == "--help":
-            print("Использование:")
-            print("  python export_data.py           # Экспорт в JSON")
-            print("  python export_data.py --sql     # Экспорт в SQL")
-            print("  python export_data.py --help    # Показать эту справку")
-        else:
-            # Экспорт в JSON с указанным именем файла
-            export_data_to_json(sys.argv[1])
+    args = sys.argv[1:]
+    user_id = None
+    if "--user" in args:
+        i = args.index("--user")
+        user_id = int(args[i + 1])
+        del args[i:i + 2]
+    
+    if args and args[0] == "--help":
+        print("Использование:")
+        print("  python export_data.py                       # Экспорт всех таблиц (.ndjson.gz)")
+        print("  python export_data.py FILE                  # .ndjson / .ndjson.gz / .ndjson.zst")
+        print("  python export_data.py --user ID [FILE]      # Данные одного пользователя")
+        print("  python export_data.py --sql                 # Экспорт займов в SQL")
+        print("  python export_data.py --help                # Показать эту справку")
+    elif args and args[0] == "--sql":
+        # Экспорт в SQL формат
+        export_data_to_sql(args[1] if len(args) > 1 else None)
     else:
-        # Экспорт в JSON по умолчанию
-        export_data_to_json()
+        export_data_to_json(args[0] if args else None, user_id=user_id)
 
 
 if __name__ == "__main__":
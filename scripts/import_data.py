@@ -1,140 +1,93 @@
 #!/usr/bin/env python3
 """
 Скрипт для импорта данных в базу данных микрокредита.
-Импортирует данные из JSON файла, созданного скриптом export_data.py.
+Потоково импортирует выгрузку export_data.py (NDJSON, в т.ч. .gz/.zst, или
+старый JSON) пачками, с контрольными точками для продолжения после сбоя.
 """
 
-import json
 import os
 import sys
-from datetime import datetime
+import time
 from pathlib import Path
-from typing import Dict, Any, List
 
 # Добавляем путь к модулям приложения
 sys.path.append(str(Path(__file__).parent.parent))
 
 from app.config import DATABASE_URL
-from app.models_sa import Base, LoanORM, InstallmentORM
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+from app.data_export import EXPORT_TABLES
+from app.data_import import BulkImporter, ImportCheckpoint
+from app.models_sa import Base
+from sqlalchemy import create_engine, delete
 
 
-def create_session():
-    """Создает сессию для работы с базой данных."""
-    engine = create_engine(DATABASE_URL)
-    Session = sessionmaker(bind=engine)
-    return Session()
+def clear_data(engine) -> None:
+    """Удаляет все данные, кроме пользователей (дети раньше родителей)."""
+    with engine.begin() as conn:
+        for name in reversed(EXPORT_TABLES):
+            if name != "users":
+                conn.execute(delete(Base.metadata.tables[name]))
 
 
-def import_data_from_json(json_file: str, clear_existing: bool = False) -> None:
+def import_data_from_json(json_file: str, clear_existing: bool = False,
+                          target_user_id: int = None, restart: bool = False) -> None:
     """
-    Импортирует данные из JSON файла в базу данных.
+    Потоково импортирует выгрузку (NDJSON, .gz/.zst или старый JSON) в базу данных.
     
     Args:
-        json_file: Путь к JSON файлу с данными
-        clear_existing: Удалять ли существующие данные перед импортом
+        json_file: Путь к файлу выгрузки
+        clear_existing: Удалять ли существующие данные (кроме пользователей) перед импортом
+        target_user_id: Загрузить все данные файла существующему пользователю
+        restart: Игнорировать контрольную точку и начать сначала
     """
     if not os.path.exists(json_file):
         raise FileNotFoundError(f"Файл {json_file} не найден")
     
-    print(f"Чтение данных из файла: {json_file}")
-    
-    with open(json_file, 'r', encoding='utf-8') as f:
-        data = json.load(f)
-    
-    if 'loans' not in data or 'installments' not in data:
-        raise ValueError("Неверный формат файла. Ожидается JSON с полями 'loans' и 'installments'")
+    checkpoint_path = f"{json_file}.checkpoint.sqlite"
+    if restart and os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+    resuming = os.path.exists(checkpoint_path)
     
+    print(f"Чтение данных из файла: {json_file}")
     print(f"Подключение к базе данных...")
-    print(f"URL: {DATABASE_URL}")
+    print(f"URL: {DATABASE_URL.split('@')[-1]}")  # Скрываем учетные данные
     
-    session = create_session()
+    engine = create_engine(DATABASE_URL)
+    checkpoint = ImportCheckpoint(checkpoint_path)
     
     try:
-        if clear_existing:
+        if clear_existing and not resuming:
             print("Очистка существующих данных...")
-            session.query(InstallmentORM).delete()
-            session.query(LoanORM).delete()
-            session.commit()
-        
-        # Импорт кредитов
-        print(f"Импорт {len(data['loans'])} кредитов...")
-        loan_id_mapping = {}  # Старые ID -> Новые ID
-        
-        for loan_data in data['loans']:
-            old_id = loan_data['id']
-            del loan_data['id']  # Удаляем старый ID, чтобы создать новый
-            
-            loan = LoanORM(
-                website=loan_data['website'],
-                loan_date=loan_data['loan_date'],
-                amount_borrowed=loan_data['amount_borrowed'],
-                amount_due=loan_data['amount_due'],
-                due_date=loan_data['due_date'],
-                risky_org=int(loan_data['risky_org']),
-                notes=loan_data['notes'],
-                payment_methods=loan_data['payment_methods'],
-                reminded_pre_due=int(loan_data['reminded_pre_due']),
-                created_at=loan_data['created_at'],
-                is_paid=int(loan_data['is_paid']),
-                org_name=loan_data['org_name']
-            )
-            
-            session.add(loan)
-            session.flush()  # Получаем новый ID
-            loan_id_mapping[old_id] = loan.id
-        
-        session.commit()
-        print(f"[OK] Импортировано кредитов: {len(data['loans'])}")
+            clear_data(engine)
         
-        # Импорт рассрочек
-        print(f"Импорт {len(data['installments'])} рассрочек...")
-        imported_installments = 0
+        started = time.perf_counter()
+        current = [None]
         
-        for installment_data in data['installments']:
-            old_loan_id = installment_data['loan_id']
-            
-            # Проверяем, есть ли соответствующий кредит
-            if old_loan_id not in loan_id_mapping:
-                print(f"[WARNING] Пропускаем рассрочку {installment_data['id']} - кредит {old_loan_id} не найден")
-                continue
-            
-            new_loan_id = loan_id_mapping[old_loan_id]
-            del installment_data['id']  # Удаляем старый ID
-            
-            installment = InstallmentORM(
-                loan_id=new_loan_id,
-                due_date=installment_data['due_date'],
-                amount=installment_data['amount'],
-                paid=int(installment_data['paid']),
-                paid_date=installment_data['paid_date'],
-                created_at=installment_data['created_at']
-            )
-            
-            session.add(installment)
-            imported_installments += 1
+        def progress(table, count):
+            # Счётчик таблицы обновляется в одной строке
+            if current[0] not in (None, table):
+                print()
+            current[0] = table
+            print(f"\r   - {table}: {count}", end="", flush=True)
         
-        session.commit()
-        print(f"[OK] Импортировано рассрочек: {imported_installments}")
+        importer = BulkImporter(engine, checkpoint, target_user_id=target_user_id, progress=progress)
+        counts = importer.run(json_file)
+        print()
         
-        print(f"Итоговая статистика:")
-        print(f"   - Кредитов импортировано: {len(data['loans'])}")
-        print(f"   - Рассрочек импортировано: {imported_installments}")
+        print(f"Итоговая статистика ({time.perf_counter() - started:.1f} с):")
+        for table, count in counts.items():
+            skipped = importer.skipped.get(table)
+            print(f"   - {table}: {count}" + (f" (пропущено без родителя: {skipped})" if skipped else ""))
         
-        # Показываем информацию о экспорте, если есть
-        if 'export_info' in data:
-            export_info = data['export_info']
-            print(f"Информация об оригинальном экспорте:")
-            print(f"   - Дата экспорта: {export_info.get('export_date', 'неизвестно')}")
-            print(f"   - База данных: {export_info.get('database_url', 'неизвестно')}")
+        checkpoint.close(remove=True)
         
     except Exception as e:
-        session.rollback()
+        checkpoint.close()
+        print()
         print(f"[ERROR] Ошибка при импорте данных: {e}")
+        print(f"Контрольная точка сохранена: {checkpoint_path} - повторный запуск продолжит импорт")
         raise
     finally:
-        session.close()
+        engine.dispose()
 
 
 def main():
@@ -142,21 +95,26 @@ def main():
     print("Скрипт импорта данных микрокредита")
     print("=" * 50)
     
-    if len(sys.argv) < 2:
+    args = sys.argv[1:]
+    if not args or args[0].startswith("--"):
         print("Использование:")
-        print("  python import_data.py <json_file> [--clear]")
+        print("  python import_data.py <file> [--clear] [--user ID] [--restart]")
         print("")
         print("Параметры:")
-        print("  json_file  - Путь к JSON файлу с данными")
-        print("  --clear    - Удалить существующие данные перед импортом")
+        print("  file       - Файл выгрузки (.ndjson, .ndjson.gz, .ndjson.zst или старый .json)")
+        print("  --clear    - Удалить существующие данные (кроме пользователей) перед импортом")
+        print("  --user ID  - Загрузить все данные файла существующему пользователю")
+        print("  --restart  - Игнорировать контрольную точку и начать сначала")
         print("")
         print("Пример:")
-        print("  python import_data.py mikrokredit_export_20240101_120000.json")
-        print("  python import_data.py mikrokredit_export_20240101_120000.json --clear")
+        print("  python import_data.py mikrokredit_export_20240101_120000.ndjson.gz")
+        print("  python import_data.py old_backup.json --user 1")
         return
     
-    json_file = sys.argv[1]
-    clear_existing = "--clear" in sys.argv
+    json_file = args[0]
+    clear_existing = "--clear" in args
+    restart = "--restart" in args
+    target_user_id = int(args[args.index("--user") + 1]) if "--user" in args else None
     
     if clear_existing:
         print("[WARNING] ВНИМАНИЕ: Существующие данные будут удалены!")
@@ -166,7 +124,7 @@ def main():
             return
     
     try:
-        import_data_from_json(json_file, clear_existing)
+        import_data_from_json(json_file, clear_existing, target_user_id, restart)
         print("[OK] Импорт завершен успешно!")
     except Exception as e:
         print(f"[ERROR] Ошибка импорта: {e}")
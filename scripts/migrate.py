@@ -0,0 +1,28 @@
+#!/usr/bin/env python3
+"""
+Явное создание/проверка схемы БД
+Запускать при деплое (до старта gunicorn), а не при каждом старте воркера
+"""
+import sys
+import os
+
+# Добавляем корневую директорию проекта в PYTHONPATH
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.db_sa import create_schema
+
+
+def main():
+    try:
+        create_schema()
+        print("✓ Database tables created/verified")
+        return 0
+    except Exception as e:
+        print(f"❌ Ошибка миграции: {e}")
+        import traceback
+        traceback.print_exc()
+        return 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
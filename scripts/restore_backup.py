@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Восстановление базы из полного бэкапа и инкрементов (scripts/backup_incremental.py)
+
+Файлы применяются в указанном порядке: сначала полный бэкап, затем
+инкременты от старых к новым. Цепочка проверяется до записи в базу: каждый
+инкремент должен начинаться с версии, на которой закончился предыдущий
+файл (since == until предыдущего; у полного бэкапа - _vN в имени), иначе
+часть изменений потеряна и восстановление отклоняется. Id строк
+сохраняются, последовательности PostgreSQL выставляются на max(id).
+
+Бэкапы содержат только данные, без схемы (pg_dump больше не используется):
+перед восстановлением создайте схему той же версией кода -
+python scripts/migrate.py (с той же MIKROKREDIT_DATABASE_URL, что и --target).
+
+Использование:
+    python scripts/migrate.py
+    python scripts/restore_backup.py backups/mikrokredit_full_*.ndjson.gz \\
+        backups/mikrokredit_inc_*.ndjson.gz [--target URL] [--truncate]
+"""
+import argparse
+import json
+import os
+import re
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, delete, func, select
+
+from app.change_journal import JOURNALED_TABLES, apply_backup, ensure_journal_schema
+from app.data_export import open_input
+from app.models_sa import Base, ChangeLogORM
+from app.search import ensure_search_schema
+from app.table_copy import reset_sequences
+
+
+def read_records(path: str):
+    with open_input(path) as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def read_header(path: str) -> dict:
+    with open_input(path) as f:
+        return json.loads(f.readline())
+
+
+def backup_range(path: str, header: dict) -> tuple:
+    """
+    Версии журнала, которые покрывает файл
+    Returns: (since, until); у полного бэкапа since = None, until - из имени файла (_vN)
+    """
+    if header.get("kind", "full") == "increment":
+        return header["since"], header["until"]
+    match = re.search(r"_v(\d+)\.ndjson", os.path.basename(path))
+    return None, int(match.group(1)) if match else None
+
+
+def check_chain(paths: list) -> str:
+    """Returns: описание ошибки цепочки или пустую строку"""
+    headers = [read_header(path) for path in paths]
+    if headers[0].get("kind", "full") != "full":
+        return "первым должен идти полный бэкап"
+    if any(header.get("kind") != "increment" for header in headers[1:]):
+        return "после полного бэкапа допускаются только инкременты"
+
+    _, until = backup_range(paths[0], headers[0])
+    if until is None and len(paths) > 1:
+        return f"{os.path.basename(paths[0])}: в имени нет версии журнала (_vN) - нельзя проверить цепочку"
+    for path, header in zip(paths[1:], headers[1:]):
+        since, next_until = backup_range(path, header)
+        if since != until:
+            return (f"{os.path.basename(path)}: начинается с версии {since}, а предыдущий файл заканчивается "
+                    f"на {until} - {'пропущен инкремент' if since > until else 'порядок файлов нарушен'}")
+        until = next_until
+    return ""
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Восстановление из полного бэкапа и инкрементов")
+    parser.add_argument("files", nargs="+", help="полный бэкап, затем инкременты по порядку")
+    parser.add_argument("--target", help="URL базы (по умолчанию - из app/config.py)")
+    parser.add_argument("--truncate", action="store_true", help="очистить непустые таблицы")
+    args = parser.parse_args()
+
+    error = check_chain(args.files)
+    if error:
+        parser.error(error)
+
+    target = args.target
+    if not target:
+        from app.config import DATABASE_URL
+        target = DATABASE_URL
+    engine = create_engine(target)
+    tables = [Base.metadata.tables[name] for name in JOURNALED_TABLES]
+
+    try:
+        Base.metadata.create_all(engine)
+        ensure_search_schema(engine)
+        ensure_journal_schema(engine)
+
+        with engine.begin() as conn:
+            not_empty = [t.name for t in tables if conn.execute(select(func.count()).select_from(t)).scalar()]
+            if not_empty and not args.truncate:
+                print(f"❌ Таблицы не пусты: {', '.join(not_empty)} (используйте --truncate)")
+                return 1
+            for table in reversed(tables):
+                conn.execute(delete(table))
+
+        for path in args.files:
+            applied = apply_backup(engine, read_records(path))
+            print(f"✅ {os.path.basename(path)}: {sum(applied.values())} записей")
+
+        reset_sequences(engine)
+        # Журнал описывает само восстановление - начинаем его заново
+        with engine.begin() as conn:
+            conn.execute(delete(ChangeLogORM.__table__))
+    finally:
+        engine.dispose()
+
+    print("✅ Восстановление завершено. Сделайте полный бэкап: python scripts/backup_incremental.py --full")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
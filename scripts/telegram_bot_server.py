@@ -2,28 +2,124 @@
 """
 Telegram бот сервер для обработки callback кнопок
 Работает постоянно в фоне и обрабатывает нажатия на кнопки
+
+Режимы приёма обновлений: long polling (по умолчанию) или webhook, если
+задан BOT_WEBHOOK_URL (app/bot_webhook.py). Если Telegram не принял webhook,
+бот продолжает работу через polling; --polling включает его принудительно.
+
+Обновления обрабатываются параллельно (BOT_CONCURRENT_UPDATES), а работа с
+БД идёт через run_db() в пуле потоков (app/bot_runtime.py): медленный запрос
+одного чата не задерживает кнопки в остальных. Метрики каждого обновления
+собирает декоратор timed.
 """
 
+import argparse
+import asyncio
+import signal
 import sys
 import os
 from datetime import datetime
+from typing import Optional
 from telegram import Update
+from telegram.error import TelegramError
 from telegram.ext import Application, CallbackQueryHandler, CommandHandler, ContextTypes
 
 # Добавляем корень проекта в sys.path
 PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 sys.path.insert(0, PROJECT_ROOT)
 
+from app.bot_runtime import metrics, run_db, shutdown_db_executor, timed
+from app.config import BOT_CONCURRENT_UPDATES, BOT_WEBHOOK_LISTEN, BOT_WEBHOOK_PORT, BOT_WEBHOOK_URL
 from app.db_sa import get_session
 from app.models_sa import TaskORM, TaskReminderORM, UserORM
-from app.secrets import TELEGRAM_BOT_TOKEN, WEB_URL, BOT_WORK_HOURS_START, BOT_WORK_HOURS_END
+from app.secrets import TELEGRAM_BOT_TOKEN, TELEGRAM_WEBHOOK_SECRET, WEB_URL, BOT_WORK_HOURS_START, BOT_WORK_HOURS_END
 from app.telegram_auth import verify_link_code, link_telegram_account, get_user_by_telegram_chat_id
-from sqlalchemy import select
+from sqlalchemy import delete, func
 
 # Конфигурация
 TELEGRAM_TOKEN = TELEGRAM_BOT_TOKEN
 
 
+# ==================== РАБОТА С БД (выполняется через run_db) ====================
+
+def complete_task(task_id: int, reminder_id: int) -> Optional[str]:
+    """
+    Отметить задачу выполненной, напоминание - обработанным, отменить будущие напоминания
+    Returns: название задачи или None, если задача не найдена
+    """
+    with get_session() as session:
+        task = session.get(TaskORM, task_id)
+        if task is None:
+            return None
+        
+        now = datetime.now().isoformat()
+        task.status = 1
+        task.completed_at = now
+        task.updated_at = now
+        
+        # Отмечаем напоминание как обработанное
+        reminder = session.get(TaskReminderORM, reminder_id)
+        if reminder:
+            reminder.acknowledged = 1
+            reminder.acknowledged_at = now
+        
+        # Отменяем все будущие напоминания для этой задачи (одним запросом)
+        session.execute(
+            delete(TaskReminderORM).where(
+                TaskReminderORM.task_id == task_id,
+                TaskReminderORM.sent == 0
+            )
+        )
+        
+        title = task.title
+        session.commit()
+        return title
+
+
+def acknowledge_reminder(reminder_id: int) -> None:
+    """Отметить напоминание обработанным"""
+    with get_session() as session:
+        reminder = session.get(TaskReminderORM, reminder_id)
+        if reminder:
+            reminder.acknowledged = 1
+            reminder.acknowledged_at = datetime.now().isoformat()
+
+
+def get_user_name(user_id: int) -> str:
+    with get_session() as session:
+        user = session.get(UserORM, user_id)
+        return user.full_name or user.email if user else "пользователь"
+
+
+def get_account_summary(user_id: int) -> Optional[dict]:
+    """
+    Данные для /myaccount
+    Returns: None если пользователь не найден
+    """
+    from app.models_sa import LoanORM
+    
+    with get_session() as session:
+        user = session.get(UserORM, user_id)
+        if not user:
+            return None
+        
+        # Статистика
+        return {
+            'email': user.email,
+            'full_name': user.full_name,
+            'telegram_username': user.telegram_username,
+            'created_at': user.created_at,
+            'email_notifications': user.email_notifications,
+            'telegram_notifications': user.telegram_notifications,
+            'loans_count': session.query(func.count(LoanORM.id)).filter_by(user_id=user_id).scalar() or 0,
+            'tasks_count': session.query(func.count(TaskORM.id)).filter_by(user_id=user_id).scalar() or 0,
+            'tasks_pending': session.query(func.count(TaskORM.id)).filter_by(user_id=user_id, status=0).scalar() or 0,
+        }
+
+
+# ==================== ОБРАБОТЧИКИ ====================
+
+@timed
 async def callback_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Обработчик нажатий на кнопки"""
     query = update.callback_query
@@ -43,51 +139,22 @@ async def callback_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
             reminder_id = int(parts[3])
             print(f"[{datetime.now()}] Выполнение задачи {task_id}, напоминание {reminder_id}")
             
-            with get_session() as session:
-                task = session.get(TaskORM, task_id)
-                if task:
-                    task.status = 1
-                    task.completed_at = datetime.now().isoformat()
-                    task.updated_at = datetime.now().isoformat()
-                    
-                    # Отмечаем напоминание как обработанное
-                    reminder = session.get(TaskReminderORM, reminder_id)
-                    if reminder:
-                        reminder.acknowledged = 1
-                        reminder.acknowledged_at = datetime.now().isoformat()
-                    
-                    # Отменяем все будущие напоминания для этой задачи
-                    future_reminders = session.execute(
-                        select(TaskReminderORM).where(
-                            TaskReminderORM.task_id == task_id,
-                            TaskReminderORM.sent == 0
-                        )
-                    ).scalars().all()
-                    
-                    for fr in future_reminders:
-                        session.delete(fr)
-                    
-                    session.commit()
-                    
-                    await query.edit_message_text(
-                        text=f"✅ <b>Задача выполнена!</b>\n\n{task.title}\n\n<i>Отличная работа! 🎉</i>",
-                        parse_mode='HTML'
-                    )
-                    print(f"✓ Задача {task_id} отмечена как выполненная")
-                else:
-                    await query.edit_message_text("❌ Задача не найдена")
+            title = await run_db(complete_task, task_id, reminder_id)
+            if title is not None:
+                await query.edit_message_text(
+                    text=f"✅ <b>Задача выполнена!</b>\n\n{title}\n\n<i>Отличная работа! 🎉</i>",
+                    parse_mode='HTML'
+                )
+                print(f"✓ Задача {task_id} отмечена как выполненная")
+            else:
+                await query.edit_message_text("❌ Задача не найдена")
         
         elif data.startswith('task_postpone_'):
             # Отложить задачу - открыть в браузере
             task_id = int(parts[2])
             reminder_id = int(parts[3])
             
-            with get_session() as session:
-                reminder = session.get(TaskReminderORM, reminder_id)
-                if reminder:
-                    reminder.acknowledged = 1
-                    reminder.acknowledged_at = datetime.now().isoformat()
-                    session.commit()
+            await run_db(acknowledge_reminder, reminder_id)
             
             # URL к задаче
             task_url = f"{WEB_URL}/tasks/{task_id}"
@@ -106,6 +173,7 @@ async def callback_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await query.edit_message_text(f"❌ Произошла ошибка: {str(e)[:100]}")
 
 
+@timed
 async def start_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Обработчик команды /start"""
     chat_id = str(update.effective_chat.id)
@@ -117,17 +185,15 @@ async def start_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         print(f"[{datetime.now()}] Получен код привязки: {code} от chat_id: {chat_id}")
         
         # Проверяем код
-        user_id = verify_link_code(code)
+        user_id = await run_db(verify_link_code, code)
         
         if user_id:
             # Привязываем аккаунт
-            success = link_telegram_account(user_id, chat_id, username)
+            success = await run_db(link_telegram_account, user_id, chat_id, username)
             
             if success:
                 # Получаем информацию о пользователе
-                with get_session() as session:
-                    user = session.get(UserORM, user_id)
-                    user_name = user.full_name or user.email if user else "пользователь"
+                user_name = await run_db(get_user_name, user_id)
                 
                 await update.message.reply_text(
                     f"✅ <b>Telegram успешно подключен!</b>\n\n"
@@ -154,13 +220,11 @@ async def start_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
             )
     else:
         # Проверяем привязан ли уже пользователь
-        user_id = get_user_by_telegram_chat_id(chat_id)
+        user_id = await run_db(get_user_by_telegram_chat_id, chat_id)
         
         if user_id:
             # Уже привязан
-            with get_session() as session:
-                user = session.get(UserORM, user_id)
-                user_name = user.full_name or user.email if user else "пользователь"
+            user_name = await run_db(get_user_name, user_id)
             
             await update.message.reply_text(
                 f"👋 <b>Привет, {user_name}!</b>\n\n"
@@ -190,12 +254,13 @@ async def start_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
             )
 
 
+@timed
 async def myaccount_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Обработчик команды /myaccount"""
     chat_id = str(update.effective_chat.id)
     
     # Получаем user_id по chat_id
-    user_id = get_user_by_telegram_chat_id(chat_id)
+    user_id = await run_db(get_user_by_telegram_chat_id, chat_id)
     
     if not user_id:
         await update.message.reply_text(
@@ -207,44 +272,70 @@ async def myaccount_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         return
     
     # Получаем информацию о пользователе
-    with get_session() as session:
-        user = session.get(UserORM, user_id)
-        
-        if not user:
-            await update.message.reply_text("❌ Пользователь не найден")
+    account = await run_db(get_account_summary, user_id)
+    
+    if not account:
+        await update.message.reply_text("❌ Пользователь не найден")
+        return
+    
+    # Формируем ответ
+    message = f"👤 <b>Ваш аккаунт</b>\n\n"
+    message += f"📧 Email: {account['email']}\n"
+    message += f"👤 Имя: {account['full_name'] or '—'}\n"
+    message += f"💬 Telegram: @{account['telegram_username'] or 'ID: ' + chat_id}\n"
+    message += f"📅 Регистрация: {account['created_at'][:10]}\n\n"
+    message += f"📊 <b>Статистика:</b>\n"
+    message += f"💳 Займов: {account['loans_count']}\n"
+    message += f"✅ Задач: {account['tasks_count']} (активных: {account['tasks_pending']})\n\n"
+    message += f"🌐 Личный кабинет: {WEB_URL}/profile\n\n"
+    message += f"📱 <b>Настройки уведомлений:</b>\n"
+    message += f"Email: {'✅' if account['email_notifications'] else '❌'}\n"
+    message += f"Telegram: {'✅' if account['telegram_notifications'] else '❌'}"
+    
+    await update.message.reply_text(message, parse_mode='HTML')
+
+
+@timed
+async def forecast_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Обработчик команды /forecast [day|week|month] [месяцев]"""
+    from app.forecast import GRANULARITIES, FORECAST_DEFAULT_MONTHS, get_forecast, format_forecast_text
+    
+    chat_id = str(update.effective_chat.id)
+    user_id = await run_db(get_user_by_telegram_chat_id, chat_id)
+    if not user_id:
+        await update.message.reply_text(
+            "❌ <b>Telegram не подключен</b>\n\n"
+            f"Для подключения используйте команду /start с кодом из личного кабинета:\n"
+            f"{WEB_URL}/profile/notifications",
+            parse_mode='HTML'
+        )
+        return
+    
+    granularity, months = "month", FORECAST_DEFAULT_MONTHS
+    for arg in context.args or []:
+        if arg.isdigit():
+            months = int(arg)
+        elif arg in GRANULARITIES:
+            granularity = arg
+        else:
+            await update.message.reply_text(
+                "Использование: /forecast [day|week|month] [месяцев]\n"
+                "Например: /forecast week 3"
+            )
             return
-        
-        # Статистика
-        from app.models_sa import LoanORM, TaskORM
-        from sqlalchemy import func
-        
-        loans_count = session.query(func.count(LoanORM.id)).filter_by(user_id=user_id).scalar() or 0
-        tasks_count = session.query(func.count(TaskORM.id)).filter_by(user_id=user_id).scalar() or 0
-        tasks_pending = session.query(func.count(TaskORM.id)).filter_by(user_id=user_id, status=0).scalar() or 0
-        
-        # Формируем ответ
-        message = f"👤 <b>Ваш аккаунт</b>\n\n"
-        message += f"📧 Email: {user.email}\n"
-        message += f"👤 Имя: {user.full_name or '—'}\n"
-        message += f"💬 Telegram: @{user.telegram_username or 'ID: ' + chat_id}\n"
-        message += f"📅 Регистрация: {user.created_at[:10]}\n\n"
-        message += f"📊 <b>Статистика:</b>\n"
-        message += f"💳 Займов: {loans_count}\n"
-        message += f"✅ Задач: {tasks_count} (активных: {tasks_pending})\n\n"
-        message += f"🌐 Личный кабинет: {WEB_URL}/profile\n\n"
-        message += f"📱 <b>Настройки уведомлений:</b>\n"
-        message += f"Email: {'✅' if user.email_notifications else '❌'}\n"
-        message += f"Telegram: {'✅' if user.telegram_notifications else '❌'}"
-        
-        await update.message.reply_text(message, parse_mode='HTML')
+    
+    forecast = await run_db(get_forecast, user_id, granularity=granularity, months=months)
+    await update.message.reply_text(format_forecast_text(forecast), parse_mode='HTML')
 
 
+@timed
 async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Обработчик команды /help"""
     message = (
         "📱 <b>Доступные команды:</b>\n\n"
         "/start [код] - подключить Telegram к аккаунту\n"
         "/myaccount - информация о вашем аккаунте\n"
+        "/forecast [day|week|month] [месяцев] - прогноз платежей\n"
         "/help - эта справка\n\n"
         f"🌐 Веб-интерфейс: {WEB_URL}\n\n"
         "💡 <b>Что умеет бот:</b>\n"
@@ -256,26 +347,96 @@ async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     await update.message.reply_text(message, parse_mode='HTML')
 
 
-def main():
-    """Основная функция - запуск бота"""
-    print(f"Запуск Telegram бота...")
-    print(f"Токен: {TELEGRAM_TOKEN[:20]}...")
-    print(f"Рабочие часы: {BOT_WORK_HOURS_START}:00 - {BOT_WORK_HOURS_END}:00 MSK")
-    
-    # Создаём приложение
-    app = Application.builder().token(TELEGRAM_TOKEN).build()
+async def _post_shutdown(application: Application) -> None:
+    """Закрыть пул БД и вывести итоговые метрики"""
+    shutdown_db_executor()
+    summary = metrics.summary()
+    if summary:
+        print(f"📊 Bot metrics: {summary}")
+
+
+def build_application(token: str, base_url: Optional[str] = None) -> Application:
+    """
+    Приложение бота со всеми обработчиками
+    base_url - другой адрес Bot API (локальный сервер, проверки)
+    """
+    builder = (
+        Application.builder()
+        .token(token)
+        .concurrent_updates(BOT_CONCURRENT_UPDATES)
+        # По умолчанию к Bot API одно соединение: параллельные обработчики ждали бы его
+        .connection_pool_size(BOT_CONCURRENT_UPDATES)
+        .post_shutdown(_post_shutdown)
+    )
+    if base_url:
+        builder = builder.base_url(base_url)
+    app = builder.build()
     
     # Добавляем обработчики команд
     app.add_handler(CommandHandler("start", start_command))
     app.add_handler(CommandHandler("myaccount", myaccount_command))
+    app.add_handler(CommandHandler("forecast", forecast_command))
     app.add_handler(CommandHandler("help", help_command))
     
     # Добавляем обработчик callback кнопок
     app.add_handler(CallbackQueryHandler(callback_handler))
+    return app
+
+
+async def run_webhook(application: Application, url: str, listen: str, port: int, secret: str) -> None:
+    """
+    Работа в webhook-режиме до SIGINT/SIGTERM
+    Raises: TelegramError, если Telegram не принял webhook (вызывающий переходит на polling)
+    """
+    from app.bot_webhook import WebhookServer
+    
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+    
+    server = WebhookServer(application, url, listen, port, secret)
+    await application.initialize()
+    try:
+        await server.start()
+        print(f"✓ Webhook: {url} -> http://{listen}:{server.port}{server.path}")
+        await stop.wait()
+    finally:
+        await server.stop()
+        await application.shutdown()
+        await _post_shutdown(application)
+        print(f"✓ Webhook остановлен: {server.stats}")
+
+
+def main():
+    """Основная функция - запуск бота"""
+    parser = argparse.ArgumentParser(description="Telegram бот MikroKredit")
+    parser.add_argument("--polling", action="store_true", help="long polling даже при заданном BOT_WEBHOOK_URL")
+    args = parser.parse_args()
+    
+    print(f"Запуск Telegram бота...")
+    print(f"Токен: {TELEGRAM_TOKEN[:20]}...")
+    print(f"Рабочие часы: {BOT_WORK_HOURS_START}:00 - {BOT_WORK_HOURS_END}:00 MSK")
+    print(f"Параллельных обновлений: {BOT_CONCURRENT_UPDATES}")
+    print("✓ Команды: /start, /myaccount, /forecast, /help")
+    
+    if BOT_WEBHOOK_URL and not args.polling:
+        if not TELEGRAM_WEBHOOK_SECRET:
+            print("⚠️  BOT_WEBHOOK_URL задан без TELEGRAM_WEBHOOK_SECRET - работаем через polling")
+        else:
+            try:
+                asyncio.run(run_webhook(build_application(TELEGRAM_TOKEN), BOT_WEBHOOK_URL,
+                                        BOT_WEBHOOK_LISTEN, BOT_WEBHOOK_PORT, TELEGRAM_WEBHOOK_SECRET))
+                return
+            except TelegramError as e:
+                print(f"⚠️  Webhook не установлен ({e}) - переходим на polling")
+    
+    # Создаём приложение (asyncio.run закрыл свой цикл - polling нужен новый)
+    asyncio.set_event_loop(asyncio.new_event_loop())
+    app = build_application(TELEGRAM_TOKEN)
     
-    # Запускаем polling
-    print("✓ Бот запущен и ожидает команды и callback...")
-    print("✓ Команды: /start, /myaccount, /help")
+    # Запускаем polling (run_polling сам снимает webhook, если он был установлен)
+    print("✓ Бот запущен и ожидает команды и callback (polling)...")
     app.run_polling(allowed_updates=Update.ALL_TYPES)
 
 
@@ -1,142 +1,33 @@
 #!/usr/bin/env python3
 """
-Telegram уведомления о горящих кредитах
-Отправляет уведомления о займах со сроком оплаты <= 2 дней
+Уведомления о горящих кредитах - каждому пользователю в его Telegram и/или email
+Напоминает о платежах со сроком <= LOAN_NOTIFY_DAYS_BEFORE дней (и просроченных)
+
+Кого и о чём уведомлять, выбирается одним запросом по всем пользователям
+(app/loan_notifications.py); сообщения рассылаются параллельно через общий
+пул соединений (telegram_notifier.send_many), письма - синхронно одним
+SMTP-соединением (email_service.send_now). Доставленное записывается
+в loan_notifications, так что повторный запуск в тот же день не дублирует
+напоминания, а недоставленное повторится при следующем запуске.
+
+Использование:
+    python scripts/telegram_notifier.py
+    python scripts/telegram_notifier.py --dry-run
 """
 
+import argparse
 import sys
 import os
-from datetime import date, timedelta
-import requests
-from typing import List, Tuple
+from datetime import date, datetime
+from typing import List
 
 # Добавляем корень проекта в sys.path
 PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 sys.path.insert(0, PROJECT_ROOT)
 
+from app.config import LOAN_NOTIFY_DAYS_BEFORE
 from app.db_sa import get_session
-from app.models_sa import LoanORM, InstallmentORM
-from app.secrets import TELEGRAM_BOT_TOKEN, TELEGRAM_CHAT_ID, WEB_URL
-from sqlalchemy import select, func
-
-# Конфигурация Telegram
-TELEGRAM_TOKEN = TELEGRAM_BOT_TOKEN
-TELEGRAM_API_URL = f"https://api.telegram.org/bot{TELEGRAM_TOKEN}/sendMessage"
-TELEGRAM_CHAT_ID = str(TELEGRAM_CHAT_ID)
-
-# Настройки уведомлений
-DAYS_BEFORE_DUE = 2  # Уведомлять за 2 дня и менее для Telegram
-
-
-def send_telegram_message(text: str) -> bool:
-    """Отправка сообщения в Telegram"""
-    try:
-        payload = {
-            'chat_id': TELEGRAM_CHAT_ID,
-            'text': text,
-            'parse_mode': 'HTML',
-            'disable_web_page_preview': False
-        }
-        response = requests.post(TELEGRAM_API_URL, json=payload, timeout=10)
-        response.raise_for_status()
-        return True
-    except Exception as e:
-        print(f"Ошибка отправки в Telegram: {e}")
-        return False
-
-
-def get_urgent_loans() -> List[dict]:
-    """
-    Получить список горящих кредитов
-    Возвращает: [{'org_name': ..., 'website': ..., 'due_date': ..., 'amount': ..., 'days_left': ...}, ...]
-    """
-    urgent_loans = []
-    today = date.today()
-    threshold_date = today + timedelta(days=DAYS_BEFORE_DUE)
-    
-    with get_session() as session:
-        # Получаем ВСЕ займы (даже с is_paid=1, т.к. флаг может быть несинхронизирован)
-        loans = session.execute(
-            select(LoanORM)
-        ).scalars().all()
-        
-        for loan in loans:
-            # Сразу получаем все данные внутри сессии
-            loan_data = {
-                'id': loan.id,
-                'org_name': loan.org_name,
-                'website': loan.website,
-                'amount_due': loan.amount_due,
-                'due_date': loan.due_date
-            }
-            
-            # Проверяем есть ли платежи вообще и сколько неоплаченных
-            total_count = session.execute(
-                select(func.count(InstallmentORM.id))
-                .where(InstallmentORM.loan_id == loan.id)
-            ).scalar()
-            
-            unpaid_count = session.execute(
-                select(func.count(InstallmentORM.id))
-                .where(
-                    InstallmentORM.loan_id == loan.id,
-                    InstallmentORM.paid == 0
-                )
-            ).scalar()
-            
-            # Если есть неоплаченные платежи - проверяем ближайший
-            if unpaid_count > 0:
-                next_payment = session.execute(
-                    select(InstallmentORM)
-                    .where(
-                        InstallmentORM.loan_id == loan.id,
-                        InstallmentORM.paid == 0
-                    )
-                    .order_by(InstallmentORM.due_date.asc())
-                    .limit(1)
-                ).scalar_one_or_none()
-                
-                if next_payment:
-                    try:
-                        payment_date = date.fromisoformat(next_payment.due_date)
-                        days_left = (payment_date - today).days
-                        
-                        if days_left <= DAYS_BEFORE_DUE:
-                            urgent_loans.append({
-                                'org_name': loan_data['org_name'],
-                                'website': loan_data['website'],
-                                'due_date': next_payment.due_date,
-                                'amount': next_payment.amount,
-                                'days_left': days_left
-                            })
-                    except ValueError:
-                        pass  # Неверный формат даты
-            else:
-                # Нет неоплаченных платежей по рассрочке
-                # Если есть платежи и все оплачены - займ считается оплаченным
-                if total_count > 0:
-                    continue  # Все платежи оплачены, пропускаем
-                
-                # Нет платежей вообще - проверяем основной займ только если is_paid=0
-                if loan.is_paid == 0:
-                    try:
-                        loan_due_date = date.fromisoformat(loan_data['due_date'])
-                        days_left = (loan_due_date - today).days
-                        
-                        if days_left <= DAYS_BEFORE_DUE and loan_data['amount_due'] > 0:
-                            urgent_loans.append({
-                                'org_name': loan_data['org_name'],
-                                'website': loan_data['website'],
-                                'due_date': loan_data['due_date'],
-                                'amount': loan_data['amount_due'],
-                                'days_left': days_left
-                            })
-                    except ValueError:
-                        pass  # Неверный формат даты
-    
-    # Сортируем по количеству оставшихся дней
-    urgent_loans.sort(key=lambda x: x['days_left'])
-    return urgent_loans
+from app.loan_notifications import CHANNEL_EMAIL, CHANNEL_TELEGRAM, find_due, pending, record_sent
 
 
 def format_message(urgent_loans: List[dict]) -> str:
@@ -193,25 +84,72 @@ def format_message(urgent_loans: List[dict]) -> str:
 
 def main():
     """Основная функция"""
-    print(f"[{date.today()} {__import__('datetime').datetime.now().strftime('%H:%M:%S')}] Проверка горящих кредитов...")
+    parser = argparse.ArgumentParser(description="Уведомления о горящих кредитах")
+    parser.add_argument("--days", type=int, default=LOAN_NOTIFY_DAYS_BEFORE, help="за сколько дней до срока")
+    parser.add_argument("--dry-run", action="store_true", help="только показать, кому что ушло бы")
+    args = parser.parse_args()
     
-    # Получаем список горящих кредитов
-    urgent_loans = get_urgent_loans()
+    from app.email_service import email_service
+    from app.telegram_notifier import telegram_notifier
     
-    print(f"Найдено горящих кредитов: {len(urgent_loans)}")
+    today = date.today()
+    print(f"[{today} {datetime.now().strftime('%H:%M:%S')}] Проверка горящих кредитов...")
+    
+    # Один запрос: пользователи, их горящие платежи, настройки и что уже отправлено сегодня
+    with get_session() as session:
+        users = find_due(session, today, args.days)
     
-    # Формируем сообщение
-    message = format_message(urgent_loans)
+    telegram_batch = [(user, pending(user, CHANNEL_TELEGRAM)) for user in users]
+    telegram_batch = [(user, loans) for user, loans in telegram_batch if loans]
+    email_batch = [(user, pending(user, CHANNEL_EMAIL)) for user in users] if email_service.enabled else []
+    email_batch = [(user, loans) for user, loans in email_batch if loans]
     
-    # Отправляем в Telegram
-    if send_telegram_message(message):
-        print("✓ Уведомление отправлено в Telegram")
+    print(f"Пользователей с горящими кредитами: {len(users)}; "
+          f"к отправке: Telegram {len(telegram_batch)}, email {len(email_batch)}")
+    
+    if args.dry_run:
+        for user, loans in telegram_batch:
+            print(f"  Telegram -> user {user['user_id']}: {len(loans)} кредит(ов)")
+        for user, loans in email_batch:
+            print(f"  Email -> user {user['user_id']}: {len(loans)} кредит(ов)")
         return 0
-    else:
-        print("✗ Ошибка отправки уведомления")
+    
+    sent = {CHANNEL_TELEGRAM: [], CHANNEL_EMAIL: []}
+    telegram_ok = email_ok = 0
+    
+    # Отправляем в Telegram (параллельно, общий пул соединений)
+    results = telegram_notifier.send_many(
+        [(user['telegram_chat_id'], format_message(loans)) for user, loans in telegram_batch]
+    )
+    for (user, loans), message_id in zip(telegram_batch, results):
+        if message_id is None:
+            continue
+        telegram_ok += 1
+        sent[CHANNEL_TELEGRAM].extend({'user_id': user['user_id'], 'loan': loan} for loan in loans)
+    
+    # Письма - синхронно, одним SMTP-соединением: записываем только принятые сервером,
+    # иначе не дошедшее письмо не повторится до завтра
+    results = email_service.send_now(
+        [email_service.build_loan_due_email(user['email'], user['name'], loans) for user, loans in email_batch]
+    )
+    for (user, loans), delivered in zip(email_batch, results):
+        if not delivered:
+            continue
+        email_ok += 1
+        sent[CHANNEL_EMAIL].extend({'user_id': user['user_id'], 'loan': loan} for loan in loans)
+    
+    # Запоминаем отправленное: повторный запуск сегодня его пропустит
+    with get_session() as session:
+        recorded = record_sent(session, sent, today)
+    
+    print(f"✓ Отправлено: Telegram {telegram_ok}/{len(telegram_batch)}, email {email_ok}/{len(email_batch)}; "
+          f"записано напоминаний: {recorded}")
+    failed = len(telegram_batch) - telegram_ok + len(email_batch) - email_ok
+    if failed:
+        print(f"✗ Ошибок отправки: {failed}")
         return 1
+    return 0
 
 
 if __name__ == "__main__":
     sys.exit(main())
-
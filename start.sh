@@ -65,6 +65,9 @@ start_app() {
     cd "$APP_DIR"
     source "$VENV_DIR/bin/activate"
     
+    # Create/verify DB schema once (workers no longer do it on boot)
+    python scripts/migrate.py
+    
     # Start gunicorn in background
     gunicorn --config "$GUNICORN_CONFIG" "web:create_app()" &
     echo $! > "$PID_FILE"
@@ -22,15 +22,14 @@ def create_app() -> Flask:
     from werkzeug.middleware.proxy_fix import ProxyFix
     app.wsgi_app = ProxyFix(app.wsgi_app, x_prefix=1, x_for=1, x_host=1, x_proto=1)
 
-    # Ensure DB schema exists (Postgres/SQLite via DATABASE_URL)
-    try:
-        from app.db_sa import engine
-        from app.models_sa import Base
-        Base.metadata.create_all(bind=engine)
+    # Схема БД создаётся явной командой `flask --app web migrate`
+    # (или scripts/migrate.py), а не при каждом старте воркера
+    @app.cli.command("migrate")
+    def migrate_command():
+        """Создать недостающие таблицы БД"""
+        from app.db_sa import create_schema
+        create_schema()
         print("✓ Database tables created/verified")
-    except Exception as e:
-        print(f"⚠ Database initialization warning: {e}")
-        pass
 
     # Регистрация blueprints
     from .auth_views import bp as auth_bp
@@ -48,6 +47,19 @@ def create_app() -> Flask:
     from .admin_views import bp as admin_bp
     app.register_blueprint(admin_bp)
 
+    # Пул хеширования паролей перегружен - просим повторить позже
+    from app.password_hasher import HashingBusyError
+    
+    @app.errorhandler(HashingBusyError)
+    def handle_hashing_busy(e):
+        from flask import render_template
+        response = app.make_response((
+            render_template('auth/busy.html', message=str(e), retry_after=e.retry_after),
+            e.status_code,
+        ))
+        response.headers['Retry-After'] = str(e.retry_after)
+        return response
+
     # Контекстный процессор для доступа к пользователю в шаблонах
     @app.context_processor
     def inject_user():
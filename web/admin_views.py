@@ -2,36 +2,150 @@
 Административная панель
 Управление пользователями, статистика системы
 """
-from flask import Blueprint, render_template, request, redirect, url_for, flash
+from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify
+from app import forecast
 from app.auth import admin_required, get_current_user
 from app.db_sa import get_session
 from app.models_sa import UserORM, LoanORM, TaskORM, TaskCategoryORM
-from sqlalchemy import func
+from sqlalchemy import func, select, tuple_
 from datetime import datetime
+import base64
+import json
+import threading
+import time
 
 bp = Blueprint('admin', __name__, url_prefix='/admin')
 
 
+ADMIN_USERS_PAGE_SIZE = 50
+ADMIN_USERS_SORTS = {
+    'created': 'Регистрация',
+    'id': 'ID',
+    'loans': 'Займы',
+    'tasks': 'Задачи',
+    'categories': 'Категории',
+}
+# Снимок общей статистики пересчитывается не чаще раза в ADMIN_STATS_TTL_SECONDS
+ADMIN_STATS_TTL_SECONDS = 60
+
+_stats_snapshot = None  # (stats_data, computed_at_monotonic)
+_stats_lock = threading.Lock()
+_stats_refreshing = False
+
+
+def _encode_cursor(values) -> str:
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode().rstrip('=')
+
+
+def _decode_cursor(cursor: str):
+    """Returns: (значение сортировки, user_id) или None, если курсор битый"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        value, user_id = json.loads(base64.urlsafe_b64decode(padded))
+        return value, int(user_id)
+    except Exception:
+        return None
+
+
+COUNTED_MODELS = {
+    'loans': LoanORM,
+    'tasks': TaskORM,
+    'categories': TaskCategoryORM,
+}
+
+
+def _count_by_user(model, user_ids=None):
+    """
+    Подзапрос: user_id -> количество строк (одна группировка на таблицу)
+    user_ids - считать только этих пользователей (по индексу user_id, а не всю таблицу)
+    """
+    query = select(model.user_id.label('user_id'), func.count().label('n')).group_by(model.user_id)
+    if user_ids is not None:
+        query = query.where(model.user_id.in_(user_ids))
+    return query.subquery()
+
+
+def _load_users_page(db, sort: str, order: str, cursor: str = None):
+    """
+    Страница пользователей со счётчиками займов/задач/категорий
+    Keyset-пагинация по (ключ сортировки, id) - стоимость не растёт с номером страницы.
+    Сначала выбирается страница (по users; при сортировке по счётчику - с группировкой
+    только этой таблицы), затем счётчики считаются одним запросом лишь для её user_id.
+    Returns: (rows, next_cursor)
+    """
+    query = select(
+        UserORM.id, UserORM.email, UserORM.full_name, UserORM.is_admin,
+        UserORM.is_active, UserORM.email_verified, UserORM.created_at,
+    )
+    if sort in COUNTED_MODELS:
+        # Порядок по счётчику требует его для всех пользователей - но только по одной таблице
+        sorted_counts = _count_by_user(COUNTED_MODELS[sort])
+        sort_key = func.coalesce(sorted_counts.c.n, 0)
+        query = query.add_columns(sort_key.label('sort_value')).outerjoin(
+            sorted_counts, sorted_counts.c.user_id == UserORM.id
+        )
+    else:
+        sort_key = UserORM.created_at if sort == 'created' else UserORM.id
+
+    position = _decode_cursor(cursor) if cursor else None
+    if position:
+        boundary = tuple_(sort_key, UserORM.id)
+        query = query.where(boundary < position if order == 'desc' else boundary > position)
+
+    if order == 'desc':
+        query = query.order_by(sort_key.desc(), UserORM.id.desc())
+    else:
+        query = query.order_by(sort_key.asc(), UserORM.id.asc())
+
+    page = db.execute(query.limit(ADMIN_USERS_PAGE_SIZE + 1)).all()
+    next_cursor = None
+    if len(page) > ADMIN_USERS_PAGE_SIZE:
+        page = page[:ADMIN_USERS_PAGE_SIZE]
+        last = page[-1]
+        last_value = last.created_at if sort == 'created' else (
+            last.id if sort == 'id' else last.sort_value
+        )
+        next_cursor = _encode_cursor([last_value, last.id])
+
+    user_ids = [row.id for row in page]
+    counts = {}
+    if user_ids:
+        subqueries = {name: _count_by_user(model, user_ids) for name, model in COUNTED_MODELS.items()}
+        counts_query = select(
+            UserORM.id,
+            *(func.coalesce(sub.c.n, 0).label(f'{name}_count') for name, sub in subqueries.items()),
+        ).where(UserORM.id.in_(user_ids))
+        for sub in subqueries.values():
+            counts_query = counts_query.outerjoin(sub, sub.c.user_id == UserORM.id)
+        counts = {row.id: row._mapping for row in db.execute(counts_query)}
+
+    rows = [{**row._mapping, **counts.get(row.id, {})} for row in page]
+    return rows, next_cursor
+
+
 @bp.route('/users')
 @admin_required
 def users():
-    """Список всех пользователей"""
+    """Список пользователей (постранично, сортировка по любому счётчику)"""
+    sort = request.args.get('sort', 'created')
+    if sort not in ADMIN_USERS_SORTS:
+        sort = 'created'
+    order = 'asc' if request.args.get('order') == 'asc' else 'desc'
+    cursor = request.args.get('cursor')
+
     with get_session() as db:
-        users_list = db.query(UserORM).order_by(UserORM.created_at.desc()).all()
-        
-        # Статистика по каждому пользователю
-        users_data = []
-        for user in users_list:
-            loans_count = db.query(func.count(LoanORM.id)).filter_by(user_id=user.id).scalar()
-            tasks_count = db.query(func.count(TaskORM.id)).filter_by(user_id=user.id).scalar()
-            
-            users_data.append({
-                'user': user,
-                'loans_count': loans_count,
-                'tasks_count': tasks_count
-            })
-    
-    return render_template('admin/users.html', users_data=users_data)
+        rows, next_cursor = _load_users_page(db, sort, order, cursor)
+
+    return render_template(
+        'admin/users.html',
+        users_data=rows,
+        sort=sort,
+        order=order,
+        sorts=ADMIN_USERS_SORTS,
+        cursor=cursor,
+        next_cursor=next_cursor,
+        total_users=get_stats_snapshot()['users']['total'],
+    )
 
 
 @bp.route('/users/<int:user_id>')
@@ -84,6 +198,7 @@ def toggle_active(user_id):
         status = 'активирован' if user.is_active else 'деактивирован'
         flash(f'Пользователь {user.email} {status}', 'success')
     
+    invalidate_stats_snapshot()
     return redirect(url_for('admin.user_detail', user_id=user_id))
 
 
@@ -114,43 +229,112 @@ def make_admin(user_id):
         status = 'назначен администратором' if user.is_admin else 'снят с прав администратора'
         flash(f'Пользователь {user.email} {status}', 'success')
     
+    invalidate_stats_snapshot()
     return redirect(url_for('admin.user_detail', user_id=user_id))
 
 
-@bp.route('/stats')
-@admin_required
-def stats():
-    """Общая статистика системы"""
+def _compute_stats() -> dict:
+    """Общая статистика одним запросом (скалярные подзапросы) + последние регистрации"""
+    def count(model, *conditions):
+        return select(func.count(model.id)).where(*conditions).scalar_subquery()
+
     with get_session() as db:
-        # Общая статистика
-        total_users = db.query(func.count(UserORM.id)).scalar()
-        active_users = db.query(func.count(UserORM.id)).filter_by(is_active=True).scalar()
-        admin_users = db.query(func.count(UserORM.id)).filter_by(is_admin=True).scalar()
-        verified_users = db.query(func.count(UserORM.id)).filter_by(email_verified=True).scalar()
-        telegram_users = db.query(func.count(UserORM.id)).filter(UserORM.telegram_chat_id.isnot(None)).scalar()
-        
-        total_loans = db.query(func.count(LoanORM.id)).scalar()
-        total_tasks = db.query(func.count(TaskORM.id)).scalar()
-        total_categories = db.query(func.count(TaskCategoryORM.id)).scalar()
-        
-        # Последние регистрации
-        recent_users = db.query(UserORM).order_by(UserORM.created_at.desc()).limit(5).all()
-    
-    stats_data = {
+        row = db.execute(select(
+            count(UserORM).label('total_users'),
+            count(UserORM, UserORM.is_active == True).label('active_users'),
+            count(UserORM, UserORM.is_admin == True).label('admin_users'),
+            count(UserORM, UserORM.email_verified == True).label('verified_users'),
+            count(UserORM, UserORM.telegram_chat_id.isnot(None)).label('telegram_users'),
+            count(LoanORM).label('total_loans'),
+            count(TaskORM).label('total_tasks'),
+            count(TaskCategoryORM).label('total_categories'),
+        )).one()
+
+        recent_users = db.execute(
+            select(UserORM.email, UserORM.full_name, UserORM.created_at, UserORM.is_active)
+            .order_by(UserORM.created_at.desc())
+            .limit(5)
+        ).all()
+
+    return {
         'users': {
-            'total': total_users,
-            'active': active_users,
-            'admins': admin_users,
-            'verified': verified_users,
-            'telegram': telegram_users
+            'total': row.total_users,
+            'active': row.active_users,
+            'admins': row.admin_users,
+            'verified': row.verified_users,
+            'telegram': row.telegram_users
         },
         'content': {
-            'loans': total_loans,
-            'tasks': total_tasks,
-            'categories': total_categories
+            'loans': row.total_loans,
+            'tasks': row.total_tasks,
+            'categories': row.total_categories
         },
         'recent_users': recent_users
     }
-    
-    return render_template('admin/stats.html', stats=stats_data)
 
+
+def _refresh_stats() -> dict:
+    global _stats_snapshot, _stats_refreshing
+    try:
+        data = _compute_stats()
+        with _stats_lock:
+            _stats_snapshot = (data, time.monotonic())
+        return data
+    finally:
+        with _stats_lock:
+            _stats_refreshing = False
+
+
+def get_stats_snapshot() -> dict:
+    """
+    Снимок общей статистики
+    Первый вызов считает синхронно; устаревший снимок отдаётся сразу,
+    а пересчёт идёт в фоновом потоке (не больше одного одновременно)
+    """
+    global _stats_refreshing
+    with _stats_lock:
+        snapshot = _stats_snapshot
+        if snapshot is None or time.monotonic() - snapshot[1] >= ADMIN_STATS_TTL_SECONDS:
+            start_refresh = not _stats_refreshing
+            _stats_refreshing = True
+        else:
+            start_refresh = False
+
+    if snapshot is None:
+        if start_refresh:
+            return _refresh_stats()
+        # Первый пересчёт уже идёт в другом потоке - посчитаем сами
+        return _compute_stats()
+
+    if start_refresh:
+        threading.Thread(target=_refresh_stats, name='admin-stats-refresh', daemon=True).start()
+    return snapshot[0]
+
+
+def invalidate_stats_snapshot() -> None:
+    """Сбросить снимок (после изменений, которые админ должен увидеть сразу)"""
+    global _stats_snapshot
+    with _stats_lock:
+        _stats_snapshot = None
+
+
+@bp.route('/stats')
+@admin_required
+def stats():
+    """Общая статистика системы"""
+    return render_template('admin/stats.html', stats=get_stats_snapshot(), forecast=forecast.get_forecast())
+
+
+@bp.route('/forecast.json')
+@admin_required
+def forecast_json():
+    """Прогноз выплат по всем пользователям: ?granularity=day|week|month&months=N"""
+    try:
+        data = forecast.get_forecast(
+            None,
+            granularity=request.args.get('granularity', 'month'),
+            months=request.args.get('months', forecast.FORECAST_DEFAULT_MONTHS, type=int),
+        )
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify(data)
@@ -7,6 +7,7 @@ from app.auth import (
     authenticate_user, is_ip_blocked, add_login_attempt,
     clear_login_attempts, get_client_ip, get_block_time_remaining,
     create_user, generate_verification_token, verify_email_token,
+    start_user_session, end_user_session,
     generate_password_reset_token, reset_password, get_user_by_email,
     is_valid_email, is_strong_password
 )
@@ -43,8 +44,7 @@ def login():
         
         if user_id:
             # Успешный вход
-            session['user_id'] = user_id
-            session.permanent = True  # Cookie на 30 дней
+            start_user_session(user_id)
             clear_login_attempts(client_ip)
             
             # Проверяем верификацию email
@@ -127,7 +127,7 @@ def register():
         # Генерируем токен верификации
         token = generate_verification_token(user_id)
         
-        # Отправляем письмо с подтверждением
+        # Ставим письмо с подтверждением в очередь отправки
         email_sent = email_service.send_verification_email(email, full_name or email, token)
         
         if email_sent:
@@ -136,8 +136,7 @@ def register():
             flash('Регистрация успешна! Email сервис временно недоступен, но вы можете войти в систему.', 'warning')
         
         # Автоматический вход после регистрации
-        session['user_id'] = user_id
-        session.permanent = True
+        start_user_session(user_id)
         
         return redirect(url_for('views.dashboard'))
     
@@ -257,20 +256,12 @@ def resend_verification():
         # Генерируем новый токен
         token = generate_verification_token(user_id)
         
-        # Отправляем письмо с защитой от зависания
-        email_sent = False
-        if email_service.enabled:
-            try:
-                print(f"📤 Повторная отправка письма верификации на {user.email}...")
-                email_sent = email_service.send_verification_email(
-                    user.email,
-                    user.full_name or user.email,
-                    token
-                )
-                if email_sent:
-                    print(f"✅ Письмо верификации отправлено на {user.email}")
-            except Exception as e:
-                print(f"⚠️  Ошибка при повторной отправке письма: {e}")
+        # Письмо уходит фоновой очередью - запрос не ждёт SMTP
+        email_sent = email_service.send_verification_email(
+            user.email,
+            user.full_name or user.email,
+            token
+        )
         
         if email_sent:
             flash('Письмо с подтверждением отправлено повторно. Проверьте почту.', 'success')
@@ -283,6 +274,6 @@ def resend_verification():
 @bp.route('/logout')
 def logout():
     """Выход"""
-    session.clear()
+    end_user_session()
     flash('Вы успешно вышли из системы', 'success')
     return redirect(url_for('auth.login'))
@@ -0,0 +1,84 @@
+"""
+Условные GET-запросы (ETag / Last-Modified) по версии данных пользователя
+
+Декоратор conditional_get строит из версии (app/data_version.py) сильный
+ETag и отвечает 304 на If-None-Match до обращения к БД и рендеринга шаблона.
+"""
+import hashlib
+import os
+from datetime import date, datetime, timezone
+from functools import wraps
+from typing import Optional
+
+from flask import Response, make_response, request, session as flask_session
+
+from app.data_version import GLOBAL_SCOPE, current_version
+
+_build_id: Optional[str] = None
+
+
+def _get_build_id() -> str:
+    """
+    Отпечаток кода и шаблонов: после деплоя ETag'и меняются,
+    даже если данные пользователя не менялись
+    """
+    global _build_id
+    if _build_id is None:
+        build_id = os.environ.get("APP_BUILD_ID")
+        if not build_id:
+            root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+            latest = 0.0
+            for folder in ("app", "web"):
+                for dirpath, _, filenames in os.walk(os.path.join(root, folder)):
+                    for name in filenames:
+                        if name.endswith((".py", ".html")):
+                            latest = max(latest, os.path.getmtime(os.path.join(dirpath, name)))
+            build_id = str(int(latest))
+        _build_id = build_id
+    return _build_id
+
+
+def _make_etag(scope, version: int) -> str:
+    # Страницы считают "сколько дней до платежа" - меняются и с датой
+    raw = "|".join([str(scope), str(version), date.today().isoformat(), request.full_path, _get_build_id()])
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+def conditional_get(global_scope: bool = False):
+    """
+    Декоратор: ETag/Last-Modified по версии данных, 304 до вызова view.
+    Ставится НАД login_required, чтобы на 304 не загружать пользователя из БД.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            # Ожидающие flash-сообщения должны попасть на страницу
+            if request.method not in ("GET", "HEAD") or flask_session.get("_flashes"):
+                return f(*args, **kwargs)
+
+            from app.auth import get_session_user_id
+            user_id = get_session_user_id()
+            if not user_id:
+                return f(*args, **kwargs)  # login_required разберётся
+
+            scope = GLOBAL_SCOPE if global_scope else user_id
+            version = current_version(scope)
+            if version is None:
+                return f(*args, **kwargs)
+
+            # В ETag входит user_id: общий ответ не должен совпасть у разных пользователей
+            etag = _make_etag(f"{scope}:{user_id}", version)
+            if request.if_none_match.contains(etag):
+                response = Response(status=304)
+            else:
+                response = make_response(f(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+
+            response.set_etag(etag)
+            response.last_modified = datetime.fromtimestamp(version / 1000, tz=timezone.utc)
+            # Браузер может хранить копию, но обязан перепроверять её
+            response.headers["Cache-Control"] = "private, no-cache"
+            return response
+        return decorated_function
+    return decorator
@@ -3,7 +3,11 @@
 Профиль, настройки, уведомления, Telegram привязка
 """
 from flask import Blueprint, render_template, request, redirect, url_for, flash, session
-from app.auth import login_required, get_current_user, update_user_password, is_valid_email, is_strong_password
+from app.auth import (
+    login_required, get_current_user, update_user_password, is_valid_email, is_strong_password,
+    check_user_password
+)
+from app import session_store
 from app.db_sa import get_session
 from app.models_sa import UserORM
 from datetime import datetime
@@ -68,11 +72,10 @@ def change_email():
             return redirect(url_for('profile.index'))
         
         # Проверяем текущий пароль
-        from app.auth import authenticate_user, generate_verification_token
+        from app.auth import generate_verification_token
         from app.email_service import email_service
         
-        user_id = authenticate_user(user.email, password)
-        if not user_id:
+        if not check_user_password(user.id, password):
             flash('Неверный пароль', 'danger')
             return render_template('profile/change_email.html', user=user)
         
@@ -100,23 +103,13 @@ def change_email():
         # Логирование
         try:
             from app import audit_log
-            audit_log.log_security_event('EMAIL_CHANGED', f'user_id={user.id}, old={old_email}, new={new_email}')
+            audit_log.log_security_event('EMAIL_CHANGED', f'old={old_email}, new={new_email}', user_id=user.id)
         except Exception as e:
             print(f"⚠️  Audit log error: {e}")
         
-        # Отправляем письмо синхронно (с timeout 5 секунд внутри)
-        if email_service.enabled:
-            try:
-                print(f"📤 Отправка письма верификации на {new_email}...")
-                email_sent = email_service.send_verification_email(new_email, user.full_name or new_email, token)
-                if email_sent:
-                    print(f"✅ Письмо верификации успешно отправлено на {new_email}")
-                else:
-                    print(f"⚠️  Письмо не отправлено (SMTP не настроен)")
-            except Exception as e:
-                print(f"⚠️  Ошибка при отправке письма верификации: {e}")
-                import traceback
-                traceback.print_exc()
+        # Письмо уходит фоновой очередью - запрос не ждёт SMTP
+        if not email_service.send_verification_email(new_email, user.full_name or new_email, token):
+            print(f"⚠️  Письмо верификации на {new_email} не поставлено в очередь")
         
         flash(f'Email изменен на {new_email}. Проверьте почту для подтверждения нового адреса.', 'success')
         return redirect(url_for('profile.index'))
@@ -148,11 +141,9 @@ def change_password():
             return render_template('profile/change_password.html')
         
         # Проверяем текущий пароль
-        from app.auth import authenticate_user
         user = get_current_user()
-        user_id = authenticate_user(user.email, current_password)
         
-        if not user_id:
+        if not check_user_password(user.id, current_password):
             flash('Неверный текущий пароль', 'danger')
             return render_template('profile/change_password.html')
         
@@ -160,6 +151,8 @@ def change_password():
         success = update_user_password(user.id, new_password)
         
         if success:
+            # Выходим на всех остальных устройствах
+            session_store.revoke_user_sessions(user.id, except_token=session.get('session_token'))
             flash('Пароль успешно изменен', 'success')
             return redirect(url_for('profile.index'))
         else:
@@ -173,7 +166,30 @@ def change_password():
 def security():
     """Настройки безопасности"""
     user = get_current_user()
-    return render_template('profile/security.html', user=user)
+    sessions = session_store.list_user_sessions(user.id, current_token=session.get('session_token'))
+    return render_template('profile/security.html', user=user, sessions=sessions)
+
+
+@bp.route('/sessions/<int:session_id>/revoke', methods=['POST'])
+@login_required
+def revoke_session(session_id: int):
+    """Завершить сессию на другом устройстве"""
+    user = get_current_user()
+    if session_store.revoke_session_by_id(user.id, session_id):
+        flash('Сессия завершена', 'success')
+    else:
+        flash('Сессия не найдена', 'warning')
+    return redirect(url_for('profile.security'))
+
+
+@bp.route('/sessions/revoke-others', methods=['POST'])
+@login_required
+def revoke_other_sessions():
+    """Завершить все сессии, кроме текущей"""
+    user = get_current_user()
+    count = session_store.revoke_user_sessions(user.id, except_token=session.get('session_token'))
+    flash(f'Завершено сессий: {count}', 'success')
+    return redirect(url_for('profile.security'))
 
 
 @bp.route('/notifications', methods=['GET', 'POST'])
@@ -236,10 +252,7 @@ def delete_account():
         return redirect(url_for('profile.security'))
     
     # Проверяем пароль
-    from app.auth import authenticate_user
-    user_id = authenticate_user(user.email, password)
-    
-    if not user_id:
+    if not check_user_password(user.id, password):
         flash('Неверный пароль', 'danger')
         return redirect(url_for('profile.security'))
     
@@ -251,7 +264,8 @@ def delete_account():
             db.flush()
     
     # Выходим из системы
-    session.clear()
+    from app.auth import end_user_session
+    end_user_session()
     flash('Ваш аккаунт удален. Спасибо за использование системы!', 'info')
     return redirect(url_for('auth.login'))
 
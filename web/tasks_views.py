@@ -3,10 +3,12 @@
 """
 from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify
 from datetime import datetime, date
-from sqlalchemy import select, func
+from sqlalchemy import select, func, case, and_, literal_column, tuple_
+import base64
 import json
 
 from app.auth import login_required
+from web.conditional import conditional_get
 from app.db_sa import get_session
 from app.models_sa import (
     TaskORM, TaskCategoryORM, SubtaskORM, TaskReminderORM, ReminderTemplateORM,
@@ -24,7 +26,119 @@ def clear_cache():
     return render_template('tasks/clear_cache.html')
 
 
+# Размер страницы списка задач (keyset-пагинация)
+TASKS_PAGE_SIZE = 50
+# Сколько символов описания нужно карточке (шаблон показывает 100 + "...")
+TASK_DESCRIPTION_PREVIEW = 101
+# Задачи без срока сортируются в конец (одинаково в SQLite и PostgreSQL).
+# Литерал, а не параметр: выражение должно совпасть с индексом ix_tasks_user_listing
+NO_DUE_DATE_SORT_KEY = '9999-12-31'
+TASK_DUE_SORT_KEY = func.coalesce(TaskORM.due_date, literal_column(f"'{NO_DUE_DATE_SORT_KEY}'"))
+
+
+def _encode_cursor(values) -> str:
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode().rstrip('=')
+
+
+def _decode_cursor(cursor: str):
+    """Returns: (importance, due_key, id) или None, если курсор битый"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        importance, due_key, task_id = json.loads(base64.urlsafe_b64decode(padded))
+        return int(importance), str(due_key), int(task_id)
+    except Exception:
+        return None
+
+
+def _load_task_page(session, user_id: int, filter_by: str, category_id, cursor: str = None):
+    """
+    Одна страница списка задач двумя запросами:
+    проекция нужных колонок + категория (outer join) по индексу сортировки,
+    затем счётчики подзадач только для задач этой страницы (по ix_subtasks_task_id).
+    Число запросов не зависит от числа задач и подзадач.
+    Returns: (tasks, next_cursor)
+    """
+    due_key = TASK_DUE_SORT_KEY
+    
+    query = (
+        select(
+            TaskORM.id, TaskORM.title,
+            func.substr(TaskORM.description, 1, TASK_DESCRIPTION_PREVIEW).label('description'),
+            TaskORM.status, TaskORM.importance, TaskORM.due_date, TaskORM.category_id,
+            due_key.label('due_key'),
+            TaskCategoryORM.name.label('category_name'),
+            TaskCategoryORM.color.label('category_color'),
+        )
+        .select_from(TaskORM)
+        .outerjoin(TaskCategoryORM, TaskCategoryORM.id == TaskORM.category_id)
+        .where(TaskORM.user_id == user_id)
+    )
+    
+    # Фильтры
+    if filter_by == 'today':
+        today = date.today().isoformat()
+        query = query.where(TaskORM.due_date.like(f'{today}%'), TaskORM.status == 0)
+    elif filter_by == 'overdue':
+        now = datetime.now().isoformat()
+        query = query.where(TaskORM.due_date < now, TaskORM.status == 0)
+    elif filter_by == 'completed':
+        query = query.where(TaskORM.status == 1)
+    elif filter_by == 'important':
+        query = query.where(TaskORM.importance == 1, TaskORM.status == 0)
+    elif filter_by == 'pending':
+        query = query.where(TaskORM.status == 0)
+    
+    if category_id:
+        query = query.where(TaskORM.category_id == int(category_id))
+    
+    # Keyset: продолжаем строго после последней строки предыдущей страницы
+    after = _decode_cursor(cursor) if cursor else None
+    if after:
+        query = query.where(tuple_(TaskORM.importance, due_key, TaskORM.id) > tuple_(*after))
+    
+    # Сортировка: сначала важные и просроченные
+    query = query.order_by(TaskORM.importance.asc(), due_key.asc(), TaskORM.id.asc()).limit(TASKS_PAGE_SIZE + 1)
+    
+    rows = session.execute(query).all()
+    has_more = len(rows) > TASKS_PAGE_SIZE
+    rows = rows[:TASKS_PAGE_SIZE]
+    
+    subtask_counts = {}
+    if rows:
+        subtask_counts = {
+            row.task_id: (int(row.total), int(row.done or 0))
+            for row in session.execute(
+                select(
+                    SubtaskORM.task_id,
+                    func.count(SubtaskORM.id).label('total'),
+                    func.sum(case((SubtaskORM.completed == True, 1), else_=0)).label('done'),
+                )
+                .where(SubtaskORM.task_id.in_([row.id for row in rows]))
+                .group_by(SubtaskORM.task_id)
+            )
+        }
+    
+    tasks = [
+        {
+            'id': row.id,
+            'title': row.title,
+            'description': row.description,
+            'status': row.status,
+            'importance': row.importance,
+            'due_date': row.due_date,
+            'category_id': row.category_id,
+            'category': {'name': row.category_name, 'color': row.category_color} if row.category_name is not None else None,
+            'subtasks_total': subtask_counts.get(row.id, (0, 0))[0],
+            'subtasks_done': subtask_counts.get(row.id, (0, 0))[1],
+        }
+        for row in rows
+    ]
+    next_cursor = _encode_cursor([rows[-1].importance, rows[-1].due_key, rows[-1].id]) if has_more else None
+    return tasks, next_cursor
+
+
 @bp.route('/')
+@conditional_get()
 @login_required
 def index():
     """Главная страница задач"""
@@ -35,82 +149,68 @@ def index():
     category_id = request.args.get('category')
     
     with get_session() as session:
-        # Базовый запрос - только задачи текущего пользователя
-        query = select(TaskORM).where(TaskORM.user_id == user.id)
-        
-        # Фильтры
-        if filter_by == 'today':
-            today = date.today().isoformat()
-            query = query.where(TaskORM.due_date.like(f'{today}%'), TaskORM.status == 0)
-        elif filter_by == 'overdue':
-            now = datetime.now().isoformat()
-            query = query.where(TaskORM.due_date < now, TaskORM.status == 0)
-        elif filter_by == 'completed':
-            query = query.where(TaskORM.status == 1)
-        elif filter_by == 'important':
-            query = query.where(TaskORM.importance == 1, TaskORM.status == 0)
-        elif filter_by == 'pending':
-            query = query.where(TaskORM.status == 0)
-        
-        if category_id:
-            query = query.where(TaskORM.category_id == int(category_id))
-        
-        # Сортировка: сначала важные и просроченные
-        query = query.order_by(TaskORM.importance.asc(), TaskORM.due_date.asc())
-        
-        tasks_orm = session.execute(query).scalars().all()
-        
-        # Преобразуем в словари
-        tasks = []
-        for task in tasks_orm:
-            tasks.append({
-                'id': task.id,
-                'title': task.title,
-                'description': task.description,
-                'status': task.status,
-                'importance': task.importance,
-                'due_date': task.due_date,
-                'category_id': task.category_id,
-                'category': {'name': task.category.name, 'color': task.category.color} if task.category else None,
-                'subtasks': [{'title': st.title, 'completed': st.completed} for st in task.subtasks]
-            })
+        tasks, next_cursor = _load_task_page(session, user.id, filter_by, category_id, request.args.get('cursor'))
         
         # Получаем категории для фильтра - только для текущего пользователя
-        categories_orm = session.execute(
-            select(TaskCategoryORM).where(TaskCategoryORM.user_id == user.id)
-        ).scalars().all()
-        categories = [{'id': c.id, 'name': c.name, 'color': c.color} for c in categories_orm]
+        categories = [
+            {'id': c.id, 'name': c.name, 'color': c.color}
+            for c in session.execute(
+                select(TaskCategoryORM.id, TaskCategoryORM.name, TaskCategoryORM.color)
+                .where(TaskCategoryORM.user_id == user.id)
+            ).all()
+        ]
         
-        # Статистика - только для текущего пользователя
+        # Статистика - только для текущего пользователя, одним запросом
+        now = datetime.now().isoformat()
+        today = date.today().isoformat()
+        pending = TaskORM.status == 0
+        counts = session.execute(
+            select(
+                func.count(TaskORM.id),
+                func.sum(case((TaskORM.status == 1, 1), else_=0)),
+                func.sum(case((pending, 1), else_=0)),
+                func.sum(case((and_(pending, TaskORM.due_date < now), 1), else_=0)),
+                func.sum(case((and_(pending, TaskORM.due_date.like(f'{today}%')), 1), else_=0)),
+            ).where(TaskORM.user_id == user.id)
+        ).one()
         stats = {
-            'total': session.execute(
-                select(func.count(TaskORM.id)).where(TaskORM.user_id == user.id)
-            ).scalar() or 0,
-            'completed': session.execute(
-                select(func.count(TaskORM.id)).where(TaskORM.user_id == user.id, TaskORM.status == 1)
-            ).scalar() or 0,
-            'pending': session.execute(
-                select(func.count(TaskORM.id)).where(TaskORM.user_id == user.id, TaskORM.status == 0)
-            ).scalar() or 0,
-            'overdue': session.execute(
-                select(func.count(TaskORM.id)).where(
-                    TaskORM.user_id == user.id,
-                    TaskORM.due_date < datetime.now().isoformat(),
-                    TaskORM.status == 0
-                )
-            ).scalar() or 0,
-            'today': 0
+            'total': counts[0] or 0,
+            'completed': counts[1] or 0,
+            'pending': counts[2] or 0,
+            'overdue': counts[3] or 0,
+            'today': counts[4] or 0,
         }
         
     return render_template(
         'tasks/index.html',
         tasks=tasks,
+        next_cursor=next_cursor,
+        category_id=category_id,
         categories=categories,
         filter_by=filter_by,
         stats=stats
     )
 
 
+@bp.route('/list.json')
+@conditional_get()
+@login_required
+def list_json():
+    """Следующая страница списка задач для бесконечной прокрутки"""
+    from app.auth import get_current_user
+    user = get_current_user()
+    
+    filter_by = request.args.get('filter', 'all')
+    category_id = request.args.get('category')
+    
+    with get_session() as session:
+        tasks, next_cursor = _load_task_page(session, user.id, filter_by, category_id, request.args.get('cursor'))
+    
+    return jsonify({
+        'items': tasks,
+        'html': render_template('tasks/_task_cards.html', tasks=tasks),
+        'next_cursor': next_cursor,
+    })
 
 
 @bp.route('/<int:task_id>/complete', methods=['POST'])
@@ -312,6 +412,7 @@ def delete(task_id):
 
 
 @bp.route('/reminder-templates', methods=['GET'])
+@conditional_get(global_scope=True)
 @login_required
 def get_reminder_templates():
     """Получить список шаблонов напоминаний"""
@@ -7,6 +7,8 @@ import json
 
 from app.integration import cache_manager, api_gateway_client
 from app.auth import login_required
+from web.conditional import conditional_get
+from app import forecast, month_calendar, schedule, search
 from app.db_sa import get_session
 from app.models_sa import LoanORM, InstallmentORM, TaskORM
 
@@ -30,6 +32,7 @@ def healthz():
 
 
 @bp.route("/")
+@conditional_get()
 @login_required
 def dashboard():
     """Главная страница - Dashboard"""
@@ -149,11 +152,103 @@ def dashboard():
         loans_stats=loans_stats,
         urgent_loans=urgent_loans,
         tasks_stats=tasks_stats,
-        today_tasks=today_tasks_data
+        today_tasks=today_tasks_data,
+        forecast=forecast.get_forecast(user.id)
     )
 
 
+SEARCH_PAGE_SIZE = 20
+SEARCH_MAX_PAGE_SIZE = 50
+
+
+@bp.get("/search")
+@login_required
+def search_json():
+    """Полнотекстовый поиск по задачам, подзадачам и займам (JSON, по релевантности)"""
+    from app.auth import get_current_user
+    user = get_current_user()
+    
+    q = (request.args.get("q", "") or "").strip()
+    kinds = [k for k in request.args.get("kinds", "").split(",") if k] or list(search.ALL_KINDS)
+    page = max(1, request.args.get("page", 1, type=int))
+    per_page = min(SEARCH_MAX_PAGE_SIZE, max(1, request.args.get("per_page", SEARCH_PAGE_SIZE, type=int)))
+    
+    with get_session() as session:
+        # Берём на одну строку больше, чтобы знать, есть ли следующая страница
+        hits = search.search(session, user.id, q, kinds=kinds, limit=per_page + 1, offset=(page - 1) * per_page)
+    
+    has_more = len(hits) > per_page
+    hits = hits[:per_page]
+    for hit in hits:
+        if hit["kind"] == "loan":
+            hit["url"] = url_for("views.loan_edit_v2", loan_id=hit["id"])
+        else:
+            hit["url"] = url_for("tasks.edit", task_id=hit["task_id"])
+    
+    return jsonify({
+        "q": q,
+        "page": page,
+        "per_page": per_page,
+        "items": hits,
+        "next_page": page + 1 if has_more else None,
+    })
+
+
+@bp.get("/forecast.json")
+@conditional_get()
+@login_required
+def forecast_json():
+    """Прогноз выплат по неоплаченным платежам: ?granularity=day|week|month&months=N"""
+    from app.auth import get_current_user
+    user = get_current_user()
+    
+    try:
+        data = forecast.get_forecast(
+            user.id,
+            granularity=request.args.get("granularity", "month"),
+            months=request.args.get("months", forecast.FORECAST_DEFAULT_MONTHS, type=int),
+        )
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify(data)
+
+
+@bp.get("/calendar")
+@conditional_get()
+@login_required
+def calendar():
+    """Календарь месяца: платежи и напоминания по дням (?month=YYYY-MM)"""
+    from app.auth import get_current_user
+    user = get_current_user()
+    
+    try:
+        first = month_calendar.parse_month(request.args.get("month"))
+    except ValueError as e:
+        flash(str(e), "error")
+        return redirect(url_for("views.calendar"))
+    data = month_calendar.get_month(user.id, first)
+    # Сетка с понедельника: пустые ячейки до первого дня месяца
+    return render_template("calendar.html", calendar=data, leading_blanks=first.weekday(),
+                           today=date.today().isoformat())
+
+
+@bp.get("/calendar.json")
+@conditional_get()
+@login_required
+def calendar_json():
+    """Календарь месяца в JSON (?month=YYYY-MM)"""
+    from app.auth import get_current_user
+    user = get_current_user()
+    
+    try:
+        first = month_calendar.parse_month(request.args.get("month"))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify(month_calendar.get_month(user.id, first))
+
+
 @bp.route("/loans")
+@conditional_get()
 @login_required
 def loans_index():
     from app.auth import get_current_user
@@ -170,9 +265,21 @@ def loans_index():
     
     with get_session() as session:
         # Фильтруем займы по текущему пользователю
-        loans = session.execute(select(LoanORM).where(LoanORM.user_id == user.id)).scalars().all()
+        query = select(LoanORM).where(LoanORM.user_id == user.id)
         if q:
-            loans = [l for l in loans if q in (l.org_name or "").lower() or q in (l.website or "").lower() or q in (l.notes or "").lower()]
+            try:
+                with session.begin_nested():
+                    query = query.where(LoanORM.id.in_(search.search_loan_ids(session, user.id, q)))
+            except Exception as e:
+                # Поисковые индексы ещё не созданы (не запускалась миграция)
+                print(f"⚠️  Full-text search unavailable: {e}")
+                pattern = f"%{q}%"
+                query = query.where(
+                    func.lower(LoanORM.org_name).like(pattern)
+                    | func.lower(LoanORM.website).like(pattern)
+                    | func.lower(LoanORM.notes).like(pattern)
+                )
+        loans = session.execute(query).scalars().all()
         enriched = []
         today = date.today()
         total_remaining = 0.0
@@ -496,6 +603,7 @@ def loan_new_v2():
 
 
 @bp.route("/loan/<int:loan_id>/v2", methods=["GET"])
+@conditional_get()
 @login_required
 def loan_edit_v2(loan_id: int):
     """Новый интерфейс редактирования займа"""
@@ -555,12 +663,16 @@ def loan_edit_v2(loan_id: int):
 @login_required
 def loan_save_new():
     """Сохранение нового займа (JSON API)"""
+    from app.auth import get_current_user
+    user = get_current_user()
+    
     try:
         data = request.get_json()
         
         with get_session() as session:
             # Создаём займ
             loan = LoanORM(
+                user_id=user.id,
                 org_name=data['org_name'],
                 website=data['website'],
                 loan_date=data['loan_date'],
@@ -610,11 +722,14 @@ def loan_save_new():
 @login_required
 def loan_save_existing(loan_id: int):
     """Обновление существующего займа (JSON API)"""
+    from app.auth import get_current_user
+    user = get_current_user()
+    
     try:
         data = request.get_json()
         
         with get_session() as session:
-            loan = session.get(LoanORM, loan_id)
+            loan = check_loan_access(session, loan_id, user.id)
             if loan is None:
                 return jsonify({"success": False, "error": "Займ не найден"}), 404
             
@@ -667,6 +782,42 @@ def loan_save_existing(loan_id: int):
         return jsonify({"success": False, "error": str(e)}), 500
 
 
+@bp.get("/loan/schedule/preview")
+@login_required
+def loan_schedule_preview():
+    """Предпросмотр графика: ?principal=&rate=&term=&start=YYYY-MM-DD&method=annuity|differentiated|equal_principal"""
+    try:
+        params = schedule.parse_params(request.args)
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+    return jsonify({"success": True, **schedule.schedule_to_json(schedule.generate_schedule(*params))})
+
+
+@bp.route("/loan/<int:loan_id>/schedule", methods=["POST"])
+@login_required
+def loan_schedule_save(loan_id: int):
+    """Сгенерировать график на сервере и заменить им неоплаченные платежи (JSON API)"""
+    from app.auth import get_current_user
+    user = get_current_user()
+    
+    try:
+        principal, rate, term, start, method = schedule.parse_params(request.get_json() or {})
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+    
+    with get_session() as session:
+        loan = check_loan_access(session, loan_id, user.id)
+        if loan is None:
+            return jsonify({"success": False, "error": "Займ не найден"}), 404
+        periods = schedule.generate_schedule(principal, rate, term, start, method)
+        count = schedule.save_schedule(session, loan, periods, rate)
+        amount_due = loan.amount_due
+        session.commit()
+    cache_manager.delete("loans_data")
+    
+    return jsonify({"success": True, "count": count, "amount_due": amount_due})
+
+
 def sync_loan_paid_status(session: Session, loan_id: int):
     """Автоматическая синхронизация is_paid на основе installments"""
     loan = session.get(LoanORM, loan_id)